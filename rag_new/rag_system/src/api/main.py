@@ -4,7 +4,7 @@ Main API application for the RAG system
 """
 from fastapi import FastAPI, HTTPException, Depends, UploadFile, File, BackgroundTasks, WebSocket, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 from typing import Dict, Any, Optional, List
 import logging
 import asyncio
@@ -33,9 +33,11 @@ def safe_import(relative_import, absolute_import):
 try:
     from .models.requests import QueryRequest, UploadRequest
     from .models.responses import QueryResponse, UploadResponse, HealthResponse
+    from .streaming import sse_events, SSE_HEADERS
 except ImportError:
     from models.requests import QueryRequest, UploadRequest
     from models.responses import QueryResponse, UploadResponse, HealthResponse
+    from streaming import sse_events, SSE_HEADERS
 
 try:
     from ..core.error_handling import RAGSystemError, QueryError, EmbeddingError, LLMError
@@ -44,6 +46,8 @@ try:
         format_api_response, get_http_status_code, QueryErrorHandler
     )
     from ..core.resource_manager import get_global_app, ManagedThreadPool
+    from ..core.model_memory_manager import get_model_memory_manager
+    from ..retrieval.llm_rate_limiter import get_llm_rate_limiter
     from ..storage.feedback_store import FeedbackStore
 except ImportError:
     # Fallback to absolute imports when running as main module
@@ -53,6 +57,8 @@ except ImportError:
         format_api_response, get_http_status_code, QueryErrorHandler
     )
     from core.resource_manager import get_global_app, ManagedThreadPool
+    from core.model_memory_manager import get_model_memory_manager
+    from retrieval.llm_rate_limiter import get_llm_rate_limiter
     from storage.feedback_store import FeedbackStore
 
 try:
@@ -548,6 +554,47 @@ Answer:"""
                 }
             }, status_code=500)
     
+    @app.post("/query/stream")
+    async def query_stream(request: dict):
+        """Stream a query answer as Server-Sent Events: sources, then tokens, then the full response"""
+        query_text = request.get("query", "").strip()
+        if not query_text:
+            return JSONResponse({
+                "success": False,
+                "error": {
+                    "code": "INVALID_REQUEST",
+                    "message": "Query text is required"
+                }
+            }, status_code=400)
+        try:
+            max_results = min(int(request.get("max_results", 5)), 10)
+        except (TypeError, ValueError) as e:
+            return JSONResponse({
+                "success": False,
+                "error": {
+                    "code": "INVALID_PARAMETER",
+                    "message": "Invalid max_results value",
+                    "details": {"error": str(e)}
+                }
+            }, status_code=400)
+        
+        query_engine = container.get('query_engine')
+        start_time = time.time()
+        
+        def log_completion(response: Dict[str, Any]):
+            response['response_id'] = str(uuid.uuid4())
+            log_query_performance({
+                'query': query_text,
+                'response_time': time.time() - start_time,
+                'sources_count': len(response.get('sources', [])),
+                'success': True,
+                'streamed': True
+            })
+        
+        events = query_engine.process_query_stream(query_text, top_k=max_results)
+        return StreamingResponse(sse_events(events, on_done=log_completion),
+                                 media_type="text/event-stream", headers=SSE_HEADERS)
+    
     async def _process_text_ingestion_async(text: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
         """Process text ingestion asynchronously with timeout - SIMPLIFIED"""
         def _process_text():
@@ -859,7 +906,7 @@ Answer:"""
                 test_response = await asyncio.wait_for(
                     asyncio.get_event_loop().run_in_executor(
                         thread_pool,
-                        lambda: llm_client.generate("Hello", max_tokens=5)
+                        lambda: llm_client.generate("Hello", max_tokens=5, use_cache=False)
                     ),
                     timeout=llm_test_timeout
                 )
@@ -920,6 +967,17 @@ Answer:"""
                     'documents': sorted(list(unique_docs))
                 }
                 
+                query_engine = container.get('query_engine')
+                if hasattr(query_engine, 'get_cache_stats'):
+                    enhanced_stats['query_cache'] = query_engine.get_cache_stats()
+                
+                # Local models resident in the shared registry
+                enhanced_stats['models'] = get_model_memory_manager().get_stats()
+                enhanced_stats['llm_rate_limiter'] = get_llm_rate_limiter().get_stats()
+                llm_client = container.get('llm_client')
+                if hasattr(llm_client, 'get_cache_stats'):
+                    enhanced_stats['llm_cache'] = llm_client.get_cache_stats()
+                
                 return enhanced_stats
             
             loop = asyncio.get_event_loop()
@@ -2505,7 +2563,14 @@ Answer:"""
                 feedback_store,
                 lambda fs: fs.close() if hasattr(fs, 'close') else None
             )
-        
+            
+            # Flush the vector store's write-ahead log into its snapshot on exit
+            app_lifecycle.resource_manager.register_resource(
+                "vector_store",
+                container.get('vector_store'),
+                lambda vs: vs.close() if hasattr(vs, 'close') else None
+            )
+    
     @app.on_event("shutdown")
     async def shutdown_event():
         """Clean up resources on shutdown with comprehensive cleanup"""
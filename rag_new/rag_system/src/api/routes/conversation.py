@@ -5,6 +5,7 @@ FastAPI endpoints for LangGraph conversation management with state persistence
 import logging
 from typing import Dict, Any, Optional, List
 from fastapi import APIRouter, HTTPException, Depends
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel, Field, validator
 
 # Import the fresh conversation system components
@@ -15,6 +16,7 @@ try:
         FreshSmartRouter as SuggestionPlugin
     )
     from ...core.dependency_container import get_dependency_container
+    from ..streaming import sse_events, SSE_HEADERS
 except ImportError:
     # Fallback for different execution contexts
     from rag_system.src.conversation import (
@@ -23,6 +25,7 @@ except ImportError:
         FreshSmartRouter as SuggestionPlugin
     )
     from rag_system.src.core.dependency_container import get_dependency_container
+    from rag_system.src.api.streaming import sse_events, SSE_HEADERS
 
 # Create router
 router = APIRouter(prefix="/conversation", tags=["Conversation"])
@@ -30,25 +33,6 @@ logger = logging.getLogger(__name__)
 
 # Request/Response models
 
-# ------------------------------------------------------------------
-# Streaming endpoint (simple placeholder)
-# ------------------------------------------------------------------
-from fastapi.responses import StreamingResponse
-
-@router.get("/message/stream")
-async def stream_messages(thread_id: str = ""):
-    """Server-Sent Events placeholder for message streaming.
-    Currently yields an empty stream so that the route exists and
-    the frontend no longer receives 404. Replace with real stream logic
-    (e.g., SSE or WebSocket) as needed.
-    """
-    async def event_generator():
-        # Placeholder: no live streaming implemented yet
-        yield "event: end\ndata: Stream not implemented yet\n\n"
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
-
-# ------------------------------------------------------------------
-
 class ConversationRequest(BaseModel):
     thread_id: Optional[str] = Field(None, description="Optional thread ID to continue a conversation.")
     message: Optional[str] = Field(None, description="User's message. Required for sending messages, not for starting.")
@@ -129,6 +113,37 @@ async def send_message(
         logger.error(f"Error sending message: {e}", exc_info=True)
         raise HTTPException(status_code=500, detail=f"Failed to send message: {str(e)}")
 
+def _stream_message_response(manager: ConversationManager, thread_id: str, message: str) -> StreamingResponse:
+    if thread_id not in manager.active_conversations:
+        raise HTTPException(status_code=404, detail=f"Conversation {thread_id} not found")
+    events = manager.stream_message(thread_id, message)
+    return StreamingResponse(sse_events(events), media_type="text/event-stream", headers=SSE_HEADERS)
+
+@router.post("/message/stream")
+async def stream_message(
+    request: MessageRequest,
+    manager: ConversationManager = Depends(get_conversation_manager)
+):
+    """
+    Send a message and stream the reply as Server-Sent Events
+    ('sources', then 'token' events, then 'done' with the full ConversationResponse).
+    """
+    return _stream_message_response(manager, request.thread_id, request.message)
+
+@router.get("/message/stream")
+async def stream_message_get(
+    thread_id: str = "",
+    message: str = "",
+    manager: ConversationManager = Depends(get_conversation_manager)
+):
+    """
+    EventSource-friendly variant of POST /message/stream taking query parameters.
+    Without a message the stream just ends.
+    """
+    if not message:
+        return StreamingResponse(iter(["event: end\ndata: {}\n\n"]), media_type="text/event-stream")
+    return _stream_message_response(manager, thread_id, message)
+
 @router.get("/threads")
 async def get_conversation_threads(
     manager: ConversationManager = Depends(get_conversation_manager)
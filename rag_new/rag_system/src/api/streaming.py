@@ -0,0 +1,37 @@
+"""
+Server-Sent Events helpers
+Turns the event dicts produced by QueryEngine.process_query_stream into an SSE body
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, Iterator, Optional
+
+SSE_HEADERS = {
+    'Cache-Control': 'no-cache',
+    'Connection': 'keep-alive',
+    'X-Accel-Buffering': 'no'  # stop nginx from buffering the stream
+}
+
+
+def format_sse(event: str, data: Any) -> str:
+    """One SSE frame; ``data`` is sent as JSON on a single line"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_events(events: Iterator[Dict[str, Any]],
+               on_done: Optional[Callable[[Dict[str, Any]], None]] = None) -> Iterator[str]:
+    """Frame ``{'type': ..., ...}`` events as SSE, ending with an ``error`` event if the producer fails.
+    
+    This is a plain generator: StreamingResponse iterates it in the threadpool,
+    so the blocking LLM stream never runs on the event loop.
+    """
+    try:
+        for event in events:
+            payload = dict(event)
+            event_type = payload.pop('type', 'message')
+            if event_type == 'done' and on_done is not None:
+                on_done(payload)
+            yield format_sse(event_type, payload)
+    except Exception as e:
+        logging.error(f"Streaming response failed: {e}")
+        yield format_sse('error', {'message': str(e)})
@@ -3,7 +3,7 @@ FreshConversationGraph Module
 Implements the directed graph for the conversation flow
 """
 import logging
-from typing import Dict, List, Any, Optional, Callable
+from typing import Dict, Iterator, List, Any, Optional, Callable
 from datetime import datetime
 import uuid
 
@@ -100,12 +100,14 @@ class FreshConversationGraph:
             # Default to search for all other intents (critical "search-first" principle)
             return 'search'
     
-    def process_message(self, state: FreshConversationState) -> FreshConversationState:
+    def process_message(self, state: FreshConversationState,
+                        start_node: str = 'understand') -> FreshConversationState:
         """
         Process a user message through the conversation graph
         
         Args:
             state: The current conversation state with the user's message
+            start_node: Node to resume from when earlier nodes already ran
             
         Returns:
             FreshConversationState: Updated state with the assistant's response
@@ -117,7 +119,7 @@ class FreshConversationGraph:
         self.active_conversations[thread_id] = state
         
         # Determine starting node
-        current_node = 'understand'
+        current_node = start_node
         
         # Process through the graph
         while current_node:
@@ -198,6 +200,59 @@ class FreshConversationGraph:
         Returns:
             Dict[str, Any]: Updated conversation state with response
         """
+        current_state = self._add_user_message(thread_id, message)
+        
+        # Process through graph
+        processed_state = self.process_message(current_state)
+        
+        # Update active conversations with processed state
+        self.active_conversations[thread_id] = processed_state
+        
+        return self._conversation_result(thread_id, processed_state)
+    
+    def stream_message(self, thread_id: str, message: str) -> Iterator[Dict[str, Any]]:
+        """
+        Send a message and stream the answer as it is generated
+        
+        Yields the same events as QueryEngine.process_query_stream ('sources',
+        'token', then 'done' carrying the send_message result). Turns that do
+        not end in a single regular search (greetings, decomposed or
+        aggregation queries) run through the graph as usual and are emitted
+        as one token.
+        """
+        state = self._add_user_message(thread_id, message)
+        state = self.nodes.understand_intent(state)
+        
+        next_node = self._route_after_understanding(state)
+        request = {'query': None}
+        if next_node == 'search' and hasattr(self.nodes.query_engine, 'process_query_stream'):
+            request = self.nodes.prepare_streamed_search(state)
+        
+        if request['query'] is None:
+            if next_node == 'search':
+                state = self.nodes.search_knowledge(state, query_analysis=request.get('analysis'))
+                next_node = 'respond'
+            state = self.process_message(state, start_node=next_node)
+            result = self._conversation_result(thread_id, state)
+            yield {'type': 'sources', 'sources': result['sources'], 'total_sources': len(result['sources'])}
+            yield {'type': 'token', 'text': result['response']}
+            yield dict(result, type='done')
+            return
+        
+        search_result = None
+        for event in self.nodes.query_engine.process_query_stream(
+                request['query'], top_k=5, conversation_context=request['conversation_context']):
+            if event['type'] == 'done':
+                search_result = event
+                break
+            yield event
+        
+        state = self.nodes.complete_streamed_search(state, request, search_result)
+        state = self.process_message(state, start_node='respond')
+        yield dict(self._conversation_result(thread_id, state), type='done')
+    
+    def _add_user_message(self, thread_id: str, message: str) -> FreshConversationState:
+        """Append the user's message to an existing conversation"""
         # Get existing state or raise error
         if thread_id not in self.active_conversations:
             raise ValueError(f"Conversation {thread_id} not found")
@@ -214,13 +269,9 @@ class FreshConversationGraph:
         current_state['messages'] = messages
         current_state['last_activity'] = datetime.now().isoformat()
         current_state['turn_count'] = current_state.get('turn_count', 0) + 1
-        
-        # Process through graph
-        processed_state = self.process_message(current_state)
-        
-        # Update active conversations with processed state
-        self.active_conversations[thread_id] = processed_state
-        
+        return current_state
+    
+    def _conversation_result(self, thread_id: str, processed_state: FreshConversationState) -> Dict[str, Any]:
         # Get latest bot message
         latest_message = next((msg for msg in reversed(processed_state.get('messages', [])) 
                              if msg.get('type') == 'assistant'), None)
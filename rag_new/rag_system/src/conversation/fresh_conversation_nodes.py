@@ -5,12 +5,13 @@ Enhanced with LLM-powered query decomposition and synonym resolution
 """
 import logging
 import json
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 import re
 
 from .fresh_conversation_state import FreshConversationState, SearchResult
 from .fresh_smart_router import QueryIntent, QueryComplexity, Route
+from ..retrieval.llm_rate_limiter import llm_priority, PRIORITY_BACKGROUND
 
 
 class FreshConversationNodes:
@@ -116,7 +117,8 @@ class FreshConversationNodes:
         """
         
         try:
-            response = self.llm_client.generate(analysis_prompt)
+            with llm_priority(PRIORITY_BACKGROUND):
+                response = self.llm_client.generate(analysis_prompt)
             return json.loads(response)
         except Exception as e:
             self.logger.error(f"LLM analysis failed: {e}")
@@ -158,7 +160,8 @@ class FreshConversationNodes:
         """
         
         try:
-            response = self.llm_client.generate(decomposition_prompt)
+            with llm_priority(PRIORITY_BACKGROUND):
+                response = self.llm_client.generate(decomposition_prompt)
             decomposed = json.loads(response)
             return decomposed[:self.max_decomposed_queries]
         except Exception as e:
@@ -181,25 +184,33 @@ class FreshConversationNodes:
                 analysis
             )
         
-        # Execute each sub-query
-        all_results = []
-        all_chunks = []
-        results_by_query = {}
+        # Apply synonym expansion to every sub-query
+        expanded_queries = [
+            self._expand_with_synonyms(sub_query, analysis.get('synonyms', {}))
+            for sub_query in decomposed_queries
+        ]
         
-        for sub_query in decomposed_queries:
-            # Apply synonym expansion
-            expanded_query = self._expand_with_synonyms(sub_query, analysis.get('synonyms', {}))
-            
-            if self.query_engine:
+        # Retrieve all sub-queries with one embedding call and one batched search
+        sources_by_sub_query = [[] for _ in decomposed_queries]
+        if self.query_engine and hasattr(self.query_engine, 'retrieve_sources_batch'):
+            sources_by_sub_query = self.query_engine.retrieve_sources_batch(expanded_queries)
+        elif self.query_engine:
+            for i, expanded_query in enumerate(expanded_queries):
                 result = self.query_engine.process_query(
                     expanded_query,
                     conversation_context={}
                 )
-                
-                if result and result.get('sources'):
-                    results_by_query[sub_query] = result['sources']
-                    all_results.extend(result['sources'])
-                    all_chunks.extend([s.get('text', '') for s in result['sources']])
+                sources_by_sub_query[i] = (result or {}).get('sources', [])
+        
+        all_results = []
+        all_chunks = []
+        results_by_query = {}
+        
+        for sub_query, sources in zip(decomposed_queries, sources_by_sub_query):
+            if sources:
+                results_by_query[sub_query] = sources
+                all_results.extend(sources)
+                all_chunks.extend([s.get('text', '') for s in sources])
         
         # Store structured results
         new_state = state.copy()
@@ -236,7 +247,8 @@ class FreshConversationNodes:
             """
             
             try:
-                search_terms = json.loads(self.llm_client.generate(search_prompt))
+                with llm_priority(PRIORITY_BACKGROUND):
+                    search_terms = json.loads(self.llm_client.generate(search_prompt))
             except:
                 search_terms = [entity_type]
         else:
@@ -431,6 +443,23 @@ class FreshConversationNodes:
         if entity_type == 'person' or 'person' in entity_type.lower():
             return self._handle_person_query(state, analysis)
         
+        expanded_query, conversation_context = self._regular_search_request(state, analysis)
+        
+        # Execute search
+        new_state = state.copy()
+        if self.query_engine:
+            search_result = self.query_engine.process_query(
+                expanded_query,
+                top_k=5,
+                conversation_context=conversation_context
+            )
+            self._apply_search_result(new_state, search_result, expanded_query, analysis)
+        
+        return new_state
+    
+    def _regular_search_request(self, state: FreshConversationState,
+                                analysis: Dict[str, Any]) -> Tuple[str, Dict[str, Any]]:
+        """Expanded query and conversation context for a regular search"""
         processed_query = state['processed_query']
         
         # Apply synonym expansion if enabled
@@ -447,34 +476,55 @@ class FreshConversationNodes:
             'original_query': state.get('original_query', ''),
             'query_analysis': analysis
         }
-        
-        # Execute search
-        new_state = state.copy()
-        if self.query_engine:
-            search_result = self.query_engine.process_query(
-                expanded_query,
-                top_k=5,
-                conversation_context=conversation_context
-            )
+        return expanded_query, conversation_context
+    
+    def _apply_search_result(self, new_state: FreshConversationState, search_result: Optional[Dict[str, Any]],
+                             expanded_query: str, analysis: Dict[str, Any]) -> FreshConversationState:
+        """Store a query engine result on the state for generate_response"""
+        if search_result and search_result.get('sources'):
+            new_state['search_results'] = search_result['sources']
+            new_state['context_chunks'] = [s.get('text', '') for s in search_result['sources']]
+            new_state['query_engine_response'] = search_result.get('response', '')
             
-            if search_result and search_result.get('sources'):
-                new_state['search_results'] = search_result['sources']
-                new_state['context_chunks'] = [s.get('text', '') for s in search_result['sources']]
-                new_state['query_engine_response'] = search_result.get('response', '')
-                
-                # Store search metadata
-                new_state['search_metadata'] = {
-                    'original_query': processed_query,
-                    'expanded_query': expanded_query,
-                    'synonyms_used': analysis.get('synonyms', {}),
-                    'search_strategy': 'regular'
-                }
-            else:
-                new_state['search_results'] = []
-                new_state['context_chunks'] = []
-                new_state['query_engine_response'] = ''
-        
+            # Store search metadata
+            new_state['search_metadata'] = {
+                'original_query': new_state['processed_query'],
+                'expanded_query': expanded_query,
+                'synonyms_used': analysis.get('synonyms', {}),
+                'search_strategy': 'regular'
+            }
+        else:
+            new_state['search_results'] = []
+            new_state['context_chunks'] = []
+            new_state['query_engine_response'] = ''
         return new_state
+    
+    def prepare_streamed_search(self, state: FreshConversationState) -> Dict[str, Any]:
+        """
+        Analyse the processed query and, for a regular search, build the request to stream
+        
+        Decomposed, aggregation and person queries compose their answers from
+        several searches, so for those 'query' is None and the caller should
+        run search_knowledge with the returned analysis instead.
+        """
+        if not state.get('processed_query') or not self.query_engine:
+            return {'analysis': {}, 'query': None, 'conversation_context': None}
+        
+        analysis = self._analyze_query_with_llm(state['processed_query'])
+        entity_type = analysis.get('entity_type', '') or ''
+        if ((analysis.get('needs_decomposition') and self.enable_query_decomposition)
+                or (analysis.get('query_type') == 'aggregation' and self.enable_aggregation_detection)
+                or 'person' in entity_type.lower()):
+            return {'analysis': analysis, 'query': None, 'conversation_context': None}
+        
+        expanded_query, conversation_context = self._regular_search_request(state, analysis)
+        return {'analysis': analysis, 'query': expanded_query, 'conversation_context': conversation_context}
+    
+    def complete_streamed_search(self, state: FreshConversationState, request: Dict[str, Any],
+                                 search_result: Dict[str, Any]) -> FreshConversationState:
+        """Fold the final streamed query engine result into the state, as search_knowledge would"""
+        new_state = FreshConversationState(**state)
+        return self._apply_search_result(new_state, search_result, request['query'], request['analysis'])
 
     def _generate_structured_response(self, state: FreshConversationState) -> str:
         """Generate response for decomposed/structured queries"""
@@ -685,7 +735,8 @@ class FreshConversationNodes:
                 Enhanced search query:"""
                 
                 try:
-                    enhanced_query = self.llm_client.generate(prompt)
+                    with llm_priority(PRIORITY_BACKGROUND):
+                        enhanced_query = self.llm_client.generate(prompt)
                     new_state['processed_query'] = enhanced_query.strip()
                     self.logger.info(f"Enhanced contextual query: {enhanced_query}")
                 except Exception as e:
@@ -702,13 +753,15 @@ class FreshConversationNodes:
             new_state['error_messages'] = state.get('error_messages', []) + [f"Intent analysis failed: {e}"]
             return new_state
 
-    def search_knowledge(self, state: FreshConversationState) -> FreshConversationState:
+    def search_knowledge(self, state: FreshConversationState,
+                         query_analysis: Optional[Dict[str, Any]] = None) -> FreshConversationState:
         """
         Search for relevant information using the query engine
         Enhanced with query decomposition and synonym expansion
         
         Args:
             state: The current conversation state
+            query_analysis: Analysis already computed for this turn, if any
             
         Returns:
             FreshConversationState: Updated state with search results
@@ -730,7 +783,8 @@ class FreshConversationNodes:
             processed_query = state['processed_query']
             
             # Analyze query with LLM if available
-            query_analysis = self._analyze_query_with_llm(processed_query)
+            if query_analysis is None:
+                query_analysis = self._analyze_query_with_llm(processed_query)
             
             # Handle different query types based on configuration
             if query_analysis.get('needs_decomposition') and self.enable_query_decomposition:
@@ -10,6 +10,8 @@ from typing import Dict, List, Any, Optional, Set, Tuple
 from enum import Enum
 from dataclasses import dataclass
 
+from ..retrieval.llm_rate_limiter import llm_priority, PRIORITY_BACKGROUND
+
 
 class QueryIntent(Enum):
     """Types of query intents"""
@@ -119,7 +121,8 @@ class SmartQueryAnalyzer:
         """
         
         try:
-            response = self.llm_client.generate(prompt)
+            with llm_priority(PRIORITY_BACKGROUND):
+                response = self.llm_client.generate(prompt)
             return json.loads(response)
         except Exception as e:
             self.logger.error(f"LLM entity analysis failed: {e}")
@@ -314,7 +317,8 @@ class FreshSmartRouter:
         """
         
         try:
-            response = self.llm_client.generate(analysis_prompt)
+            with llm_priority(PRIORITY_BACKGROUND):
+                response = self.llm_client.generate(analysis_prompt)
             return json.loads(response)
         except Exception as e:
             self.logger.error(f"LLM analysis failed: {e}")
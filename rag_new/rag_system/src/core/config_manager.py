@@ -38,12 +38,21 @@ class VectorStoreConfig:
     index_type: str = "flat"
     nprobe: int = 10
     enable_gpu: bool = False
+    faiss_wal_enabled: bool = True  # Append mutations to a write-ahead log instead of rewriting the index
+    faiss_wal_compact_bytes: int = 64 * 1024 * 1024  # Fold the log into the snapshot past this size
+    faiss_wal_compact_interval: int = 300  # Seconds between background compaction checks
+    faiss_mmap_index: bool = False  # Memory-map the index on load (read-only replicas share pages)
     
     # Qdrant-specific settings
     url: str = "localhost:6333"
     collection_name: str = "rag_documents"
     on_disk_storage: bool = True
     distance: str = "cosine"
+    qdrant_prefer_grpc: bool = False  # Use the gRPC transport instead of HTTP/JSON
+    qdrant_grpc_port: int = 6334
+    qdrant_local_path: str = ""  # Run Qdrant embedded at this path instead of connecting to a server
+    qdrant_upload_batch_size: int = 256  # add_vectors batches larger than this go through upload_points
+    qdrant_upload_parallel: int = 1  # Upload worker processes (server mode only)
 
 @dataclass
 class DatabaseConfig:
@@ -68,6 +77,17 @@ class EmbeddingConfig:
     batch_size: int = 96
     device: str = "cpu"
     api_key: Optional[str] = None
+    cache_enabled: bool = True  # Reuse embeddings of unchanged chunk text across re-ingestion
+    cache_path: str = "data/embedding_cache/embeddings.sqlite"
+    cache_max_entries: int = 200000  # ~4KB per entry at 1024 dimensions
+    max_concurrency: int = 4  # Cohere/Azure: embedding batches in flight at once
+    requests_per_second: float = 0.0  # Cohere/Azure: request rate cap; 0 = unlimited
+    max_retries: int = 5  # Cohere/Azure: retries on 429/5xx with jittered backoff
+    local_backend: str = "torch"  # torch or onnx; applies to every local sentence-transformer/cross-encoder model
+    onnx_cache_dir: str = "data/onnx_models"  # Exported (and quantized) models are reused from here
+    onnx_quantize: bool = True  # Dynamic int8 quantization of the exported weights
+    onnx_num_threads: int = 0  # ONNX Runtime intra-op threads; 0 = runtime default
+    onnx_min_similarity: float = 0.99  # Exports agreeing less with the PyTorch model are rejected
 
 @dataclass
 class LLMConfig:
@@ -77,6 +97,14 @@ class LLMConfig:
     api_key: Optional[str] = None
     temperature: float = 0.1
     max_tokens: int = 1000
+    requests_per_minute: int = 50  # Process-wide across all LLM calls, 0 = unlimited
+    tokens_per_minute: int = 0  # Prompt + completion tokens, 0 = unlimited
+    max_concurrency: int = 8  # LLM calls in flight at once, 0 = unlimited
+    rate_limit_timeout: float = 120.0  # Max seconds a call waits for capacity before failing
+    response_cache_enabled: bool = True  # Reuse completions for byte-identical prompts
+    response_cache_size: int = 1000  # Completions kept in memory
+    response_cache_ttl: float = 3600.0  # Seconds before a cached completion expires
+    response_cache_path: str = ""  # SQLite file for a persistent tier, "" = memory only
 
 @dataclass
 class APIConfig:
@@ -100,6 +128,11 @@ class IngestionConfig:
     batch_size: int = 10
     timeout: float = 300.0  # 5 minutes default for text ingestion
     file_timeout: float = 600.0  # 10 minutes default for file processing
+    pipeline_workers: int = 0  # Extraction processes for ingest_directory (0 = one per CPU core, 1 = in-process)
+    pipeline_embed_concurrency: int = 2  # Embedding batches in flight at once (overlaps provider round-trips)
+    pipeline_max_in_flight: int = 32  # Files allowed between extraction and storage at once
+    pipeline_store_batch_size: int = 1024  # Vectors committed per vector store write
+    incremental_updates: bool = True  # Re-ingesting a document only embeds chunks whose text changed
 
 @dataclass
 class RetrievalConfig:
@@ -108,6 +141,17 @@ class RetrievalConfig:
     similarity_threshold: float = 0.7  # Good default for normalized cosine similarity (range -1 to 1)
     rerank_top_k: int = 3
     enable_reranking: bool = True
+    rerank_model: str = "cross-encoder/ms-marco-MiniLM-L6-v2"
+    rerank_batch_size: int = 32
+    rerank_cache_size: int = 10000  # Cached (model, query, chunk) scores; 0 disables
+    rerank_max_tokens: int = 0  # Truncate chunks to this many words before tokenizing; 0 = model limit
+    rerank_cascade_model: str = ""  # Cheap cross-encoder that prunes candidates first (e.g. a TinyBERT/int8 model)
+    rerank_cascade_keep: int = 20  # Candidates the cascade passes on to the full model
+    query_cache_enabled: bool = True  # Answer repeated and near-duplicate questions from cache
+    query_cache_max_entries: int = 1000
+    query_cache_ttl_seconds: int = 3600
+    query_cache_semantic_enabled: bool = True  # Also reuse answers for queries with similar embeddings
+    query_cache_semantic_threshold: float = 0.95  # Minimum cosine similarity for a semantic hit
 
 @dataclass
 class MonitoringConfig:
@@ -127,6 +171,10 @@ class FolderMonitoringConfig:
     max_file_size_mb: int = 100
     auto_ingest: bool = True
     recursive: bool = True
+    watch_mode: str = "auto"  # auto, events (watchdog/inotify), polling
+    debounce_seconds: float = 2.0  # Quiet time before a burst of writes to a file is processed
+    reconcile_interval_seconds: int = 3600  # Full safety-net scan while file events are active
+    state_db_path: str = "data/folder_monitor/file_states.sqlite"  # Persisted file states, "" = memory only
     
     def __post_init__(self):
         if self.monitored_folders is None:
@@ -108,33 +108,45 @@ def inject(*dependencies):
 def create_config_manager(container: DependencyContainer):
     """Factory for ConfigManager"""
     from .config_manager import ConfigManager
-    return ConfigManager()
+    from .onnx_backend import configure_model_backend
+    config_manager = ConfigManager()
+    
+    # Local sentence-transformer / cross-encoder models are loaded through this backend
+    embedding_config = config_manager.get_config('embedding')
+    configure_model_backend(
+        backend=embedding_config.local_backend,
+        cache_dir=embedding_config.onnx_cache_dir,
+        quantize=embedding_config.onnx_quantize,
+        num_threads=embedding_config.onnx_num_threads,
+        min_similarity=embedding_config.onnx_min_similarity
+    )
+    return config_manager
 
 def create_json_store(container: DependencyContainer):
-    """Factory for JSONStore"""
+    """Factory for JSONStore (log-structured backend)"""
     print(f"     🔧 Creating JSON store...")
-    from .json_store import JSONStore
+    from .json_store import LogStructuredJSONStore
     print(f"     📋 JSONStore imported")
     # Use default path to avoid circular dependency with config_manager
-    json_store = JSONStore("data")
+    json_store = LogStructuredJSONStore("data")
     print(f"     ✅ JSON store created successfully")
     return json_store
 
 def create_metadata_store(container: DependencyContainer):
-    """Factory for PersistentJSONMetadataStore"""
+    """Factory for SQLiteMetadataStore (imports legacy JSON metadata on first start)"""
     try:
-        from ..storage.persistent_metadata_store import PersistentJSONMetadataStore
+        from ..storage.sqlite_metadata_store import SQLiteMetadataStore
     except ImportError:
         try:
-            from rag_system.src.storage.persistent_metadata_store import PersistentJSONMetadataStore
+            from rag_system.src.storage.sqlite_metadata_store import SQLiteMetadataStore
         except ImportError:
             # Last fallback for when running as script
             import sys
             from pathlib import Path
             sys.path.insert(0, str(Path(__file__).parent.parent))
-            from storage.persistent_metadata_store import PersistentJSONMetadataStore
+            from storage.sqlite_metadata_store import SQLiteMetadataStore
     # Use default path to avoid circular dependency with config_manager
-    return PersistentJSONMetadataStore("data/metadata")
+    return SQLiteMetadataStore("data/metadata")
 
 def create_log_store(container: DependencyContainer):
     """Factory for PersistentJSONLogStore (persistent file-based log store)"""
@@ -223,13 +235,20 @@ def create_vector_store(container: DependencyContainer):
         url = vector_store_config.url
         collection_name = vector_store_config.collection_name
         on_disk = vector_store_config.on_disk_storage
+        local_path = vector_store_config.qdrant_local_path or None
         
-        print(f"     📋 Qdrant config: url={url}, collection={collection_name}, dimension={dimension}")
+        print(f"     📋 Qdrant config: url={url}, collection={collection_name}, dimension={dimension}, "
+              f"local_path={local_path}")
         vector_store = QdrantVectorStore(
             url=url,
             collection_name=collection_name,
             dimension=dimension,
-            on_disk=on_disk
+            on_disk=on_disk,
+            prefer_grpc=vector_store_config.qdrant_prefer_grpc,
+            grpc_port=vector_store_config.qdrant_grpc_port,
+            path=local_path,
+            upload_batch_size=vector_store_config.qdrant_upload_batch_size,
+            upload_parallel=vector_store_config.qdrant_upload_parallel
         )
         print(f"     ✅ Qdrant store created successfully with dimension {dimension}")
     else:
@@ -255,9 +274,18 @@ def create_vector_store(container: DependencyContainer):
             index_path = database_config.faiss_index_path
         
         print(f"     📋 FAISS config: path={index_path}, dimension={dimension}")
+        faiss_kwargs = {}
+        if vector_store_config:
+            faiss_kwargs = {
+                'wal_enabled': vector_store_config.faiss_wal_enabled,
+                'wal_compact_bytes': vector_store_config.faiss_wal_compact_bytes,
+                'wal_compact_interval': vector_store_config.faiss_wal_compact_interval,
+                'mmap_index': vector_store_config.faiss_mmap_index
+            }
         vector_store = FAISSStore(
             index_path=index_path,
-            dimension=dimension
+            dimension=dimension,
+            **faiss_kwargs
         )
         print(f"     ✅ FAISS store created successfully with dimension {dimension}")
     
@@ -281,6 +309,13 @@ def create_embedder(container: DependencyContainer):
             from pathlib import Path
             sys.path.insert(0, str(Path(__file__).parent.parent))
             from ingestion.embedder import Embedder
+    try:
+        from ..ingestion.embedding_cache import EmbeddingCache
+    except ImportError:
+        try:
+            from rag_system.src.ingestion.embedding_cache import EmbeddingCache
+        except ImportError:
+            from ingestion.embedding_cache import EmbeddingCache
     import os
     
     # Get config to use correct embedding provider and model
@@ -294,13 +329,24 @@ def create_embedder(container: DependencyContainer):
     if embedding_config.provider == 'azure':
         endpoint = os.getenv('AZURE_EMBEDDINGS_ENDPOINT')
     
+    cache = None
+    if getattr(embedding_config, 'cache_enabled', False):
+        try:
+            cache = EmbeddingCache(embedding_config.cache_path, embedding_config.cache_max_entries)
+        except Exception as e:
+            print(f"     ⚠️ Embedding cache unavailable, embedding without it: {e}")
+    
     embedder = Embedder(
         provider=embedding_config.provider,
         model_name=embedding_config.model_name,
         device=embedding_config.device,
         batch_size=embedding_config.batch_size,
         api_key=embedding_config.api_key,
-        endpoint=endpoint
+        endpoint=endpoint,
+        cache=cache,
+        max_concurrency=embedding_config.max_concurrency,
+        requests_per_second=embedding_config.requests_per_second,
+        max_retries=embedding_config.max_retries
     )
     print(f"     ✅ Embedder created successfully")
     return embedder
@@ -335,33 +381,56 @@ def create_llm_client(container: DependencyContainer):
     """Factory for LLMClient"""
     try:
         from ..retrieval.llm_client import LLMClient
+        from ..retrieval.llm_rate_limiter import configure_llm_rate_limiter
+        from ..retrieval.llm_response_cache import LLMResponseCache
     except ImportError:
         try:
             from rag_system.src.retrieval.llm_client import LLMClient
+            from rag_system.src.retrieval.llm_rate_limiter import configure_llm_rate_limiter
+            from rag_system.src.retrieval.llm_response_cache import LLMResponseCache
         except ImportError:
             # Last fallback for when running as script
             import sys
             from pathlib import Path
             sys.path.insert(0, str(Path(__file__).parent.parent))
             from retrieval.llm_client import LLMClient
+            from retrieval.llm_rate_limiter import configure_llm_rate_limiter
+            from retrieval.llm_response_cache import LLMResponseCache
     
     # Get configuration from config manager
     config_manager = container.get('config_manager')
     llm_config = config_manager.get_config('llm')
     
+    # One limiter for every LLM call in the process
+    configure_llm_rate_limiter(
+        requests_per_minute=llm_config.requests_per_minute,
+        tokens_per_minute=llm_config.tokens_per_minute,
+        max_concurrency=llm_config.max_concurrency,
+        timeout=llm_config.rate_limit_timeout
+    )
+    
     # Get endpoint for Azure if needed
     endpoint = None
     if llm_config.provider == 'azure':
         import os
         endpoint = os.getenv('AZURE_CHAT_ENDPOINT')
     
+    response_cache = None
+    if llm_config.response_cache_enabled:
+        response_cache = LLMResponseCache(
+            max_entries=llm_config.response_cache_size,
+            ttl_seconds=llm_config.response_cache_ttl,
+            disk_path=llm_config.response_cache_path or None
+        )
+    
     return LLMClient(
         provider=llm_config.provider,
         model_name=llm_config.model_name,
         api_key=llm_config.api_key,
         temperature=llm_config.temperature,
         max_tokens=llm_config.max_tokens,
-        endpoint=endpoint
+        endpoint=endpoint,
+        response_cache=response_cache
     )
 
 def create_reranker(container: DependencyContainer):
@@ -463,6 +532,22 @@ def create_query_engine(container: DependencyContainer):
                 sys.path.insert(0, str(Path(__file__).parent.parent))
                 from retrieval.query_engine import QueryEngine
         
+        query_cache = None
+        if config.retrieval.query_cache_enabled:
+            try:
+                from ..retrieval.query_cache import QueryResultCache
+            except ImportError:
+                try:
+                    from rag_system.src.retrieval.query_cache import QueryResultCache
+                except ImportError:
+                    from retrieval.query_cache import QueryResultCache
+            query_cache = QueryResultCache(
+                max_entries=config.retrieval.query_cache_max_entries,
+                ttl_seconds=config.retrieval.query_cache_ttl_seconds,
+                semantic_enabled=config.retrieval.query_cache_semantic_enabled,
+                semantic_threshold=config.retrieval.query_cache_semantic_threshold
+            )
+        
         return QueryEngine(
             vector_store=container.get('vector_store'),
             embedder=container.get('embedder'),
@@ -470,7 +555,8 @@ def create_query_engine(container: DependencyContainer):
             metadata_store=container.get('metadata_store'),
             config_manager=config_manager,
             reranker=container.get('reranker'),
-            query_enhancer=container.get('query_enhancer')
+            query_enhancer=container.get('query_enhancer'),
+            query_cache=query_cache
         )
 
 def create_ingestion_engine(container: DependencyContainer):
@@ -254,12 +254,446 @@ class JSONStore:
                     if backup_file.stat().st_mtime < cutoff_time:
                         backup_file.unlink()
 
+class _CollectionLog:
+    """In-memory state of one log-structured collection"""
+    
+    def __init__(self, path: Path):
+        self.path = path
+        self.offsets: Dict[str, int] = {}  # key -> byte offset of its latest record
+        self.dead = 0  # Superseded or deleted records still in the file
+        self.generation = 0  # Bumped by each compaction; snapshots never span generations
+        self.size = 0
+        self.field_indexes: Dict[str, Dict[Any, set]] = {}  # field -> value -> keys
+
+
+class LogStructuredJSONStore(JSONStore):
+    """JSONStore backend that appends newline-delimited records instead of rewriting collections
+    
+    Each collection lives in ``<collection>.jsonl``. A write appends one
+    ``put`` or ``del`` record and moves the key's entry in an in-memory
+    key -> offset index, so ``append``/``update``/``delete`` cost O(1)
+    regardless of collection size. The file is compacted once superseded
+    records outnumber live ones. Fields listed in ``index_fields`` get
+    value -> keys indexes that ``search`` uses to avoid a full scan.
+    
+    Existing ``<collection>.json`` files are imported the first time the
+    collection is opened and left in place untouched.
+    """
+    
+    def __init__(self, base_path: str = "data", index_fields: Optional[Dict[str, List[str]]] = None,
+                 compact_min_records: int = 1000, fsync: bool = True):
+        super().__init__(base_path)
+        self.index_fields = {collection: list(fields) for collection, fields in (index_fields or {}).items()}
+        self.compact_min_records = compact_min_records
+        self.fsync = fsync
+        self._collections: Dict[str, _CollectionLog] = {}
+    
+    # ------------------------------------------------------------------
+    # Log file handling
+    # ------------------------------------------------------------------
+    
+    def _log_path(self, collection: str) -> Path:
+        return self.base_path / f"{collection}.jsonl"
+    
+    @staticmethod
+    def _encode(record: Dict[str, Any]) -> bytes:
+        return (json.dumps(record, default=str, ensure_ascii=False) + "\n").encode('utf-8')
+    
+    @staticmethod
+    def _index_value(value: Any) -> Any:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True, default=str)
+        return value
+    
+    def _collection(self, collection: str) -> _CollectionLog:
+        """Load (or import) a collection's offset index; caller holds the collection lock"""
+        state = self._collections.get(collection)
+        if state is not None:
+            return state
+        
+        state = _CollectionLog(self._log_path(collection))
+        for field in self.index_fields.get(collection, []):
+            state.field_indexes[field] = {}
+        self._collections[collection] = state
+        
+        if state.path.exists():
+            self._replay(state)
+        else:
+            legacy_path = self.base_path / f"{collection}.json"
+            if legacy_path.exists():
+                try:
+                    with open(legacy_path, 'r') as f:
+                        legacy = json.load(f)
+                except (json.JSONDecodeError, ValueError):
+                    legacy = {}
+                if isinstance(legacy, dict):
+                    self._rewrite(state, legacy)
+        return state
+    
+    def _replay(self, state: _CollectionLog):
+        """Rebuild offsets and field indexes from the log, dropping a torn final line"""
+        state.offsets.clear()
+        state.dead = 0
+        state.generation = 0
+        for index in state.field_indexes.values():
+            index.clear()
+        
+        good_size = 0
+        with open(state.path, 'rb') as f:
+            offset = 0
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except (json.JSONDecodeError, ValueError):
+                    break  # Partial write from a crash; everything after it is discarded
+                if not line.endswith(b"\n"):
+                    break
+                op = record.get("op")
+                if op == "compact":
+                    state.generation = record.get("generation", 0)
+                elif op in ("put", "del"):
+                    key = record["key"]
+                    if key in state.offsets:
+                        state.dead += 1
+                        if state.field_indexes:
+                            self._unindex(state, key, self._read_value(state, state.offsets[key]))
+                    if op == "put":
+                        state.offsets[key] = offset
+                        self._index(state, key, record["value"])
+                    else:
+                        state.offsets.pop(key, None)
+                        state.dead += 1
+                offset += len(line)
+                good_size = offset
+        
+        if good_size != state.path.stat().st_size:
+            with open(state.path, 'r+b') as f:
+                f.truncate(good_size)
+        state.size = good_size
+    
+    def _read_value(self, state: _CollectionLog, offset: int) -> Any:
+        with open(state.path, 'rb') as f:
+            f.seek(offset)
+            return json.loads(f.readline())["value"]
+    
+    def _append_records(self, state: _CollectionLog, records: List[Dict[str, Any]]) -> List[int]:
+        """Append records to the log and return their offsets"""
+        offsets = []
+        payload = bytearray()
+        for record in records:
+            offsets.append(state.size + len(payload))
+            payload += self._encode(record)
+        with open(state.path, 'ab') as f:
+            f.write(payload)
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+        state.size += len(payload)
+        return offsets
+    
+    def _rewrite(self, state: _CollectionLog, data: Dict[str, Any], generation: Optional[int] = None):
+        """Atomically replace the log with one ``put`` per live key"""
+        if generation is None:
+            generation = state.generation + 1
+        tmp_path = state.path.with_suffix(".jsonl.tmp")
+        offsets = {}
+        with open(tmp_path, 'wb') as f:
+            offset = f.write(self._encode({"op": "compact", "generation": generation}))
+            for key, value in data.items():
+                key = str(key)
+                offsets[key] = offset
+                offset += f.write(self._encode({"op": "put", "key": key, "value": value}))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, state.path)
+        
+        state.offsets = offsets
+        state.dead = 0
+        state.generation = generation
+        state.size = offset
+        for index in state.field_indexes.values():
+            index.clear()
+        for key, value in data.items():
+            self._index(state, str(key), value)
+    
+    def _maybe_compact(self, state: _CollectionLog):
+        if state.dead > max(self.compact_min_records, len(state.offsets)):
+            self._rewrite(state, self._read_all(state))
+    
+    def _read_all(self, state: _CollectionLog) -> Dict[str, Any]:
+        """Read every live value in one sequential pass over the log"""
+        by_offset = {offset: key for key, offset in state.offsets.items()}
+        values = {}
+        if by_offset:
+            with open(state.path, 'rb') as f:
+                offset = 0
+                for line in f:
+                    key = by_offset.get(offset)
+                    if key is not None:
+                        values[key] = json.loads(line)["value"]
+                    offset += len(line)
+        # Keep first-insertion order, as a JSON object would
+        return {key: values[key] for key in state.offsets if key in values}
+    
+    # ------------------------------------------------------------------
+    # Field indexes
+    # ------------------------------------------------------------------
+    
+    def _index(self, state: _CollectionLog, key: str, value: Any):
+        if not state.field_indexes or not isinstance(value, dict):
+            return
+        for field, index in state.field_indexes.items():
+            if field in value:
+                index.setdefault(self._index_value(value[field]), set()).add(key)
+    
+    def _unindex(self, state: _CollectionLog, key: str, value: Any):
+        if not state.field_indexes or not isinstance(value, dict):
+            return
+        for field, index in state.field_indexes.items():
+            if field in value:
+                keys = index.get(self._index_value(value[field]))
+                if keys is not None:
+                    keys.discard(key)
+    
+    def add_index(self, collection: str, field: str):
+        """Index ``field`` of ``collection`` for ``search``"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            fields = self.index_fields.setdefault(collection, [])
+            if field not in fields:
+                fields.append(field)
+            state = self._collection(collection)
+            if field not in state.field_indexes:
+                state.field_indexes[field] = {}
+                for key, value in self._read_all(state).items():
+                    if isinstance(value, dict) and field in value:
+                        state.field_indexes[field].setdefault(self._index_value(value[field]), set()).add(key)
+    
+    # ------------------------------------------------------------------
+    # JSONStore API
+    # ------------------------------------------------------------------
+    
+    def _put(self, state: _CollectionLog, key: str, value: Any):
+        old_offset = state.offsets.get(key)
+        if old_offset is not None:
+            if state.field_indexes:
+                self._unindex(state, key, self._read_value(state, old_offset))
+            state.dead += 1
+        state.offsets[key] = self._append_records(state, [{"op": "put", "key": key, "value": value}])[0]
+        self._index(state, key, value)
+        self._maybe_compact(state)
+    
+    def read(self, collection: str, key: Optional[str] = None) -> Union[Dict, Any]:
+        """Read data from the store"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            if key is None:
+                return self._read_all(state)
+            offset = state.offsets.get(str(key))
+            return None if offset is None else self._read_value(state, offset)
+    
+    def write(self, collection: str, data: Dict[str, Any], key: Optional[str] = None):
+        """Write data to the store"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            if key is None:
+                # Replace entire collection
+                self._rewrite(state, data)
+            else:
+                self._put(state, str(key), data)
+    
+    def append(self, collection: str, item: Dict[str, Any], key_field: str = "id"):
+        """Append item to collection"""
+        # Generate key if not provided
+        if key_field not in item:
+            item[key_field] = self._generate_id()
+        
+        key = item[key_field]
+        self.write(collection, item, key)
+        return key
+    
+    def update(self, collection: str, key: str, updates: Dict[str, Any]):
+        """Update specific item in collection"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            offset = state.offsets.get(str(key))
+            if offset is None:
+                return False
+            item = self._read_value(state, offset)
+            item.update(updates)
+            item["updated_at"] = datetime.now().isoformat()
+            self._put(state, str(key), item)
+            return True
+    
+    def delete(self, collection: str, key: str):
+        """Delete item from collection"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            key = str(key)
+            offset = state.offsets.get(key)
+            if offset is None:
+                return False
+            if state.field_indexes:
+                self._unindex(state, key, self._read_value(state, offset))
+            self._append_records(state, [{"op": "del", "key": key}])
+            del state.offsets[key]
+            state.dead += 2  # The deleted put and the tombstone itself
+            self._maybe_compact(state)
+            return True
+    
+    def search(self, collection: str, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Search items in collection, narrowing by field indexes where available"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            candidates = None
+            for field, value in filters.items():
+                index = state.field_indexes.get(field)
+                if index is None:
+                    continue
+                keys = index.get(self._index_value(value), set())
+                candidates = set(keys) if candidates is None else candidates & keys
+            
+            if candidates is None:
+                items = self._read_all(state).items()
+            else:
+                items = [(key, self._read_value(state, state.offsets[key]))
+                         for key in state.offsets if key in candidates]
+        
+        results = []
+        for item_key, item in items:
+            if all(filter_key in item and item[filter_key] == filter_value
+                   for filter_key, filter_value in filters.items()):
+                results.append({**item, "_key": item_key})
+        return results
+    
+    def list_collections(self) -> List[str]:
+        """List all available collections"""
+        names = {f.stem for f in self.base_path.glob("*.jsonl") if not f.name.startswith('.')}
+        names.update(super().list_collections())
+        return sorted(names)
+    
+    def collection_stats(self, collection: str) -> Dict[str, Any]:
+        """Get statistics for a collection"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            exists = state.path.exists()
+            return {
+                "count": len(state.offsets),
+                "size_bytes": state.size,
+                "dead_records": state.dead,
+                "last_modified": datetime.fromtimestamp(
+                    state.path.stat().st_mtime
+                ).isoformat() if exists else None
+            }
+    
+    def compact(self, collection: str):
+        """Rewrite the collection's log with only its live records"""
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            self._rewrite(state, self._read_all(state))
+    
+    # ------------------------------------------------------------------
+    # Incremental snapshots
+    # ------------------------------------------------------------------
+    
+    def _snapshots(self, collection: str, generation: int) -> List[Path]:
+        backup_dir = self.base_path / "manual_backups"
+        return sorted(backup_dir.glob(f"{collection}.g{generation}.*.jsonl"))
+    
+    def _unused_generation(self, collection: str, state: _CollectionLog) -> int:
+        """A generation above the live log's and every existing snapshot's"""
+        highest = state.generation
+        for snapshot in (self.base_path / "manual_backups").glob(f"{collection}.g*.jsonl"):
+            try:
+                name, generation, _, _ = snapshot.name.rsplit(".", 3)
+                if name == collection:
+                    highest = max(highest, int(generation[1:]))
+            except ValueError:
+                continue
+        return highest + 1
+    
+    def backup_collection(self, collection: str) -> str:
+        """Snapshot the collection by copying only the log bytes written since the last snapshot
+        
+        Snapshots of one log generation chain together; restoring a
+        snapshot replays it and every earlier one of the same generation.
+        """
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            if not state.path.exists():
+                raise FileNotFoundError(f"Collection {collection} not found")
+            
+            backup_dir = self.base_path / "manual_backups"
+            backup_dir.mkdir(exist_ok=True)
+            previous = self._snapshots(collection, state.generation)
+            start = int(previous[-1].name.split(".")[-2]) if previous else 0
+            if previous and start == state.size:
+                return str(previous[-1])
+            if start > state.size:
+                # The generation's snapshots belong to another history (e.g. written before a
+                # restore); move to a fresh generation and take a full snapshot
+                self._rewrite(state, self._read_all(state), self._unused_generation(collection, state))
+                start = 0
+            
+            backup_path = backup_dir / f"{collection}.g{state.generation}.{state.size:015d}.jsonl"
+            with open(state.path, 'rb') as src, open(backup_path, 'wb') as dst:
+                src.seek(start)
+                dst.write(src.read(state.size - start))
+            return str(backup_path)
+    
+    def restore_collection(self, collection: str, backup_path: str):
+        """Restore collection from an incremental snapshot or a legacy JSON backup"""
+        backup_file = Path(backup_path)
+        if not backup_file.exists():
+            raise FileNotFoundError(f"Backup file not found: {backup_path}")
+        
+        if backup_file.suffix != ".jsonl":
+            try:
+                with open(backup_file, 'r') as f:
+                    data = json.load(f)
+            except json.JSONDecodeError:
+                raise ValueError("Invalid backup file format")
+            self.write(collection, data)
+            return
+        
+        try:
+            _, generation, end, _ = backup_file.name.rsplit(".", 3)
+            generation, end = int(generation[1:]), int(end)
+        except ValueError:
+            raise ValueError("Invalid backup file format")
+        
+        with self._get_file_lock(str(self._log_path(collection))):
+            state = self._collection(collection)
+            tmp_path = state.path.with_suffix(".jsonl.tmp")
+            with open(tmp_path, 'wb') as dst:
+                for snapshot in self._snapshots(collection, generation):
+                    if int(snapshot.name.split(".")[-2]) > end:
+                        break
+                    with open(snapshot, 'rb') as src:
+                        shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, state.path)
+            self._replay(state)
+            # Move to a generation no snapshot uses yet, so later snapshots start a new chain
+            # instead of extending the abandoned history's
+            self._rewrite(state, self._read_all(state), self._unused_generation(collection, state))
+    
+    def cleanup_old_backups(self, days: int = 30):
+        """Clean up old backup files"""
+        super().cleanup_old_backups(days)
+        backup_dir = self.base_path / "manual_backups"
+        cutoff_time = datetime.now().timestamp() - (days * 24 * 60 * 60)
+        if backup_dir.exists():
+            for backup_file in backup_dir.glob("*.jsonl"):
+                if backup_file.stat().st_mtime < cutoff_time:
+                    backup_file.unlink()
+
 # Specialized stores for different data types
-class MetadataStore(JSONStore):
+class MetadataStore(LogStructuredJSONStore):
     """Specialized store for metadata"""
     
     def __init__(self, base_path: str = "data/metadata"):
-        super().__init__(base_path)
+        super().__init__(base_path, index_fields={"chunks_metadata": ["file_id"]})
     
     def add_file_metadata(self, file_path: str, metadata: Dict[str, Any]) -> str:
         """Add file metadata"""
@@ -282,7 +716,7 @@ class MetadataStore(JSONStore):
         """Get all chunks for a file"""
         return self.search("chunks_metadata", {"file_id": file_id})
 
-class LogStore(JSONStore):
+class LogStore(LogStructuredJSONStore):
     """Specialized store for logs"""
     
     def __init__(self, base_path: str = "data/logs"):
@@ -299,7 +733,7 @@ class LogStore(JSONStore):
     
     def get_recent_logs(self, event_type: str, limit: int = 100) -> List[Dict[str, Any]]:
         """Get recent logs of specific type"""
-        logs = list(self.read(f"{event_type}_log", {}).values())
+        logs = list(self.read(f"{event_type}_log").values())
         # Sort by timestamp descending
         logs.sort(key=lambda x: x.get("timestamp", ""), reverse=True)
         return logs[:limit] 
\ No newline at end of file
@@ -28,12 +28,14 @@ class MetadataSchema:
     # Content metadata
     chunk_size: int = 0
     total_chunks: int = 0
+    chunk_hash: Optional[str] = None  # SHA-256 of the chunk text, for incremental re-ingestion
     source_type: str = "unknown"
     content_type: Optional[str] = None
     
     # Upload and source metadata  
     upload_source: Optional[str] = None
     upload_timestamp: Optional[str] = None
+    doc_hash: Optional[str] = None  # SHA-256 of the source file, for duplicate detection
     
     # Timestamps
     created_at: str = field(default_factory=lambda: datetime.now().isoformat())
@@ -4,6 +4,7 @@ Manages ML model memory with automatic cleanup and resource management
 """
 import weakref
 import gc
+import os
 from typing import Optional, List, Dict, Any, Callable
 import threading
 import time
@@ -23,6 +24,11 @@ try:
 except ImportError:
     TORCH_AVAILABLE = False
 
+try:
+    from .onnx_backend import get_model_backend_settings, load_cross_encoder, load_sentence_transformer
+except ImportError:
+    from onnx_backend import get_model_backend_settings, load_cross_encoder, load_sentence_transformer
+
 class ModelWrapper:
     """Wrapper for models to enable weak references"""
     def __init__(self, model, model_id: str):
@@ -63,8 +69,65 @@ class ModelWrapper:
     def __repr__(self):
         return self.__str__()
 
+class SharedModelHandle:
+    """Lazy, reference-counted handle to a model held by the ModelMemoryManager.
+    
+    The model is loaded on first attribute access and looked up again on
+    every access, so the manager can evict it under memory pressure and the
+    next use simply reloads it. Components never hold the model itself.
+    """
+    
+    def __init__(self, manager: 'ModelMemoryManager', model_id: str, loader_func: Callable, *args, **kwargs):
+        self._manager = manager
+        self._model_id = model_id
+        self._loader = (loader_func, args, kwargs)
+        self._released = False
+    
+    @property
+    def model_id(self) -> str:
+        return self._model_id
+    
+    def resolve(self) -> Any:
+        """The resident model, loading it if needed"""
+        loader_func, args, kwargs = self._loader
+        return self._manager.get_model(self._model_id, loader_func, *args, **kwargs)
+    
+    def __getattr__(self, name):
+        if name.startswith('__') or name in ('_manager', '_model_id', '_loader', '_released'):
+            raise AttributeError(name)
+        return getattr(self.resolve(), name)
+    
+    def __bool__(self):
+        return True
+    
+    def release(self):
+        """Drop this handle's reference; the model is unloaded once no handle needs it"""
+        if not self._released:
+            self._released = True
+            self._manager.release(self._model_id)
+    
+    def __del__(self):
+        try:
+            self.release()
+        except Exception:
+            pass
+    
+    def __reduce__(self):
+        # Unpickling (e.g. in a worker process) registers a new handle with that process's own registry
+        loader_func, args, kwargs = self._loader
+        return (_acquire_shared_handle, (self._model_id, loader_func, args, kwargs))
+    
+    def __repr__(self):
+        return f"SharedModelHandle({self._model_id})"
+
 class ModelMemoryManager:
-    """Manage ML model memory with automatic cleanup"""
+    """Manage ML model memory with automatic cleanup
+    
+    Models are keyed by an id such as ``shared_model_id()``; components
+    that share a key share one loaded instance. ``acquire`` hands out lazy
+    reference-counted handles, and resident models are evicted least
+    recently used first once their estimated size exceeds ``max_memory_mb``.
+    """
     
     def __init__(self, max_memory_mb: int = 1024, idle_timeout: int = 300):
         self.max_memory_mb = max_memory_mb
@@ -73,6 +136,7 @@ class ModelMemoryManager:
         self._model_refs: Dict[str, weakref.ref] = {}
         self._last_used: Dict[str, float] = {}
         self._model_info: Dict[str, Dict[str, Any]] = {}
+        self._ref_counts: Dict[str, int] = {}
         self._lock = threading.RLock()  # Use RLock for nested calls
         self._cleanup_thread = None
         self._running = True
@@ -103,23 +167,24 @@ class ModelMemoryManager:
                 model = model_ref()
                 if model is not None:
                     self._last_used[model_id] = time.time()
+                    self._model_info[model_id]['access_count'] += 1
                     self.logger.debug(f"Retrieved cached model: {model_id}")
                     return model
                 else:
                     # Model was garbage collected, clean up references
                     self._cleanup_dead_reference(model_id)
             
-            # Check memory before loading
-            if not self._check_memory_available():
-                self._evict_models_for_memory()
-            
             # Load model
             self.logger.info(f"Loading model: {model_id}")
             start_time = time.time()
+            memory_before = self._get_memory_info()
             
             try:
                 raw_model = loader_func(*args, **kwargs)
                 load_time = time.time() - start_time
+                memory_after = self._get_memory_info()
+                rss_delta_mb = (memory_after['current_mb'] - memory_before['current_mb']
+                                if memory_before and memory_after else 0.0)
                 
                 # Wrap model to enable weak references
                 model_wrapper = ModelWrapper(raw_model, model_id)
@@ -133,10 +198,12 @@ class ModelMemoryManager:
                     'load_time': load_time,
                     'args': args,
                     'kwargs': kwargs,
-                    'access_count': 1
+                    'access_count': 1,
+                    'size_mb': self._estimate_model_mb(raw_model, rss_delta_mb)
                 }
                 
                 self._stats['models_loaded'] += 1
+                self._evict_for_budget(keep=model_id)
                 
                 # Log memory usage if available
                 memory_info = self._get_memory_info()
@@ -151,6 +218,52 @@ class ModelMemoryManager:
                 self.logger.error(f"Failed to load model {model_id}: {e}")
                 raise
     
+    def acquire(self, model_id: str, loader_func: Callable, *args, **kwargs) -> SharedModelHandle:
+        """Register a consumer of ``model_id``; the model loads on the handle's first use"""
+        with self._lock:
+            self._ref_counts[model_id] = self._ref_counts.get(model_id, 0) + 1
+        return SharedModelHandle(self, model_id, loader_func, *args, **kwargs)
+    
+    def release(self, model_id: str):
+        """Drop a consumer of ``model_id``, unloading the model when it was the last one"""
+        with self._lock:
+            count = self._ref_counts.get(model_id, 0) - 1
+            if count > 0:
+                self._ref_counts[model_id] = count
+                return
+            self._ref_counts.pop(model_id, None)
+            self._unload_model(model_id)
+    
+    def _estimate_model_mb(self, model, rss_delta_mb: float) -> float:
+        """Parameter bytes for PyTorch models, file size for ONNX exports, else the RSS growth at load"""
+        try:
+            torch_module = model if hasattr(model, 'parameters') else getattr(model, 'model', None)
+            if torch_module is not None and hasattr(torch_module, 'parameters'):
+                size = sum(p.numel() * p.element_size() for p in torch_module.parameters())
+                size += sum(b.numel() * b.element_size() for b in torch_module.buffers())
+                return size / 1024 / 1024
+            export_info = getattr(model, 'export_info', None)
+            if export_info:
+                return os.path.getsize(os.path.join(model.model_dir, export_info['model_file'])) / 1024 / 1024
+        except Exception as e:
+            self.logger.debug(f"Could not size model: {e}")
+        return max(rss_delta_mb, 0.0)
+    
+    def _resident_mb(self) -> float:
+        return sum(info.get('size_mb', 0.0) for info in self._model_info.values())
+    
+    def _evict_for_budget(self, keep: Optional[str] = None):
+        """Evict least recently used models until the resident models fit in ``max_memory_mb``"""
+        while self._resident_mb() > self.max_memory_mb:
+            candidates = [model_id for model_id in self._last_used if model_id != keep and model_id in self._models]
+            if not candidates:
+                self.logger.warning(f"Model {keep} alone exceeds the {self.max_memory_mb}MB model budget")
+                return
+            oldest_id = min(candidates, key=self._last_used.get)
+            self.logger.info(f"Evicting model to stay within {self.max_memory_mb}MB: {oldest_id}")
+            self._unload_model(oldest_id)
+            self._stats['memory_cleanups'] += 1
+    
     def _create_cleanup_callback(self, model_id: str):
         """Create a cleanup callback for weak reference"""
         def cleanup_callback(ref):
@@ -282,16 +395,8 @@ class ModelMemoryManager:
                 except Exception as e:
                     self.logger.debug(f"Failed to move model to CPU: {e}")
             
-            # Sentence transformer cleanup
-            if hasattr(actual_model, '_modules'):
-                # Clear module cache
-                try:
-                    if hasattr(actual_model, 'tokenizer'):
-                        del actual_model.tokenizer
-                    if hasattr(actual_model, '_target_device'):
-                        actual_model._target_device = None
-                except Exception as e:
-                    self.logger.debug(f"Sentence transformer cleanup failed: {e}")
+            # The tokenizer is left in place: a shared model may still be mid-call in
+            # another component, and dropping the manager's reference is what frees it
             
             # Generic cleanup for objects with close/cleanup methods
             for method_name in ['close', 'cleanup', 'clear_cache']:
@@ -320,27 +425,33 @@ class ModelMemoryManager:
             self.logger.debug(f"Model {model_id} was garbage collected")
             self._cleanup_dead_reference(model_id)
     
+    def _unload_idle_models(self, current_time: Optional[float] = None) -> List[str]:
+        """Unload unreferenced models that haven't been used within ``idle_timeout``
+        
+        Models held through ``acquire`` handles stay resident however long
+        they sit idle; only the memory budget can evict them.
+        """
+        current_time = time.time() if current_time is None else current_time
+        with self._lock:
+            models_to_unload = [
+                model_id for model_id, last_used in self._last_used.items()
+                if current_time - last_used > self.idle_timeout and self._ref_counts.get(model_id, 0) <= 0
+            ]
+            
+            if models_to_unload:
+                self.logger.info(f"Cleaning up {len(models_to_unload)} idle models")
+                for model_id in models_to_unload:
+                    self._unload_model(model_id)
+                
+                self._stats['last_cleanup'] = datetime.now()
+            return models_to_unload
+    
     def _cleanup_idle_models(self):
         """Clean up models that haven't been used recently"""
         while self._running:
             try:
                 time.sleep(60)  # Check every minute
-                
-                with self._lock:
-                    current_time = time.time()
-                    models_to_unload = []
-                    
-                    for model_id, last_used in self._last_used.items():
-                        if current_time - last_used > self.idle_timeout:
-                            models_to_unload.append(model_id)
-                    
-                    if models_to_unload:
-                        self.logger.info(f"Cleaning up {len(models_to_unload)} idle models")
-                        for model_id in models_to_unload:
-                            self._unload_model(model_id)
-                        
-                        self._stats['last_cleanup'] = datetime.now()
-                        
+                self._unload_idle_models()
             except Exception as e:
                 self.logger.error(f"Error in cleanup thread: {e}")
     
@@ -362,6 +473,7 @@ class ModelMemoryManager:
             
             return {
                 'active_models': len(self._models),
+                'resident_mb': round(self._resident_mb(), 1),
                 'models_loaded': self._stats['models_loaded'],
                 'models_evicted': self._stats['models_evicted'],
                 'memory_cleanups': self._stats['memory_cleanups'],
@@ -374,10 +486,13 @@ class ModelMemoryManager:
                         'loaded_at': info['loaded_at'].isoformat(),
                         'load_time': info['load_time'],
                         'access_count': info['access_count'],
+                        'size_mb': round(info.get('size_mb', 0.0), 1),
+                        'ref_count': self._ref_counts.get(model_id, 0),
                         'last_used': datetime.fromtimestamp(self._last_used.get(model_id, 0)).isoformat()
                     }
                     for model_id, info in self._model_info.items()
-                }
+                },
+                'registered_models': dict(self._ref_counts)
             }
     
     def force_cleanup(self):
@@ -457,4 +572,23 @@ def shutdown_model_memory_manager():
     
     if _model_memory_manager is not None:
         _model_memory_manager.shutdown()
-        _model_memory_manager = None 
\ No newline at end of file
+        _model_memory_manager = None 
+
+def _acquire_shared_handle(model_id: str, loader_func: Callable, args: tuple, kwargs: dict) -> SharedModelHandle:
+    return get_model_memory_manager().acquire(model_id, loader_func, *args, **kwargs)
+
+def shared_model_id(kind: str, model_name: str, device: str = "cpu", backend: Optional[str] = None) -> str:
+    """Registry key for a local model: (kind, model name, device, backend)"""
+    if backend is None:
+        backend = get_model_backend_settings()['backend']
+    return f"{kind}:{model_name}:{device}:{backend}"
+
+def get_shared_sentence_transformer(model_name: str, device: str = "cpu") -> SharedModelHandle:
+    """Shared lazy handle to a sentence-transformer (or its ONNX export)"""
+    return get_model_memory_manager().acquire(
+        shared_model_id('sentence_transformer', model_name, device), load_sentence_transformer, model_name, device)
+
+def get_shared_cross_encoder(model_name: str, device: str = "cpu") -> SharedModelHandle:
+    """Shared lazy handle to a cross-encoder (or its ONNX export)"""
+    return get_model_memory_manager().acquire(
+        shared_model_id('cross_encoder', model_name, device), load_cross_encoder, model_name, device)
@@ -0,0 +1,300 @@
+"""
+ONNX Runtime Backend
+Exports local sentence-transformer and cross-encoder models to ONNX (optionally int8-quantized),
+caches the artifacts on disk and runs them through ONNX Runtime
+"""
+import json
+import logging
+import os
+import re
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+try:
+    import onnxruntime as ort
+    ONNXRUNTIME_AVAILABLE = True
+except ImportError:
+    ONNXRUNTIME_AVAILABLE = False
+
+# Probe inputs used to check an export against the PyTorch model it came from
+_PROBE_SENTENCES = [
+    "How do I reset my network password?",
+    "INC0012345: router in building B lost connectivity after the firmware upgrade",
+    "The quarterly report summarizes incident volume by priority and assignment group.",
+    "def retry(func, attempts=3): return func()",
+    "Access points on floor 3 drop clients every few minutes",
+    "short",
+    "Employees must complete security awareness training annually.",
+    "What is the escalation path for a P1 outage?"
+]
+
+_settings: Dict[str, Any] = {
+    'backend': 'torch',  # torch or onnx
+    'cache_dir': 'data/onnx_models',
+    'quantize': True,  # Dynamic int8 quantization of the exported weights
+    'num_threads': 0,  # ONNX Runtime intra-op threads; 0 lets ORT decide
+    'min_similarity': 0.99  # Minimum agreement with the PyTorch model for an export to be used
+}
+_export_lock = threading.Lock()
+
+
+def configure_model_backend(backend: str = "torch", cache_dir: str = "data/onnx_models",
+                            quantize: bool = True, num_threads: int = 0, min_similarity: float = 0.99):
+    """Select the process-wide backend for local sentence-transformer and cross-encoder models"""
+    _settings.update(backend=(backend or "torch").lower(), cache_dir=cache_dir, quantize=quantize,
+                     num_threads=num_threads, min_similarity=min_similarity)
+    logging.info(f"Local model backend: {_settings['backend']}"
+                 + (f" (int8={quantize}, threads={num_threads or 'auto'}, cache={cache_dir})"
+                    if _settings['backend'] == 'onnx' else ""))
+
+
+def get_model_backend_settings() -> Dict[str, Any]:
+    return dict(_settings)
+
+
+def load_sentence_transformer(model_name: str, device: str = "cpu"):
+    """SentenceTransformer for ``model_name``, or its ONNX equivalent when the onnx backend is selected"""
+    if _settings['backend'] == 'onnx' and device == 'cpu':
+        try:
+            return ONNXSentenceEncoder(_ensure_export(model_name, 'sentence_transformer'),
+                                       _settings['num_threads'])
+        except Exception as e:
+            logging.warning(f"ONNX backend unavailable for {model_name}, using PyTorch: {e}")
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device=device)
+
+
+def load_cross_encoder(model_name: str, device: str = "cpu"):
+    """CrossEncoder for ``model_name``, or its ONNX equivalent when the onnx backend is selected"""
+    if _settings['backend'] == 'onnx' and device == 'cpu':
+        try:
+            return ONNXCrossEncoder(_ensure_export(model_name, 'cross_encoder'), _settings['num_threads'])
+        except Exception as e:
+            logging.warning(f"ONNX backend unavailable for {model_name}, using PyTorch: {e}")
+    from sentence_transformers import CrossEncoder
+    return CrossEncoder(model_name, device=device)
+
+
+# ----------------------------------------------------------------------
+# Inference
+# ----------------------------------------------------------------------
+
+def _create_session(model_path: str, num_threads: int):
+    if not ONNXRUNTIME_AVAILABLE:
+        raise ImportError("onnxruntime package not installed")
+    options = ort.SessionOptions()
+    options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+    if num_threads:
+        options.intra_op_num_threads = num_threads
+        options.inter_op_num_threads = 1
+    return ort.InferenceSession(model_path, sess_options=options, providers=["CPUExecutionProvider"])
+
+
+class _ONNXModel:
+    """Tokenizer plus ONNX Runtime session loaded from an export directory"""
+    
+    def __init__(self, model_dir: str, num_threads: int = 0):
+        from transformers import AutoTokenizer
+        
+        self.model_dir = model_dir
+        with open(Path(model_dir) / "export.json", 'r', encoding='utf-8') as f:
+            self.export_info = json.load(f)
+        self.model_name = self.export_info['model_name']
+        self.max_length = self.export_info['max_length']
+        self.quantized = self.export_info['quantized']
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = _create_session(str(Path(model_dir) / self.export_info['model_file']), num_threads)
+        self._input_names = [i.name for i in self.session.get_inputs()]
+    
+    def _run(self, *texts: List[str]) -> np.ndarray:
+        encoded = self.tokenizer(*texts, padding=True, truncation=True,
+                                 max_length=self.max_length, return_tensors='np')
+        feeds = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        return self.session.run(None, feeds)[0]
+    
+    @staticmethod
+    def _length_order(lengths: List[int]) -> np.ndarray:
+        # Longest first, so each batch pads to similar lengths
+        return np.argsort(-np.asarray(lengths), kind='stable')
+
+
+class ONNXSentenceEncoder(_ONNXModel):
+    """Drop-in for SentenceTransformer.encode / get_sentence_embedding_dimension"""
+    
+    @property
+    def max_seq_length(self) -> int:
+        return self.max_length
+    
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.export_info['dimension']
+    
+    def encode(self, sentences: Union[str, Sequence[str]], batch_size: int = 32,
+               show_progress_bar: bool = False, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = False, **kwargs) -> Union[np.ndarray, List[np.ndarray]]:
+        single = isinstance(sentences, str)
+        sentences = [sentences] if single else list(sentences)
+        embeddings = np.zeros((len(sentences), self.get_sentence_embedding_dimension()), dtype=np.float32)
+        order = self._length_order([len(s) for s in sentences])
+        for start in range(0, len(sentences), batch_size):
+            positions = order[start:start + batch_size]
+            embeddings[positions] = self._run([sentences[i] for i in positions])
+        
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        if single:
+            return embeddings[0]
+        return embeddings if convert_to_numpy else list(embeddings)
+
+
+class ONNXCrossEncoder(_ONNXModel):
+    """Drop-in for CrossEncoder.predict"""
+    
+    def predict(self, sentences: Sequence[Tuple[str, str]], batch_size: int = 32,
+                show_progress_bar: bool = False, **kwargs) -> np.ndarray:
+        pairs = list(sentences)
+        scores = np.zeros(len(pairs), dtype=np.float32)
+        order = self._length_order([len(a) + len(b) for a, b in pairs])
+        for start in range(0, len(pairs), batch_size):
+            positions = order[start:start + batch_size]
+            logits = self._run([pairs[i][0] for i in positions], [pairs[i][1] for i in positions])
+            scores[positions] = logits[:, 0]
+        if self.export_info.get('activation') == 'sigmoid':
+            scores = 1.0 / (1.0 + np.exp(-scores))
+        return scores
+
+
+# ----------------------------------------------------------------------
+# Export
+# ----------------------------------------------------------------------
+
+def _ensure_export(model_name: str, kind: str) -> str:
+    """Directory holding the ONNX export of ``model_name``, exporting it on first use"""
+    variant = 'int8' if _settings['quantize'] else 'fp32'
+    safe_name = re.sub(r'[^A-Za-z0-9_.-]+', '_', model_name)
+    target = Path(_settings['cache_dir']) / f"{safe_name}.{kind}.{variant}"
+    if (target / "export.json").exists():
+        return str(target)
+    
+    with _export_lock:
+        if (target / "export.json").exists():
+            return str(target)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix=f".{safe_name}.", dir=str(target.parent))
+        try:
+            _export(model_name, kind, work_dir)
+            try:
+                os.replace(work_dir, target)
+            except OSError:
+                # Another process finished the same export first
+                if not (target / "export.json").exists():
+                    raise
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+    return str(target)
+
+
+def _export(model_name: str, kind: str, work_dir: str):
+    import torch
+    
+    logging.info(f"Exporting {model_name} to ONNX ({kind}, int8={_settings['quantize']})")
+    if kind == 'sentence_transformer':
+        from sentence_transformers import SentenceTransformer
+        reference = SentenceTransformer(model_name, device='cpu')
+        tokenizer = reference.tokenizer
+        max_length = reference.max_seq_length
+        probe_inputs = (_PROBE_SENTENCES,)
+        
+        def reference_forward(features):
+            return reference(features)['sentence_embedding']
+        module = reference
+    else:
+        from sentence_transformers import CrossEncoder
+        reference = CrossEncoder(model_name, device='cpu')
+        tokenizer = reference.tokenizer
+        max_length = reference.max_length or tokenizer.model_max_length
+        probe_inputs = (_PROBE_SENTENCES, list(reversed(_PROBE_SENTENCES)))
+        
+        def reference_forward(features):
+            return reference.model(**features).logits
+        module = reference.model
+    module.eval()
+    
+    sample = tokenizer(*probe_inputs, padding=True, truncation=True, max_length=max_length, return_tensors='pt')
+    input_names = list(sample.keys())
+    
+    class _Graph(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.module = module
+        
+        def forward(self, *tensors):
+            return reference_forward(dict(zip(input_names, tensors)))
+    
+    fp32_path = os.path.join(work_dir, "model.onnx")
+    with torch.no_grad():
+        expected = reference_forward(dict(sample)).numpy()
+        torch.onnx.export(
+            _Graph(), tuple(sample[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=['output'],
+            dynamic_axes={**{name: {0: 'batch', 1: 'sequence'} for name in input_names}, 'output': {0: 'batch'}},
+            opset_version=14
+        )
+    tokenizer.save_pretrained(work_dir)
+    
+    export_info = {
+        'model_name': model_name,
+        'kind': kind,
+        'max_length': int(max_length),
+        'dimension': int(expected.shape[1]),
+        'activation': _detect_activation(reference, probe_inputs, expected) if kind == 'cross_encoder' else None,
+        'model_file': "model.onnx",
+        'quantized': False
+    }
+    
+    candidates = [("model.onnx", False)]
+    if _settings['quantize']:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(fp32_path, os.path.join(work_dir, "model.int8.onnx"), weight_type=QuantType.QInt8)
+        candidates.insert(0, ("model.int8.onnx", True))
+    
+    feeds = {name: sample[name].numpy().astype(np.int64) for name in input_names}
+    for model_file, quantized in candidates:
+        session = _create_session(os.path.join(work_dir, model_file), _settings['num_threads'])
+        agreement = _agreement(expected, session.run(None, feeds)[0], kind)
+        if agreement >= _settings['min_similarity']:
+            export_info.update(model_file=model_file, quantized=quantized, agreement=round(agreement, 5))
+            break
+        logging.warning(f"ONNX export {model_file} of {model_name} agrees only {agreement:.4f} "
+                        f"with PyTorch (< {_settings['min_similarity']})")
+    else:
+        raise ValueError(f"No ONNX export of {model_name} matched the PyTorch model")
+    
+    with open(os.path.join(work_dir, "export.json"), 'w', encoding='utf-8') as f:
+        json.dump(export_info, f, indent=2)
+    logging.info(f"ONNX export of {model_name} ready: {export_info['model_file']} "
+                 f"(agreement {export_info['agreement']})")
+
+
+def _agreement(expected: np.ndarray, actual: np.ndarray, kind: str) -> float:
+    """Minimum per-row cosine for embeddings; Pearson correlation of the scores for cross-encoders"""
+    if kind == 'sentence_transformer':
+        norms = np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+        return float(np.min(np.sum(expected * actual, axis=1) / np.maximum(norms, 1e-12)))
+    return float(np.corrcoef(expected[:, 0], actual[:, 0])[0, 1])
+
+
+def _detect_activation(cross_encoder, probe_inputs, logits: np.ndarray) -> Optional[str]:
+    """Whether CrossEncoder.predict applies a sigmoid on top of the raw logits"""
+    scores = np.asarray(cross_encoder.predict(list(zip(*probe_inputs)), show_progress_bar=False),
+                        dtype=np.float32).reshape(-1)
+    if np.allclose(scores, logits[:, 0], atol=1e-4):
+        return None
+    if np.allclose(scores, 1.0 / (1.0 + np.exp(-logits[:, 0])), atol=1e-4):
+        return 'sigmoid'
+    raise ValueError("Unsupported cross-encoder activation")
@@ -0,0 +1,284 @@
+"""
+Async Embedding Client
+Concurrent, rate-limited HTTP client for hosted embedding APIs (Cohere, Azure AI Inference)
+"""
+import asyncio
+import json
+import logging
+import os
+import random
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+try:
+    from ..core.error_handling import EmbeddingError
+    from ..core.constants import get_embedding_dimension
+except ImportError:
+    try:
+        from rag_system.src.core.error_handling import EmbeddingError
+        from rag_system.src.core.constants import get_embedding_dimension
+    except ImportError:
+        # Fallback for when running as script
+        import sys
+        sys.path.insert(0, str(Path(__file__).parent.parent))
+        from core.error_handling import EmbeddingError
+        from core.constants import get_embedding_dimension
+
+COHERE_EMBED_URL = "https://api.cohere.com/v1/embed"
+AZURE_INFERENCE_API_VERSION = "2024-05-01-preview"
+RETRYABLE_STATUS = {408, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """Async token bucket: ``rate`` requests per second with bursts of up to ``capacity``"""
+    
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+    
+    async def acquire(self, tokens: float = 1.0):
+        if self.rate <= 0:
+            return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self._tokens) / self.rate)
+
+
+class AsyncEmbeddingClient:
+    """Sends embedding batches over a pooled keep-alive connection, ``max_concurrency`` at a time.
+    
+    Provider differences live in ``build_payload`` (texts -> JSON body) and
+    ``parse_response`` (JSON body -> vectors). 408/429/5xx responses and
+    transport errors are retried with full-jitter exponential backoff,
+    honouring ``Retry-After``. The client owns a private event loop thread, so
+    the blocking ``embed`` works from both sync code and inside a running loop.
+    """
+    
+    def __init__(self, url: str, headers: Dict[str, str],
+                 build_payload: Callable[[List[str]], Dict[str, Any]],
+                 parse_response: Callable[[Dict[str, Any]], List[List[float]]],
+                 batch_size: int = 96, max_concurrency: int = 4, requests_per_second: float = 0.0,
+                 max_retries: int = 5, backoff_base: float = 0.5, backoff_max: float = 30.0,
+                 timeout: float = 60.0):
+        if not HTTPX_AVAILABLE:
+            raise EmbeddingError("httpx package not installed")
+        self.url = url
+        self.headers = headers
+        self.build_payload = build_payload
+        self.parse_response = parse_response
+        self.batch_size = batch_size
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.timeout = timeout
+        self.rate_limiter = TokenBucket(requests_per_second)
+        
+        self._client = None
+        self._loop = None
+        self._loop_thread = None
+        self._start_lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'batches': 0}
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    
+    def embed(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Blocking wrapper around ``embed_async``"""
+        if not texts:
+            return []
+        self._ensure_loop()
+        future = asyncio.run_coroutine_threadsafe(self.embed_async(texts, batch_size), self._loop)
+        return future.result()
+    
+    async def embed_async(self, texts: List[str], batch_size: Optional[int] = None) -> List[List[float]]:
+        """Embeddings for ``texts`` in input order, with up to ``max_concurrency`` batches in flight"""
+        effective_batch_size = batch_size or self.batch_size
+        client = self._get_client()
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        
+        async def run_batch(batch: List[str]) -> List[List[float]]:
+            async with semaphore:
+                return await self._post_batch(client, batch)
+        
+        batches = [texts[i:i + effective_batch_size] for i in range(0, len(texts), effective_batch_size)]
+        results = await asyncio.gather(*(run_batch(batch) for batch in batches))
+        return [vector for batch_vectors in results for vector in batch_vectors]
+    
+    def close(self):
+        """Close pooled connections and stop the event loop thread"""
+        with self._start_lock:
+            if self._loop is None:
+                return
+            if self._client is not None:
+                asyncio.run_coroutine_threadsafe(self._client.aclose(), self._loop).result(timeout=10)
+                self._client = None
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._loop_thread.join(timeout=10)
+            self._loop.close()
+            self._loop = None
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats, max_concurrency=self.max_concurrency, requests_per_second=self.rate_limiter.rate)
+    
+    # ------------------------------------------------------------------
+    # Internals
+    # ------------------------------------------------------------------
+    
+    def _ensure_loop(self):
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._loop_thread = threading.Thread(target=self._loop.run_forever, daemon=True,
+                                                     name="AsyncEmbeddingClient")
+                self._loop_thread.start()
+    
+    def _get_client(self):
+        if self._client is None:
+            limits = httpx.Limits(max_connections=self.max_concurrency,
+                                  max_keepalive_connections=self.max_concurrency)
+            self._client = httpx.AsyncClient(headers=self.headers, limits=limits, timeout=self.timeout)
+        return self._client
+    
+    async def _post_batch(self, client, batch: List[str]) -> List[List[float]]:
+        payload = self.build_payload(batch)
+        for attempt in range(self.max_retries + 1):
+            await self.rate_limiter.acquire()
+            self.stats['requests'] += 1
+            start_time = time.time()
+            retry_after = None
+            try:
+                response = await client.post(self.url, json=payload)
+            except httpx.TransportError as e:
+                error = f"{type(e).__name__}: {e}"
+            else:
+                if response.status_code < 400:
+                    vectors = self.parse_response(response.json())
+                    if len(vectors) != len(batch):
+                        raise EmbeddingError(f"Expected {len(batch)} embeddings, received {len(vectors)}")
+                    self.stats['batches'] += 1
+                    logging.debug(f"Embedding batch ({len(batch)} texts) took {time.time() - start_time:.2f} seconds")
+                    return vectors
+                if response.status_code not in RETRYABLE_STATUS:
+                    raise EmbeddingError(f"Embedding request failed with HTTP {response.status_code}: "
+                                         f"{response.text[:500]}")
+                if response.status_code == 429:
+                    self.stats['rate_limited'] += 1
+                error = f"HTTP {response.status_code}"
+                retry_after = self._retry_after(response)
+            
+            if attempt == self.max_retries:
+                raise EmbeddingError(f"Embedding request failed after {attempt + 1} attempts: {error}")
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+            if retry_after is not None:
+                delay = max(delay, retry_after)
+            self.stats['retries'] += 1
+            logging.warning(f"Embedding batch failed ({error}), retrying in {delay:.2f}s "
+                            f"(attempt {attempt + 1}/{self.max_retries})")
+            await asyncio.sleep(delay)
+    
+    @staticmethod
+    def _retry_after(response) -> Optional[float]:
+        value = response.headers.get('retry-after')
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            return None
+    
+    # ------------------------------------------------------------------
+    # Providers
+    # ------------------------------------------------------------------
+    
+    @classmethod
+    def for_cohere(cls, api_key: str, model_name: str, input_type: str = "search_document",
+                   url: Optional[str] = None, **kwargs) -> 'AsyncEmbeddingClient':
+        def parse(body):
+            embeddings = body['embeddings']
+            return embeddings['float'] if isinstance(embeddings, dict) else embeddings
+        
+        return cls(
+            url=url or os.getenv('COHERE_EMBED_URL', COHERE_EMBED_URL),
+            headers={'Authorization': f"Bearer {api_key}", 'Content-Type': 'application/json'},
+            build_payload=lambda texts: {'texts': texts, 'model': model_name, 'input_type': input_type},
+            parse_response=parse,
+            **kwargs
+        )
+    
+    @classmethod
+    def for_azure(cls, endpoint: str, api_key: str, model_name: str, input_type: str = "document",
+                  **kwargs) -> 'AsyncEmbeddingClient':
+        def parse(body):
+            return [item['embedding'] for item in sorted(body['data'], key=lambda item: item.get('index', 0))]
+        
+        return cls(
+            url=f"{endpoint.rstrip('/')}/embeddings?api-version={AZURE_INFERENCE_API_VERSION}",
+            headers={'api-key': api_key, 'Authorization': f"Bearer {api_key}",
+                     'Content-Type': 'application/json'},
+            build_payload=lambda texts: {'input': texts, 'model': model_name, 'input_type': input_type},
+            parse_response=parse,
+            **kwargs
+        )
+
+
+class EmbeddingDimensionCache:
+    """Embedding dimension per provider/model without a probe request.
+    
+    Starts from ``core.constants.get_embedding_dimension`` and is corrected
+    (and persisted) when a real response disagrees, so an unknown model costs
+    one mismatch warning instead of a test call on every startup.
+    """
+    
+    _lock = threading.Lock()
+    
+    def __init__(self, path: str = "data/embedding_cache/dimensions.json"):
+        self.path = Path(path)
+    
+    def _load(self) -> Dict[str, int]:
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+    
+    def get(self, provider: str, model_name: str) -> int:
+        return self._load().get(f"{provider}:{model_name}") or get_embedding_dimension(provider, model_name)
+    
+    def observe(self, provider: str, model_name: str, dimension: int) -> int:
+        """Record the dimension seen in a real response"""
+        key = f"{provider}:{model_name}"
+        with self._lock:
+            known = self._load()
+            if known.get(key) == dimension:
+                return dimension
+            if get_embedding_dimension(provider, model_name) != dimension:
+                logging.warning(f"{key} returned {dimension}-dimensional embeddings; caching that dimension")
+            known[key] = dimension
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                tmp_path = self.path.with_suffix('.tmp')
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(known, f, indent=2)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logging.warning(f"Could not persist embedding dimension cache: {e}")
+        return dimension
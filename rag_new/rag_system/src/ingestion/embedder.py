@@ -20,6 +20,21 @@ except ImportError:
         sys.path.insert(0, str(Path(__file__).parent.parent / 'core'))
         from error_handling import EmbeddingError
 
+try:
+    from ..core.model_memory_manager import get_shared_sentence_transformer
+except ImportError:
+    try:
+        from rag_system.src.core.model_memory_manager import get_shared_sentence_transformer
+    except ImportError:
+        from model_memory_manager import get_shared_sentence_transformer
+
+try:
+    from .embedding_cache import EmbeddingCache
+    from .async_embedding_client import AsyncEmbeddingClient, EmbeddingDimensionCache, HTTPX_AVAILABLE
+except ImportError:
+    from embedding_cache import EmbeddingCache
+    from async_embedding_client import AsyncEmbeddingClient, EmbeddingDimensionCache, HTTPX_AVAILABLE
+
 class BaseEmbedder(ABC):
     """Base class for embedding providers"""
     
@@ -45,9 +60,9 @@ class SentenceTransformerEmbedder(BaseEmbedder):
     def _load_model(self):
         """Load the sentence transformer model"""
         try:
-            from sentence_transformers import SentenceTransformer
-            self.model = SentenceTransformer(self.model_name, device=self.device)
-            logging.info(f"Loaded SentenceTransformer model: {self.model_name}")
+            self.model = get_shared_sentence_transformer(self.model_name, device=self.device)
+            loaded = self.model.resolve()  # The embedder is always needed, so load up front
+            logging.info(f"Loaded SentenceTransformer model: {self.model_name} ({type(loaded).__name__})")
         except ImportError:
             raise EmbeddingError("sentence-transformers package not installed")
         except Exception as e:
@@ -79,16 +94,51 @@ class SentenceTransformerEmbedder(BaseEmbedder):
         """Get embedding dimension"""
         return self.model.get_sentence_embedding_dimension()
 
-class CohereEmbedder(BaseEmbedder):
+class RemoteEmbedder(BaseEmbedder):
+    """Shared plumbing for hosted embedding APIs: async client and dimension lookup"""
+    
+    provider = None
+    
+    def _init_remote(self, max_concurrency: int, requests_per_second: float, max_retries: int):
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        self.max_retries = max_retries
+        self.async_client = None
+        self.dimension_cache = EmbeddingDimensionCache()
+        # Known dimension up front instead of a probe request on every startup
+        self._dimension = self.dimension_cache.get(self.provider, self.model_name)
+        self._dimension_verified = False
+    
+    def _async_client_kwargs(self) -> dict:
+        return dict(batch_size=self.batch_size, max_concurrency=self.max_concurrency,
+                    requests_per_second=self.requests_per_second, max_retries=self.max_retries)
+    
+    def _verify_dimension(self, embeddings: List[List[float]]):
+        if embeddings and not self._dimension_verified:
+            self._dimension = self.dimension_cache.observe(self.provider, self.model_name, len(embeddings[0]))
+            self._dimension_verified = True
+    
+    def get_dimension(self) -> int:
+        """Get embedding dimension"""
+        return self._dimension
+    
+    def close(self):
+        if self.async_client is not None:
+            self.async_client.close()
+
+class CohereEmbedder(RemoteEmbedder):
     """Cohere embedder"""
     
+    provider = "cohere"
+    
     def __init__(self, model_name: str = "embed-english-v3.0", 
-                 api_key: Optional[str] = None, batch_size: int = 96):
+                 api_key: Optional[str] = None, batch_size: int = 96,
+                 max_concurrency: int = 4, requests_per_second: float = 0.0, max_retries: int = 5):
         self.model_name = model_name
         self.api_key = api_key or os.getenv('COHERE_API_KEY')
         self.batch_size = batch_size
         self.client = None
-        self._dimension = None
+        self._init_remote(max_concurrency, requests_per_second, max_retries)
         self._load_client()
     
     def _load_client(self):
@@ -96,20 +146,18 @@ class CohereEmbedder(BaseEmbedder):
         if not self.api_key:
             raise EmbeddingError("Cohere API key not provided. Set COHERE_API_KEY environment variable.")
         
+        if HTTPX_AVAILABLE:
+            self.async_client = AsyncEmbeddingClient.for_cohere(
+                self.api_key, self.model_name, **self._async_client_kwargs())
+            logging.info(f"Loaded async Cohere client with model: {self.model_name} "
+                         f"({self.max_concurrency} concurrent batches)")
+            return
+        
         try:
             import cohere
             self.client = cohere.Client(self.api_key)
             logging.info(f"Loaded Cohere client with model: {self.model_name}")
             
-            # Get dimension by testing with a sample text
-            test_response = self.client.embed(
-                texts=["test"],
-                model=self.model_name,
-                input_type="search_document"
-            )
-            self._dimension = len(test_response.embeddings[0])
-            logging.info(f"Cohere embedding dimension: {self._dimension}")
-            
         except ImportError:
             raise EmbeddingError("cohere package not installed")
         except Exception as e:
@@ -125,6 +173,11 @@ class CohereEmbedder(BaseEmbedder):
         
         try:
             import time
+            if self.async_client is not None:
+                all_embeddings = self.async_client.embed(texts, effective_batch_size)
+                self._verify_dimension(all_embeddings)
+                return all_embeddings
+            
             all_embeddings = []
             for i in range(0, len(texts), effective_batch_size):
                 batch = texts[i:i + effective_batch_size]
@@ -137,27 +190,29 @@ class CohereEmbedder(BaseEmbedder):
                 elapsed = time.time() - start_time
                 logging.debug(f"Cohere embedding batch ({len(batch)} texts) took {elapsed:.2f} seconds")
                 all_embeddings.extend(response.embeddings)
+            self._verify_dimension(all_embeddings)
             return all_embeddings
+        except EmbeddingError:
+            raise
         except Exception as e:
             logging.error(f"Cohere embedding error: {e}")
             raise EmbeddingError(f"Failed to generate Cohere embeddings: {e}")
-    
-    def get_dimension(self) -> int:
-        """Get embedding dimension"""
-        return self._dimension
 
-class AzureEmbedder(BaseEmbedder):
+class AzureEmbedder(RemoteEmbedder):
     """Azure AI Inference embedder"""
     
+    provider = "azure"
+    
     def __init__(self, model_name: str = "Cohere-embed-v3-english", 
                  api_key: Optional[str] = None, endpoint: Optional[str] = None, 
-                 batch_size: int = 96):
+                 batch_size: int = 96, max_concurrency: int = 4, requests_per_second: float = 0.0,
+                 max_retries: int = 5):
         self.model_name = model_name
         self.api_key = api_key or os.getenv('AZURE_API_KEY')
         self.endpoint = endpoint or os.getenv('AZURE_EMBEDDINGS_ENDPOINT')
         self.batch_size = batch_size
         self.client = None
-        self._dimension = None
+        self._init_remote(max_concurrency, requests_per_second, max_retries)
         self._load_client()
     
     def _load_client(self):
@@ -167,6 +222,13 @@ class AzureEmbedder(BaseEmbedder):
         if not self.endpoint:
             raise EmbeddingError("Azure endpoint not provided. Set AZURE_EMBEDDINGS_ENDPOINT environment variable.")
         
+        if HTTPX_AVAILABLE:
+            self.async_client = AsyncEmbeddingClient.for_azure(
+                self.endpoint, self.api_key, self.model_name, **self._async_client_kwargs())
+            logging.info(f"Loaded async Azure AI Inference client with model: {self.model_name} "
+                         f"({self.max_concurrency} concurrent batches)")
+            return
+        
         try:
             from azure.ai.inference import EmbeddingsClient
             from azure.core.credentials import AzureKeyCredential
@@ -177,15 +239,6 @@ class AzureEmbedder(BaseEmbedder):
             )
             logging.info(f"Loaded Azure AI Inference client with model: {self.model_name}")
             
-            # Get dimension by testing with a sample text
-            test_response = self.client.embed(
-                input=["test"],
-                model=self.model_name,
-                input_type="document"
-            )
-            self._dimension = len(test_response.data[0].embedding)
-            logging.info(f"Azure embedding dimension: {self._dimension}")
-            
         except ImportError:
             raise EmbeddingError("azure-ai-inference package not installed")
         except Exception as e:
@@ -201,6 +254,11 @@ class AzureEmbedder(BaseEmbedder):
         
         try:
             import time
+            if self.async_client is not None:
+                all_embeddings = self.async_client.embed(texts, effective_batch_size)
+                self._verify_dimension(all_embeddings)
+                return all_embeddings
+            
             all_embeddings = []
             for i in range(0, len(texts), effective_batch_size):
                 batch = texts[i:i + effective_batch_size]
@@ -216,21 +274,21 @@ class AzureEmbedder(BaseEmbedder):
                 # Extract embeddings from response
                 batch_embeddings = [item.embedding for item in response.data]
                 all_embeddings.extend(batch_embeddings)
+            self._verify_dimension(all_embeddings)
             return all_embeddings
+        except EmbeddingError:
+            raise
         except Exception as e:
             logging.error(f"Azure embedding error: {e}")
             raise EmbeddingError(f"Failed to generate Azure embeddings: {e}")
-    
-    def get_dimension(self) -> int:
-        """Get embedding dimension"""
-        return self._dimension
 
 class Embedder:
     """Multi-provider text embedder"""
     
     def __init__(self, provider: str = "cohere", model_name: Optional[str] = None, 
                  api_key: Optional[str] = None, device: str = "cpu", batch_size: int = 32,
-                 endpoint: Optional[str] = None):
+                 endpoint: Optional[str] = None, cache: Optional[EmbeddingCache] = None,
+                 max_concurrency: int = 4, requests_per_second: float = 0.0, max_retries: int = 5):
         self.provider = provider.lower()
         self.model_name = model_name
         self.api_key = api_key
@@ -238,6 +296,10 @@ class Embedder:
         self.batch_size = batch_size
         self.endpoint = endpoint
         self.embedder = None
+        self.cache = cache
+        # Hosted providers only: concurrent batches in flight, request rate cap (0 = none), retries on 429/5xx
+        self.remote_options = dict(max_concurrency=max_concurrency, requests_per_second=requests_per_second,
+                                   max_retries=max_retries)
         
         self._initialize_embedder()
         logging.info(f"Embedder initialized with provider: {provider}")
@@ -249,7 +311,8 @@ class Embedder:
             self.embedder = CohereEmbedder(
                 model_name=model,
                 api_key=self.api_key,
-                batch_size=self.batch_size
+                batch_size=self.batch_size,
+                **self.remote_options
             )
         elif self.provider == "azure":
             model = self.model_name or "Cohere-embed-v3-english"
@@ -257,7 +320,8 @@ class Embedder:
                 model_name=model,
                 api_key=self.api_key,
                 endpoint=self.endpoint,
-                batch_size=self.batch_size
+                batch_size=self.batch_size,
+                **self.remote_options
             )
         elif self.provider == "sentence-transformers":
             model = self.model_name or "sentence-transformers/all-MiniLM-L6-v2"
@@ -322,11 +386,46 @@ class Embedder:
         """Generate embedding for a single text"""
         return self.embed_texts([text])[0]
     
+    @property
+    def cache_model_key(self) -> str:
+        """Cache namespace: vectors from different providers or models never mix"""
+        return f"{self.provider}/{self.embedder.model_name}"
+    
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
-        """Generate embeddings for multiple texts with adaptive batch sizing"""
+        """Generate embeddings for multiple texts, serving unchanged chunks from the cache"""
         if not texts:
             return []
+        if self.cache is None:
+            return self._embed_uncached(texts)
         
+        model_key = self.cache_model_key
+        keys = [EmbeddingCache.text_key(text) for text in texts]
+        try:
+            cached = self.cache.get_many(model_key, keys)
+        except Exception as e:
+            logging.warning(f"Embedding cache lookup failed, embedding all texts: {e}")
+            cached = {}
+        
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+        if missing:
+            new_embeddings = self._embed_uncached(list(missing.values()))
+            # Round-trip through float32 so results match what later cache hits return
+            computed = dict(zip(missing, np.asarray(new_embeddings, dtype=np.float32)))
+            try:
+                self.cache.put_many(model_key, computed)
+            except Exception as e:
+                logging.warning(f"Failed to store embeddings in cache: {e}")
+            cached.update(computed)
+        
+        logging.debug(f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} texts served from cache")
+        return [cached[key].tolist() for key in keys]
+    
+    def _embed_uncached(self, texts: List[str]) -> List[List[float]]:
+        """Generate embeddings for multiple texts with adaptive batch sizing"""
         # Calculate optimal batch size based on text characteristics
         text_lengths = [len(text) for text in texts]
         optimal_batch_size = self.calculate_optimal_batch_size(text_lengths)
@@ -343,6 +442,10 @@ class Embedder:
         
         return all_embeddings
     
+    def get_cache_stats(self) -> dict:
+        """Embedding cache hit/miss counters (empty when caching is disabled)"""
+        return self.cache.get_stats() if self.cache else {}
+    
     def get_dimension(self) -> int:
         """Get embedding dimension"""
         return self.embedder.get_dimension()
@@ -0,0 +1,152 @@
+"""
+Embedding Cache
+Persistent, content-addressed cache of chunk embeddings keyed by (model, SHA-256 of text)
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Stay below SQLITE_MAX_VARIABLE_NUMBER on older SQLite builds
+_LOOKUP_CHUNK = 400
+
+
+class EmbeddingCache:
+    """SQLite-backed embedding cache with least-recently-used eviction.
+    
+    Vectors are stored as little-endian float32 blobs, so an entry costs
+    roughly ``4 * dimension`` bytes plus the key. Lookups and inserts are
+    batched per ``embed_texts`` call; the table is trimmed back to
+    ``max_entries`` by dropping the entries that were used least recently.
+    """
+    
+    def __init__(self, db_path: str = "data/embedding_cache/embeddings.sqlite", max_entries: int = 200000):
+        self.db_path = Path(db_path)
+        self.max_entries = max(1, max_entries)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                dimension INTEGER NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, text_hash)
+            ) WITHOUT ROWID
+        ''')
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        self._conn.commit()
+        
+        self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        self._last_tick = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        logging.info(f"Embedding cache opened at {self.db_path} ({self._entries} entries)")
+    
+    def _tick(self) -> float:
+        """Strictly increasing use timestamp so recency never ties within this process"""
+        self._last_tick = max(time.time(), self._last_tick + 1e-6)
+        return self._last_tick
+    
+    @staticmethod
+    def text_key(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def get_many(self, model: str, keys: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Return the cached vectors for ``keys``; missing keys are simply absent"""
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self._lock:
+            now = self._tick()
+            for i in range(0, len(keys), _LOOKUP_CHUNK):
+                chunk = keys[i:i + _LOOKUP_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({placeholders})",
+                    [model, *chunk]
+                ).fetchall()
+                for text_hash, blob in rows:
+                    found[text_hash] = np.frombuffer(blob, dtype='<f4')
+            if found:
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, text_hash) for text_hash in found]
+                )
+                self._conn.commit()
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+    
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        """Cache ``vectors`` (text hash -> embedding) and evict if over capacity"""
+        if not vectors:
+            return
+        rows = []
+        for text_hash, vector in vectors.items():
+            array = np.asarray(vector, dtype='<f4')
+            rows.append([model, text_hash, int(array.shape[0]), array.tobytes()])
+        
+        with self._lock:
+            now = self._tick()
+            for row in rows:
+                row.append(now)
+            before = self._conn.total_changes
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, dimension, vector, last_used) "
+                "VALUES (?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+            if self._conn.total_changes - before:
+                self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            if self._entries > self.max_entries:
+                self._evict()
+    
+    def _evict(self):
+        """Drop the least recently used entries, leaving 10% headroom so eviction stays infrequent"""
+        excess = self._entries - int(self.max_entries * 0.9)
+        self._conn.execute('''
+            DELETE FROM embeddings WHERE (model, text_hash) IN (
+                SELECT model, text_hash FROM embeddings ORDER BY last_used LIMIT ?
+            )
+        ''', (excess,))
+        self._conn.commit()
+        self._entries -= excess
+        self.evictions += excess
+        logging.debug(f"Embedding cache evicted {excess} entries")
+    
+    def clear(self, model: Optional[str] = None):
+        """Remove every entry, or only those of ``model``"""
+        with self._lock:
+            if model is None:
+                self._conn.execute("DELETE FROM embeddings")
+            else:
+                self._conn.execute("DELETE FROM embeddings WHERE model = ?", (model,))
+            self._conn.commit()
+            self._entries = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    
+    def get_stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': self.hits / lookups if lookups else 0.0,
+            'cache_entries': self._entries,
+            'cache_max_entries': self.max_entries,
+            'cache_evictions': self.evictions
+        }
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,39 @@
+"""
+File Hashing
+Content hash shared by the ingestion engine (deduplication) and the folder monitor (change detection)
+"""
+import hashlib
+import os
+from typing import Any, Dict, Optional
+
+HASH_ALGORITHM = "sha256"
+
+# Read size for document hashing; large reads keep hashing I/O-bound rather than call-bound
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def compute_file_hash(file_path) -> str:
+    """SHA-256 of the file's content, read in HASH_BUFFER_SIZE chunks"""
+    hasher = hashlib.new(HASH_ALGORITHM)
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+def precomputed_file_hash(file_path, metadata: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Hash a caller already computed with ``compute_file_hash``, if the file is unchanged since.
+    
+    Callers pass it as ``file_hash`` alongside ``hash_algorithm``, ``file_size``
+    and ``file_mtime`` in the ingestion metadata; a different size or mtime
+    means the file was written after hashing, so it must be read again.
+    """
+    if not metadata or not metadata.get('file_hash') or metadata.get('hash_algorithm') != HASH_ALGORITHM:
+        return None
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    if stat.st_size != metadata.get('file_size') or stat.st_mtime != metadata.get('file_mtime'):
+        return None
+    return metadata['file_hash']
@@ -6,6 +6,7 @@ import logging
 import mimetypes
 import hashlib
 import os
+import pickle
 from pathlib import Path
 from typing import Dict, List, Any, Optional
 from datetime import datetime
@@ -21,6 +22,8 @@ from .processors.excel_processor import ExcelProcessor
 from .processors import create_processor_registry
 from ..core.progress_tracker import ProgressTracker, ProgressStage, ProgressStatus
 from ..ingestion.progress_integration import ProgressTrackedIngestion
+from .pipeline import IngestionPipeline, PipelineFile
+from .file_hashing import compute_file_hash, precomputed_file_hash
 
 class IngestionEngine:
     """Main document ingestion engine with progress tracking"""
@@ -234,16 +237,13 @@ class IngestionEngine:
     
     def _calculate_document_hash(self, file_path: Path) -> str:
         """Calculate hash of document content for deduplication"""
-        hasher = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(4096), b""):
-                hasher.update(chunk)
-        return hasher.hexdigest()
+        return compute_file_hash(file_path)
 
-    def check_duplicate(self, file_path: str) -> Optional[str]:
+    def check_duplicate(self, file_path: str, doc_hash: Optional[str] = None) -> Optional[str]:
         """Check if document already exists"""
-        doc_hash = self._calculate_document_hash(Path(file_path))
-        # Check in metadata store
+        if doc_hash is None:
+            doc_hash = self._calculate_document_hash(Path(file_path))
+        # Check in metadata store (hash-indexed)
         existing = self.metadata_store.find_by_hash(doc_hash)
         return existing.get('file_id') if existing else None
     
@@ -269,8 +269,12 @@ class IngestionEngine:
                 if file_path.stat().st_size > self.config.ingestion.max_file_size_mb * 1024 * 1024:
                     raise FileProcessingError(f"File too large: {file_path}")
             
+            # Hash the file once (or reuse the caller's hash, e.g. the folder monitor's);
+            # duplicate detection, replacement and metadata all reuse it
+            doc_hash = precomputed_file_hash(file_path, metadata) or self._calculate_document_hash(file_path)
+            
             # Check for duplicate document
-            duplicate_file_id = self.check_duplicate(str(file_path))
+            duplicate_file_id = self.check_duplicate(str(file_path), doc_hash)
             if duplicate_file_id:
                 logging.info(f"Duplicate document detected: {file_path} (existing: {duplicate_file_id})")
                 return {
@@ -280,31 +284,10 @@ class IngestionEngine:
                     'duplicate_file_id': duplicate_file_id
                 }
             
-            old_vectors_deleted = self._handle_existing_file(str(file_path))
+            old_vectors_deleted = self._handle_existing_file(str(file_path), doc_hash)
             
             # ✅ FIX: Prepare enhanced metadata BEFORE calling processor
-            # Get original filename for proper metadata handling
-            original_filename = metadata.get('original_filename', str(file_path)) if metadata else str(file_path)
-            
-            # Create enhanced metadata that includes source information for processors
-            enhanced_metadata = {
-                'file_path': original_filename,  # Use original filename for file_path
-                'original_filename': original_filename,
-                'filename': os.path.basename(original_filename),  # Extract filename from original path
-                'file_size': file_path.stat().st_size,
-                'file_type': Path(original_filename).suffix,  # Get extension from original filename
-                'source_type': metadata.get('source_type', 'file') if metadata else 'file',  # Respect input source_type
-                'upload_source': metadata.get('upload_source', 'unknown') if metadata else 'unknown',  # ✅ PRESERVE upload_source
-                'content_type': metadata.get('content_type') if metadata else None,
-                'upload_timestamp': metadata.get('upload_timestamp') if metadata else None,
-                'ingested_at': datetime.now().isoformat(),
-                'processor': 'ingestion_engine',
-                'is_update': old_vectors_deleted > 0,
-                'replaced_vectors': old_vectors_deleted,
-                'doc_hash': self._calculate_document_hash(file_path),
-                # Include any additional metadata from the API call
-                **(metadata or {})
-            }
+            enhanced_metadata = self._build_file_metadata(file_path, metadata, old_vectors_deleted, doc_hash)
             
             # Set enhanced metadata for processors to use
             self._current_metadata = enhanced_metadata
@@ -332,24 +315,10 @@ class IngestionEngine:
             chunking_start = datetime.now()
             if self.progress_helper:
                 with self.progress_helper.track_stage(str(file_path), ProgressStage.CHUNKING):
-                    # Check for processor chunks
-                    if hasattr(self, '_use_processor_chunks') and self._use_processor_chunks and hasattr(self, '_processor_chunks'):
-                        chunks = self._processor_chunks
-                        logging.info(f"Using {len(chunks)} chunks from processor")
-                        # Clean up flags
-                        self._use_processor_chunks = False
-                        self._processor_chunks = None
-                    else:
-                        chunks = self.chunker.chunk_text(text_content, file_metadata)
+                    chunks = self._chunk_extracted_text(text_content, file_metadata)
             else:
                 # Same logic without progress tracking
-                if hasattr(self, '_use_processor_chunks') and self._use_processor_chunks and hasattr(self, '_processor_chunks'):
-                    chunks = self._processor_chunks
-                    logging.info(f"Using {len(chunks)} chunks from processor")
-                    self._use_processor_chunks = False
-                    self._processor_chunks = None
-                else:
-                    chunks = self.chunker.chunk_text(text_content, file_metadata)
+                chunks = self._chunk_extracted_text(text_content, file_metadata)
             chunking_time = (datetime.now() - chunking_start).total_seconds()
             
             if not chunks:
@@ -362,14 +331,21 @@ class IngestionEngine:
             # Validate chunk structure
             validated_chunks = self._validate_chunk_structure(chunks)
             
+            # Incremental update: vectors of unchanged chunks are kept as they are
+            chunk_diff = self._diff_stored_chunks(file_path, metadata, file_metadata, validated_chunks)
+            if chunk_diff:
+                chunks_to_embed = [chunk for i, chunk in enumerate(validated_chunks) if i not in chunk_diff['reused']]
+            else:
+                chunks_to_embed = validated_chunks
+            
             # Embedding stage
             embedding_start = datetime.now()
             if self.progress_helper:
                 with self.progress_helper.track_stage(str(file_path), ProgressStage.EMBEDDING):
-                    chunk_texts = [chunk['text'] for chunk in validated_chunks]
+                    chunk_texts = [chunk['text'] for chunk in chunks_to_embed]
                     embeddings = self.embedder.embed_texts(chunk_texts)
             else:
-                chunk_texts = [chunk['text'] for chunk in validated_chunks]
+                chunk_texts = [chunk['text'] for chunk in chunks_to_embed]
                 embeddings = self.embedder.embed_texts(chunk_texts)
             embedding_time = (datetime.now() - embedding_start).total_seconds()
             
@@ -377,128 +353,24 @@ class IngestionEngine:
             storage_start = datetime.now()
             if self.progress_helper:
                 with self.progress_helper.track_stage(str(file_path), ProgressStage.STORING):
-                    chunk_metadata_list = []
-                    for i, (chunk, embedding) in enumerate(zip(validated_chunks, embeddings)):
-                        try:
-                            # Extract chunk metadata and ensure it's flat
-                            chunk_meta = chunk.get('metadata', {})
-                            
-                            # If chunk metadata has nested 'metadata', extract it
-                            if isinstance(chunk_meta.get('metadata'), dict):
-                                nested_meta = chunk_meta.pop('metadata')
-                                # Merge nested metadata into chunk_meta
-                                for k, v in nested_meta.items():
-                                    if k not in chunk_meta:
-                                        chunk_meta[k] = v
-                            
-                            # ✅ FIX: Create base metadata that doesn't override processor metadata
-                            # Only include essential chunk metadata that should NOT override processor data
-                            base_chunk_metadata = {
-                                'text': chunk['text'],
-                                'content': chunk['text'],  # For compatibility
-                                'chunk_index': i,
-                                'total_chunks': len(validated_chunks),
-                                'chunk_size': len(chunk['text']),
-                                'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),  # Use consistent ID
-                                'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),  # Use original path for doc_path
-                                'chunking_method': getattr(self.chunker.__class__, '__name__', 'unknown'),
-                                'embedding_model': getattr(self.embedder, 'model_name', 'unknown')
-                            }
-                            
-                            # ✅ FIX: Change merge order - put base_chunk_metadata FIRST so processor metadata takes priority
-                            merged_metadata = self.metadata_manager.merge_metadata(
-                                base_chunk_metadata,  # 1st: Basic chunk info (lowest priority)
-                                file_metadata,        # 2nd: File metadata
-                                metadata or {},       # 3rd: API upload metadata 
-                                chunk_meta             # 4th: Processor chunk metadata (HIGHEST priority) ✅
-                            )
-                            
-                            storage_metadata = self.metadata_manager.prepare_for_storage(merged_metadata)
-                            chunk_metadata_list.append(storage_metadata)
-                        except Exception as e:
-                            logging.error(f"Failed to merge metadata for chunk {i}: {e}")
-                            # Fallback metadata
-                            fallback_meta = {
-                                'text': chunk['text'],
-                                'chunk_index': i,
-                                'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),
-                                'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
-                                'filename': os.path.basename(metadata.get('original_filename', str(file_path))) if metadata else os.path.basename(file_path),
-                                'file_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
-                                'source_type': 'file'
-                            }
-                            chunk_metadata_list.append(fallback_meta)
-                    
-                    vector_ids = self.vector_store.add_vectors(embeddings, chunk_metadata_list)
-                    final_file_metadata = {
-                        **file_metadata,
-                        'chunk_count': len(validated_chunks),
-                        'vector_ids': vector_ids,
-                        'doc_id': chunk_metadata_list[0].get('doc_id', 'unknown') if chunk_metadata_list else 'unknown'
-                    }
-                    file_id = self.metadata_store.add_file_metadata(str(file_path), final_file_metadata)
+                    if chunk_diff:
+                        chunk_metadata_list, vector_ids, file_id = self._store_chunk_diff(
+                            file_path, file_metadata, chunk_diff, embeddings
+                        )
+                    else:
+                        chunk_metadata_list, vector_ids, file_id = self._store_file_chunks(
+                            file_path, metadata, file_metadata, validated_chunks, embeddings
+                        )
             else:
                 # Fallback without progress tracking (same fix applied)
-                chunk_metadata_list = []
-                for i, (chunk, embedding) in enumerate(zip(validated_chunks, embeddings)):
-                    try:
-                        # Extract chunk metadata and ensure it's flat
-                        chunk_meta = chunk.get('metadata', {})
-                        
-                        # If chunk metadata has nested 'metadata', extract it
-                        if isinstance(chunk_meta.get('metadata'), dict):
-                            nested_meta = chunk_meta.pop('metadata')
-                            # Merge nested metadata into chunk_meta
-                            for k, v in nested_meta.items():
-                                if k not in chunk_meta:
-                                    chunk_meta[k] = v
-                        
-                        # ✅ FIX: Create base metadata that doesn't override processor metadata
-                        # Only include essential chunk metadata that should NOT override processor data
-                        base_chunk_metadata = {
-                            'text': chunk['text'],
-                            'content': chunk['text'],  # For compatibility
-                            'chunk_index': i,
-                            'total_chunks': len(validated_chunks),
-                            'chunk_size': len(chunk['text']),
-                            'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),  # Use consistent ID
-                            'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),  # Use original path for doc_path
-                            'chunking_method': getattr(self.chunker.__class__, '__name__', 'unknown'),
-                            'embedding_model': getattr(self.embedder, 'model_name', 'unknown')
-                        }
-                        
-                        # ✅ FIX: Change merge order - put base_chunk_metadata FIRST so processor metadata takes priority
-                        merged_metadata = self.metadata_manager.merge_metadata(
-                            base_chunk_metadata,  # 1st: Basic chunk info (lowest priority)
-                            file_metadata,        # 2nd: File metadata
-                            metadata or {},       # 3rd: API upload metadata 
-                            chunk_meta             # 4th: Processor chunk metadata (HIGHEST priority) ✅
-                        )
-                        
-                        storage_metadata = self.metadata_manager.prepare_for_storage(merged_metadata)
-                        chunk_metadata_list.append(storage_metadata)
-                    except Exception as e:
-                        logging.error(f"Failed to merge metadata for chunk {i}: {e}")
-                        # Fallback metadata
-                        fallback_meta = {
-                            'text': chunk['text'],
-                            'chunk_index': i,
-                            'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),
-                            'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
-                            'filename': os.path.basename(metadata.get('original_filename', str(file_path))) if metadata else os.path.basename(file_path),
-                            'file_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
-                            'source_type': 'file'
-                        }
-                        chunk_metadata_list.append(fallback_meta)
-                
-                vector_ids = self.vector_store.add_vectors(embeddings, chunk_metadata_list)
-                final_file_metadata = {
-                    **file_metadata,
-                    'chunk_count': len(validated_chunks),
-                    'vector_ids': vector_ids,
-                    'doc_id': chunk_metadata_list[0].get('doc_id', 'unknown') if chunk_metadata_list else 'unknown'
-                }
-                file_id = self.metadata_store.add_file_metadata(str(file_path), final_file_metadata)
+                if chunk_diff:
+                    chunk_metadata_list, vector_ids, file_id = self._store_chunk_diff(
+                        file_path, file_metadata, chunk_diff, embeddings
+                    )
+                else:
+                    chunk_metadata_list, vector_ids, file_id = self._store_file_chunks(
+                        file_path, metadata, file_metadata, validated_chunks, embeddings
+                    )
             
             storage_time = (datetime.now() - storage_start).total_seconds()
             
@@ -525,20 +397,28 @@ class IngestionEngine:
                 self.progress_tracker.complete_file(str(file_path), metrics)
             
             logging.info(f"Successfully ingested file: {file_path} ({len(validated_chunks)} chunks)")
+            if chunk_diff:
+                old_vectors_deleted += len(chunk_diff['removed'])
+                logging.info(f"Incremental update: reused {len(chunk_diff['reused'])} chunks, "
+                             f"embedded {len(chunks_to_embed)}, removed {len(chunk_diff['removed'])}")
             if old_vectors_deleted > 0:
                 logging.info(f"Replaced {old_vectors_deleted} old vectors for updated file")
             
             doc_id = chunk_metadata_list[0].get('doc_id', 'unknown') if chunk_metadata_list else 'unknown'
-            return {
+            result = {
                 'status': 'success',
                 'file_id': file_id,
                 'doc_id': doc_id,
                 'file_path': str(file_path),
                 'chunks_created': len(validated_chunks),
                 'vectors_stored': len(vector_ids),
-                'is_update': old_vectors_deleted > 0,
+                'is_update': old_vectors_deleted > 0 or bool(chunk_diff),
                 'old_vectors_deleted': old_vectors_deleted
             }
+            if chunk_diff:
+                result['chunks_reused'] = len(chunk_diff['reused'])
+                result['chunks_embedded'] = len(chunks_to_embed)
+            return result
             
         except Exception as e:
             logging.error(f"Failed to ingest file {file_path}: {e}")
@@ -546,6 +426,222 @@ class IngestionEngine:
                 self.progress_tracker.fail_file(str(file_path), e)
             raise IngestionError(f"Failed to ingest file: {e}", details={"file_path": str(file_path)})
     
+    def _build_file_metadata(self, file_path: Path, metadata: Optional[Dict[str, Any]],
+                             old_vectors_deleted: int, doc_hash: Optional[str] = None) -> Dict[str, Any]:
+        """File-level metadata shared by every chunk of ``file_path`` (also handed to processors)"""
+        # Get original filename for proper metadata handling
+        original_filename = metadata.get('original_filename', str(file_path)) if metadata else str(file_path)
+        
+        # Create enhanced metadata that includes source information for processors
+        enhanced_metadata = {
+            'file_path': original_filename,  # Use original filename for file_path
+            'original_filename': original_filename,
+            'filename': os.path.basename(original_filename),  # Extract filename from original path
+            'file_size': file_path.stat().st_size,
+            'file_type': Path(original_filename).suffix,  # Get extension from original filename
+            'source_type': metadata.get('source_type', 'file') if metadata else 'file',  # Respect input source_type
+            'upload_source': metadata.get('upload_source', 'unknown') if metadata else 'unknown',  # ✅ PRESERVE upload_source
+            'content_type': metadata.get('content_type') if metadata else None,
+            'upload_timestamp': metadata.get('upload_timestamp') if metadata else None,
+            'ingested_at': datetime.now().isoformat(),
+            'processor': 'ingestion_engine',
+            'is_update': old_vectors_deleted > 0,
+            'replaced_vectors': old_vectors_deleted,
+            'doc_hash': doc_hash or self._calculate_document_hash(file_path),
+            # Include any additional metadata from the API call
+            **(metadata or {})
+        }
+        return enhanced_metadata
+    
+    def _extract_and_chunk(self, file_path: str, file_metadata: Dict[str, Any]):
+        """Extract and chunk one file without touching the stores; returns (chunks, file_metadata, info)"""
+        file_path = Path(file_path)
+        # Processors read and enrich the file metadata through _current_metadata
+        self._current_metadata = file_metadata
+        
+        extraction_start = datetime.now()
+        text_content = self._extract_text(file_path)
+        info = {'extraction_time': (datetime.now() - extraction_start).total_seconds()}
+        if not text_content.strip():
+            info['skip_reason'] = 'no_content'
+            return [], file_metadata, info
+        
+        chunking_start = datetime.now()
+        chunks = self._chunk_extracted_text(text_content, file_metadata)
+        info['chunking_time'] = (datetime.now() - chunking_start).total_seconds()
+        if not chunks:
+            info['skip_reason'] = 'no_chunks'
+            return [], file_metadata, info
+        
+        return self._validate_chunk_structure(chunks), file_metadata, info
+    
+    def _chunk_extracted_text(self, text_content: str, file_metadata: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Use the chunks a specialized processor produced, or chunk the extracted text"""
+        # Check for processor chunks
+        if hasattr(self, '_use_processor_chunks') and self._use_processor_chunks and hasattr(self, '_processor_chunks'):
+            chunks = self._processor_chunks
+            logging.info(f"Using {len(chunks)} chunks from processor")
+            # Clean up flags
+            self._use_processor_chunks = False
+            self._processor_chunks = None
+            return chunks
+        return self.chunker.chunk_text(text_content, file_metadata)
+    
+    def _build_chunk_metadata(self, file_path: Path, metadata: Optional[Dict[str, Any]],
+                              file_metadata: Dict[str, Any], validated_chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge chunk, file and API metadata into the flat per-chunk metadata that gets stored"""
+        chunk_metadata_list = []
+        for i, chunk in enumerate(validated_chunks):
+            try:
+                # Extract chunk metadata and ensure it's flat
+                chunk_meta = chunk.get('metadata', {})
+                
+                # If chunk metadata has nested 'metadata', extract it
+                if isinstance(chunk_meta.get('metadata'), dict):
+                    nested_meta = chunk_meta.pop('metadata')
+                    # Merge nested metadata into chunk_meta
+                    for k, v in nested_meta.items():
+                        if k not in chunk_meta:
+                            chunk_meta[k] = v
+                
+                # ✅ FIX: Create base metadata that doesn't override processor metadata
+                # Only include essential chunk metadata that should NOT override processor data
+                base_chunk_metadata = {
+                    'text': chunk['text'],
+                    'content': chunk['text'],  # For compatibility
+                    'chunk_index': i,
+                    'total_chunks': len(validated_chunks),
+                    'chunk_size': len(chunk['text']),
+                    'chunk_hash': self._chunk_hash(chunk['text']),
+                    'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),  # Use consistent ID
+                    'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),  # Use original path for doc_path
+                    'chunking_method': getattr(self.chunker.__class__, '__name__', 'unknown'),
+                    'embedding_model': getattr(self.embedder, 'model_name', 'unknown')
+                }
+                
+                # ✅ FIX: Change merge order - put base_chunk_metadata FIRST so processor metadata takes priority
+                merged_metadata = self.metadata_manager.merge_metadata(
+                    base_chunk_metadata,  # 1st: Basic chunk info (lowest priority)
+                    file_metadata,        # 2nd: File metadata
+                    metadata or {},       # 3rd: API upload metadata 
+                    chunk_meta             # 4th: Processor chunk metadata (HIGHEST priority) ✅
+                )
+                
+                storage_metadata = self.metadata_manager.prepare_for_storage(merged_metadata)
+                chunk_metadata_list.append(storage_metadata)
+            except Exception as e:
+                logging.error(f"Failed to merge metadata for chunk {i}: {e}")
+                # Fallback metadata
+                fallback_meta = {
+                    'text': chunk['text'],
+                    'chunk_index': i,
+                    'chunk_hash': self._chunk_hash(chunk['text']),
+                    'doc_id': self._generate_consistent_doc_id(file_path, file_metadata),
+                    'doc_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
+                    'filename': os.path.basename(metadata.get('original_filename', str(file_path))) if metadata else os.path.basename(file_path),
+                    'file_path': metadata.get('original_filename', str(file_path)) if metadata else str(file_path),
+                    'source_type': 'file'
+                }
+                chunk_metadata_list.append(fallback_meta)
+        return chunk_metadata_list
+    
+    def _store_file_chunks(self, file_path: Path, metadata: Optional[Dict[str, Any]], file_metadata: Dict[str, Any],
+                           validated_chunks: List[Dict[str, Any]], embeddings: List[List[float]]):
+        """Write one file's vectors and file record; returns (chunk metadata, vector IDs, file ID)"""
+        chunk_metadata_list = self._build_chunk_metadata(file_path, metadata, file_metadata, validated_chunks)
+        vector_ids = self.vector_store.add_vectors(embeddings, chunk_metadata_list)
+        file_id = self._record_file_metadata(file_path, file_metadata, chunk_metadata_list, vector_ids)
+        return chunk_metadata_list, vector_ids, file_id
+    
+    @staticmethod
+    def _chunk_hash(text: str) -> str:
+        return hashlib.sha256(text.encode('utf-8')).hexdigest()
+    
+    def _diff_stored_chunks(self, file_path: Path, metadata: Optional[Dict[str, Any]], file_metadata: Dict[str, Any],
+                            validated_chunks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """Match the new chunks against the vectors already stored for the same doc_path
+        
+        Returns None when there is nothing stored to diff against. Otherwise
+        returns the new chunk metadata, ``reused`` (chunk position -> existing
+        vector ID, for chunks whose text hash is unchanged) and ``removed``
+        (vector IDs no longer backed by any chunk). Vectors stored before
+        chunk hashes were recorded never match, so they are all replaced.
+        """
+        if not getattr(self.config.ingestion, 'incremental_updates', False):
+            return None
+        if not hasattr(self.vector_store, 'find_chunk_hashes') or not hasattr(self.vector_store, 'update_metadata_batch'):
+            return None
+        
+        chunk_metadata_list = self._build_chunk_metadata(file_path, metadata, file_metadata, validated_chunks)
+        doc_path = chunk_metadata_list[0].get('doc_path') if chunk_metadata_list else None
+        if not doc_path:
+            return None
+        try:
+            stored_hashes = self.vector_store.find_chunk_hashes(doc_path)
+        except Exception as e:
+            logging.warning(f"Could not read stored chunks for {doc_path}, ingesting in full: {e}")
+            return None
+        if not stored_hashes:
+            return None
+        
+        # Hash -> stored vector IDs; a list so repeated chunk text maps one-to-one
+        available: Dict[str, List[Any]] = {}
+        for vector_id, chunk_hash in stored_hashes.items():
+            if chunk_hash:
+                available.setdefault(chunk_hash, []).append(vector_id)
+        
+        reused = {}
+        for position, chunk_metadata in enumerate(chunk_metadata_list):
+            candidates = available.get(chunk_metadata.get('chunk_hash'))
+            if candidates:
+                reused[position] = candidates.pop()
+        kept = set(reused.values())
+        removed = [vector_id for vector_id in stored_hashes if vector_id not in kept]
+        
+        return {'chunk_metadata': chunk_metadata_list, 'reused': reused, 'removed': removed}
+    
+    def _store_chunk_diff(self, file_path: Path, file_metadata: Dict[str, Any], chunk_diff: Dict[str, Any],
+                          embeddings: List[List[float]]):
+        """Apply an incremental update; returns (chunk metadata, vector IDs, file ID) like _store_file_chunks"""
+        chunk_metadata_list = chunk_diff['chunk_metadata']
+        reused = chunk_diff['reused']
+        new_positions = [i for i in range(len(chunk_metadata_list)) if i not in reused]
+        
+        # Add before removing so the document never disappears from search mid-update
+        new_ids = []
+        if new_positions:
+            new_ids = self.vector_store.add_vectors(
+                embeddings, [chunk_metadata_list[i] for i in new_positions]
+            )
+        if reused:
+            # Text is unchanged by definition; refresh position and file-level fields only
+            self.vector_store.update_metadata_batch({
+                vector_id: {k: v for k, v in chunk_metadata_list[position].items()
+                            if k not in ('text', 'content', 'vector_id')}
+                for position, vector_id in reused.items()
+            })
+        if chunk_diff['removed']:
+            self.vector_store.delete_vectors(chunk_diff['removed'])
+        
+        vector_ids = [None] * len(chunk_metadata_list)
+        for position, vector_id in reused.items():
+            vector_ids[position] = vector_id
+        for position, vector_id in zip(new_positions, new_ids):
+            vector_ids[position] = vector_id
+        
+        file_id = self._record_file_metadata(file_path, file_metadata, chunk_metadata_list, vector_ids)
+        return chunk_metadata_list, vector_ids, file_id
+    
+    def _record_file_metadata(self, file_path: Path, file_metadata: Dict[str, Any],
+                              chunk_metadata_list: List[Dict[str, Any]], vector_ids: List[int]) -> str:
+        final_file_metadata = {
+            **file_metadata,
+            'chunk_count': len(chunk_metadata_list),
+            'vector_ids': vector_ids,
+            'doc_id': chunk_metadata_list[0].get('doc_id', 'unknown') if chunk_metadata_list else 'unknown'
+        }
+        return self.metadata_store.add_file_metadata(str(file_path), final_file_metadata)
+    
     def ingest_text(self, text: str, metadata: Dict[str, Any] = None) -> Dict[str, Any]:
         """Ingest raw text content with managed metadata"""
         try:
@@ -797,30 +893,16 @@ class IngestionEngine:
             logging.error(f"Failed to ingest text: {e}")
             raise IngestionError(f"Failed to ingest text: {e}")
     
-    def _handle_existing_file(self, file_path: str) -> int:
-        """Handle existing file by deleting old vectors"""
+    def _handle_existing_file(self, file_path: str, doc_hash: Optional[str] = None) -> int:
+        """Delete vectors left behind by an earlier ingest of identical content"""
         try:
-            # Get identifying information from current metadata
-            doc_path = getattr(self, '_current_metadata', {}).get('doc_path') if hasattr(self, '_current_metadata') else None
-            filename = getattr(self, '_current_metadata', {}).get('filename') if hasattr(self, '_current_metadata') else None
-            
-            if not doc_path:
-                # Try to extract from file_path
-                doc_path = self._current_metadata.get('doc_path') if hasattr(self, '_current_metadata') and self._current_metadata else None
+            if doc_hash is None:
+                doc_hash = self._calculate_document_hash(Path(file_path))
             
-            # Find vectors to delete based on content hash
+            # Vectors whose file record is gone; served by the stores' doc_hash index, not a scan
             vectors_to_delete = []
-            
-            # Get the doc_hash of the incoming file
-            incoming_doc_hash = self._calculate_document_hash(Path(file_path))
-
-            for vector_id, metadata in self.vector_store.id_to_metadata.items():
-                if metadata.get('deleted', False):
-                    continue
-                
-                # Check for match based on doc_hash
-                if metadata.get('doc_hash') == incoming_doc_hash:
-                    vectors_to_delete.append(vector_id)
+            if hasattr(self.vector_store, 'find_vectors_by_metadata'):
+                vectors_to_delete = self.vector_store.find_vectors_by_metadata({'doc_hash': doc_hash})
             
             if vectors_to_delete:
                 self.vector_store.delete_vectors(vectors_to_delete)
@@ -832,8 +914,14 @@ class IngestionEngine:
             logging.warning(f"Error handling existing file {file_path}: {e}")
             return 0
     
-    def ingest_directory(self, directory_path: str, file_patterns: List[str] = None, batch_id: Optional[str] = None) -> Dict[str, Any]:
-        """Ingest all files in a directory with batch progress tracking"""
+    def ingest_directory(self, directory_path: str, file_patterns: List[str] = None, batch_id: Optional[str] = None,
+                         max_workers: Optional[int] = None) -> Dict[str, Any]:
+        """Ingest all files in a directory with batch progress tracking
+        
+        Files flow through an IngestionPipeline: extraction and chunking run in
+        a process pool, chunks from many files are packed into full embedding
+        batches, and a single writer commits vectors in large batches.
+        """
         directory = Path(directory_path)
         if not directory.exists():
             raise IngestionError(f"Directory not found: {directory_path}")
@@ -842,8 +930,10 @@ class IngestionEngine:
         files_to_ingest = []
         for pattern in file_patterns:
             files_to_ingest.extend(directory.rglob(f"*{pattern}"))
+        # Overlapping patterns must not ingest the same file twice
+        files_to_ingest = list(dict.fromkeys(str(f) for f in files_to_ingest))
         if batch_id:
-            self.progress_tracker.create_batch(batch_id, [str(f) for f in files_to_ingest])
+            self.progress_tracker.create_batch(batch_id, files_to_ingest)
         results = {
             'batch_id': batch_id,
             'total_files': len(files_to_ingest),
@@ -852,26 +942,151 @@ class IngestionEngine:
             'skipped': 0,
             'results': []
         }
-        for file_path in files_to_ingest:
+        if not files_to_ingest:
+            return results
+        
+        ingestion_config = self.config.ingestion
+        workers = max_workers or getattr(ingestion_config, 'pipeline_workers', 0) or os.cpu_count() or 1
+        workers = min(workers, len(files_to_ingest))
+        if workers > 1:
             try:
-                result = self.ingest_file(str(file_path))
-                results['results'].append(result)
-                if result['status'] == 'success':
-                    results['successful'] += 1
-                elif result['status'] == 'skipped':
-                    results['skipped'] += 1
+                # Worker processes rebuild an extraction-only engine from these
+                pickle.dumps((self.chunker, self.config_manager))
             except Exception as e:
+                logging.warning(f"Chunker or config cannot be sent to worker processes ({e}), extracting in-process")
+                workers = 1
+        
+        pipeline = IngestionPipeline(
+            prepare=self._prepare_pipeline_file,
+            extract=_pipeline_extract if workers > 1 else self._extract_and_chunk,
+            embed=self.embedder.embed_texts,
+            store=self._store_pipeline_files,
+            on_failed=self._pipeline_file_failed,
+            on_stage=self._pipeline_stage,
+            workers=workers,
+            embed_batch_size=getattr(self.config.embedding, 'batch_size', 96),
+            embed_concurrency=getattr(ingestion_config, 'pipeline_embed_concurrency', 2),
+            store_batch_size=getattr(ingestion_config, 'pipeline_store_batch_size', 1024),
+            max_in_flight=getattr(ingestion_config, 'pipeline_max_in_flight', 32),
+            initializer=_init_pipeline_worker,
+            initargs=(self.chunker, self.config_manager)
+        )
+        for result in pipeline.run(files_to_ingest):
+            results['results'].append(result)
+            if result['status'] == 'success':
+                results['successful'] += 1
+            elif result['status'] == 'skipped':
+                results['skipped'] += 1
+            else:
                 results['failed'] += 1
-                results['results'].append({
-                    'status': 'failed',
-                    'file_path': str(file_path),
-                    'error': str(e)
-                })
-                logging.error(f"Failed to ingest {file_path}: {e}")
+        results['pipeline'] = pipeline.stats
         logging.info(f"Directory ingestion completed: {results['successful']} successful, "
-                    f"{results['failed']} failed, {results['skipped']} skipped")
+                    f"{results['failed']} failed, {results['skipped']} skipped "
+                    f"({workers} extraction workers)")
         return results
     
+    def _prepare_pipeline_file(self, file_path: str):
+        """Pipeline prepare hook: validation, duplicate check and replacing an older version"""
+        path = Path(file_path)
+        if not path.exists():
+            raise FileProcessingError(f"File not found: {path}")
+        if self.progress_tracker:
+            self.progress_tracker.start_file(file_path)
+        
+        with self.progress_helper.track_stage(file_path, ProgressStage.VALIDATING):
+            if path.stat().st_size > self.config.ingestion.max_file_size_mb * 1024 * 1024:
+                raise FileProcessingError(f"File too large: {path}")
+        
+        doc_hash = self._calculate_document_hash(path)
+        duplicate_file_id = self.check_duplicate(file_path, doc_hash)
+        if duplicate_file_id:
+            logging.info(f"Duplicate document detected: {path} (existing: {duplicate_file_id})")
+            return {
+                'status': 'skipped',
+                'reason': 'duplicate',
+                'file_path': file_path,
+                'duplicate_file_id': duplicate_file_id
+            }
+        
+        old_vectors_deleted = self._handle_existing_file(file_path, doc_hash)
+        file_metadata = self._build_file_metadata(path, None, old_vectors_deleted, doc_hash)
+        return PipelineFile(file_path=file_path, metadata=file_metadata,
+                            context={'old_vectors_deleted': old_vectors_deleted})
+    
+    _PIPELINE_STAGES = {
+        'extracting': (ProgressStage.EXTRACTING, ProgressStage.CHUNKING),
+        'embedding': (ProgressStage.EMBEDDING,),
+        'storing': (ProgressStage.STORING, ProgressStage.INDEXING, ProgressStage.FINALIZING),
+    }
+    
+    def _pipeline_stage(self, item: PipelineFile, stage: str, status: str):
+        """Pipeline progress hook: map pipeline stages onto the tracker's stages"""
+        stages = self._PIPELINE_STAGES[stage]
+        if status == 'running':
+            self.progress_tracker.update_stage(item.file_path, stages[0], 0.0, ProgressStatus.RUNNING)
+        else:
+            for progress_stage in stages:
+                self.progress_tracker.complete_stage(item.file_path, progress_stage)
+    
+    def _store_pipeline_files(self, files: List[PipelineFile]) -> List[Dict[str, Any]]:
+        """Pipeline store hook: one vector store write for many files, then per-file bookkeeping"""
+        storage_start = datetime.now()
+        chunk_metadata_lists = [
+            self._build_chunk_metadata(Path(item.file_path), None, item.metadata, item.chunks) for item in files
+        ]
+        embeddings = [embedding for item in files for embedding in item.embeddings]
+        all_metadata = [chunk_metadata for chunk_metadata_list in chunk_metadata_lists
+                        for chunk_metadata in chunk_metadata_list]
+        all_vector_ids = self.vector_store.add_vectors(embeddings, all_metadata)
+        storage_time = (datetime.now() - storage_start).total_seconds()
+        
+        results = []
+        offset = 0
+        for item, chunk_metadata_list in zip(files, chunk_metadata_lists):
+            vector_ids = list(all_vector_ids[offset:offset + len(chunk_metadata_list)])
+            offset += len(chunk_metadata_list)
+            try:
+                file_id = self._record_file_metadata(Path(item.file_path), item.metadata, chunk_metadata_list, vector_ids)
+            except Exception as e:
+                results.append(self._pipeline_file_failed(item.file_path, e))
+                continue
+            
+            if self.progress_tracker:
+                self.progress_tracker.complete_file(item.file_path, {
+                    'chunks_created': len(item.chunks),
+                    'vectors_created': len(vector_ids),
+                    'extraction_time': item.timings.get('extraction_time', 0.0),
+                    'chunking_time': item.timings.get('chunking_time', 0.0),
+                    'embedding_time': item.timings.get('embedding_time', 0.0),
+                    # The write is shared; attribute it by the file's share of the vectors
+                    'storage_time': storage_time * len(vector_ids) / max(len(all_vector_ids), 1)
+                })
+            
+            old_vectors_deleted = item.context.get('old_vectors_deleted', 0)
+            logging.info(f"Successfully ingested file: {item.file_path} ({len(item.chunks)} chunks)")
+            results.append({
+                'status': 'success',
+                'file_id': file_id,
+                'doc_id': chunk_metadata_list[0].get('doc_id', 'unknown') if chunk_metadata_list else 'unknown',
+                'file_path': item.file_path,
+                'chunks_created': len(item.chunks),
+                'vectors_stored': len(vector_ids),
+                'is_update': old_vectors_deleted > 0,
+                'old_vectors_deleted': old_vectors_deleted
+            })
+        return results
+    
+    def _pipeline_file_failed(self, file_path: str, error: Exception) -> Dict[str, Any]:
+        """Pipeline failure hook"""
+        logging.error(f"Failed to ingest {file_path}: {error}")
+        if self.progress_tracker:
+            self.progress_tracker.fail_file(file_path, error)
+        return {
+            'status': 'failed',
+            'file_path': file_path,
+            'error': str(error)
+        }
+    
     def _extract_text(self, file_path: Path) -> str:
         """Extract text content from various file types"""
         file_extension = file_path.suffix.lower()
@@ -1103,50 +1318,75 @@ class IngestionEngine:
         except Exception as e:
             raise FileProcessingError(f"Failed to extract Excel content: {e}")
     
+    def _find_file_vectors(self, file_path: str, doc_path: str = None) -> List[Any]:
+        """Find a file's vectors through the vector store's metadata index"""
+        criteria = [('file_path', file_path), ('original_path', file_path)]
+        if doc_path:
+            criteria.insert(0, ('doc_path', doc_path))
+        
+        vectors_to_delete = []
+        seen = set()
+        for field, value in criteria:
+            for vector_id in self.vector_store.find_vectors_by_metadata({field: value}):
+                if vector_id not in seen:
+                    seen.add(vector_id)
+                    vectors_to_delete.append(vector_id)
+                    logging.info(f"Found vector to delete {vector_id}: {field} match: {value}")
+        return vectors_to_delete
+    
+    def _scan_file_vectors(self, file_path: str, doc_path: str = None) -> List[Any]:
+        """Find a file's vectors by scanning every metadata entry"""
+        vectors_to_delete = []
+        
+        # Get all vector metadata and find matches
+        for vector_id, metadata in self.vector_store.id_to_metadata.items():
+            if metadata.get('deleted', False):
+                continue
+            
+            # Check multiple possible matching criteria
+            is_match = False
+            match_reason = ""
+            
+            # Priority 1: doc_path match (most reliable)
+            if doc_path and metadata.get('doc_path') == doc_path:
+                is_match = True
+                match_reason = f"doc_path match: {metadata.get('doc_path')}"
+            
+            # Priority 2: Check nested metadata for doc_path
+            elif doc_path and isinstance(metadata.get('metadata'), dict):
+                nested_doc_path = metadata['metadata'].get('doc_path')
+                if nested_doc_path == doc_path:
+                    is_match = True
+                    match_reason = f"nested doc_path match: {nested_doc_path}"
+            
+            # Priority 3: Direct file_path match
+            elif metadata.get('file_path') == file_path:
+                is_match = True
+                match_reason = f"file_path match: {metadata.get('file_path')}"
+            
+            # Priority 4: Check nested metadata for original_path
+            elif isinstance(metadata.get('metadata'), dict):
+                nested_original_path = metadata['metadata'].get('original_path')
+                if nested_original_path == file_path:
+                    is_match = True
+                    match_reason = f"nested original_path match: {nested_original_path}"
+            
+            if is_match:
+                vectors_to_delete.append(vector_id)
+                logging.info(f"Found vector to delete {vector_id}: {match_reason}")
+        
+        return vectors_to_delete
+    
     def delete_file(self, file_path: str, doc_path: str = None) -> Dict[str, Any]:
         """Delete all vectors associated with a file"""
         try:
             logging.info(f"Deleting vectors for file: {file_path}")
             
             # Find all vectors associated with this file
-            vectors_to_delete = []
-            
-            # Get all vector metadata and find matches
-            for vector_id, metadata in self.vector_store.id_to_metadata.items():
-                if metadata.get('deleted', False):
-                    continue
-                
-                # Check multiple possible matching criteria
-                is_match = False
-                match_reason = ""
-                
-                # Priority 1: doc_path match (most reliable)
-                if doc_path and metadata.get('doc_path') == doc_path:
-                    is_match = True
-                    match_reason = f"doc_path match: {metadata.get('doc_path')}"
-                
-                # Priority 2: Check nested metadata for doc_path
-                elif doc_path and isinstance(metadata.get('metadata'), dict):
-                    nested_doc_path = metadata['metadata'].get('doc_path')
-                    if nested_doc_path == doc_path:
-                        is_match = True
-                        match_reason = f"nested doc_path match: {nested_doc_path}"
-                
-                # Priority 3: Direct file_path match
-                elif metadata.get('file_path') == file_path:
-                    is_match = True
-                    match_reason = f"file_path match: {metadata.get('file_path')}"
-                
-                # Priority 4: Check nested metadata for original_path
-                elif isinstance(metadata.get('metadata'), dict):
-                    nested_original_path = metadata['metadata'].get('original_path')
-                    if nested_original_path == file_path:
-                        is_match = True
-                        match_reason = f"nested original_path match: {nested_original_path}"
-                
-                if is_match:
-                    vectors_to_delete.append(vector_id)
-                    logging.info(f"Found vector to delete {vector_id}: {match_reason}")
+            if hasattr(self.vector_store, 'find_vectors_by_metadata'):
+                vectors_to_delete = self._find_file_vectors(file_path, doc_path)
+            else:
+                vectors_to_delete = self._scan_file_vectors(file_path, doc_path)
             
             if vectors_to_delete:
                 # Delete the vectors
@@ -1198,6 +1438,10 @@ class IngestionEngine:
         stats['total_vectors'] = vector_store_info.get('vector_count', 0)
         stats['active_vectors'] = vector_store_info.get('vector_count', 0)
         
+        # Embedding cache hit/miss counters
+        if hasattr(self.embedder, 'get_cache_stats'):
+            stats['embedding_cache'] = self.embedder.get_cache_stats()
+        
         return stats
     
     def _validate_chunk_structure(self, chunks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
@@ -1259,4 +1503,18 @@ class IngestionEngine:
             sentences.append(buffer[last_end:end].strip())
             last_end = end
         remainder = buffer[last_end:]
-        return [s for s in sentences if s], remainder
\ No newline at end of file
+        return [s for s in sentences if s], remainder
+
+
+# Extraction-only engine owned by each ingest_directory worker process
+_pipeline_worker_engine = None
+
+
+def _init_pipeline_worker(chunker, config_manager):
+    global _pipeline_worker_engine
+    _pipeline_worker_engine = IngestionEngine(chunker, None, None, None, config_manager,
+                                              progress_tracker=ProgressTracker(persistence_path=None))
+
+
+def _pipeline_extract(file_path: str, file_metadata: Dict[str, Any]):
+    return _pipeline_worker_engine._extract_and_chunk(file_path, file_metadata)
@@ -3,6 +3,7 @@ Memory Efficient Semantic Chunker
 Fixes critical memory leak issues with ML models staying in memory
 """
 import gc
+import importlib.util
 from typing import Optional, List, Dict, Any
 import threading
 import time
@@ -10,13 +11,10 @@ import logging
 import numpy as np
 from pathlib import Path
 
-from ..core.model_memory_manager import get_model_memory_manager
+from ..core.model_memory_manager import get_model_memory_manager, get_shared_sentence_transformer
 
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Models load through the shared registry; only check that the package is installed
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
 
 try:
     import torch
@@ -37,14 +35,12 @@ class MemoryEfficientSemanticChunker:
         self.min_chunk_size = min_chunk_size
         self.max_chunk_size = max_chunk_size
         
-        # Create unique model ID
-        self.model_id = f"semantic_chunker_{model_name.replace('/', '_')}"
-        
         # Get memory manager
         self._memory_manager = get_model_memory_manager()
         
-        # Model will be loaded lazily
-        self._model = None
+        # Shared with every other component using the same model; loaded lazily
+        self._model = get_shared_sentence_transformer(model_name)
+        self.model_id = self._model.model_id
         self._model_dimension = None
         
         # Thread safety
@@ -67,28 +63,14 @@ class MemoryEfficientSemanticChunker:
             raise ImportError("sentence-transformers not available for semantic chunking")
         
         try:
-            def load_model():
-                self.logger.info(f"Loading sentence transformer: {self.model_name}")
-                
-                # Configure model loading for memory efficiency
-                model_kwargs = {}
-                if TORCH_AVAILABLE:
-                    # Use CPU by default to save GPU memory
-                    model_kwargs['device'] = 'cpu'
-                
-                model = SentenceTransformer(self.model_name, **model_kwargs)
-                
-                # Get model dimension
+            # Get model through memory manager
+            if self._model is None:
+                self._model = get_shared_sentence_transformer(self.model_name)
+            model = self._model.resolve()
+            
+            if self._model_dimension is None:
                 self._model_dimension = model.get_sentence_embedding_dimension()
-                
                 self._stats['model_loads'] += 1
-                return model
-            
-            # Get model through memory manager
-            model = self._memory_manager.get_model(
-                self.model_id,
-                load_model
-            )
             
             return model
             
@@ -486,7 +468,9 @@ class MemoryEfficientSemanticChunker:
     
     def cleanup(self):
         """Manual cleanup of resources"""
-        # Model will be cleaned up by memory manager
+        # The memory manager unloads the model once no other component holds it
+        if self._model is not None:
+            self._model.release()
         self._model = None
         gc.collect()
         self.logger.debug(f"Semantic chunker {self.model_id} cleaned up")
@@ -0,0 +1,290 @@
+"""
+Ingestion Pipeline
+Staged, parallel pipeline for bulk ingestion: extract/chunk -> embed -> store
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+_DONE = object()
+
+
+@dataclass
+class PipelineFile:
+    """A file moving through the pipeline"""
+    file_path: str
+    metadata: Dict[str, Any]  # File-level metadata handed to the extractor
+    context: Dict[str, Any] = field(default_factory=dict)  # Caller state carried to the store stage
+    chunks: List[Dict[str, Any]] = field(default_factory=list)
+    embeddings: List[Any] = field(default_factory=list)
+    timings: Dict[str, float] = field(default_factory=dict)
+    index: int = -1
+    pending: int = 0  # Chunks still waiting for an embedding
+    failed: bool = False
+
+
+class IngestionPipeline:
+    """Runs many files through bounded stages so every resource stays busy.
+    
+    * ``prepare(file_path)`` runs in the calling thread and returns either a
+      ``PipelineFile`` or a final result dict (e.g. a skipped duplicate).
+    * ``extract(file_path, metadata)`` runs in a process pool (or inline with
+      ``workers <= 1``) and returns ``(chunks, metadata, info)``; ``info``
+      carries timings and an optional ``skip_reason``. It must be picklable.
+    * ``embed(texts)`` is fed full provider batches built from the chunks of
+      many files.
+    * ``store(files)`` commits several fully embedded files at once from a
+      single writer thread and returns one result dict per file.
+    
+    At most ``max_in_flight`` files sit between prepare and store, which
+    bounds memory and pushes back on extraction when embedding or storage
+    falls behind. ``on_stage(file, stage, status)`` and
+    ``on_failed(file_path, error)`` report progress and failures.
+    """
+    
+    def __init__(self, prepare: Callable[[str], Any],
+                 extract: Callable[[str, Dict[str, Any]], Tuple[List[Dict[str, Any]], Dict[str, Any], Dict[str, Any]]],
+                 embed: Callable[[List[str]], List[Any]],
+                 store: Callable[[List[PipelineFile]], List[Dict[str, Any]]],
+                 on_failed: Callable[[str, Exception], Dict[str, Any]],
+                 on_stage: Optional[Callable[[PipelineFile, str, str], None]] = None,
+                 workers: int = 1, embed_batch_size: int = 96, embed_concurrency: int = 1,
+                 store_batch_size: int = 1024, max_in_flight: int = 32, flush_interval: float = 2.0,
+                 initializer: Optional[Callable] = None, initargs: tuple = ()):
+        self.prepare = prepare
+        self.extract = extract
+        self.embed = embed
+        self.store = store
+        self.on_failed = on_failed
+        self.on_stage = on_stage
+        self.workers = workers
+        self.embed_batch_size = max(1, embed_batch_size)
+        self.embed_concurrency = max(1, embed_concurrency)
+        self.store_batch_size = max(1, store_batch_size)
+        self.max_in_flight = max(1, max_in_flight)
+        self.flush_interval = flush_interval
+        self.initializer = initializer
+        self.initargs = initargs
+        
+        self._lock = threading.Lock()
+        self._results: List[Optional[Dict[str, Any]]] = []
+        self._slots = None
+        self._submitted = 0
+        self.stats: Dict[str, Any] = {}
+    
+    def run(self, file_paths: List[str]) -> List[Dict[str, Any]]:
+        """Ingest ``file_paths``; returns one result dict per file, in input order"""
+        self._results = [None] * len(file_paths)
+        self._slots = threading.BoundedSemaphore(self.max_in_flight)
+        self.stats = {'files': len(file_paths), 'embed_batches': 0, 'embedded_chunks': 0,
+                      'store_batches': 0, 'stored_files': 0}
+        start_time = time.time()
+        
+        extracted = queue.Queue()  # Bounded by the in-flight slots
+        batches = queue.Queue(maxsize=self.embed_concurrency * 2)
+        ready = queue.Queue()  # Also bounded by the in-flight slots
+        
+        threads = [threading.Thread(target=self._batch_chunks, args=(extracted, batches),
+                                    name="ingest-batcher", daemon=True)]
+        threads += [threading.Thread(target=self._embed_batches, args=(batches, ready),
+                                     name=f"ingest-embedder-{i}", daemon=True)
+                    for i in range(self.embed_concurrency)]
+        writer = threading.Thread(target=self._write_files, args=(ready,), name="ingest-writer", daemon=True)
+        for thread in threads + [writer]:
+            thread.start()
+        
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=self.initializer,
+                                           initargs=self.initargs)
+        self._submitted = 0
+        try:
+            self._feed(file_paths, executor, extracted)
+        finally:
+            extracted.put((_DONE, self._submitted))
+            for thread in threads:
+                thread.join()
+            ready.put(_DONE)
+            writer.join()
+            if executor:
+                executor.shutdown(wait=True)
+        
+        elapsed = time.time() - start_time
+        self.stats['elapsed_seconds'] = elapsed
+        if self.stats['embed_batches']:
+            self.stats['avg_embed_batch'] = self.stats['embedded_chunks'] / self.stats['embed_batches']
+        logging.info(f"Pipeline ingested {len(file_paths)} files in {elapsed:.1f}s "
+                     f"({self.stats['embed_batches']} embedding batches, {self.stats['store_batches']} store commits)")
+        return self._results
+    
+    def _feed(self, file_paths: List[str], executor: Optional[ProcessPoolExecutor], extracted: queue.Queue):
+        """Prepare files and hand them to the extractors; blocks while the pipeline is full"""
+        for index, file_path in enumerate(file_paths):
+            try:
+                prepared = self.prepare(file_path)
+            except Exception as e:
+                self._results[index] = self.on_failed(file_path, e)
+                continue
+            if not isinstance(prepared, PipelineFile):
+                self._results[index] = prepared
+                continue
+            
+            prepared.index = index
+            self._slots.acquire()
+            self._stage(prepared, 'extracting', 'running')
+            if executor:
+                try:
+                    future = executor.submit(self.extract, prepared.file_path, prepared.metadata)
+                except Exception as e:
+                    # e.g. BrokenProcessPool after a worker crashed
+                    future = Future()
+                    future.set_exception(e)
+            else:
+                future = Future()
+                try:
+                    future.set_result(self.extract(prepared.file_path, prepared.metadata))
+                except Exception as e:
+                    future.set_exception(e)
+            self._submitted += 1
+            future.add_done_callback(lambda done, item=prepared: extracted.put((item, done)))
+    
+    def _batch_chunks(self, extracted: queue.Queue, batches: queue.Queue):
+        """Pack chunks from many files into full embedding batches"""
+        buffer: List[Tuple[PipelineFile, int]] = []
+        received, expected = 0, None
+        while expected is None or received < expected:
+            try:
+                item, future = extracted.get(timeout=self.flush_interval)
+            except queue.Empty:
+                # Extraction is the bottleneck right now; don't sit on a partial batch
+                if buffer:
+                    batches.put(buffer)
+                    buffer = []
+                continue
+            if item is _DONE:
+                expected = future
+                continue
+            received += 1
+            
+            try:
+                chunks, metadata, info = future.result()
+            except Exception as e:
+                self._fail(item, e)
+                continue
+            
+            item.metadata = metadata
+            item.timings.update({k: v for k, v in info.items() if k.endswith('_time')})
+            self._stage(item, 'extracting', 'completed')
+            if not chunks:
+                self._finish(item, {'status': 'skipped', 'reason': info.get('skip_reason', 'no_chunks'),
+                                    'file_path': item.file_path})
+                continue
+            
+            item.chunks = chunks
+            item.embeddings = [None] * len(chunks)
+            item.pending = len(chunks)
+            self._stage(item, 'embedding', 'running')
+            buffer.extend((item, position) for position in range(len(chunks)))
+            while len(buffer) >= self.embed_batch_size:
+                batches.put(buffer[:self.embed_batch_size])
+                buffer = buffer[self.embed_batch_size:]
+        
+        if buffer:
+            batches.put(buffer)
+        for _ in range(self.embed_concurrency):
+            batches.put(_DONE)
+    
+    def _embed_batches(self, batches: queue.Queue, ready: queue.Queue):
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                return
+            batch = [(item, position) for item, position in batch if not item.failed]
+            if not batch:
+                continue
+            
+            start_time = time.time()
+            try:
+                embeddings = self.embed([item.chunks[position]['text'] for item, position in batch])
+                if len(embeddings) != len(batch):
+                    raise ValueError(f"Embedder returned {len(embeddings)} vectors for {len(batch)} chunks")
+            except Exception as e:
+                for item in {id(item): item for item, _ in batch}.values():
+                    self._fail(item, e)
+                continue
+            elapsed = time.time() - start_time
+            
+            completed = []
+            with self._lock:
+                self.stats['embed_batches'] += 1
+                self.stats['embedded_chunks'] += len(batch)
+                for (item, position), embedding in zip(batch, embeddings):
+                    item.embeddings[position] = embedding
+                    item.pending -= 1
+                    # Attribute batch time to files by their share of the batch
+                    item.timings['embedding_time'] = item.timings.get('embedding_time', 0.0) + elapsed / len(batch)
+                    if item.pending == 0 and not item.failed:
+                        completed.append(item)
+            for item in completed:
+                self._stage(item, 'embedding', 'completed')
+                ready.put(item)
+    
+    def _write_files(self, ready: queue.Queue):
+        """Single writer: commit embedded files to the stores in large batches"""
+        pending: List[PipelineFile] = []
+        pending_vectors = 0
+        done = False
+        while not done:
+            try:
+                item = ready.get(timeout=self.flush_interval)
+            except queue.Empty:
+                item = None
+            if item is _DONE:
+                done = True
+            elif item is not None:
+                pending.append(item)
+                pending_vectors += len(item.chunks)
+                if pending_vectors < self.store_batch_size:
+                    continue
+            if pending:
+                self._store(pending)
+                pending, pending_vectors = [], 0
+    
+    def _store(self, files: List[PipelineFile]):
+        for item in files:
+            self._stage(item, 'storing', 'running')
+        try:
+            results = self.store(files)
+        except Exception as e:
+            for item in files:
+                self._fail(item, e)
+            return
+        with self._lock:
+            self.stats['store_batches'] += 1
+            self.stats['stored_files'] += len(files)
+        for item, result in zip(files, results):
+            self._finish(item, result)
+    
+    def _stage(self, item: PipelineFile, stage: str, status: str):
+        if self.on_stage:
+            try:
+                self.on_stage(item, stage, status)
+            except Exception as e:
+                logging.debug(f"Progress update failed for {item.file_path}: {e}")
+    
+    def _finish(self, item: PipelineFile, result: Dict[str, Any]):
+        self._results[item.index] = result
+        self._slots.release()
+    
+    def _fail(self, item: PipelineFile, error: Exception):
+        """Record a failure once per file, however many of its batches fail"""
+        with self._lock:
+            if item.failed:
+                return
+            item.failed = True
+        logging.error(f"Pipeline failed for {item.file_path}: {error}")
+        self._finish(item, self.on_failed(item.file_path, error))
@@ -2,29 +2,31 @@
 Semantic Chunker
 Advanced chunking based on semantic similarity and document structure
 """
+import importlib.util
 import logging
 import re
 from typing import List, Dict, Any, Optional, Tuple
 import numpy as np
 from dataclasses import dataclass
 
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Models load through the shared registry; only check that the package is installed
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not SENTENCE_TRANSFORMERS_AVAILABLE:
     logging.warning("sentence-transformers not available. Semantic chunking will use fallback.")
 
 try:
     from ..core.error_handling import ChunkingError
-    from ..core.resource_manager import get_global_app
 except ImportError:
     # Fallback for when running as script
     import sys
     from pathlib import Path
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from core.error_handling import ChunkingError
-    from core.resource_manager import get_global_app
+
+try:
+    from ..core.model_memory_manager import get_shared_sentence_transformer
+except ImportError:
+    from core.model_memory_manager import get_shared_sentence_transformer
 
 @dataclass
 class ChunkBoundary:
@@ -326,40 +328,10 @@ class SemanticChunker:
         return self._detect_content_type(text) == 'structured_data'
     
     def _initialize_model(self):
-        """Initialize the sentence transformer model with memory management"""
+        """Register the sentence transformer with the shared model registry (loaded on first use)"""
         try:
-            # Try new memory manager first
-            try:
-                from ..core.model_memory_manager import get_model_memory_manager
-                memory_manager = get_model_memory_manager()
-                
-                # Create unique model ID
-                model_id = f"semantic_chunker_{self.model_name.replace('/', '_')}"
-                
-                def load_model():
-                    logging.info(f"Loading sentence transformer: {self.model_name}")
-                    return SentenceTransformer(self.model_name)
-                
-                # Get model through memory manager
-                self.model = memory_manager.get_model(model_id, load_model)
-                logging.info(f"Semantic chunker initialized with memory-managed model: {self.model_name}")
-                return
-                
-            except ImportError:
-                # Fallback to existing resource manager
-                pass
-            
-            # Fallback to existing resource management
-            app = get_global_app()
-            
-            # Load model through managed model loader
-            self.model = app.model_loader.load_model(
-                f"semantic_chunker_{self.model_name}",
-                SentenceTransformer,
-                self.model_name
-            )
-            
-            logging.info(f"Initialized managed semantic chunker model: {self.model_name}")
+            self.model = get_shared_sentence_transformer(self.model_name)
+            logging.info(f"Semantic chunker initialized with shared model: {self.model_name}")
         except Exception as e:
             logging.error(f"Failed to initialize semantic chunker model: {e}")
             self.enabled = False
@@ -369,23 +341,10 @@ class SemanticChunker:
         """Clean up model resources"""
         try:
             if self.model:
-                # Try memory manager cleanup first
-                try:
-                    from ..core.model_memory_manager import get_model_memory_manager
-                    memory_manager = get_model_memory_manager()
-                    model_id = f"semantic_chunker_{self.model_name.replace('/', '_')}"
-                    memory_manager.unload_model(model_id)
-                    self.model = None
-                    logging.info(f"Cleaned up semantic chunker model via memory manager: {self.model_name}")
-                    return
-                except ImportError:
-                    pass
-                
-                # Fallback to existing cleanup
-                app = get_global_app()
-                app.model_loader.unload_model(f"semantic_chunker_{self.model_name}")
+                # Other components may share the model; it is unloaded once the last one releases it
+                self.model.release()
                 self.model = None
-                logging.info(f"Cleaned up semantic chunker model: {self.model_name}")
+                logging.info(f"Released semantic chunker model: {self.model_name}")
         except Exception as e:
             logging.error(f"Error cleaning up semantic chunker: {e}")
     
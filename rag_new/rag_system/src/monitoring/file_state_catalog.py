@@ -0,0 +1,76 @@
+"""
+File State Catalog
+SQLite persistence for FolderMonitor file states, so a restart resumes instead of re-hashing every file
+"""
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+
+_COLUMNS = ('path', 'size', 'mtime', 'inode', 'hash', 'doc_path',
+            'last_ingested', 'ingestion_status', 'error_message')
+
+
+class FileStateCatalog:
+    """One row per tracked file, keyed by path.
+    
+    ``load`` returns the rows as dicts of FileState fields; ``save`` and
+    ``delete`` write a batch in a single transaction. Write failures are
+    logged and swallowed: the in-memory states stay authoritative and the
+    next save catches up.
+    """
+    
+    def __init__(self, db_path: str):
+        self.db_path = Path(db_path)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        with self._conn:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS file_states (
+                    path TEXT PRIMARY KEY,
+                    size INTEGER NOT NULL,
+                    mtime REAL NOT NULL,
+                    inode INTEGER,
+                    hash TEXT NOT NULL,
+                    doc_path TEXT NOT NULL,
+                    last_ingested TEXT,
+                    ingestion_status TEXT NOT NULL,
+                    error_message TEXT
+                )
+            ''')
+    
+    def load(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM file_states").fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+    
+    def save(self, states: Iterable[Dict[str, Any]]):
+        rows = [tuple(state.get(column) for column in _COLUMNS) for state in states]
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    f"INSERT OR REPLACE INTO file_states ({', '.join(_COLUMNS)}) "
+                    f"VALUES ({', '.join('?' for _ in _COLUMNS)})", rows)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to save {len(rows)} file states to {self.db_path}: {e}")
+    
+    def delete(self, paths: Iterable[str]):
+        rows = [(path,) for path in paths]
+        if not rows:
+            return
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany("DELETE FROM file_states WHERE path = ?", rows)
+        except sqlite3.Error as e:
+            logging.warning(f"Failed to delete {len(rows)} file states from {self.db_path}: {e}")
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
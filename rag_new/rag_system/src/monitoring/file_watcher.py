@@ -0,0 +1,139 @@
+"""
+File Event Watcher
+Debounced filesystem notifications (inotify / FSEvents / ReadDirectoryChangesW via watchdog) for FolderMonitor
+"""
+import logging
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+    FileSystemEventHandler = object
+
+# Event kinds handed to the callback
+CHANGED = 'changed'  # created, written or moved in; a directory means "look inside"
+DELETED = 'deleted'  # removed or moved out; a directory means everything under it
+
+_IGNORED_EVENT_TYPES = {'opened', 'closed_no_write'}
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: 'FileEventWatcher'):
+        super().__init__()
+        self.watcher = watcher
+    
+    def on_any_event(self, event):
+        event_type = event.event_type
+        if event_type in _IGNORED_EVENT_TYPES:
+            return
+        if event.is_directory and event_type in ('modified', 'closed'):
+            return  # Fired for every change to a child; the child has its own event
+        if event_type == 'moved':
+            self.watcher.record(event.src_path, DELETED)
+            self.watcher.record(event.dest_path, CHANGED)
+        elif event_type == 'deleted':
+            self.watcher.record(event.src_path, DELETED)
+        else:
+            self.watcher.record(event.src_path, CHANGED)
+
+
+class FileEventWatcher:
+    """Watches folders and reports settled paths in batches.
+    
+    Raw events are coalesced per path: a burst of writes to one file becomes
+    a single CHANGED once the path has been quiet for ``debounce_seconds``
+    (or after ``max_delay_seconds`` for files that never stop changing), and
+    the last event wins, so create-then-delete reports only DELETED.
+    ``callback`` receives ``[(kind, path), ...]`` on the watcher's thread.
+    """
+    
+    def __init__(self, folders: List[str], callback: Callable[[List[Tuple[str, str]]], None],
+                 recursive: bool = True, debounce_seconds: float = 2.0,
+                 max_delay_seconds: Optional[float] = None):
+        self.folders = list(folders)
+        self.callback = callback
+        self.recursive = recursive
+        self.debounce_seconds = debounce_seconds
+        self.max_delay_seconds = max_delay_seconds or debounce_seconds * 10
+        
+        self._lock = threading.Lock()
+        self._pending: Dict[str, Tuple[str, float, float]] = {}  # path -> (kind, first_seen, last_seen)
+        self._observer = None
+        self._flush_thread = None
+        self._stop = threading.Event()
+        self.stats = {'raw_events': 0, 'batches': 0, 'paths_reported': 0}
+    
+    @property
+    def is_running(self) -> bool:
+        return self._observer is not None
+    
+    def start(self):
+        if not WATCHDOG_AVAILABLE:
+            raise RuntimeError("watchdog package not installed")
+        if self._observer is not None:
+            return
+        observer = Observer()
+        handler = _EventHandler(self)
+        for folder in self.folders:
+            observer.schedule(handler, folder, recursive=self.recursive)
+        observer.start()
+        self._observer = observer
+        
+        self._stop.clear()
+        self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True, name="FileEventWatcher")
+        self._flush_thread.start()
+        logging.info(f"Watching {len(self.folders)} folders for file events (debounce {self.debounce_seconds}s)")
+    
+    def stop(self):
+        if self._observer is None:
+            return
+        self._stop.set()
+        self._observer.stop()
+        self._observer.join(timeout=5)
+        self._observer = None
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=5)
+            self._flush_thread = None
+        self.flush(force=True)
+    
+    def record(self, path: str, kind: str):
+        """Note an event for ``path``; it is reported once the path settles"""
+        now = time.monotonic()
+        with self._lock:
+            self.stats['raw_events'] += 1
+            previous = self._pending.get(path)
+            first_seen = previous[1] if previous else now
+            self._pending[path] = (kind, first_seen, now)
+    
+    def flush(self, force: bool = False) -> List[Tuple[str, str]]:
+        """Report every settled path (all of them with ``force``) and return the batch"""
+        now = time.monotonic()
+        with self._lock:
+            due = [
+                path for path, (kind, first_seen, last_seen) in self._pending.items()
+                if force or now - last_seen >= self.debounce_seconds or now - first_seen >= self.max_delay_seconds
+            ]
+            batch = [(self._pending.pop(path)[0], path) for path in due]
+            if batch:
+                self.stats['batches'] += 1
+                self.stats['paths_reported'] += len(batch)
+        if batch:
+            try:
+                self.callback(batch)
+            except Exception as e:
+                logging.error(f"File event callback failed: {e}")
+        return batch
+    
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, pending=len(self._pending), running=self.is_running)
+    
+    def _flush_loop(self):
+        interval = max(0.05, self.debounce_seconds / 4)
+        while not self._stop.wait(interval):
+            self.flush()
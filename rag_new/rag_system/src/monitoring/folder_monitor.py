@@ -3,9 +3,9 @@ Folder Monitoring Service for RAG System
 Monitors specified folders for file changes and automatically ingests new/modified files
 """
 import os
+import queue
 import time
 import threading
-import hashlib
 import logging
 from pathlib import Path
 from typing import Dict, List, Set, Optional, Any, Tuple
@@ -13,6 +13,15 @@ from datetime import datetime
 from dataclasses import dataclass, asdict
 import json
 
+try:
+    from .file_watcher import FileEventWatcher, WATCHDOG_AVAILABLE, DELETED
+    from .file_state_catalog import FileStateCatalog
+    from ..ingestion.file_hashing import HASH_ALGORITHM, compute_file_hash
+except ImportError:
+    from rag_system.src.monitoring.file_watcher import FileEventWatcher, WATCHDOG_AVAILABLE, DELETED
+    from rag_system.src.monitoring.file_state_catalog import FileStateCatalog
+    from rag_system.src.ingestion.file_hashing import HASH_ALGORITHM, compute_file_hash
+
 @dataclass
 class FileState:
     """Represents the state of a monitored file"""
@@ -24,6 +33,7 @@ class FileState:
     last_ingested: Optional[str] = None
     ingestion_status: str = "pending"  # pending, success, failed
     error_message: Optional[str] = None
+    inode: Optional[int] = None  # None/0 where the platform does not report one
 
 @dataclass
 class FolderMonitorStats:
@@ -57,6 +67,19 @@ class FolderMonitor:
         self.max_file_size_mb = 100
         self.auto_ingest = True
         self.recursive = True
+        self.watch_mode = "auto"  # auto (file events when watchdog is installed), events, polling
+        self.debounce_seconds = 2.0
+        self.reconcile_interval = 3600  # seconds between full scans while file events are active
+        self.state_db_path: Optional[str] = None  # SQLite file-state catalog; None keeps states in memory only
+        
+        # Persisted file states (paths changed since the last save)
+        self.catalog: Optional[FileStateCatalog] = None
+        self._dirty_paths: Set[str] = set()
+        self._dirty_lock = threading.Lock()  # Separate from _lock, which is held around saves
+        
+        # File event watching
+        self.event_watcher: Optional[FileEventWatcher] = None
+        self._event_queue: "queue.Queue[List[Tuple[str, str]]]" = queue.Queue()
         
         # Thread safety
         self._lock = threading.Lock()
@@ -70,9 +93,13 @@ class FolderMonitor:
             'files_ingested': 0,
             'files_failed': 0,
             'last_scan_time': None,
-            'scan_count': 0
+            'scan_count': 0,
+            'file_events': 0,
+            'files_hashed': 0
         }
         
+        self._load_file_states()
+        
         self.logger.info("Folder monitor initialized")
     
     def _load_config(self):
@@ -91,11 +118,69 @@ class FolderMonitor:
                 self.auto_ingest = getattr(folder_config, 'auto_ingest', True)
                 self.recursive = getattr(folder_config, 'recursive', True)
                 self.monitored_folders = list(getattr(folder_config, 'monitored_folders', []))
+                self.watch_mode = getattr(folder_config, 'watch_mode', 'auto')
+                self.debounce_seconds = getattr(folder_config, 'debounce_seconds', 2.0)
+                self.reconcile_interval = getattr(folder_config, 'reconcile_interval_seconds', 3600)
+                self.state_db_path = getattr(folder_config, 'state_db_path', '') or None
                 
                 self.logger.info(f"Loaded folder monitoring config: {len(self.monitored_folders)} folders, {self.check_interval}s interval")
         except Exception as e:
             self.logger.error(f"Failed to load folder monitoring config: {e}")
     
+    def _load_file_states(self):
+        """Open the file-state catalog and resume from the states saved by the last run.
+        
+        States of files under folders that are no longer monitored are dropped.
+        The first scan then only hashes files whose size, mtime or inode changed
+        while the monitor was down, and files still pending are ingested.
+        """
+        if not self.state_db_path:
+            return
+        
+        try:
+            self.catalog = FileStateCatalog(self.state_db_path)
+            rows = self.catalog.load()
+        except Exception as e:
+            self.logger.warning(f"File state catalog unavailable at {self.state_db_path}: {e}")
+            self.catalog = None
+            return
+        
+        monitored_prefixes = tuple(os.path.join(folder, '') for folder in self.monitored_folders)
+        stale = []
+        for row in rows:
+            if row['path'].startswith(monitored_prefixes):
+                self.file_states[row['path']] = FileState(**row)
+            else:
+                stale.append(row['path'])
+        self.catalog.delete(stale)
+        
+        self.logger.info(f"Loaded {len(self.file_states)} file states from {self.state_db_path}")
+    
+    def _mark_dirty(self, file_path: str):
+        """Record that ``file_path``'s state changed (or was removed) since the last save"""
+        if self.catalog is not None:
+            with self._dirty_lock:
+                self._dirty_paths.add(file_path)
+    
+    def _save_file_states(self):
+        """Write the states changed since the last save to the catalog in one batch"""
+        if self.catalog is None:
+            return
+        with self._dirty_lock:
+            dirty, self._dirty_paths = self._dirty_paths, set()
+        if not dirty:
+            return
+        
+        states, removed = [], []
+        for file_path in dirty:
+            state = self.file_states.get(file_path)
+            if state is None:
+                removed.append(file_path)
+            else:
+                states.append(asdict(state))
+        self.catalog.save(states)
+        self.catalog.delete(removed)
+    
     def add_folder(self, folder_path: str) -> Dict[str, Any]:
         """Add a folder to monitoring"""
         folder_path = os.path.abspath(folder_path)
@@ -112,7 +197,9 @@ class FolderMonitor:
                 self._save_monitored_folders()
                 
                 # Initial scan of the new folder
-                self._scan_folder(folder_path)
+                self._scan_folders([folder_path])
+                self._save_file_states()
+                self._restart_event_watcher()
                 
                 self.logger.info(f"Added folder to monitoring: {folder_path}")
                 return {
@@ -136,6 +223,9 @@ class FolderMonitor:
                 files_to_remove = [f for f in self.file_states.keys() if f.startswith(folder_path)]
                 for file_path in files_to_remove:
                     del self.file_states[file_path]
+                    self._mark_dirty(file_path)
+                self._save_file_states()
+                self._restart_event_watcher()
                 
                 self.logger.info(f"Removed folder from monitoring: {folder_path}")
                 return {
@@ -174,15 +264,17 @@ class FolderMonitor:
             return {"success": False, "error": "No folders configured for monitoring"}
         
         self.is_running = True
+        self._start_event_watcher()
         self.monitor_thread = threading.Thread(target=self._monitoring_loop, daemon=True)
         self.monitor_thread.start()
         
-        self.logger.info(f"Started folder monitoring for {len(self.monitored_folders)} folders")
+        self.logger.info(f"Started folder monitoring for {len(self.monitored_folders)} folders ({self._mode()})")
         return {
             "success": True, 
             "message": f"Started monitoring {len(self.monitored_folders)} folders",
             "folders": self.monitored_folders,
-            "interval": self.check_interval
+            "interval": self.check_interval,
+            "mode": self._mode()
         }
     
     def stop_monitoring(self) -> Dict[str, Any]:
@@ -192,11 +284,14 @@ class FolderMonitor:
         
         self.is_running = False
         self.is_paused = False  # Reset pause state when stopping
+        self._stop_event_watcher()
         
         # Wait for thread to finish
         if self.monitor_thread and self.monitor_thread.is_alive():
             self.monitor_thread.join(timeout=5)
         
+        self._save_file_states()
+        
         self.logger.info("Stopped folder monitoring")
         return {"success": True, "message": "Folder monitoring stopped"}
     
@@ -225,26 +320,77 @@ class FolderMonitor:
                 "last_scan_time": self.stats.get('last_scan_time'),
                 "check_interval": self.check_interval,
                 "scan_count": self.stats.get('scan_count', 0),
-                "auto_ingest": self.auto_ingest
+                "auto_ingest": self.auto_ingest,
+                "mode": self._mode(),
+                "file_events": self.stats.get('file_events', 0)
             }
     
+    def _mode(self) -> str:
+        return "events" if self.event_watcher is not None else "polling"
+    
+    def _start_event_watcher(self) -> bool:
+        """Watch the monitored folders for file events; False means fall back to polling"""
+        if self.watch_mode == 'polling' or not self.monitored_folders:
+            return False
+        if not WATCHDOG_AVAILABLE:
+            if self.watch_mode == 'events':
+                self.logger.warning("watchdog not installed; falling back to polling")
+            return False
+        
+        folders = [folder for folder in self.monitored_folders if os.path.isdir(folder)]
+        try:
+            watcher = FileEventWatcher(folders, self._event_queue.put, recursive=self.recursive,
+                                       debounce_seconds=self.debounce_seconds)
+            watcher.start()
+        except Exception as e:
+            self.logger.warning(f"File event watching unavailable ({e}); polling every {self.check_interval}s")
+            return False
+        self.event_watcher = watcher
+        return True
+    
+    def _stop_event_watcher(self):
+        if self.event_watcher is not None:
+            self.event_watcher.stop()
+            self.event_watcher = None
+    
+    def _restart_event_watcher(self):
+        """Pick up added or removed folders"""
+        if self.is_running and self.event_watcher is not None:
+            self._stop_event_watcher()
+            self._start_event_watcher()
+    
     def _monitoring_loop(self):
-        """Main monitoring loop"""
+        """Main monitoring loop
+        
+        With file events, changes are applied as the watcher reports them and
+        a full reconciliation scan runs every ``reconcile_interval`` seconds
+        to catch anything the events missed (e.g. changes made by another host
+        on a network share). Without them, every ``check_interval``.
+        """
         self.logger.info("Folder monitoring loop started")
+        last_full_scan = None
         
         while self.is_running:
             try:
+                interval = self.reconcile_interval if self.event_watcher is not None else self.check_interval
+                
                 # Skip scanning if monitoring is paused
-                if not self.is_paused:
+                if not self.is_paused and (last_full_scan is None or time.monotonic() - last_full_scan >= interval):
                     self._scan_all_folders()
                     self.stats['scan_count'] = self.stats.get('scan_count', 0) + 1
                     self.stats['last_scan_time'] = datetime.now().isoformat()
+                    last_full_scan = time.monotonic()
                 
-                # Sleep in small intervals to allow quick shutdown
-                for _ in range(self.check_interval):
-                    if not self.is_running:
-                        break
+                # Wait for file events in small intervals to allow quick shutdown
+                try:
+                    events = self._event_queue.get(timeout=1)
+                except queue.Empty:
+                    continue
+                if self.is_paused:
+                    self._event_queue.put(events)  # Keep them for when monitoring resumes
                     time.sleep(1)
+                    continue
+                self._handle_file_events(events)
                     
             except Exception as e:
                 self.logger.error(f"Error in monitoring loop: {e}")
@@ -254,12 +400,9 @@ class FolderMonitor:
     
     def _scan_all_folders(self):
         """Scan all monitored folders for changes"""
-        changes_detected = []
-        
-        for folder_path in self.monitored_folders:
-            if os.path.exists(folder_path):
-                folder_changes = self._scan_folder(folder_path)
-                changes_detected.extend(folder_changes)
+        changes_detected = self._scan_folders(
+            [folder_path for folder_path in self.monitored_folders if os.path.exists(folder_path)]
+        )
         
         if changes_detected:
             self.logger.info(f"Detected {len(changes_detected)} file changes")
@@ -271,54 +414,142 @@ class FolderMonitor:
         # Also process any existing pending files if auto-ingest is enabled
         if self.auto_ingest:
             self._process_pending_files()
+        
+        self._save_file_states()
     
-    def _scan_folder(self, folder_path: str) -> List[Tuple[str, str]]:
-        """Scan a single folder for changes"""
-        changes = []
+    def _scan_folders(self, folders: List[str]) -> List[Tuple[str, str]]:
+        """Full scan of ``folders``: new, modified and deleted files"""
         current_files = {}
-        
-        # Scan files
-        if self.recursive:
-            for root, dirs, files in os.walk(folder_path):
-                for file in files:
-                    file_path = os.path.join(root, file)
-                    if self._should_monitor_file(file_path):
-                        current_files[file_path] = self._get_file_info(file_path)
-        else:
-            for file in os.listdir(folder_path):
-                file_path = os.path.join(folder_path, file)
-                if os.path.isfile(file_path) and self._should_monitor_file(file_path):
-                    current_files[file_path] = self._get_file_info(file_path)
+        for folder_path in folders:
+            current_files.update(self._list_files(folder_path))
+        self.stats['files_scanned'] = self.stats.get('files_scanned', 0) + len(current_files)
         
         # Check for new or modified files
+        changes = []
         for file_path, file_info in current_files.items():
-            if file_info is None:
-                continue
-                
-            old_state = self.file_states.get(file_path)
-            
-            if not old_state:
-                # New file
-                changes.append(('new', file_path))
-                self._create_file_state(file_path, file_info)
-            elif (file_info['mtime'] != old_state.mtime or 
-                  file_info['size'] != old_state.size):
-                # Potentially modified file - check hash
-                new_hash = self._get_file_hash(file_path)
-                if new_hash != old_state.hash:
-                    changes.append(('modified', file_path))
-                    self._update_file_state(file_path, file_info, new_hash)
-        
-        # Check for deleted files
-        for file_path, file_state in list(self.file_states.items()):
-            if file_path.startswith(folder_path) and file_path not in current_files:
-                if os.path.exists(file_path):
-                    continue  # File still exists, might be in different scan
-                changes.append(('deleted', file_path))
-                del self.file_states[file_path]
+            change = self._apply_file_info(file_path, file_info)
+            if change:
+                changes.append(change)
+        
+        # Check for deleted files: one pass over the tracked files under the scanned folders
+        scanned_prefixes = tuple(os.path.join(folder_path, '') for folder_path in folders)
+        for file_path in [path for path in self.file_states if path not in current_files]:
+            if not file_path.startswith(scanned_prefixes) or os.path.exists(file_path):
+                continue  # Not scanned here, or still present but filtered out
+            changes.append(('deleted', file_path))
+            del self.file_states[file_path]
+            self._mark_dirty(file_path)
         
         return changes
     
+    def _list_files(self, folder_path: str) -> Dict[str, Dict[str, Any]]:
+        """Monitored files under ``folder_path`` with their size and mtime.
+        
+        Uses os.scandir and the DirEntry's own stat, so each file costs one
+        stat call (none on Windows) and unsupported extensions cost nothing.
+        """
+        max_size = self.max_file_size_mb * 1024 * 1024
+        files = {}
+        directories = [folder_path]
+        while directories:
+            directory = directories.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    directories.append(entry.path)
+                            elif (os.path.splitext(entry.name)[1].lower() in self.supported_extensions
+                                  and entry.is_file()):
+                                stat = entry.stat()
+                                if stat.st_size <= max_size:
+                                    files[entry.path] = {'size': stat.st_size, 'mtime': stat.st_mtime,
+                                                         'inode': stat.st_ino}
+                        except OSError:
+                            continue
+            except OSError as e:
+                self.logger.debug(f"Cannot scan {directory}: {e}")
+        return files
+    
+    def _apply_file_info(self, file_path: str, file_info: Dict[str, Any]) -> Optional[Tuple[str, str]]:
+        """Compare a file's current size/mtime/inode with its state; hash only when they changed"""
+        old_state = self.file_states.get(file_path)
+        
+        if not old_state:
+            # New file
+            if not os.access(file_path, os.R_OK):
+                return None
+            self._create_file_state(file_path, file_info)
+            return ('new', file_path)
+        
+        # Inodes are only compared when both are known (scandir reports none on Windows)
+        inode = file_info.get('inode')
+        replaced = bool(inode and old_state.inode and inode != old_state.inode)
+        if file_info['mtime'] != old_state.mtime or file_info['size'] != old_state.size or replaced:
+            # Potentially modified file - check hash
+            new_hash = self._get_file_hash(file_path)
+            if new_hash != old_state.hash:
+                self._update_file_state(file_path, file_info, new_hash)
+                return ('modified', file_path)
+            # Touched but unchanged: remember the new stat so it is not re-hashed next scan
+            old_state.size = file_info['size']
+            old_state.mtime = file_info['mtime']
+            old_state.inode = inode or old_state.inode
+            self._mark_dirty(file_path)
+        elif inode and not old_state.inode:
+            old_state.inode = inode
+            self._mark_dirty(file_path)
+        return None
+    
+    def _handle_file_events(self, events: List[Tuple[str, str]]):
+        """Apply a batch of debounced file events, touching only the reported paths"""
+        self.stats['file_events'] = self.stats.get('file_events', 0) + len(events)
+        monitored_prefixes = tuple(os.path.join(folder, '') for folder in self.monitored_folders)
+        changes = []
+        
+        for kind, path in events:
+            if not path.startswith(monitored_prefixes):
+                continue  # e.g. the destination of a move out of a watched tree
+            if kind == DELETED or not os.path.exists(path):
+                changes.extend(self._forget_path(path))
+            elif os.path.isdir(path):
+                # Directory created or moved in: its files arrive without events of their own
+                if self.recursive:
+                    for file_path, file_info in self._list_files(path).items():
+                        change = self._apply_file_info(file_path, file_info)
+                        if change:
+                            changes.append(change)
+            elif self._should_monitor_file(path):
+                file_info = self._get_file_info(path)
+                change = self._apply_file_info(path, file_info) if file_info else None
+                if change:
+                    changes.append(change)
+        
+        if changes:
+            self.logger.info(f"Detected {len(changes)} file changes from file events")
+            if self.auto_ingest:
+                self._process_changes(changes)
+        
+        if self.auto_ingest:
+            self._process_pending_files()
+        
+        self._save_file_states()
+    
+    def _forget_path(self, path: str) -> List[Tuple[str, str]]:
+        """Deletion changes for a removed file, or for every tracked file under a removed directory"""
+        if path in self.file_states:
+            del self.file_states[path]
+            self._mark_dirty(path)
+            return [('deleted', path)]
+        
+        prefix = os.path.join(path, '')
+        removed = [file_path for file_path in self.file_states if file_path.startswith(prefix)]
+        for file_path in removed:
+            del self.file_states[file_path]
+            self._mark_dirty(file_path)
+        return [('deleted', file_path) for file_path in removed]
+    
     def _should_monitor_file(self, file_path: str) -> bool:
         """Check if file should be monitored"""
         try:
@@ -346,20 +577,18 @@ class FolderMonitor:
             stat = os.stat(file_path)
             return {
                 'size': stat.st_size,
-                'mtime': stat.st_mtime
+                'mtime': stat.st_mtime,
+                'inode': stat.st_ino
             }
         except Exception as e:
             self.logger.error(f"Failed to get file info for {file_path}: {e}")
             return None
     
     def _get_file_hash(self, file_path: str) -> str:
-        """Calculate file hash"""
+        """Calculate file hash (the ingestion engine's document hash, so ingestion can reuse it)"""
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            self.stats['files_hashed'] = self.stats.get('files_hashed', 0) + 1
+            return compute_file_hash(file_path)
         except Exception as e:
             self.logger.error(f"Failed to calculate hash for {file_path}: {e}")
             return ""
@@ -375,8 +604,10 @@ class FolderMonitor:
             mtime=file_info['mtime'],
             hash=file_hash,
             doc_path=doc_path,
-            ingestion_status="pending"
+            ingestion_status="pending",
+            inode=file_info.get('inode')
         )
+        self._mark_dirty(file_path)
     
     def _update_file_state(self, file_path: str, file_info: Dict[str, Any], new_hash: str):
         """Update existing file state"""
@@ -385,8 +616,10 @@ class FolderMonitor:
             state.size = file_info['size']
             state.mtime = file_info['mtime']
             state.hash = new_hash
+            state.inode = file_info.get('inode')
             state.ingestion_status = "pending"
             state.error_message = None
+            self._mark_dirty(file_path)
     
     def _generate_doc_path(self, file_path: str) -> str:
         """Generate document path for file"""
@@ -461,7 +694,9 @@ class FolderMonitor:
                 "doc_path": file_state.doc_path,
                 "monitored_folder": self._get_parent_folder(file_path),
                 "file_size": file_state.size,
+                "file_mtime": file_state.mtime,
                 "file_hash": file_state.hash,
+                "hash_algorithm": HASH_ALGORITHM,
                 "ingestion_time": datetime.now().isoformat(),
                 "ingestion_method": "folder_monitor_auto"
             }
@@ -503,6 +738,10 @@ class FolderMonitor:
                 self.file_states[file_path].error_message = str(e)
             self.stats['files_failed'] = self.stats.get('files_failed', 0) + 1
             self.logger.error(f"Exception ingesting {file_path}: {e}")
+        finally:
+            # Save per file so a restart mid-batch does not re-ingest what already finished
+            self._mark_dirty(file_path)
+            self._save_file_states()
     
     def _handle_deleted_file(self, file_path: str, ingestion_engine):
         """Handle deleted file"""
@@ -535,6 +774,7 @@ class FolderMonitor:
             # Remove from file_states tracking
             if file_path in self.file_states:
                 del self.file_states[file_path]
+                self._mark_dirty(file_path)
                 self.logger.info(f"Removed {os.path.basename(file_path)} from tracking")
                 
         except Exception as e:
@@ -554,11 +794,9 @@ class FolderMonitor:
     def force_scan(self) -> Dict[str, Any]:
         """Force an immediate scan of all folders"""
         try:
-            changes = []
-            for folder_path in self.monitored_folders:
-                if os.path.exists(folder_path):
-                    folder_changes = self._scan_folder(folder_path)
-                    changes.extend(folder_changes)
+            changes = self._scan_folders(
+                [folder_path for folder_path in self.monitored_folders if os.path.exists(folder_path)]
+            )
             
             if self.auto_ingest and changes:
                 self._process_changes(changes)
@@ -568,6 +806,7 @@ class FolderMonitor:
                 self._process_pending_files()
             
             self.stats['last_scan_time'] = datetime.now().isoformat()
+            self._save_file_states()
             
             return {
                 "success": True,
@@ -597,6 +836,8 @@ class FolderMonitor:
             for file_path in failed_files:
                 self.file_states[file_path].ingestion_status = "pending"
                 self.file_states[file_path].error_message = None
+                self._mark_dirty(file_path)
+            self._save_file_states()
             
             self.logger.info(f"Reset {len(failed_files)} failed files to pending status")
             
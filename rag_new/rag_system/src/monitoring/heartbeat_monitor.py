@@ -399,7 +399,7 @@ class HeartbeatMonitor:
                 
                 # Test LLM generation
                 test_prompt = "Respond with exactly: 'Health check successful'"
-                response = llm_client.generate(test_prompt, max_tokens=10, temperature=0.0)
+                response = llm_client.generate(test_prompt, max_tokens=10, temperature=0.0, use_cache=False)
                 
                 # Verify response
                 response_valid = len(response) > 0 and "health check" in response.lower()
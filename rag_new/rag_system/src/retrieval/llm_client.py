@@ -5,13 +5,17 @@ Multi-provider LLM client for text generation
 import logging
 import os
 import time
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Iterator
 from abc import ABC, abstractmethod
 
 try:
     from ..core.error_handling import LLMError, APIKeyError
+    from .llm_rate_limiter import LLMPermit, estimate_tokens, get_llm_rate_limiter
+    from .llm_response_cache import LLMResponseCache
 except ImportError:
     from rag_system.src.core.error_handling import LLMError, APIKeyError
+    from rag_system.src.retrieval.llm_rate_limiter import LLMPermit, estimate_tokens, get_llm_rate_limiter
+    from rag_system.src.retrieval.llm_response_cache import LLMResponseCache
 
 class BaseLLMClient(ABC):
     """Base class for LLM clients"""
@@ -19,15 +23,31 @@ class BaseLLMClient(ABC):
     @abstractmethod
     def generate(self, prompt: str, **kwargs) -> str:
         pass
+    
+    def generate_stream(self, prompt: str, **kwargs) -> Iterator[str]:
+        """Yield the completion in pieces as it is generated (default: one piece)"""
+        yield self.generate(prompt, **kwargs)
+    
+    def _acquire_permit(self, prompt: str, max_tokens: int) -> LLMPermit:
+        """Wait for the process-wide LLM rate limiter (priority comes from llm_priority)"""
+        return get_llm_rate_limiter().acquire(estimate_tokens(prompt, max_tokens))
+    
+    @staticmethod
+    def _total_tokens(response) -> Optional[int]:
+        usage = getattr(response, 'usage', None)
+        return getattr(usage, 'total_tokens', None) if usage is not None else None
+    
+    @staticmethod
+    def _iter_chat_deltas(stream) -> Iterator[str]:
+        """Text deltas from an OpenAI-style chat completion stream"""
+        for chunk in stream:
+            if chunk.choices:
+                content = chunk.choices[0].delta.content
+                if content:
+                    yield content
 
 class GroqClient(BaseLLMClient):
-    """Groq LLM client with rate limiting"""
-    
-    # Class-level rate limiting variables
-    last_request_time = 0
-    min_request_interval = 1.0  # Minimum time between requests in seconds
-    request_count = 0
-    max_requests_per_minute = 50  # Maximum requests per minute
+    """Groq LLM client"""
     
     def __init__(self, api_key: str, model_name: str = "mixtral-8x7b-32768", timeout: int = 30):
         self.api_key = api_key
@@ -48,56 +68,52 @@ class GroqClient(BaseLLMClient):
         except Exception as e:
             raise APIKeyError("groq")
     
-    def _apply_rate_limiting(self):
-        """Apply rate limiting to avoid hitting API limits"""
-        current_time = time.time()
-        
-        # Check if we need to wait between requests
-        time_since_last_request = current_time - GroqClient.last_request_time
-        if time_since_last_request < GroqClient.min_request_interval:
-            # Wait to maintain minimum interval between requests
-            sleep_time = GroqClient.min_request_interval - time_since_last_request
-            logging.debug(f"Rate limiting: Sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-        
-        # Update request count and check rate limits
-        GroqClient.request_count += 1
-        if GroqClient.request_count >= GroqClient.max_requests_per_minute:
-            # If we've hit the rate limit, wait until the next minute
-            logging.warning(f"Rate limit approaching: {GroqClient.request_count} requests. Slowing down.")
-            time.sleep(2.0)  # Add extra delay when approaching limits
-            GroqClient.request_count = 0  # Reset counter
-        
-        # Update last request time
-        GroqClient.last_request_time = time.time()
-    
     def generate(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.1) -> str:
         try:
-            # Apply rate limiting before making the request
-            self._apply_rate_limiting()
-            
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                timeout=self.timeout
-            )
+            with self._acquire_permit(prompt, max_tokens) as permit:
+                start_time = time.time()
+                response = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=self.timeout
+                )
+                permit.record_usage(self._total_tokens(response))
             elapsed = time.time() - start_time
             logging.debug(f"Groq API call took {elapsed:.2f} seconds")
             return response.choices[0].message.content
         except Exception as e:
             logging.error(f"Groq generation error: {e}")
             raise LLMError(f"Groq generation failed: {e}", details={"provider": "groq", "model": self.model_name})
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.1) -> Iterator[str]:
+        try:
+            with self._acquire_permit(prompt, max_tokens):
+                start_time = time.time()
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=self.timeout,
+                    stream=True
+                )
+                yield from self._iter_chat_deltas(stream)
+            logging.debug(f"Groq streaming call took {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            logging.error(f"Groq streaming error: {e}")
+            raise LLMError(f"Groq generation failed: {e}", details={"provider": "groq", "model": self.model_name})
 
 class OpenAIClient(BaseLLMClient):
     """OpenAI LLM client"""
     
-    def __init__(self, api_key: str, model_name: str = "gpt-3.5-turbo", timeout: int = 30):
+    def __init__(self, api_key: str, model_name: str = "gpt-3.5-turbo", timeout: int = 30,
+                 base_url: Optional[str] = None):
         self.api_key = api_key
         self.model_name = model_name
         self.timeout = timeout
+        self.base_url = base_url  # OpenAI-compatible server; None = api.openai.com (or OPENAI_BASE_URL)
         self.client = None
         self._initialize_client()
     
@@ -106,7 +122,8 @@ class OpenAIClient(BaseLLMClient):
             import openai
             self.client = openai.OpenAI(
                 api_key=self.api_key,
-                timeout=self.timeout
+                timeout=self.timeout,
+                base_url=self.base_url
             )
         except ImportError:
             raise LLMError("OpenAI package not installed")
@@ -115,20 +132,40 @@ class OpenAIClient(BaseLLMClient):
     
     def generate(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.1) -> str:
         try:
-            start_time = time.time()
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                timeout=self.timeout
-            )
+            with self._acquire_permit(prompt, max_tokens) as permit:
+                start_time = time.time()
+                response = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=self.timeout
+                )
+                permit.record_usage(self._total_tokens(response))
             elapsed = time.time() - start_time
             logging.debug(f"OpenAI API call took {elapsed:.2f} seconds")
             return response.choices[0].message.content
         except Exception as e:
             logging.error(f"OpenAI generation error: {e}")
             raise LLMError(f"OpenAI generation failed: {e}", details={"provider": "openai", "model": self.model_name})
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.1) -> Iterator[str]:
+        try:
+            with self._acquire_permit(prompt, max_tokens):
+                start_time = time.time()
+                stream = self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=[{"role": "user", "content": prompt}],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    timeout=self.timeout,
+                    stream=True
+                )
+                yield from self._iter_chat_deltas(stream)
+            logging.debug(f"OpenAI streaming call took {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            logging.error(f"OpenAI streaming error: {e}")
+            raise LLMError(f"OpenAI generation failed: {e}", details={"provider": "openai", "model": self.model_name})
 
 class AzureClient(BaseLLMClient):
     """Azure AI Inference LLM client"""
@@ -160,29 +197,54 @@ class AzureClient(BaseLLMClient):
         try:
             from azure.ai.inference.models import SystemMessage, UserMessage
             
-            start_time = time.time()
-            response = self.client.complete(
-                messages=[
-                    SystemMessage(content="You are a helpful assistant."),
-                    UserMessage(content=prompt)
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                model=self.model_name
-            )
+            with self._acquire_permit(prompt, max_tokens) as permit:
+                start_time = time.time()
+                response = self.client.complete(
+                    messages=[
+                        SystemMessage(content="You are a helpful assistant."),
+                        UserMessage(content=prompt)
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    model=self.model_name
+                )
+                permit.record_usage(self._total_tokens(response))
             elapsed = time.time() - start_time
             logging.debug(f"Azure AI call took {elapsed:.2f} seconds")
             return response.choices[0].message.content
         except Exception as e:
             logging.error(f"Azure generation error: {e}")
             raise LLMError(f"Azure generation failed: {e}", details={"provider": "azure", "model": self.model_name})
+    
+    def generate_stream(self, prompt: str, max_tokens: int = 1000, temperature: float = 0.1) -> Iterator[str]:
+        try:
+            from azure.ai.inference.models import SystemMessage, UserMessage
+            
+            with self._acquire_permit(prompt, max_tokens):
+                start_time = time.time()
+                stream = self.client.complete(
+                    messages=[
+                        SystemMessage(content="You are a helpful assistant."),
+                        UserMessage(content=prompt)
+                    ],
+                    max_tokens=max_tokens,
+                    temperature=temperature,
+                    model=self.model_name,
+                    stream=True
+                )
+                yield from self._iter_chat_deltas(stream)
+            logging.debug(f"Azure AI streaming call took {time.time() - start_time:.2f} seconds")
+        except Exception as e:
+            logging.error(f"Azure streaming error: {e}")
+            raise LLMError(f"Azure generation failed: {e}", details={"provider": "azure", "model": self.model_name})
 
 class LLMClient:
     """Main LLM client with provider switching"""
     
     def __init__(self, provider: str = "groq", model_name: str = None, 
                  api_key: str = None, temperature: float = 0.1, max_tokens: int = 1000,
-                 timeout: int = 30, endpoint: str = None):
+                 timeout: int = 30, endpoint: str = None,
+                 response_cache: Optional[LLMResponseCache] = None):
         self.provider = provider
         self.model_name = model_name
         self.api_key = api_key or self._get_api_key(provider)
@@ -190,6 +252,7 @@ class LLMClient:
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.timeout = timeout
+        self.response_cache = response_cache
         self.client = None
         
         self._initialize_client()
@@ -230,7 +293,7 @@ class LLMClient:
             self.client = GroqClient(self.api_key, model, self.timeout)
         elif self.provider == "openai":
             model = self.model_name or "gpt-3.5-turbo"
-            self.client = OpenAIClient(self.api_key, model, self.timeout)
+            self.client = OpenAIClient(self.api_key, model, self.timeout, base_url=self.endpoint)
         elif self.provider == "azure":
             model = self.model_name or "Llama-4-Maverick-17B-128E-Instruct-FP8"
             self.client = AzureClient(self.api_key, self.endpoint, model, self.timeout)
@@ -238,21 +301,63 @@ class LLMClient:
             raise LLMError(f"Unsupported provider: {self.provider}")
     
     def generate(self, prompt: str, max_tokens: Optional[int] = None, 
-                temperature: Optional[float] = None) -> str:
-        """Generate text using the configured LLM"""
+                temperature: Optional[float] = None, use_cache: bool = True) -> str:
+        """Generate text using the configured LLM
+        
+        Identical prompts (same model, temperature and max_tokens) are served
+        from the response cache, and concurrent identical prompts share one
+        upstream call. Pass use_cache=False for health checks.
+        """
         max_tokens = max_tokens or self.max_tokens
         temperature = temperature or self.temperature
         
-        try:
+        def call_provider():
             return self.client.generate(prompt, max_tokens=max_tokens, temperature=temperature)
+        
+        try:
+            if self.response_cache is None or not use_cache:
+                return call_provider()
+            cache_key = self._cache_key(prompt, max_tokens, temperature)
+            return self.response_cache.get_or_generate(cache_key, call_provider)
         except Exception as e:
             logging.error(f"LLM generation failed: {e}")
             raise
     
+    def generate_stream(self, prompt: str, max_tokens: Optional[int] = None,
+                        temperature: Optional[float] = None, use_cache: bool = True) -> Iterator[str]:
+        """Stream text from the configured LLM as it is generated (a cached completion arrives in one piece)"""
+        max_tokens = max_tokens or self.max_tokens
+        temperature = temperature or self.temperature
+        
+        cache_key = None
+        if self.response_cache is not None and use_cache:
+            cache_key = self._cache_key(prompt, max_tokens, temperature)
+            cached = self.response_cache.get(cache_key)
+            if cached is not None:
+                yield cached
+                return
+        
+        try:
+            parts = []
+            for token in self.client.generate_stream(prompt, max_tokens=max_tokens, temperature=temperature):
+                parts.append(token)
+                yield token
+        except Exception as e:
+            logging.error(f"LLM streaming failed: {e}")
+            raise
+        if cache_key is not None:
+            self.response_cache.put(cache_key, "".join(parts))
+    
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        return LLMResponseCache.make_key(self.provider, self.client.model_name, prompt, temperature, max_tokens)
+    
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        return self.response_cache.get_stats() if self.response_cache is not None else None
+    
     def test_connection(self) -> bool:
         """Test LLM connection"""
         try:
-            response = self.generate("Hello", max_tokens=5)
+            response = self.generate("Hello", max_tokens=5, use_cache=False)
             return bool(response)
         except Exception as e:
             logging.error(f"LLM connection test failed: {e}")
@@ -9,6 +9,11 @@ from typing import List, Tuple, Dict, Any, Optional
 
 import json
 
+try:
+    from .llm_rate_limiter import llm_priority, PRIORITY_BACKGROUND
+except ImportError:
+    from rag_system.src.retrieval.llm_rate_limiter import llm_priority, PRIORITY_BACKGROUND
+
 class LLMQueryEnhancer:
     """Generate query variants with an LLM for improved retrieval."""
 
@@ -55,7 +60,8 @@ class LLMQueryEnhancer:
             "Limit to {} variants.\n\nUser question: {}".format(self.max_variants, query)
         )
         try:
-            raw = self.llm_client.generate(prompt)
+            with llm_priority(PRIORITY_BACKGROUND):
+                raw = self.llm_client.generate(prompt)
             lines = [l.strip() for l in raw.split("\n") if l.strip()]
             filters = None
             # Try parse last line as JSON
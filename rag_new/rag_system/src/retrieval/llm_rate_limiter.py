@@ -0,0 +1,275 @@
+"""
+LLM Rate Limiter
+Process-wide request/token buckets and concurrency gate shared by every LLM client
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    from ..core.error_handling import LLMError
+except ImportError:
+    from rag_system.src.core.error_handling import LLMError
+
+PRIORITY_INTERACTIVE = 0  # user-facing answers
+PRIORITY_BACKGROUND = 1   # query analysis, decomposition, enhancement
+
+_current_priority = contextvars.ContextVar('llm_priority', default=PRIORITY_INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: int):
+    """Run the enclosed LLM calls at ``priority`` (e.g. ``with llm_priority(PRIORITY_BACKGROUND):``)"""
+    token = _current_priority.set(priority)
+    try:
+        yield
+    finally:
+        _current_priority.reset(token)
+
+
+def estimate_tokens(prompt: str, max_tokens: int = 0) -> int:
+    """Rough prompt + completion size (about four characters per token)"""
+    return len(prompt) // 4 + 1 + (max_tokens or 0)
+
+
+class _Bucket:
+    """Per-minute budget refilled continuously; ``per_minute <= 0`` means unlimited"""
+    
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+    
+    @property
+    def limited(self) -> bool:
+        return self.capacity > 0
+    
+    def refill(self, now: float):
+        if self.limited:
+            self.level = min(self.capacity, self.level + (now - self.updated) * self.capacity / 60.0)
+        self.updated = now
+    
+    def seconds_until(self, amount: float) -> float:
+        if not self.limited or self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60.0 / self.capacity
+
+
+class LLMPermit:
+    """A granted LLM call; release it (or leave the ``with`` block) when the call finishes"""
+    
+    def __init__(self, limiter: 'LLMRateLimiter', reserved_tokens: int, queue_time: float):
+        self.limiter = limiter
+        self.reserved_tokens = reserved_tokens
+        self.queue_time = queue_time
+        self.used_tokens: Optional[int] = None
+        self._released = False
+    
+    def record_usage(self, total_tokens: Optional[int]):
+        """Actual tokens reported by the provider; corrects the estimate on release"""
+        if total_tokens:
+            self.used_tokens = int(total_tokens)
+    
+    def release(self):
+        if not self._released:
+            self._released = True
+            self.limiter._release(self)
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+
+
+class LLMRateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets plus a bound on in-flight calls.
+    
+    Waiters are served strictly by (priority, arrival), so background work
+    queued behind a burst never delays an interactive request that arrives
+    later. ``acquire`` blocks the calling thread; ``acquire_async`` waits
+    without blocking the event loop. Token reservations use an estimate and
+    are settled against the provider's reported usage on release.
+    """
+    
+    def __init__(self, requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                 max_concurrency: int = 0, timeout: float = 120.0):
+        self.requests = _Bucket(requests_per_minute)
+        self.tokens = _Bucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, seq)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self.stats = {
+            'granted': 0, 'timeouts': 0, 'queued': 0,
+            'total_queue_time': 0.0, 'max_queue_time': 0.0,
+            'granted_by_priority': {}
+        }
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    
+    def acquire(self, estimated_tokens: int = 1, priority: Optional[int] = None,
+                timeout: Optional[float] = None) -> LLMPermit:
+        """Block until the call may start"""
+        ticket, start = self._enqueue(priority)
+        deadline = start + (self.timeout if timeout is None else timeout)
+        with self._cond:
+            try:
+                while True:
+                    wait = self._try_grant(ticket, estimated_tokens)
+                    if wait == 0.0:
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timed_out(ticket)
+                    self._cond.wait(remaining if wait is None else min(wait, remaining))
+            except BaseException:
+                self._abandon(ticket)
+                raise
+            self._cond.notify_all()  # the next waiter may now be at the head
+        return self._granted(ticket, estimated_tokens, start)
+    
+    async def acquire_async(self, estimated_tokens: int = 1, priority: Optional[int] = None,
+                            timeout: Optional[float] = None) -> LLMPermit:
+        """Wait on the event loop until the call may start"""
+        ticket, start = self._enqueue(priority)
+        deadline = start + (self.timeout if timeout is None else timeout)
+        try:
+            while True:
+                with self._cond:
+                    wait = self._try_grant(ticket, estimated_tokens)
+                    if wait == 0.0:
+                        self._cond.notify_all()
+                        break
+                    if time.monotonic() >= deadline:
+                        raise self._timed_out(ticket)
+                # Thread waiters are woken by the condition; poll briefly here instead
+                await asyncio.sleep(0.05 if wait is None else min(wait, 0.05))
+        except BaseException:
+            with self._cond:
+                self._abandon(ticket)
+            raise
+        return self._granted(ticket, estimated_tokens, start)
+    
+    @contextmanager
+    def slot(self, estimated_tokens: int = 1, priority: Optional[int] = None) -> Iterator[LLMPermit]:
+        permit = self.acquire(estimated_tokens, priority)
+        try:
+            yield permit
+        finally:
+            permit.release()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._cond:
+            granted = self.stats['granted']
+            return dict(
+                self.stats,
+                granted_by_priority=dict(self.stats['granted_by_priority']),
+                avg_queue_time=self.stats['total_queue_time'] / granted if granted else 0.0,
+                in_flight=self._in_flight,
+                waiting=len(self._waiting),
+                requests_per_minute=self.requests.capacity,
+                tokens_per_minute=self.tokens.capacity,
+                max_concurrency=self.max_concurrency
+            )
+    
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._cond unless noted)
+    # ------------------------------------------------------------------
+    
+    def _enqueue(self, priority: Optional[int]):
+        priority = _current_priority.get() if priority is None else priority
+        ticket = (priority, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+        return ticket, time.monotonic()
+    
+    def _try_grant(self, ticket, estimated_tokens: int) -> Optional[float]:
+        """0.0 when granted, seconds until the budgets allow it, or None to wait for a release"""
+        if self._waiting[0] != ticket:
+            return None
+        if self.max_concurrency and self._in_flight >= self.max_concurrency:
+            return None
+        
+        now = time.monotonic()
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        # A single call larger than the whole minute budget waits for a full bucket
+        tokens_needed = min(estimated_tokens, self.tokens.capacity) if self.tokens.limited else 0
+        wait = max(self.requests.seconds_until(1), self.tokens.seconds_until(tokens_needed))
+        if wait > 0:
+            return wait
+        
+        if self.requests.limited:
+            self.requests.level -= 1
+        if self.tokens.limited:
+            self.tokens.level -= tokens_needed
+        self._in_flight += 1
+        heapq.heappop(self._waiting)
+        return 0.0
+    
+    def _abandon(self, ticket):
+        if ticket in self._waiting:
+            self._waiting.remove(ticket)
+            heapq.heapify(self._waiting)
+            self._cond.notify_all()
+    
+    def _timed_out(self, ticket) -> LLMError:
+        self.stats['timeouts'] += 1
+        return LLMError(f"Timed out waiting for LLM capacity ({len(self._waiting)} calls queued, "
+                        f"{self._in_flight} in flight)", details={'priority': ticket[0]})
+    
+    def _granted(self, ticket, estimated_tokens: int, start: float) -> LLMPermit:
+        """Record metrics for a grant (takes the lock itself)"""
+        queue_time = time.monotonic() - start
+        with self._cond:
+            self.stats['granted'] += 1
+            self.stats['total_queue_time'] += queue_time
+            self.stats['max_queue_time'] = max(self.stats['max_queue_time'], queue_time)
+            if queue_time > 0.01:
+                self.stats['queued'] += 1
+            by_priority = self.stats['granted_by_priority']
+            by_priority[ticket[0]] = by_priority.get(ticket[0], 0) + 1
+        if queue_time > 1.0:
+            logging.info(f"LLM call waited {queue_time:.2f}s for capacity (priority {ticket[0]})")
+        return LLMPermit(self, estimated_tokens, queue_time)
+    
+    def _release(self, permit: LLMPermit):
+        with self._cond:
+            self._in_flight -= 1
+            if self.tokens.limited and permit.used_tokens is not None:
+                # Settle the estimate; overshoot becomes debt the bucket refills through
+                reserved = min(permit.reserved_tokens, self.tokens.capacity)
+                self.tokens.level -= permit.used_tokens - reserved
+            self._cond.notify_all()
+
+
+_limiter = LLMRateLimiter()
+_limiter_lock = threading.Lock()
+
+
+def configure_llm_rate_limiter(requests_per_minute: int = 0, tokens_per_minute: int = 0,
+                               max_concurrency: int = 0, timeout: float = 120.0) -> LLMRateLimiter:
+    """Replace the process-wide limiter (calls already holding a permit release to the old one)"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = LLMRateLimiter(requests_per_minute, tokens_per_minute, max_concurrency, timeout)
+        logging.info(f"LLM rate limiter: {requests_per_minute or 'unlimited'} req/min, "
+                     f"{tokens_per_minute or 'unlimited'} tokens/min, "
+                     f"max concurrency {max_concurrency or 'unlimited'}")
+        return _limiter
+
+
+def get_llm_rate_limiter() -> LLMRateLimiter:
+    return _limiter
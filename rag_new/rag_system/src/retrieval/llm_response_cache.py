@@ -0,0 +1,211 @@
+"""
+LLM Response Cache
+Prompt-level completion cache with single-flight coalescing of identical in-flight prompts
+"""
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+class _Flight:
+    """One upstream call that concurrent identical prompts wait on"""
+    
+    __slots__ = ('done', 'value', 'error')
+    
+    def __init__(self):
+        self.done = threading.Event()
+        self.value: Optional[str] = None
+        self.error: Optional[BaseException] = None
+
+
+class LLMResponseCache:
+    """LRU + TTL cache of completions keyed by (provider, model, temperature, max_tokens, prompt hash).
+    
+    ``get_or_generate`` coalesces concurrent misses for the same key so only
+    one upstream call is made; the others wait for its result (or error).
+    With ``disk_path`` set, entries are also written to a SQLite file and
+    survive restarts; the memory tier is checked first. Errors and empty
+    completions are never cached.
+    """
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0,
+                 disk_path: Optional[str] = None, disk_max_entries: int = 20000):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.disk_max_entries = disk_max_entries
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (text, created_at)
+        self._in_flight: Dict[str, _Flight] = {}
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'coalesced': 0, 'evictions': 0, 'errors': 0}
+        
+        self._conn = None
+        self._disk_writes = 0
+        if disk_path:
+            self._open_disk(Path(disk_path))
+    
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str, temperature: float, max_tokens: int) -> str:
+        prompt_hash = hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+        return f"{provider}:{model}:{temperature}:{max_tokens}:{prompt_hash}"
+    
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            return self._lookup(key)
+    
+    def put(self, key: str, text: str):
+        if not text:
+            return
+        now = time.time()
+        with self._lock:
+            self._remember(key, text, now)
+            self._write_disk(key, text, now)
+    
+    def get_or_generate(self, key: str, generate: Callable[[], str]) -> str:
+        """Cached completion for ``key``, calling ``generate`` at most once across concurrent callers"""
+        with self._lock:
+            cached = self._lookup(key)
+            if cached is not None:
+                return cached
+            flight = self._in_flight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._in_flight[key] = _Flight()
+                self.stats['misses'] += 1
+            else:
+                self.stats['coalesced'] += 1
+        
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+        
+        try:
+            flight.value = generate()
+            self.put(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.stats['errors'] += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            flight.done.set()
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            if self._conn is not None:
+                with self._conn:
+                    self._conn.execute("DELETE FROM llm_responses")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+            return dict(
+                self.stats,
+                entries=len(self._entries),
+                in_flight=len(self._in_flight),
+                hit_rate=(self.stats['hits'] + self.stats['coalesced']) / lookups if lookups else 0.0,
+                disk_enabled=self._conn is not None
+            )
+    
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+    
+    # ------------------------------------------------------------------
+    # Internals (callers hold self._lock)
+    # ------------------------------------------------------------------
+    
+    def _lookup(self, key: str) -> Optional[str]:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None:
+            text, created_at = entry
+            if now - created_at <= self.ttl_seconds:
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return text
+            del self._entries[key]
+        
+        row = self._read_disk(key, now)
+        if row is not None:
+            text, created_at = row
+            self._remember(key, text, created_at)
+            self.stats['hits'] += 1
+            self.stats['disk_hits'] += 1
+            return text
+        return None
+    
+    def _remember(self, key: str, text: str, created_at: float):
+        self._entries[key] = (text, created_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.stats['evictions'] += 1
+    
+    def _open_disk(self, path: Path):
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(path), check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+            with self._conn:
+                self._conn.execute('''
+                    CREATE TABLE IF NOT EXISTS llm_responses (
+                        key TEXT PRIMARY KEY,
+                        response TEXT NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                ''')
+                self._conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_responses_created "
+                                   "ON llm_responses(created_at)")
+        except sqlite3.Error as e:
+            logging.warning(f"LLM response disk cache unavailable at {path}: {e}")
+            self._conn = None
+    
+    def _read_disk(self, key: str, now: float) -> Optional[Tuple[str, float]]:
+        if self._conn is None:
+            return None
+        try:
+            row = self._conn.execute("SELECT response, created_at FROM llm_responses WHERE key = ?",
+                                     (key,)).fetchone()
+        except sqlite3.Error as e:
+            logging.warning(f"LLM response disk cache read failed: {e}")
+            return None
+        if row is None or now - row[1] > self.ttl_seconds:
+            return None
+        return row[0], row[1]
+    
+    def _write_disk(self, key: str, text: str, created_at: float):
+        if self._conn is None:
+            return
+        try:
+            with self._conn:
+                self._conn.execute("INSERT OR REPLACE INTO llm_responses (key, response, created_at) "
+                                   "VALUES (?, ?, ?)", (key, text, created_at))
+                self._disk_writes += 1
+                if self._disk_writes % 100 == 0:
+                    # Drop expired rows, then the oldest beyond the size bound
+                    self._conn.execute("DELETE FROM llm_responses WHERE created_at < ?",
+                                       (created_at - self.ttl_seconds,))
+                    self._conn.execute(
+                        "DELETE FROM llm_responses WHERE key IN (SELECT key FROM llm_responses "
+                        "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.disk_max_entries,))
+        except sqlite3.Error as e:
+            logging.warning(f"LLM response disk cache write failed: {e}")
@@ -0,0 +1,250 @@
+"""
+Query Result Cache
+Two-tier answer cache in front of QueryEngine.process_query: exact normalized query, then semantic match
+"""
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+_WHITESPACE = re.compile(r"\s+")
+_TRAILING_PUNCTUATION = re.compile(r"[\s?.!]+$")
+
+
+class _CacheEntry:
+    __slots__ = ('key', 'response', 'created_at', 'version', 'doc_paths', 'identifiers', 'slot')
+    
+    def __init__(self, key, response, created_at, version, doc_paths, identifiers):
+        self.key = key
+        self.response = response
+        self.created_at = created_at
+        self.version = version
+        self.doc_paths = doc_paths  # None: invalidate on any store change
+        self.identifiers = identifiers
+        self.slot = None  # Row in the embedding matrix, if the entry is in the semantic tier
+
+
+class QueryResultCache:
+    """LRU cache of query responses with an embedding-similarity second tier.
+    
+    Entries are scoped by filters and ``top_k``, expire after ``ttl_seconds``
+    and are dropped once the vector store's change log reports a change to
+    one of the documents the answer was built from. A semantic hit also
+    requires both queries to mention the same identifier-like tokens (any
+    token containing a digit), so "INC0012345" never answers "INC0012346".
+    """
+    
+    def __init__(self, max_entries: int = 1000, ttl_seconds: float = 3600.0,
+                 semantic_enabled: bool = True, semantic_threshold: float = 0.95):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.semantic_enabled = semantic_enabled
+        self.semantic_threshold = semantic_threshold
+        
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[Tuple[str, str], _CacheEntry]" = OrderedDict()
+        
+        # Semantic tier: one normalized query embedding per row
+        self._vectors: Optional[np.ndarray] = None
+        self._slot_valid = np.zeros(self.max_entries, dtype=bool)
+        self._slot_scope = np.zeros(self.max_entries, dtype=np.int64)
+        self._slot_entries: List[Optional[_CacheEntry]] = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        
+        self.exact_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+        self.evictions = 0
+    
+    # ------------------------------------------------------------------
+    # Keys
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def normalize(query: str) -> str:
+        return _TRAILING_PUNCTUATION.sub("", _WHITESPACE.sub(" ", query.strip().lower()))
+    
+    @staticmethod
+    def make_scope(filters: Optional[Dict[str, Any]], top_k: int) -> str:
+        return json.dumps({'filters': filters or {}, 'top_k': top_k}, sort_keys=True, default=str)
+    
+    @staticmethod
+    def _identifiers(normalized_query: str) -> FrozenSet[str]:
+        return frozenset(token for token in normalized_query.split() if any(c.isdigit() for c in token))
+    
+    # ------------------------------------------------------------------
+    # Lookup
+    # ------------------------------------------------------------------
+    
+    def get(self, query: str, scope: str, change_log=None,
+            embedding: Union[List[float], Callable[[], List[float]], None] = None) -> Optional[Dict[str, Any]]:
+        """Cached response for ``query`` or None; hits carry ``cache_hit`` ("exact"/"semantic").
+        
+        ``embedding`` may be a zero-argument callable, called (outside the lock)
+        only when the exact tier misses and the semantic tier is consulted.
+        """
+        normalized = self.normalize(query)
+        with self._lock:
+            entry = self._entries.get((scope, normalized))
+            if entry is not None and self._is_fresh(entry, change_log):
+                self._entries.move_to_end(entry.key)
+                self.exact_hits += 1
+                return self._hit(entry, 'exact', 1.0)
+        
+        if self.semantic_enabled and callable(embedding):
+            embedding = embedding()
+        
+        with self._lock:
+            if self.semantic_enabled and embedding is not None:
+                match = self._semantic_lookup(normalized, scope, change_log, embedding)
+                if match is not None:
+                    entry, similarity = match
+                    self._entries.move_to_end(entry.key)
+                    self.semantic_hits += 1
+                    return self._hit(entry, 'semantic', similarity)
+            
+            self.misses += 1
+            return None
+    
+    def _semantic_lookup(self, normalized: str, scope: str, change_log,
+                         embedding: List[float]) -> Optional[Tuple[_CacheEntry, float]]:
+        query_vector = self._unit(embedding)
+        if query_vector is None or self._vectors is None or self._vectors.shape[1] != query_vector.shape[0]:
+            return None
+        
+        slots = np.flatnonzero(self._slot_valid & (self._slot_scope == hash(scope)))
+        if len(slots) == 0:
+            return None
+        similarities = self._vectors[slots] @ query_vector
+        identifiers = self._identifiers(normalized)
+        for position in np.argsort(-similarities):
+            similarity = float(similarities[position])
+            if similarity < self.semantic_threshold:
+                break
+            entry = self._slot_entries[slots[position]]
+            if entry is None or entry.key[0] != scope or entry.identifiers != identifiers:
+                continue
+            if self._is_fresh(entry, change_log):
+                return entry, similarity
+        return None
+    
+    def _is_fresh(self, entry: _CacheEntry, change_log) -> bool:
+        """Check TTL and store changes; stale entries are removed"""
+        if self.ttl_seconds and time.time() - entry.created_at > self.ttl_seconds:
+            self._remove(entry)
+            self.expirations += 1
+            return False
+        
+        if change_log is not None and change_log.version != entry.version:
+            changed = change_log.changes_since(entry.version)
+            if changed is None or entry.doc_paths is None or changed & entry.doc_paths:
+                self._remove(entry)
+                self.invalidations += 1
+                return False
+            # Only unrelated documents changed; skip this check next time
+            entry.version = change_log.version
+        return True
+    
+    @staticmethod
+    def _hit(entry: _CacheEntry, tier: str, similarity: float) -> Dict[str, Any]:
+        response = copy.deepcopy(entry.response)
+        response['cache_hit'] = tier
+        response['cache_similarity'] = round(similarity, 4)
+        return response
+    
+    # ------------------------------------------------------------------
+    # Insert / remove
+    # ------------------------------------------------------------------
+    
+    def put(self, query: str, scope: str, response: Dict[str, Any], doc_paths: Optional[Iterable[str]],
+            version: int = 0, embedding: Optional[List[float]] = None):
+        """Cache ``response``; ``version`` is the store version read before the query ran"""
+        normalized = self.normalize(query)
+        doc_paths = frozenset(doc_paths) if doc_paths is not None else None
+        entry = _CacheEntry((scope, normalized), copy.deepcopy(response), time.time(), version,
+                            doc_paths, self._identifiers(normalized))
+        query_vector = self._unit(embedding) if self.semantic_enabled and embedding is not None else None
+        
+        with self._lock:
+            existing = self._entries.get(entry.key)
+            if existing is not None:
+                self._remove(existing)
+            while len(self._entries) >= self.max_entries:
+                _, oldest = self._entries.popitem(last=False)
+                self._release_slot(oldest)
+                self.evictions += 1
+            
+            self._entries[entry.key] = entry
+            if query_vector is not None:
+                if self._vectors is None or self._vectors.shape[1] != query_vector.shape[0]:
+                    self._reset_semantic_tier(query_vector.shape[0])
+                slot = self._free_slots.pop()
+                self._vectors[slot] = query_vector
+                self._slot_valid[slot] = True
+                self._slot_scope[slot] = hash(scope)
+                self._slot_entries[slot] = entry
+                entry.slot = slot
+    
+    def _remove(self, entry: _CacheEntry):
+        if self._entries.get(entry.key) is entry:
+            del self._entries[entry.key]
+        self._release_slot(entry)
+    
+    def _release_slot(self, entry: _CacheEntry):
+        if entry.slot is not None:
+            self._slot_valid[entry.slot] = False
+            self._slot_entries[entry.slot] = None
+            self._free_slots.append(entry.slot)
+            entry.slot = None
+    
+    def _reset_semantic_tier(self, dimension: int):
+        """(Re)allocate the embedding matrix, e.g. after an embedding model change"""
+        for entry in self._entries.values():
+            entry.slot = None
+        self._vectors = np.zeros((self.max_entries, dimension), dtype=np.float32)
+        self._slot_valid[:] = False
+        self._slot_entries = [None] * self.max_entries
+        self._free_slots = list(range(self.max_entries - 1, -1, -1))
+    
+    @staticmethod
+    def _unit(embedding) -> Optional[np.ndarray]:
+        vector = np.asarray(embedding, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm > 0 else None
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._vectors = None
+            self._slot_valid[:] = False
+            self._slot_entries = [None] * self.max_entries
+            self._free_slots = list(range(self.max_entries - 1, -1, -1))
+        logging.info("Query result cache cleared")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        hits = self.exact_hits + self.semantic_hits
+        lookups = hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'semantic_enabled': self.semantic_enabled,
+            'semantic_threshold': self.semantic_threshold,
+            'exact_hits': self.exact_hits,
+            'semantic_hits': self.semantic_hits,
+            'misses': self.misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'exact_hit_rate': self.exact_hits / lookups if lookups else 0.0,
+            'semantic_hit_rate': self.semantic_hits / lookups if lookups else 0.0,
+            'invalidations': self.invalidations,
+            'expirations': self.expirations,
+            'evictions': self.evictions
+        }
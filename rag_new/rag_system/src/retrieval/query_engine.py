@@ -3,21 +3,26 @@ Query Engine - Enhanced with Conversation Context
 Main engine for processing user queries and generating responses
 """
 import logging
-from typing import Dict, List, Any, Optional, Set, Tuple
+from typing import Dict, Iterator, List, Any, Optional, Set, Tuple
 from datetime import datetime
 from collections import defaultdict, Counter
 import math
 from pathlib import Path
 
+import numpy as np
+
 try:
     from ..core.error_handling import RetrievalError
 except ImportError:
     from rag_system.src.core.error_handling import RetrievalError
 
+LLM_FAILURE_MESSAGE = "I apologize, but I'm unable to generate a response at the moment due to a technical issue."
+
 class QueryEngine:
     """Main query processing engine with conversation awareness"""
     
-    def __init__(self, vector_store, embedder, llm_client, metadata_store, config_manager, reranker=None, query_enhancer=None):
+    def __init__(self, vector_store, embedder, llm_client, metadata_store, config_manager, reranker=None, query_enhancer=None,
+                 query_cache=None):
         self.vector_store = vector_store
         self.embedder = embedder
         self.llm_client = llm_client
@@ -25,12 +30,15 @@ class QueryEngine:
         self.config = config_manager.get_config()
         self.reranker = reranker
         self.query_enhancer = query_enhancer
+        self.query_cache = query_cache  # Optional QueryResultCache for repeated and near-duplicate questions
         
         # Source diversity configuration
         self.enable_source_diversity = getattr(self.config.retrieval, 'enable_source_diversity', True)
         self.diversity_weight = getattr(self.config.retrieval, 'diversity_weight', 0.3)
         self.max_chunks_per_doc = getattr(self.config.retrieval, 'max_chunks_per_doc', 3)
         self.min_source_types = getattr(self.config.retrieval, 'min_source_types', 2)
+        # "jaccard" compares chunk word sets; "embedding" reuses the vectors returned by the search
+        self.diversity_similarity = getattr(self.config.retrieval, 'diversity_similarity', 'jaccard')
         
         logging.info(f"Query engine initialized with reranker: {reranker is not None}, query enhancer: {query_enhancer is not None}")
         logging.info(f"Source diversity enabled: {self.enable_source_diversity}, weight: {self.diversity_weight}")
@@ -80,197 +88,405 @@ class QueryEngine:
         top_k = top_k or self.config.retrieval.top_k
         
         try:
-            # Handle conversation context if provided
-            if conversation_context and conversation_context.get('is_contextual', False):
-                logging.info(f"Processing contextual query with conversation awareness")
-                # For contextual queries, we might need to adjust the search strategy
-                # but keep the original query for response generation
-                original_query = conversation_context.get('original_query', query)
-            else:
-                original_query = query
-            
-            # Enhance query if enhancer is available
-            enhanced_query = None
-            query_variants = [(query, 1.0)]  # Default: original query with max confidence
-            
-            if self.query_enhancer:
-                try:
-                    enhanced_query = self.query_enhancer.enhance_query(query)
-                    query_variants = self.query_enhancer.get_all_query_variants(enhanced_query)
-                    logging.info(f"Query enhanced: {len(query_variants)} variants generated")
-                except Exception as e:
-                    logging.warning(f"Query enhancement failed, using original query: {e}")
-            
-            # Search with multiple query variants and track performance
-            all_results = []
-            best_variant = None
-            best_variant_score = 0
-            variant_performance = []
-            
-            for query_text, confidence in query_variants[:3]:  # Use top 3 variants
-                # Generate query embedding
-                query_embedding = self.embedder.embed_text(query_text)
-                
-                # Search for similar chunks (get more results for diversity)
-                search_k = max(top_k * 3, 20) if self.enable_source_diversity else top_k
-                search_results = self.vector_store.search_with_metadata(
-                    query_vector=query_embedding,
-                    k=search_k
-                )
-                
-                # Calculate variant performance score
-                if search_results:
-                    variant_avg_score = sum(r.get('similarity_score', 0) for r in search_results) / len(search_results)
-                    variant_performance.append({
-                        'query_text': query_text,
-                        'confidence': confidence,
-                        'avg_score': variant_avg_score,
-                        'result_count': len(search_results)
-                    })
-                    
-                    # Track best performing variant
-                    if variant_avg_score > best_variant_score:
-                        best_variant = query_text
-                        best_variant_score = variant_avg_score
-                
-                # Add confidence weighting to results
-                for result in search_results:
-                    result['query_confidence'] = confidence
-                    result['query_variant'] = query_text
-                    # Adjust similarity score by query confidence
-                    original_score = result.get('similarity_score', 0)
-                    result['weighted_score'] = original_score * confidence
-                
-                all_results.extend(search_results)
-            
-            # Log variant performance for debugging
-            if variant_performance:
-                logging.info(f"Query variant performance: {variant_performance}")
-                logging.info(f"Best variant: '{best_variant}' (score: {best_variant_score:.3f})")
-            
-            # Determine which query to use for LLM context
-            # Use best variant if it's significantly better than original query
-            query_for_llm = original_query
-            if best_variant and best_variant_score > 0.7:
-                # Check if best variant is significantly better than original
-                original_variant_score = next(
-                    (v['avg_score'] for v in variant_performance if v['query_text'] == original_query), 
-                    0.0
-                )
-                
-                # If original query not in variants, use a reasonable baseline
-                if original_variant_score == 0.0:
-                    # Use the lowest score as baseline for comparison
-                    min_score = min(v['avg_score'] for v in variant_performance) if variant_performance else 0.0
-                    original_variant_score = min_score * 0.8  # Assume original would be slightly worse
-                
-                if best_variant_score > original_variant_score * 1.2:  # 20% better threshold
-                    query_for_llm = best_variant
-                    logging.info(f"Using enhanced query for LLM: '{best_variant}' (score: {best_variant_score:.3f} vs original: {original_variant_score:.3f})")
-                else:
-                    logging.info(f"Keeping original query for LLM (enhanced not significantly better)")
-            else:
-                logging.info(f"Best variant score too low ({best_variant_score:.3f}), using original query")
-            
-            # Deduplicate and merge results
-            search_results = self._merge_search_results(all_results)
+            # Follow-up questions depend on the conversation, so only standalone queries are cached
+            cached, cache_key = self._lookup_cached_response(query, filters, top_k, conversation_context)
+            if cached is not None:
+                logging.info(f"Query answered from {cached['cache_hit']} cache")
+                return cached
             
-            if not search_results:
-                return self._create_empty_response(original_query)
-            
-            # Filter by similarity threshold (with bypass option for conversation context)
-            bypass_threshold = (conversation_context and 
-                               conversation_context.get('bypass_threshold', False))
-            
-            if bypass_threshold:
-                logging.info("Bypassing similarity threshold for conversation context")
-                filtered_results = search_results
-            else:
-                filtered_results = [
-                    result for result in search_results
-                    if result.get('similarity_score', 0) >= self.config.retrieval.similarity_threshold
-                ]
-            
-            if not filtered_results:
-                return self._create_empty_response(original_query)
-            
-            # Apply reranking if enabled and available
-            if self.reranker and self.config.retrieval.enable_reranking:
-                logging.info(f"Applying reranking to {len(filtered_results)} results")
-                reranked_results = self.reranker.rerank(
-                    query=query, 
-                    documents=filtered_results, 
-                    top_k=self.config.retrieval.rerank_top_k
-                )
-                pre_diversity_results = reranked_results
-            else:
-                # Take more results for diversity processing
-                pre_diversity_results = filtered_results
-            
-            # Apply source diversity scoring and selection
-            if self.enable_source_diversity:
-                top_results = self._apply_source_diversity_scoring(pre_diversity_results, top_k)
-            else:
-                top_results = pre_diversity_results[:top_k]
+            plan = self._retrieve_for_query(query, filters, top_k, conversation_context,
+                                            self._cached_query_embedding(cache_key))
+            if not plan['top_results']:
+                return self._create_empty_response(plan['original_query'])
             
             # Generate response using LLM with conversation context
             response = self._generate_llm_response(
-                query_for_llm, 
-                top_results, 
+                plan['query_for_llm'], 
+                plan['top_results'], 
                 conversation_context
             )
             
-            # Calculate confidence score (now includes diversity metrics)
-            confidence = self._calculate_confidence(top_results)
-            
-            # Calculate diversity metrics
-            diversity_metrics = self._calculate_diversity_metrics(top_results)
-            
-            # Prepare response with enhancement info
-            response_data = {
-                'query': original_query,
-                'response': response,
-                'confidence_score': confidence,
-                'confidence_level': 'high' if confidence > 0.8 else 'medium' if confidence > 0.5 else 'low',
-                'sources': self._format_sources(top_results),
-                'total_sources': len(top_results),
-                'diversity_metrics': diversity_metrics,
-                'timestamp': datetime.now().isoformat()
-            }
-            
-            # Add query enhancement information if available
-            if enhanced_query:
-                response_data['query_enhancement'] = {
-                    'intent_type': enhanced_query.intent.query_type.value,
-                    'intent_confidence': enhanced_query.intent.confidence,
-                    'keywords': enhanced_query.keywords,
-                    'expanded_queries': enhanced_query.expanded_queries,
-                    'reformulated_queries': enhanced_query.reformulated_queries,
-                    'total_variants': len(query_variants),
-                    'variant_performance': variant_performance,
-                    'best_variant': best_variant,
-                    'best_variant_score': best_variant_score,
-                    'query_used_for_llm': query_for_llm,
-                    'enhanced_query_used': query_for_llm != original_query
-                }
-            
-            # Add debugging logging as suggested in con_sug.md
-            logging.info(f"Query engine returning: response length={len(response)}, sources count={len(top_results)}")
-            
-            # Log query enhancement effectiveness
-            if enhanced_query and variant_performance:
-                logging.info(f"Query enhancement summary: {len(variant_performance)} variants tested, "
-                           f"best score: {best_variant_score:.3f}, "
-                           f"enhanced query used: {query_for_llm != original_query}")
-            
+            response_data = self._build_response_data(plan, response)
+            self._store_cached_response(query, cache_key, response_data, plan['top_results'])
             return response_data
             
         except Exception as e:
             raise RetrievalError(f"Query processing failed: {e}", details={'query': query})
     
+    def process_query_stream(self, query: str, filters: Dict[str, Any] = None,
+                             top_k: int = None, conversation_context: Dict[str, Any] = None
+                             ) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of process_query
+        
+        Yields events in order:
+            {'type': 'sources', ...}  sources and confidence, before any generation
+            {'type': 'token', 'text': ...}  answer text as the LLM produces it
+            {'type': 'done', ...}  the complete response, same shape as process_query
+        """
+        top_k = top_k or self.config.retrieval.top_k
+        
+        try:
+            cached, cache_key = self._lookup_cached_response(query, filters, top_k, conversation_context)
+            if cached is None:
+                plan = self._retrieve_for_query(query, filters, top_k, conversation_context,
+                                                self._cached_query_embedding(cache_key))
+        except Exception as e:
+            raise RetrievalError(f"Query processing failed: {e}", details={'query': query})
+        
+        if cached is None and not plan['top_results']:
+            cached = self._create_empty_response(plan['original_query'])
+        if cached is not None:
+            yield self._sources_event(cached)
+            yield {'type': 'token', 'text': cached['response']}
+            yield dict(cached, type='done')
+            return
+        
+        top_results = plan['top_results']
+        yield self._sources_event({
+            'sources': self._format_sources(top_results),
+            'total_sources': len(top_results),
+            'confidence_score': self._calculate_confidence(top_results)
+        })
+        
+        prompt = self._build_llm_prompt(plan['query_for_llm'], top_results, conversation_context)
+        parts = []
+        generation_failed = False
+        try:
+            for token in self.llm_client.generate_stream(prompt):
+                parts.append(token)
+                yield {'type': 'token', 'text': token}
+        except Exception as e:
+            logging.error(f"LLM streaming failed after {len(parts)} tokens: {e}")
+            generation_failed = True
+            if not parts:
+                parts.append(LLM_FAILURE_MESSAGE)
+                yield {'type': 'token', 'text': LLM_FAILURE_MESSAGE}
+        
+        response_data = self._build_response_data(plan, "".join(parts))
+        if not generation_failed:
+            self._store_cached_response(query, cache_key, response_data, top_results)
+        yield dict(response_data, type='done')
+    
+    @staticmethod
+    def _sources_event(response: Dict[str, Any]) -> Dict[str, Any]:
+        confidence = response.get('confidence_score', 0.0)
+        return {
+            'type': 'sources',
+            'sources': response.get('sources', []),
+            'total_sources': response.get('total_sources', 0),
+            'confidence_score': confidence,
+            'confidence_level': 'high' if confidence > 0.8 else 'medium' if confidence > 0.5 else 'low'
+        }
+    
+    def _lookup_cached_response(self, query: str, filters: Optional[Dict[str, Any]], top_k: int,
+                                conversation_context: Optional[Dict[str, Any]]
+                                ) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+        """(cached response or None, cache key); the key is None when the query is not cacheable"""
+        if self.query_cache is None or conversation_context:
+            return None, None
+        change_log = getattr(self.vector_store, 'change_log', None)
+        cache_key = {
+            'query': query,
+            'scope': self.query_cache.make_scope(filters, top_k),
+            'version': change_log.version if change_log is not None else 0,
+            'embedding': None
+        }
+        
+        def embed_query():
+            # Only reached on an exact-tier miss; the result is reused for retrieval and the cache entry
+            cache_key['embedding'] = self.embedder.embed_texts([query])[0]
+            return cache_key['embedding']
+        
+        cached = self.query_cache.get(query, cache_key['scope'], change_log, embed_query)
+        return cached, cache_key
+    
+    @staticmethod
+    def _cached_query_embedding(cache_key: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        """The query embedding computed for a semantic cache lookup, if any, keyed by query text"""
+        if cache_key is None or cache_key['embedding'] is None:
+            return None
+        return {cache_key['query']: cache_key['embedding']}
+    
+    def _store_cached_response(self, query: str, cache_key: Optional[Dict[str, Any]],
+                               response_data: Dict[str, Any], top_results: List[Dict[str, Any]]):
+        if cache_key is None:
+            return
+        doc_paths = [result.get('doc_path') for result in top_results]
+        self.query_cache.put(query, cache_key['scope'], response_data,
+                             None if None in doc_paths else doc_paths,
+                             cache_key['version'], cache_key['embedding'])
+    
+    def _retrieve_for_query(self, query: str, filters: Optional[Dict[str, Any]], top_k: int,
+                            conversation_context: Optional[Dict[str, Any]],
+                            known_embeddings: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Enhance, search, merge and select sources; everything process_query does before the LLM
+        
+        ``known_embeddings`` maps query texts already embedded (e.g. by the
+        cache lookup) to their vectors, so those variants are not embedded again.
+        """
+        # Handle conversation context if provided
+        if conversation_context and conversation_context.get('is_contextual', False):
+            logging.info(f"Processing contextual query with conversation awareness")
+            # For contextual queries, we might need to adjust the search strategy
+            # but keep the original query for response generation
+            original_query = conversation_context.get('original_query', query)
+        else:
+            original_query = query
+        
+        # Enhance query if enhancer is available
+        enhanced_query = None
+        query_variants = [(query, 1.0)]  # Default: original query with max confidence
+        
+        if self.query_enhancer:
+            try:
+                enhanced_query = self.query_enhancer.enhance_query(query)
+                query_variants = self.query_enhancer.get_all_query_variants(enhanced_query)
+                logging.info(f"Query enhanced: {len(query_variants)} variants generated")
+            except Exception as e:
+                logging.warning(f"Query enhancement failed, using original query: {e}")
+        
+        # Search with multiple query variants and track performance
+        all_results = []
+        best_variant = None
+        best_variant_score = 0
+        variant_performance = []
+        
+        # Embed the top 3 variants in one call and search them as a single batch
+        variants_to_search = query_variants[:3]
+        search_k = max(top_k * 3, 20) if self.enable_source_diversity else top_k
+        variant_results = self._search_query_texts(
+            [query_text for query_text, _ in variants_to_search], search_k,
+            known_embeddings=known_embeddings
+        )
+        
+        for (query_text, confidence), search_results in zip(variants_to_search, variant_results):
+            # Calculate variant performance score
+            if search_results:
+                variant_avg_score = sum(r.get('similarity_score', 0) for r in search_results) / len(search_results)
+                variant_performance.append({
+                    'query_text': query_text,
+                    'confidence': confidence,
+                    'avg_score': variant_avg_score,
+                    'result_count': len(search_results)
+                })
+                
+                # Track best performing variant
+                if variant_avg_score > best_variant_score:
+                    best_variant = query_text
+                    best_variant_score = variant_avg_score
+            
+            # Add confidence weighting to results
+            for result in search_results:
+                result['query_confidence'] = confidence
+                result['query_variant'] = query_text
+                # Adjust similarity score by query confidence
+                original_score = result.get('similarity_score', 0)
+                result['weighted_score'] = original_score * confidence
+            
+            all_results.extend(search_results)
+        
+        # Log variant performance for debugging
+        if variant_performance:
+            logging.info(f"Query variant performance: {variant_performance}")
+            logging.info(f"Best variant: '{best_variant}' (score: {best_variant_score:.3f})")
+        
+        # Determine which query to use for LLM context
+        # Use best variant if it's significantly better than original query
+        query_for_llm = original_query
+        if best_variant and best_variant_score > 0.7:
+            # Check if best variant is significantly better than original
+            original_variant_score = next(
+                (v['avg_score'] for v in variant_performance if v['query_text'] == original_query), 
+                0.0
+            )
+            
+            # If original query not in variants, use a reasonable baseline
+            if original_variant_score == 0.0:
+                # Use the lowest score as baseline for comparison
+                min_score = min(v['avg_score'] for v in variant_performance) if variant_performance else 0.0
+                original_variant_score = min_score * 0.8  # Assume original would be slightly worse
+            
+            if best_variant_score > original_variant_score * 1.2:  # 20% better threshold
+                query_for_llm = best_variant
+                logging.info(f"Using enhanced query for LLM: '{best_variant}' (score: {best_variant_score:.3f} vs original: {original_variant_score:.3f})")
+            else:
+                logging.info(f"Keeping original query for LLM (enhanced not significantly better)")
+        else:
+            logging.info(f"Best variant score too low ({best_variant_score:.3f}), using original query")
+        
+        # Deduplicate and merge results
+        search_results = self._merge_search_results(all_results)
+        
+        if not search_results:
+            return {'original_query': original_query, 'top_results': []}
+        
+        # Filter by similarity threshold (with bypass option for conversation context)
+        bypass_threshold = bool(conversation_context and 
+                                conversation_context.get('bypass_threshold', False))
+        
+        top_results = self._select_top_results(query, search_results, top_k, bypass_threshold)
+        if not top_results:
+            return {'original_query': original_query, 'top_results': []}
+        
+        return {
+            'original_query': original_query,
+            'query_for_llm': query_for_llm,
+            'top_results': top_results,
+            'enhanced_query': enhanced_query,
+            'query_variants': query_variants,
+            'variant_performance': variant_performance,
+            'best_variant': best_variant,
+            'best_variant_score': best_variant_score
+        }
+    
+    def _build_response_data(self, plan: Dict[str, Any], response: str) -> Dict[str, Any]:
+        """Assemble the process_query response for ``plan`` (from _retrieve_for_query) and the LLM answer"""
+        top_results = plan['top_results']
+        original_query = plan['original_query']
+        query_for_llm = plan['query_for_llm']
+        enhanced_query = plan['enhanced_query']
+        query_variants = plan['query_variants']
+        variant_performance = plan['variant_performance']
+        best_variant = plan['best_variant']
+        best_variant_score = plan['best_variant_score']
+        
+        # Calculate confidence score (now includes diversity metrics)
+        confidence = self._calculate_confidence(top_results)
+        
+        # Calculate diversity metrics
+        diversity_metrics = self._calculate_diversity_metrics(top_results)
+        
+        # Prepare response with enhancement info
+        response_data = {
+            'query': original_query,
+            'response': response,
+            'confidence_score': confidence,
+            'confidence_level': 'high' if confidence > 0.8 else 'medium' if confidence > 0.5 else 'low',
+            'sources': self._format_sources(top_results),
+            'total_sources': len(top_results),
+            'diversity_metrics': diversity_metrics,
+            'timestamp': datetime.now().isoformat()
+        }
+        
+        # Add query enhancement information if available
+        if enhanced_query:
+            response_data['query_enhancement'] = {
+                'intent_type': enhanced_query.intent.query_type.value,
+                'intent_confidence': enhanced_query.intent.confidence,
+                'keywords': enhanced_query.keywords,
+                'expanded_queries': enhanced_query.expanded_queries,
+                'reformulated_queries': enhanced_query.reformulated_queries,
+                'total_variants': len(query_variants),
+                'variant_performance': variant_performance,
+                'best_variant': best_variant,
+                'best_variant_score': best_variant_score,
+                'query_used_for_llm': query_for_llm,
+                'enhanced_query_used': query_for_llm != original_query
+            }
+        
+        # Add debugging logging as suggested in con_sug.md
+        logging.info(f"Query engine returning: response length={len(response)}, sources count={len(top_results)}")
+        
+        # Log query enhancement effectiveness
+        if enhanced_query and variant_performance:
+            logging.info(f"Query enhancement summary: {len(variant_performance)} variants tested, "
+                       f"best score: {best_variant_score:.3f}, "
+                       f"enhanced query used: {query_for_llm != original_query}")
+        
+        return response_data
+    
+    def retrieve_sources_batch(self, queries: List[str], top_k: int = None,
+                               filters: Dict[str, Any] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Retrieve formatted sources for several independent queries at once
+        
+        All queries are embedded in one call and searched as one batch. Each
+        query gets the same threshold, reranking and diversity selection as
+        process_query, without query enhancement or LLM response generation.
+        """
+        top_k = top_k or self.config.retrieval.top_k
+        if not queries:
+            return []
+        
+        try:
+            search_k = max(top_k * 3, 20) if self.enable_source_diversity else top_k
+            batch_results = self._search_query_texts(queries, search_k, filters)
+            
+            return [
+                self._format_sources(self._select_top_results(query, search_results, top_k))
+                for query, search_results in zip(queries, batch_results)
+            ]
+        except Exception as e:
+            raise RetrievalError(f"Batch retrieval failed: {e}", details={'queries': queries})
+    
+    def _search_query_texts(self, query_texts: List[str], k: int,
+                            filters: Dict[str, Any] = None,
+                            known_embeddings: Optional[Dict[str, Any]] = None) -> List[List[Dict[str, Any]]]:
+        """Embed query texts in one call (skipping those in ``known_embeddings``) and run one batched vector search"""
+        known_embeddings = known_embeddings or {}
+        missing = [text for text in query_texts if text not in known_embeddings]
+        embedded = dict(zip(missing, self.embedder.embed_texts(missing))) if missing else {}
+        query_embeddings = [known_embeddings.get(text, embedded.get(text)) for text in query_texts]
+        
+        if hasattr(self.vector_store, 'search_batch'):
+            if self.enable_source_diversity and self.diversity_similarity == 'embedding':
+                return self.vector_store.search_batch(query_embeddings, k=k, filters=filters, return_vectors=True)
+            return self.vector_store.search_batch(query_embeddings, k=k, filters=filters)
+        
+        # Vector stores without a batch API are searched one query at a time
+        return [
+            self.vector_store.search_with_metadata(query_vector=query_embedding, k=k)
+            for query_embedding in query_embeddings
+        ]
+    
+    def _select_top_results(self, query: str, search_results: List[Dict[str, Any]], top_k: int,
+                            bypass_threshold: bool = False) -> List[Dict[str, Any]]:
+        """Apply similarity threshold, reranking and source diversity to search results"""
+        if bypass_threshold:
+            logging.info("Bypassing similarity threshold for conversation context")
+            filtered_results = search_results
+        else:
+            filtered_results = [
+                result for result in search_results
+                if result.get('similarity_score', 0) >= self.config.retrieval.similarity_threshold
+            ]
+        
+        if not filtered_results:
+            return []
+        
+        # Apply reranking if enabled and available
+        if self.reranker and self.config.retrieval.enable_reranking:
+            logging.info(f"Applying reranking to {len(filtered_results)} results")
+            reranked_results = self.reranker.rerank(
+                query=query, 
+                documents=filtered_results, 
+                top_k=self.config.retrieval.rerank_top_k
+            )
+            pre_diversity_results = reranked_results
+        else:
+            # Take more results for diversity processing
+            pre_diversity_results = filtered_results
+        
+        # Apply source diversity scoring and selection
+        if self.enable_source_diversity:
+            return self._apply_source_diversity_scoring(pre_diversity_results, top_k)
+        return pre_diversity_results[:top_k]
+    
     def _generate_llm_response(self, query: str, sources: List[Dict[str, Any]], 
                               conversation_context: Optional[Dict[str, Any]] = None) -> str:
         """Generate response using LLM with retrieved sources and conversation context"""
+        prompt = self._build_llm_prompt(query, sources, conversation_context)
+        
+        try:
+            return self.llm_client.generate(prompt)
+        except Exception as e:
+            logging.error(f"LLM generation failed: {e}")
+            return LLM_FAILURE_MESSAGE
+    
+    def _build_llm_prompt(self, query: str, sources: List[Dict[str, Any]],
+                          conversation_context: Optional[Dict[str, Any]] = None) -> str:
+        """Prompt with the top sources as context and, for follow-ups, the recent conversation"""
         
         # Build context from sources with meaningful labels
         context_parts = []
@@ -335,11 +551,7 @@ Instructions:
 
 Answer:"""
         
-        try:
-            return self.llm_client.generate(prompt)
-        except Exception as e:
-            logging.error(f"LLM generation failed: {e}")
-            return "I apologize, but I'm unable to generate a response at the moment due to a technical issue."
+        return prompt
     
     def _get_source_label(self, source: Dict[str, Any], fallback_index: int) -> str:
         """Get the best available source label for a source with enhanced original path handling"""
@@ -554,25 +766,55 @@ Answer:"""
         # For now, return empty list
         return [] 
     
+    def get_cache_stats(self) -> Optional[Dict[str, Any]]:
+        """Query result cache statistics, or None when caching is off"""
+        return self.query_cache.get_stats() if self.query_cache is not None else None
+    
     def _apply_source_diversity_scoring(self, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
         """Apply comprehensive source diversity scoring and selection"""
         if not results:
             return results
         
-        # Step 1: Calculate diversity scores for all results
-        scored_results = self._calculate_diversity_scores(results)
-        
-        # Step 2: Apply diverse source selection algorithm
-        diverse_results = self._select_diverse_sources(scored_results, top_k)
+        # Cascade-pruned candidates have no rerank_score to compare with the reranked ones,
+        # so they only fill the slots the reranked results leave open
+        reranked = [result for result in results if not result.get('rerank_pruned')]
+        pruned = [result for result in results if result.get('rerank_pruned')]
+        diverse_results = self._select_diverse_results(reranked, top_k) if reranked else []
+        if pruned and len(diverse_results) < top_k:
+            diverse_results += self._select_diverse_results(pruned, top_k - len(diverse_results))
         
         logging.info(f"Source diversity applied: {len(results)} -> {len(diverse_results)} results")
         return diverse_results
     
+    def _select_diverse_results(self, results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+        """Score ``results`` for diversity and select up to ``top_k`` of them"""
+        # Step 1: Calculate diversity scores for all results
+        similarity, comparable = self._content_similarity_matrix(results)
+        scored_results = self._score_diversity(results, similarity, comparable)
+        order = sorted(range(len(scored_results)), key=lambda i: scored_results[i]['final_score'], reverse=True)
+        scored_results = [scored_results[i] for i in order]
+        
+        # Step 2: Apply diverse source selection algorithm
+        return self._select_diverse_sources(scored_results, top_k, similarity[np.ix_(order, order)])
+    
     def _calculate_diversity_scores(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """Calculate comprehensive diversity scores for each result"""
         if not results:
             return results
         
+        similarity, comparable = self._content_similarity_matrix(results)
+        scored_results = self._score_diversity(results, similarity, comparable)
+        
+        # Sort by final score (descending)
+        scored_results.sort(key=lambda x: x['final_score'], reverse=True)
+        
+        return scored_results
+    
+    def _score_diversity(self, results: List[Dict[str, Any]], similarity: np.ndarray,
+                         comparable: np.ndarray) -> List[Dict[str, Any]]:
+        """Diversity and final scores for each result, in input order"""
+        content_scores = self._content_diversity_scores(similarity, comparable)
+        
         # Analyze source distribution
         doc_counts = Counter()
         source_type_counts = Counter()
@@ -595,7 +837,7 @@ Answer:"""
         total_results = len(results)
         scored_results = []
         
-        for result in results:
+        for position, result in enumerate(results):
             # FIXED: Access fields directly, not through nested metadata
             doc_id = result.get('doc_id', 'unknown')
             source_type = result.get('source_type', 'unknown')
@@ -619,7 +861,7 @@ Answer:"""
             temporal_diversity_score = 1.0 - date_frequency
             
             # Content diversity score (based on text similarity)
-            content_diversity_score = self._calculate_content_diversity_score(result, results)
+            content_diversity_score = float(content_scores[position])
             
             # Combined diversity score (weighted average)
             diversity_score = (
@@ -636,8 +878,9 @@ Answer:"""
             # Combined final score (relevance + diversity)
             final_score = (relevance_score * (1 - self.diversity_weight)) + (diversity_score * self.diversity_weight)
             
-            # Add scores to result
+            # Add scores to result; search vectors are only needed for scoring
             result_copy = result.copy()
+            result_copy.pop('_vector', None)
             result_copy.update({
                 'diversity_score': diversity_score,
                 'doc_diversity_score': doc_diversity_score,
@@ -651,70 +894,75 @@ Answer:"""
             
             scored_results.append(result_copy)
         
-        # Sort by final score (descending)
-        scored_results.sort(key=lambda x: x['final_score'], reverse=True)
-        
         return scored_results
     
-    def _calculate_content_diversity_score(self, target_result: Dict[str, Any], all_results: List[Dict[str, Any]]) -> float:
-        """Calculate content diversity score based on text similarity with other results"""
-        target_text = target_result.get('text', '')
-        if not target_text:
-            return 0.5  # Neutral score for missing text
-        
-        # Calculate similarity with other results
-        similarities = []
-        for other_result in all_results:
-            if other_result == target_result:
-                continue
-            
-            other_text = other_result.get('text', '')
-            if not other_text:
-                continue
-            
-            # Simple text similarity (could be enhanced with embeddings)
-            similarity = self._calculate_text_similarity(target_text, other_text)
-            similarities.append(similarity)
-        
-        if not similarities:
-            return 1.0  # Maximum diversity if no other results
-        
-        # Diversity is inverse of average similarity
-        avg_similarity = sum(similarities) / len(similarities)
-        content_diversity = 1.0 - avg_similarity
-        
-        return max(0.0, min(1.0, content_diversity))
-    
-    def _calculate_text_similarity(self, text1: str, text2: str) -> float:
-        """Calculate simple text similarity using word overlap"""
-        if not text1 or not text2:
-            return 0.0
+    def _content_similarity_matrix(self, results: List[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+        """Pairwise content similarity of the results, plus which results can be compared.
         
-        # Simple word-based similarity
-        words1 = set(text1.lower().split())
-        words2 = set(text2.lower().split())
+        Uses cosine similarity of the search vectors when every result
+        carries one and ``diversity_similarity`` is "embedding"; otherwise
+        the Jaccard overlap of lower-cased word sets, tokenized once per
+        result and computed as one incidence-matrix product.
+        """
+        n = len(results)
+        vectors = [result.get('_vector') for result in results]
+        if self.diversity_similarity == 'embedding' and n and all(v is not None for v in vectors):
+            matrix = np.asarray(vectors, dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            matrix = matrix / np.where(norms > 0, norms, 1.0)
+            return matrix @ matrix.T, np.ones(n, dtype=bool)
         
-        if not words1 or not words2:
-            return 0.0
+        texts = [result.get('text', '') or '' for result in results]
+        vocabulary = {}
+        rows, cols = [], []
+        for row, text in enumerate(texts):
+            for word in set(text.lower().split()):
+                rows.append(row)
+                cols.append(vocabulary.setdefault(word, len(vocabulary)))
         
-        intersection = len(words1.intersection(words2))
-        union = len(words1.union(words2))
+        incidence = np.zeros((n, len(vocabulary)), dtype=np.float32)
+        incidence[rows, cols] = 1.0
+        intersection = incidence @ incidence.T
+        sizes = incidence.sum(axis=1)
+        union = sizes[:, None] + sizes[None, :] - intersection
+        similarity = np.divide(intersection, union, out=np.zeros_like(intersection), where=union > 0)
+        return similarity, np.array([bool(text) for text in texts], dtype=bool)
+    
+    @staticmethod
+    def _content_diversity_scores(similarity: np.ndarray, comparable: np.ndarray) -> np.ndarray:
+        """Per result: 1 - mean similarity to the other comparable results"""
+        n = len(comparable)
+        mask = np.logical_and.outer(comparable, comparable)
+        np.fill_diagonal(mask, False)
+        counts = mask.sum(axis=1)
+        totals = np.where(mask, similarity, 0.0).sum(axis=1)
         
-        return intersection / union if union > 0 else 0.0
+        scores = np.ones(n)  # Maximum diversity if there is nothing to compare with
+        has_others = counts > 0
+        scores[has_others] = np.clip(1.0 - totals[has_others] / counts[has_others], 0.0, 1.0)
+        scores[~comparable] = 0.5  # Neutral score for missing text
+        return scores
     
-    def _select_diverse_sources(self, scored_results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
-        """Select diverse sources using advanced selection algorithm"""
+    def _select_diverse_sources(self, scored_results: List[Dict[str, Any]], top_k: int,
+                                similarity: Optional[np.ndarray] = None) -> List[Dict[str, Any]]:
+        """Select diverse sources using advanced selection algorithm
+        
+        ``similarity`` is the content similarity matrix aligned with
+        ``scored_results``; when given, remaining slots are filled by maximal
+        marginal relevance instead of plain score order.
+        """
         if not scored_results or top_k <= 0:
             return []
         
         selected = []
+        chosen = np.zeros(len(scored_results), dtype=bool)
         seen_docs = set()
         seen_source_types = set()
         seen_authors = set()
         doc_chunk_counts = defaultdict(int)
         
         # Phase 1: Prioritize diverse sources (ensure at least one from each document/type)
-        for result in scored_results:
+        for position, result in enumerate(scored_results):
             if len(selected) >= top_k:
                 break
             
@@ -747,26 +995,48 @@ Answer:"""
             
             if should_select:
                 selected.append(result)
+                chosen[position] = True
                 doc_chunk_counts[doc_id] += 1
         
         # Phase 2: Fill remaining slots with best remaining results
         remaining_slots = top_k - len(selected)
         if remaining_slots > 0:
-            remaining_results = [r for r in scored_results if r not in selected]
+            # Only documents under the chunk limit are eligible for remaining slots
+            candidates = [
+                position for position in np.flatnonzero(~chosen)
+                if doc_chunk_counts[scored_results[position].get('doc_id', 'unknown')] < self.max_chunks_per_doc
+            ]
             
-            # Apply stricter diversity constraints for remaining slots
-            for result in remaining_results:
-                if remaining_slots <= 0:
-                    break
-                
-                # FIXED: Access fields directly, not through nested metadata
-                doc_id = result.get('doc_id', 'unknown')
-                
-                # Only add if document is under chunk limit
-                if doc_chunk_counts[doc_id] < self.max_chunks_per_doc:
-                    selected.append(result)
+            if similarity is None:
+                for position in candidates:
+                    if remaining_slots <= 0:
+                        break
+                    doc_id = scored_results[position].get('doc_id', 'unknown')
+                    if doc_chunk_counts[doc_id] < self.max_chunks_per_doc:
+                        selected.append(scored_results[position])
+                        chosen[position] = True
+                        doc_chunk_counts[doc_id] += 1
+                        remaining_slots -= 1
+            else:
+                final_scores = np.array([r.get('final_score', 0) for r in scored_results], dtype=np.float64)
+                # Highest similarity of each result to anything already selected
+                redundancy = (similarity[:, chosen].max(axis=1) if chosen.any()
+                              else np.zeros(len(scored_results)))
+                candidates = np.array(candidates, dtype=np.int64)
+                while remaining_slots > 0 and len(candidates):
+                    mmr = ((1 - self.diversity_weight) * final_scores[candidates]
+                           - self.diversity_weight * redundancy[candidates])
+                    best = int(np.argmax(mmr))
+                    position = int(candidates[best])
+                    candidates = np.delete(candidates, best)
+                    doc_id = scored_results[position].get('doc_id', 'unknown')
+                    if doc_chunk_counts[doc_id] >= self.max_chunks_per_doc:
+                        continue
+                    selected.append(scored_results[position])
+                    chosen[position] = True
                     doc_chunk_counts[doc_id] += 1
                     remaining_slots -= 1
+                    redundancy = np.maximum(redundancy, similarity[:, position])
         
         # Phase 3: Final ranking by combined score
         selected.sort(key=lambda x: x.get('final_score', 0), reverse=True)
@@ -2,17 +2,16 @@
 Query Enhancer
 Advanced query processing, expansion, and reformulation for better retrieval
 """
+import importlib.util
 import logging
 import re
 from typing import List, Dict, Any, Optional, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
-try:
-    from sentence_transformers import SentenceTransformer
-    SENTENCE_TRANSFORMERS_AVAILABLE = True
-except ImportError:
-    SENTENCE_TRANSFORMERS_AVAILABLE = False
+# Models load through the shared registry; only check that the package is installed
+SENTENCE_TRANSFORMERS_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not SENTENCE_TRANSFORMERS_AVAILABLE:
     logging.warning("sentence-transformers not available. Query enhancement will use fallback.")
 
 try:
@@ -24,6 +23,11 @@ except ImportError:
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from core.error_handling import QueryError
 
+try:
+    from ..core.model_memory_manager import get_shared_sentence_transformer
+except ImportError:
+    from core.model_memory_manager import get_shared_sentence_transformer
+
 class QueryType(Enum):
     """Types of queries for different processing strategies"""
     FACTUAL = "factual"           # What is X? Define Y
@@ -136,7 +140,7 @@ class QueryEnhancer:
     def _initialize_model(self):
         """Initialize the sentence transformer model for semantic processing"""
         try:
-            self.model = SentenceTransformer(self.model_name)
+            self.model = get_shared_sentence_transformer(self.model_name)
             logging.info(f"Query enhancer initialized with model: {self.model_name}")
         except Exception as e:
             logging.error(f"Failed to initialize query enhancer: {e}")
@@ -2,15 +2,17 @@
 Reranker Module
 Cross-encoder based reranking for improved retrieval relevance
 """
+import hashlib
+import importlib.util
 import logging
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Tuple, Optional
 import numpy as np
 
-try:
-    from sentence_transformers import CrossEncoder
-    CROSS_ENCODER_AVAILABLE = True
-except ImportError:
-    CROSS_ENCODER_AVAILABLE = False
+# Models load through the shared registry; only check that the package is installed
+CROSS_ENCODER_AVAILABLE = importlib.util.find_spec("sentence_transformers") is not None
+if not CROSS_ENCODER_AVAILABLE:
     logging.warning("sentence-transformers not available. Reranking will be disabled.")
 
 try:
@@ -22,15 +24,79 @@ except ImportError:
     sys.path.insert(0, str(Path(__file__).parent.parent))
     from core.error_handling import RetrievalError
 
+try:
+    from ..core.model_memory_manager import get_shared_cross_encoder
+except ImportError:
+    from core.model_memory_manager import get_shared_cross_encoder
+
+class RerankScoreCache:
+    """LRU cache of cross-encoder scores keyed by (model, query hash, chunk key)"""
+    
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max(1, max_entries)
+        self._scores: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def query_key(query: str) -> str:
+        return hashlib.sha1(query.encode('utf-8')).hexdigest()
+    
+    def get_many(self, keys: List[Tuple[str, str, str]]) -> List[Optional[float]]:
+        with self._lock:
+            scores = []
+            for key in keys:
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                scores.append(score)
+            found = sum(score is not None for score in scores)
+            self.hits += found
+            self.misses += len(keys) - found
+            return scores
+    
+    def put_many(self, items: List[Tuple[Tuple[str, str, str], float]]):
+        with self._lock:
+            for key, score in items:
+                self._scores[key] = score
+                self._scores.move_to_end(key)
+            while len(self._scores) > self.max_entries:
+                self._scores.popitem(last=False)
+    
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'cache_entries': len(self._scores),
+            'cache_max_entries': self.max_entries,
+            'cache_hits': self.hits,
+            'cache_misses': self.misses,
+            'cache_hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+
 class Reranker:
-    """Cross-encoder based reranker for improving retrieval relevance"""
+    """Cross-encoder based reranker for improving retrieval relevance
+    
+    Pair scores are cached per model, so re-ranking a chunk for a query
+    seen recently costs nothing. With ``cascade_model_name`` a cheaper
+    cross-encoder (distilled or quantized) scores every candidate first and
+    only the best ``cascade_keep`` go through the full model.
+    """
     
     def __init__(self, model_name: str = "cross-encoder/ms-marco-MiniLM-L6-v2", 
-                 device: str = "cpu", batch_size: int = 32):
+                 device: str = "cpu", batch_size: int = 32, cache_size: int = 10000,
+                 max_tokens: int = 0, cascade_model_name: Optional[str] = None,
+                 cascade_keep: int = 20):
         self.model_name = model_name
         self.device = device
         self.batch_size = batch_size
         self.model = None
+        self.cascade_model_name = cascade_model_name or None
+        self.cascade_model = None
+        self.cascade_keep = max(1, cascade_keep)
+        self.max_tokens = max_tokens  # 0: use the model's own limit
+        self.score_cache = RerankScoreCache(cache_size) if cache_size > 0 else None
         self.enabled = CROSS_ENCODER_AVAILABLE
         
         if self.enabled:
@@ -39,13 +105,34 @@ class Reranker:
             logging.warning("Reranker disabled due to missing dependencies")
     
     def _initialize_model(self):
-        """Initialize the cross-encoder model"""
+        """Register the cross-encoder(s) with the shared model registry; they load on first rerank"""
         try:
-            self.model = CrossEncoder(self.model_name, device=self.device)
+            self.model = get_shared_cross_encoder(self.model_name, device=self.device)
             logging.info(f"Reranker initialized with model: {self.model_name}")
         except Exception as e:
             logging.error(f"Failed to initialize reranker: {e}")
             self.enabled = False
+            return
+        
+        if self.cascade_model_name:
+            self.cascade_model = get_shared_cross_encoder(self.cascade_model_name, device=self.device)
+            logging.info(f"Reranker cascade first pass: {self.cascade_model_name}")
+    
+    def _truncate(self, text: str) -> str:
+        """Cut text to ``max_tokens`` words; every word is at least one token, so nothing the model sees is lost"""
+        if not self.max_tokens:
+            self.max_tokens = getattr(self.model, 'max_length', None) or 512
+        words = text.split(maxsplit=self.max_tokens)
+        if len(words) <= self.max_tokens:
+            return text
+        return " ".join(words[:self.max_tokens])
+    
+    @staticmethod
+    def _chunk_key(doc: Dict[str, Any], text: str) -> str:
+        chunk_id = doc.get('chunk_id', doc.get('vector_id'))
+        if chunk_id is not None and chunk_id != 'unknown':
+            return str(chunk_id)
+        return hashlib.sha1(text.encode('utf-8')).hexdigest()
     
     def rerank(self, query: str, documents: List[Dict[str, Any]], 
                top_k: Optional[int] = None) -> List[Dict[str, Any]]:
@@ -73,23 +160,46 @@ class Reranker:
                     text = str(doc.get('metadata', {}).get('content', ''))
                 doc_texts.append(text)
             
-            # Create query-document pairs
-            pairs = [(query, text) for text in doc_texts]
+            doc_texts = [self._truncate(text) for text in doc_texts]
+            chunk_keys = [self._chunk_key(doc, text) for doc, text in zip(documents, doc_texts)]
+            
+            # Cascade: a cheap first pass decides which candidates the full model scores
+            candidates = list(range(len(documents)))
+            pruned = []
+            if self.cascade_model is not None and len(documents) > self.cascade_keep:
+                try:
+                    cheap_scores = self._cached_scores(self.cascade_model, self.cascade_model_name, query,
+                                                       doc_texts, chunk_keys, candidates)
+                    order = sorted(candidates, key=lambda i: cheap_scores[i], reverse=True)
+                    candidates, pruned = order[:self.cascade_keep], order[self.cascade_keep:]
+                except Exception as e:
+                    logging.warning(f"Cascade model {self.cascade_model_name} unavailable, using single pass: {e}")
+                    self.cascade_model.release()
+                    self.cascade_model = None
             
             # Get relevance scores from cross-encoder
-            scores = self._predict_scores(pairs)
+            scores = self._cached_scores(self.model, self.model_name, query, doc_texts, chunk_keys, candidates)
             
             # Add rerank scores to documents and sort
             reranked_docs = []
-            for doc, score in zip(documents, scores):
-                doc_copy = doc.copy()
-                doc_copy['rerank_score'] = float(score)
-                doc_copy['original_score'] = doc.get('similarity_score', doc.get('score', 0))
+            for i in candidates:
+                doc_copy = documents[i].copy()
+                doc_copy['rerank_score'] = float(scores[i])
+                doc_copy['original_score'] = documents[i].get('similarity_score', documents[i].get('score', 0))
                 reranked_docs.append(doc_copy)
             
             # Sort by rerank score (descending)
             reranked_docs.sort(key=lambda x: x['rerank_score'], reverse=True)
             
+            # Pruned candidates follow in first-pass order without a rerank_score: the cheap
+            # model's scores are on a different scale, so they are kept as cascade_score
+            for i in pruned:
+                doc_copy = documents[i].copy()
+                doc_copy['cascade_score'] = float(cheap_scores[i])
+                doc_copy['original_score'] = documents[i].get('similarity_score', documents[i].get('score', 0))
+                doc_copy['rerank_pruned'] = True
+                reranked_docs.append(doc_copy)
+            
             # Return top_k results
             result = reranked_docs[:top_k] if top_k else reranked_docs
             
@@ -101,9 +211,33 @@ class Reranker:
             # Fallback to original ranking
             return documents[:top_k] if top_k else documents
     
-    def _predict_scores(self, pairs: List[Tuple[str, str]]) -> List[float]:
+    def _cached_scores(self, model, model_name: str, query: str, doc_texts: List[str],
+                       chunk_keys: List[str], positions: List[int]) -> Dict[int, float]:
+        """Scores for ``positions`` from ``model``, predicting only pairs missing from the cache"""
+        scores = {}
+        misses = positions
+        if self.score_cache is not None:
+            query_key = RerankScoreCache.query_key(query)
+            keys = {i: (model_name, query_key, chunk_keys[i]) for i in positions}
+            cached = self.score_cache.get_many([keys[i] for i in positions])
+            misses = []
+            for i, score in zip(positions, cached):
+                if score is None:
+                    misses.append(i)
+                else:
+                    scores[i] = score
+        
+        if misses:
+            predicted = self._predict_scores([(query, doc_texts[i]) for i in misses], model)
+            scores.update(zip(misses, predicted))
+            if self.score_cache is not None:
+                self.score_cache.put_many([(keys[i], score) for i, score in zip(misses, predicted)])
+        return scores
+    
+    def _predict_scores(self, pairs: List[Tuple[str, str]], model=None) -> List[float]:
         """Predict relevance scores for query-document pairs"""
-        if not self.model:
+        model = model or self.model
+        if not model:
             return [0.0] * len(pairs)
         
         try:
@@ -111,14 +245,14 @@ class Reranker:
             all_scores = []
             for i in range(0, len(pairs), self.batch_size):
                 batch_pairs = pairs[i:i + self.batch_size]
-                batch_scores = self.model.predict(batch_pairs)
-                all_scores.extend(batch_scores.tolist())
+                batch_scores = model.predict(batch_pairs)
+                all_scores.extend(np.asarray(batch_scores, dtype=np.float32).tolist())
             
             return all_scores
             
         except Exception as e:
-            logging.error(f"Score prediction failed: {e}")
-            return [0.0] * len(pairs)
+            # Raised rather than zero-filled so failed predictions never enter the score cache
+            raise RetrievalError(f"Score prediction failed: {e}")
     
     def get_model_info(self) -> Dict[str, Any]:
         """Get information about the reranker model"""
@@ -126,6 +260,10 @@ class Reranker:
             'model_name': self.model_name,
             'device': self.device,
             'batch_size': self.batch_size,
+            'max_tokens': self.max_tokens,
+            'cascade_model_name': self.cascade_model_name if self.cascade_model is not None else None,
+            'cascade_keep': self.cascade_keep,
+            'score_cache': self.score_cache.get_stats() if self.score_cache is not None else None,
             'enabled': self.enabled,
             'available': CROSS_ENCODER_AVAILABLE
         }
@@ -183,10 +321,15 @@ def create_reranker(config_manager) -> Reranker:
         return FallbackReranker()
     
     try:
+        retrieval = config.retrieval
         return Reranker(
-            model_name="cross-encoder/ms-marco-MiniLM-L6-v2",
+            model_name=retrieval.rerank_model,
             device="cpu",  # Can be configured later
-            batch_size=32
+            batch_size=retrieval.rerank_batch_size,
+            cache_size=retrieval.rerank_cache_size,
+            max_tokens=retrieval.rerank_max_tokens,
+            cascade_model_name=retrieval.rerank_cascade_model or None,
+            cascade_keep=retrieval.rerank_cascade_keep
         )
     except Exception as e:
         logging.warning(f"Failed to create reranker, using fallback: {e}")
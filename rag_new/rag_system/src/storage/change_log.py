@@ -0,0 +1,54 @@
+"""
+Document Change Log
+In-process version counter for a vector store, remembering which documents each mutation touched
+"""
+import threading
+from collections import deque
+from typing import Iterable, Optional, Set
+
+
+class DocumentChangeLog:
+    """Monotonic store version plus the doc paths changed at each version.
+    
+    Readers that cached something derived from the store (e.g. query
+    answers) remember the version they saw and later ask which documents
+    changed since then. ``None`` means "unknown": the mutation could not be
+    attributed to documents, or the history has been trimmed.
+    """
+    
+    def __init__(self, max_history: int = 10000):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._history = deque(maxlen=max_history)  # (version, frozenset of doc paths or None)
+    
+    @property
+    def version(self) -> int:
+        return self._version
+    
+    def record(self, doc_paths: Optional[Iterable[Optional[str]]] = None) -> int:
+        """Bump the version for a mutation of ``doc_paths`` (None: unknown documents)"""
+        changed = None
+        if doc_paths is not None:
+            changed = frozenset(doc_paths)
+            if None in changed:
+                changed = None
+        with self._lock:
+            self._version += 1
+            self._history.append((self._version, changed))
+            return self._version
+    
+    def changes_since(self, version: int) -> Optional[Set[str]]:
+        """Doc paths changed after ``version``; None if that cannot be determined"""
+        with self._lock:
+            if version >= self._version:
+                return set()
+            if not self._history or self._history[0][0] > version + 1:
+                return None
+            changed = set()
+            for entry_version, doc_paths in reversed(self._history):
+                if entry_version <= version:
+                    break
+                if doc_paths is None:
+                    return None
+                changed.update(doc_paths)
+            return changed
@@ -0,0 +1,120 @@
+"""
+FAISS Vector ID Map
+Bidirectional FAISS position <-> vector ID mapping backed by NumPy int64 arrays
+"""
+import numpy as np
+from typing import Dict, Iterator, Optional, Tuple, Iterable
+
+
+class VectorIdMap:
+    """Maps FAISS index positions to vector IDs and back in O(1).
+    
+    ``position -> id`` and ``id -> position`` are both dense int64 arrays
+    (``-1`` marks an empty slot) that grow geometrically, so lookups,
+    masked gathers and compaction are vectorized instead of dict scans.
+    The read API mirrors the ``{position: vector_id}`` dict it replaces.
+    """
+    
+    EMPTY = -1
+    
+    def __init__(self, position_ids: Optional[np.ndarray] = None):
+        self._position_ids = np.full(0, self.EMPTY, dtype=np.int64)
+        self._id_positions = np.full(0, self.EMPTY, dtype=np.int64)
+        self._size = 0
+        if position_ids is not None and len(position_ids):
+            self.assign(0, position_ids)
+    
+    @classmethod
+    def from_dict(cls, index_to_id: Dict[int, int]) -> 'VectorIdMap':
+        """Build from the legacy ``{position: vector_id}`` dict"""
+        id_map = cls()
+        if index_to_id:
+            position_ids = np.full(max(index_to_id) + 1, cls.EMPTY, dtype=np.int64)
+            position_ids[np.fromiter(index_to_id.keys(), dtype=np.int64)] = np.fromiter(index_to_id.values(), dtype=np.int64)
+            id_map.assign(0, position_ids)
+        return id_map
+    
+    @staticmethod
+    def _grown(array: np.ndarray, min_size: int) -> np.ndarray:
+        if min_size <= len(array):
+            return array
+        grown = np.full(max(min_size, 2 * len(array), 1024), VectorIdMap.EMPTY, dtype=np.int64)
+        grown[:len(array)] = array
+        return grown
+    
+    def assign(self, start: int, vector_ids: Iterable[int]):
+        """Map positions ``start, start + 1, ...`` to ``vector_ids``"""
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        if not len(vector_ids):
+            return
+        end = start + len(vector_ids)
+        self._position_ids = self._grown(self._position_ids, end)
+        
+        # Forget the reverse entries of any IDs being overwritten
+        replaced = self._position_ids[start:end]
+        replaced = replaced[replaced >= 0]
+        if len(replaced):
+            self._id_positions[replaced] = self.EMPTY
+        
+        self._position_ids[start:end] = vector_ids
+        valid = vector_ids >= 0
+        if valid.any():
+            self._id_positions = self._grown(self._id_positions, int(vector_ids[valid].max()) + 1)
+            self._id_positions[vector_ids[valid]] = np.arange(start, end, dtype=np.int64)[valid]
+        self._size = max(self._size, end)
+    
+    def __setitem__(self, position: int, vector_id: int):
+        self.assign(position, [vector_id])
+    
+    def get(self, position: int, default=None) -> Optional[int]:
+        if 0 <= position < self._size:
+            vector_id = self._position_ids[position]
+            if vector_id >= 0:
+                return int(vector_id)
+        return default
+    
+    def __getitem__(self, position: int) -> int:
+        vector_id = self.get(position)
+        if vector_id is None:
+            raise KeyError(position)
+        return vector_id
+    
+    def __contains__(self, position: int) -> bool:
+        return self.get(position) is not None
+    
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.position_ids >= 0))
+    
+    def items(self) -> Iterator[Tuple[int, int]]:
+        positions = np.flatnonzero(self.position_ids >= 0)
+        return zip(positions.tolist(), self._position_ids[positions].tolist())
+    
+    def values(self) -> Iterator[int]:
+        return (vector_id for _, vector_id in self.items())
+    
+    @property
+    def position_ids(self) -> np.ndarray:
+        """``position -> vector ID`` view (``-1`` for empty slots)"""
+        return self._position_ids[:self._size]
+    
+    def position_of(self, vector_id: int) -> Optional[int]:
+        if 0 <= vector_id < len(self._id_positions):
+            position = self._id_positions[vector_id]
+            if position >= 0:
+                return int(position)
+        return None
+    
+    def positions_of(self, vector_ids: Iterable[int]) -> np.ndarray:
+        """Vectorized ``position_of``; ``-1`` for IDs that are not indexed"""
+        vector_ids = np.asarray(vector_ids, dtype=np.int64)
+        positions = np.full(len(vector_ids), self.EMPTY, dtype=np.int64)
+        known = (vector_ids >= 0) & (vector_ids < len(self._id_positions))
+        positions[known] = self._id_positions[vector_ids[known]]
+        return positions
+    
+    def copy(self) -> 'VectorIdMap':
+        return VectorIdMap(self.position_ids.copy())
+    
+    def to_array(self) -> np.ndarray:
+        """Compact ``position -> vector ID`` array for persistence"""
+        return self.position_ids.copy()
@@ -0,0 +1,99 @@
+"""
+FAISS Metadata Index
+In-memory inverted index from metadata field values to vector IDs
+"""
+from typing import Dict, Any, Iterable, Optional, Set, Tuple
+
+
+class MetadataIndex:
+    """Inverted index ``field -> value -> {vector_id}`` over live (non-deleted) vectors.
+    
+    Only the configured fields with hashable values are indexed. ``lookup``
+    resolves equality filters by intersecting posting sets and returns
+    ``None`` when a filter cannot be answered from the index, so callers can
+    fall back to scanning or post-filtering.
+    """
+    
+    DEFAULT_FIELDS = (
+        'doc_path', 'file_path', 'original_path', 'filename',
+        'source_type', 'doc_id', 'file_hash', 'doc_hash'
+    )
+    
+    def __init__(self, fields: Iterable[str] = DEFAULT_FIELDS):
+        self.fields = tuple(fields)
+        self._postings: Dict[str, Dict[Any, Set[int]]] = {field: {} for field in self.fields}
+    
+    @staticmethod
+    def _is_indexable(value: Any) -> bool:
+        if value is None:
+            return False
+        try:
+            hash(value)
+        except TypeError:
+            return False
+        return True
+    
+    @staticmethod
+    def _is_live(metadata: Optional[Dict[str, Any]]) -> bool:
+        return bool(metadata) and not metadata.get('deleted', False)
+    
+    def add(self, vector_id: int, metadata: Optional[Dict[str, Any]]):
+        """Index a vector's metadata (ignored for deleted vectors)"""
+        if not self._is_live(metadata):
+            return
+        for field in self.fields:
+            value = metadata.get(field)
+            if self._is_indexable(value):
+                self._postings[field].setdefault(value, set()).add(vector_id)
+    
+    def remove(self, vector_id: int, metadata: Optional[Dict[str, Any]]):
+        """Drop a vector using the metadata it was indexed with"""
+        if not metadata:
+            return
+        for field in self.fields:
+            value = metadata.get(field)
+            if not self._is_indexable(value):
+                continue
+            postings = self._postings[field].get(value)
+            if postings is not None:
+                postings.discard(vector_id)
+                if not postings:
+                    del self._postings[field][value]
+    
+    def update(self, vector_id: int, old_metadata: Optional[Dict[str, Any]],
+               new_metadata: Optional[Dict[str, Any]]):
+        self.remove(vector_id, old_metadata)
+        self.add(vector_id, new_metadata)
+    
+    def rebuild(self, entries: Iterable[Tuple[int, Dict[str, Any]]]):
+        """Re-index every ``(vector_id, metadata)`` pair from scratch"""
+        self._postings = {field: {} for field in self.fields}
+        for vector_id, metadata in entries:
+            self.add(vector_id, metadata)
+    
+    def can_resolve(self, filters: Dict[str, Any]) -> bool:
+        """True if every filter is an equality on an indexed field"""
+        return bool(filters) and all(
+            key in self._postings and self._is_indexable(value)
+            for key, value in filters.items()
+        )
+    
+    def lookup(self, filters: Dict[str, Any]) -> Optional[Set[int]]:
+        """IDs of live vectors matching all ``filters``; None if the index can't answer"""
+        if not self.can_resolve(filters):
+            return None
+        
+        # Intersect smallest posting set first
+        postings = sorted(
+            (self._postings[key].get(value, set()) for key, value in filters.items()),
+            key=len
+        )
+        result = set(postings[0])
+        for posting in postings[1:]:
+            if not result:
+                break
+            result &= posting
+        return result
+    
+    def get_stats(self) -> Dict[str, int]:
+        return {f"{field}_values": len(values) for field, values in self._postings.items()}
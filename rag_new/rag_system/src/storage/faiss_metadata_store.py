@@ -0,0 +1,540 @@
+"""
+FAISS Columnar Metadata Store
+Memory-compact replacement for the per-vector metadata dicts held by FAISSStore
+"""
+import mmap
+import threading
+from bisect import bisect_right
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class StringHeap:
+    """Append-only UTF-8 heap addressed by ``(offset, length)``.
+    
+    New strings go to an in-memory tail. ``seal`` freezes the tail into an
+    immutable segment so a snapshot can write it out off-lock, and
+    ``attach`` swaps the sealed segments for a read-only mmap of the file
+    they were written to, moving chunk text out of the Python heap.
+    """
+    
+    def __init__(self, base: Optional[Any] = None, base_size: int = 0):
+        # (segment start offsets, segment buffers); replaced as a whole so
+        # readers always see a consistent pair
+        self._segments: Tuple[Tuple[int, ...], Tuple[Any, ...]] = ((0,), (base,)) if base_size else ((), ())
+        self._tail = bytearray()
+        self._tail_start = base_size
+        self._segments_lock = threading.Lock()
+    
+    @property
+    def size(self) -> int:
+        return self._tail_start + len(self._tail)
+    
+    def append(self, text: str) -> Tuple[int, int]:
+        data = text.encode('utf-8')
+        offset = self.size
+        self._tail += data
+        return offset, len(data)
+    
+    def get(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ''
+        if offset >= self._tail_start:
+            start = offset - self._tail_start
+            return self._tail[start:start + length].decode('utf-8')
+        starts, buffers = self._segments
+        segment = bisect_right(starts, offset) - 1
+        start = offset - starts[segment]
+        return bytes(buffers[segment][start:start + length]).decode('utf-8')
+    
+    def seal(self) -> Tuple[Tuple[Any, ...], int]:
+        """Freeze the tail; returns immutable buffers covering ``[0, size)`` and that size"""
+        with self._segments_lock:
+            if self._tail:
+                starts, buffers = self._segments
+                self._segments = (starts + (self._tail_start,), buffers + (bytes(self._tail),))
+                self._tail_start += len(self._tail)
+                self._tail = bytearray()
+            return self._segments[1], self._tail_start
+    
+    def attach(self, buffer: Any, size: int):
+        """Serve ``[0, size)`` from ``buffer`` (e.g. an mmap of the sealed segments)"""
+        with self._segments_lock:
+            starts, buffers = self._segments
+            keep = bisect_right(starts, size - 1) if size else 0
+            if keep < len(starts) and starts[keep] != size:
+                raise ValueError(f"Heap size {size} is not a sealed segment boundary")
+            self._segments = ((0,) + starts[keep:], (buffer,) + buffers[keep:])
+    
+    @staticmethod
+    def map_file(path) -> Optional[mmap.mmap]:
+        """Read-only mmap of a heap file (None for an empty file)"""
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            if f.tell() == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class ColumnarMetadataStore:
+    """``{vector_id: metadata}`` mapping stored column-wise instead of one dict per vector.
+    
+    Vector IDs index the rows directly. ``text`` / ``content`` live in a
+    ``StringHeap`` (``content`` costs nothing when it duplicates ``text``),
+    file-level fields are interned in a per-document table shared by every
+    chunk of a file, hot scalars and ISO timestamps sit in typed NumPy
+    arrays, and whatever is left is kept in a small per-row dict. Reads
+    rebuild the same flat dict that was stored, so callers see no change.
+    
+    Rows are treated as immutable: assigning a vector's metadata replaces
+    the row, which keeps ``capture`` copies stable once taken.
+    """
+    
+    DOCUMENT_FIELDS = (
+        'doc_id', 'doc_path', 'file_path', 'original_path', 'original_filename',
+        'filename', 'file_size', 'file_type', 'file_hash', 'doc_hash',
+        'source_type', 'upload_source', 'content_type', 'upload_timestamp',
+        'ingested_at', 'processor', 'is_update', 'replaced_vectors',
+        'chunking_method', 'embedding_model', 'total_chunks'
+    )
+    INT_FIELDS = ('chunk_index', 'chunk_size')
+    TIMESTAMP_FIELDS = ('added_at', 'deleted_at')
+    
+    # Row flags
+    PRESENT = 1
+    DELETED = 2
+    HAS_TEXT = 4
+    HAS_CONTENT = 8
+    CONTENT_IS_TEXT = 16
+    HAS_VECTOR_ID = 32
+    
+    INT_MISSING = np.iinfo(np.int32).min
+    INT_MAX = np.iinfo(np.int32).max
+    TIMESTAMP_MISSING = np.iinfo(np.int64).min
+    
+    # Rewrite the heap when dead strings exceed this share of it
+    HEAP_COMPACT_RATIO = 0.5
+    
+    _COLUMNS = {
+        'flags': (np.uint8, 0),
+        'doc_rows': (np.int32, -1),
+        'text_offsets': (np.int64, 0),
+        'text_lengths': (np.int32, 0),
+        'content_offsets': (np.int64, 0),
+        'content_lengths': (np.int32, 0),
+    }
+    
+    def __init__(self, document_fields: Iterable[str] = DOCUMENT_FIELDS, heap: Optional[StringHeap] = None):
+        self.document_fields = frozenset(document_fields)
+        self._heap = heap or StringHeap()
+        self._dead_bytes = 0
+        self._capacity = 0
+        self._count = 0
+        self._columns: Dict[str, np.ndarray] = {}
+        for name, (dtype, fill) in self._COLUMNS.items():
+            self._columns[name] = np.full(0, fill, dtype=dtype)
+        for field in self.INT_FIELDS:
+            self._columns[field] = np.full(0, self.INT_MISSING, dtype=np.int32)
+        for field in self.TIMESTAMP_FIELDS:
+            self._columns[field] = np.full(0, self.TIMESTAMP_MISSING, dtype=np.int64)
+        self._extras: List[Optional[Dict[str, Any]]] = []
+        
+        # Per-document table: interned field dicts with reference counts
+        self._documents: List[Optional[Dict[str, Any]]] = []
+        self._document_refs: List[int] = []
+        self._document_rows: Dict[tuple, int] = {}
+        self._free_documents: List[int] = []
+    
+    @classmethod
+    def from_dict(cls, id_to_metadata: Dict[int, Dict[str, Any]]) -> 'ColumnarMetadataStore':
+        """Build from a legacy ``{vector_id: metadata}`` dict"""
+        store = cls()
+        for vector_id, metadata in id_to_metadata.items():
+            store[vector_id] = metadata
+        return store
+    
+    # ------------------------------------------------------------------
+    # Encoding helpers
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _encode_timestamp(value: Any) -> Optional[int]:
+        """Microseconds since the epoch for a naive ISO string that round-trips exactly"""
+        if not isinstance(value, str):
+            return None
+        try:
+            parsed = datetime.fromisoformat(value)
+        except ValueError:
+            return None
+        if parsed.tzinfo is not None:
+            return None
+        micros = (parsed - _EPOCH) // _MICROSECOND
+        return micros if (_EPOCH + micros * _MICROSECOND).isoformat() == value else None
+    
+    @staticmethod
+    def _decode_timestamp(micros: int) -> str:
+        return (_EPOCH + int(micros) * _MICROSECOND).isoformat()
+    
+    @staticmethod
+    def _document_key(fields: Dict[str, Any]) -> Optional[tuple]:
+        # The value type is part of the key so True and 1 are not merged
+        try:
+            key = tuple(sorted((name, type(value).__name__, value) for name, value in fields.items()))
+            hash(key)
+        except TypeError:
+            return None
+        return key
+    
+    def _grow(self, min_size: int):
+        if min_size <= self._capacity:
+            return
+        capacity = max(min_size, 2 * self._capacity, 1024)
+        for name, column in self._columns.items():
+            grown = np.full(capacity, self._fill_value(name), dtype=column.dtype)
+            grown[:len(column)] = column
+            self._columns[name] = grown
+        self._extras.extend([None] * (capacity - len(self._extras)))
+        self._capacity = capacity
+    
+    def _fill_value(self, name: str):
+        if name in self._COLUMNS:
+            return self._COLUMNS[name][1]
+        return self.INT_MISSING if name in self.INT_FIELDS else self.TIMESTAMP_MISSING
+    
+    def _intern_document(self, fields: Dict[str, Any]) -> int:
+        if not fields:
+            return -1
+        key = self._document_key(fields)
+        row = self._document_rows.get(key) if key is not None else None
+        if row is None:
+            if self._free_documents:
+                row = self._free_documents.pop()
+                self._documents[row] = fields
+                self._document_refs[row] = 0
+            else:
+                row = len(self._documents)
+                self._documents.append(fields)
+                self._document_refs.append(0)
+            if key is not None:
+                self._document_rows[key] = row
+        self._document_refs[row] += 1
+        return row
+    
+    def _release_document(self, row: int):
+        if row < 0:
+            return
+        self._document_refs[row] -= 1
+        if self._document_refs[row] == 0:
+            key = self._document_key(self._documents[row])
+            if key is not None and self._document_rows.get(key) == row:
+                del self._document_rows[key]
+            self._documents[row] = None
+            self._free_documents.append(row)
+    
+    def _row(self, vector_id: Any) -> int:
+        """Row for ``vector_id``, or -1 if it is not stored"""
+        if isinstance(vector_id, (int, np.integer)) and not isinstance(vector_id, bool):
+            if 0 <= vector_id < self._capacity and self._columns['flags'][vector_id] & self.PRESENT:
+                return int(vector_id)
+        return -1
+    
+    def _heap_text(self, row: int, column: str) -> str:
+        return self._heap.get(int(self._columns[f'{column}_offsets'][row]),
+                              int(self._columns[f'{column}_lengths'][row]))
+    
+    # ------------------------------------------------------------------
+    # Mapping interface
+    # ------------------------------------------------------------------
+    
+    def __setitem__(self, vector_id: int, metadata: Optional[Dict[str, Any]]):
+        if not isinstance(vector_id, (int, np.integer)) or isinstance(vector_id, bool) or vector_id < 0:
+            raise KeyError(f"Vector IDs must be non-negative integers, got {vector_id!r}")
+        row = int(vector_id)
+        self._grow(row + 1)
+        columns = self._columns
+        
+        old_text = old_content = None
+        if columns['flags'][row] & self.PRESENT:
+            old_flags = columns['flags'][row]
+            if old_flags & self.HAS_TEXT:
+                old_text = (self._heap_text(row, 'text'), columns['text_offsets'][row], columns['text_lengths'][row])
+            if old_flags & self.HAS_CONTENT and not old_flags & self.CONTENT_IS_TEXT:
+                old_content = (self._heap_text(row, 'content'), columns['content_offsets'][row],
+                               columns['content_lengths'][row])
+            self._clear_row(row, keep_strings=True)
+        else:
+            self._count += 1
+        
+        metadata = metadata or {}
+        flags = self.PRESENT
+        document = {}
+        extras = {}
+        text = metadata.get('text')
+        for key, value in metadata.items():
+            if key == 'text' and isinstance(value, str):
+                flags |= self.HAS_TEXT
+                if old_text is not None and old_text[0] == value:
+                    columns['text_offsets'][row], columns['text_lengths'][row] = old_text[1:]
+                    old_text = None
+                else:
+                    columns['text_offsets'][row], columns['text_lengths'][row] = self._heap.append(value)
+            elif key == 'content' and isinstance(value, str):
+                flags |= self.HAS_CONTENT
+                if isinstance(text, str) and value == text:
+                    flags |= self.CONTENT_IS_TEXT
+                elif old_content is not None and old_content[0] == value:
+                    columns['content_offsets'][row], columns['content_lengths'][row] = old_content[1:]
+                    old_content = None
+                else:
+                    columns['content_offsets'][row], columns['content_lengths'][row] = self._heap.append(value)
+            elif key == 'vector_id' and value == vector_id and type(value) is int:
+                flags |= self.HAS_VECTOR_ID
+            elif key == 'deleted' and value is True:
+                flags |= self.DELETED
+            elif key in self.INT_FIELDS and type(value) is int and self.INT_MISSING < value <= self.INT_MAX:
+                columns[key][row] = value
+            elif key in self.document_fields:
+                document[key] = value
+            else:
+                micros = self._encode_timestamp(value) if key in self.TIMESTAMP_FIELDS else None
+                if micros is not None:
+                    columns[key][row] = micros
+                    continue
+                if key == 'deleted' and value:
+                    flags |= self.DELETED
+                extras[key] = value
+        
+        # Strings replaced by this write are now garbage in the heap
+        for old in (old_text, old_content):
+            if old is not None:
+                self._dead_bytes += int(old[2])
+        
+        columns['flags'][row] = flags
+        columns['doc_rows'][row] = self._intern_document(document)
+        self._extras[row] = extras or None
+    
+    def _clear_row(self, row: int, keep_strings: bool = False):
+        columns = self._columns
+        flags = columns['flags'][row]
+        if not keep_strings:
+            if flags & self.HAS_TEXT:
+                self._dead_bytes += int(columns['text_lengths'][row])
+            if flags & self.HAS_CONTENT and not flags & self.CONTENT_IS_TEXT:
+                self._dead_bytes += int(columns['content_lengths'][row])
+        self._release_document(int(columns['doc_rows'][row]))
+        for name in columns:
+            columns[name][row] = self._fill_value(name)
+        self._extras[row] = None
+    
+    def get(self, vector_id: Any, default=None) -> Optional[Dict[str, Any]]:
+        row = self._row(vector_id)
+        if row < 0:
+            return default
+        
+        columns = self._columns
+        flags = columns['flags'][row]
+        metadata = {}
+        doc_row = columns['doc_rows'][row]
+        if doc_row >= 0:
+            metadata.update(self._documents[doc_row])
+        if flags & self.HAS_TEXT:
+            metadata['text'] = self._heap_text(row, 'text')
+        if flags & self.HAS_CONTENT:
+            metadata['content'] = metadata['text'] if flags & self.CONTENT_IS_TEXT else self._heap_text(row, 'content')
+        if flags & self.HAS_VECTOR_ID:
+            metadata['vector_id'] = row
+        if flags & self.DELETED:
+            metadata['deleted'] = True
+        for field in self.INT_FIELDS:
+            value = columns[field][row]
+            if value != self.INT_MISSING:
+                metadata[field] = int(value)
+        for field in self.TIMESTAMP_FIELDS:
+            value = columns[field][row]
+            if value != self.TIMESTAMP_MISSING:
+                metadata[field] = self._decode_timestamp(value)
+        extras = self._extras[row]
+        if extras:
+            metadata.update(extras)
+        return metadata
+    
+    def __getitem__(self, vector_id: Any) -> Dict[str, Any]:
+        metadata = self.get(vector_id)
+        if metadata is None:
+            raise KeyError(vector_id)
+        return metadata
+    
+    def __delitem__(self, vector_id: Any):
+        row = self._row(vector_id)
+        if row < 0:
+            raise KeyError(vector_id)
+        self._clear_row(row)
+        self._count -= 1
+    
+    def __contains__(self, vector_id: Any) -> bool:
+        return self._row(vector_id) >= 0
+    
+    def __len__(self) -> int:
+        return self._count
+    
+    def __bool__(self) -> bool:
+        return self._count > 0
+    
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids().tolist())
+    
+    def keys(self) -> Iterator[int]:
+        return iter(self)
+    
+    def items(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        # IDs are captured up front so concurrent writers can't break iteration
+        for vector_id in self.ids().tolist():
+            metadata = self.get(vector_id)
+            if metadata is not None:
+                yield vector_id, metadata
+    
+    def values(self) -> Iterator[Dict[str, Any]]:
+        return (metadata for _, metadata in self.items())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (dict, ColumnarMetadataStore)):
+            return len(self) == len(other) and all(other.get(k) == v for k, v in self.items())
+        return NotImplemented
+    
+    __hash__ = None
+    
+    # ------------------------------------------------------------------
+    # Vectorized queries
+    # ------------------------------------------------------------------
+    
+    def ids(self) -> np.ndarray:
+        """IDs of every stored vector (deleted included)"""
+        return np.flatnonzero(self._columns['flags'] & self.PRESENT).astype(np.int64)
+    
+    def live_ids(self) -> np.ndarray:
+        """IDs of stored vectors that are not marked deleted"""
+        flags = self._columns['flags']
+        return np.flatnonzero((flags & (self.PRESENT | self.DELETED)) == self.PRESENT).astype(np.int64)
+    
+    def deleted_ids(self) -> np.ndarray:
+        flags = self._columns['flags']
+        return np.flatnonzero((flags & (self.PRESENT | self.DELETED)) == (self.PRESENT | self.DELETED)).astype(np.int64)
+    
+    def timestamp_range(self, field: str = 'added_at', live_only: bool = True) -> Optional[Tuple[str, str]]:
+        """Oldest and newest ISO timestamp stored in a timestamp column"""
+        rows = self.live_ids() if live_only else self.ids()
+        values = self._columns[field][rows]
+        values = values[values != self.TIMESTAMP_MISSING]
+        if not len(values):
+            return None
+        return self._decode_timestamp(values.min()), self._decode_timestamp(values.max())
+    
+    def select(self, fields: Iterable[str]) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """``(vector_id, metadata)`` restricted to ``fields``, without decoding text"""
+        fields = tuple(fields)
+        columns = self._columns
+        for row in self.ids().tolist():
+            doc_row = columns['doc_rows'][row]
+            document = self._documents[doc_row] if doc_row >= 0 else {}
+            extras = self._extras[row] or {}
+            projected = {}
+            for field in fields:
+                if field in extras:
+                    projected[field] = extras[field]
+                elif field in document:
+                    projected[field] = document[field]
+                elif field == 'deleted' and columns['flags'][row] & self.DELETED:
+                    projected[field] = True
+            yield row, projected
+    
+    # ------------------------------------------------------------------
+    # Compaction and persistence
+    # ------------------------------------------------------------------
+    
+    def retain(self, vector_ids: Iterable[int]) -> np.ndarray:
+        """Drop every row not in ``vector_ids``; returns the dropped IDs"""
+        keep = np.asarray(list(vector_ids) if not isinstance(vector_ids, np.ndarray) else vector_ids, dtype=np.int64)
+        dropped = np.setdiff1d(self.ids(), keep, assume_unique=True)
+        for row in dropped.tolist():
+            self._clear_row(row)
+        self._count -= len(dropped)
+        self.compact_heap()
+        return dropped
+    
+    def compact_heap(self, force: bool = False):
+        """Rewrite the string heap without dead strings once they dominate it"""
+        if not force and self._dead_bytes <= self._heap.size * self.HEAP_COMPACT_RATIO:
+            return
+        heap = StringHeap()
+        columns = self._columns
+        for row in self.ids().tolist():
+            flags = columns['flags'][row]
+            if flags & self.HAS_TEXT:
+                columns['text_offsets'][row], columns['text_lengths'][row] = heap.append(self._heap_text(row, 'text'))
+            if flags & self.HAS_CONTENT and not flags & self.CONTENT_IS_TEXT:
+                columns['content_offsets'][row], columns['content_lengths'][row] = \
+                    heap.append(self._heap_text(row, 'content'))
+        self._heap = heap
+        self._dead_bytes = 0
+    
+    def capture(self) -> Tuple[Dict[str, Any], StringHeap, Tuple[Any, ...]]:
+        """Copy the columns for a snapshot; caller holds the write lock.
+        
+        Returns ``(state, heap, heap_buffers)``: ``state`` is picklable and
+        the buffers are the sealed heap contents (``state['heap_size']``
+        bytes) to write to the heap file before handing it to ``heap.attach``.
+        """
+        heap_buffers, heap_size = self._heap.seal()
+        used = int(self.ids()[-1]) + 1 if self._count else 0
+        state = {
+            'columns': {name: column[:used].copy() for name, column in self._columns.items()},
+            'extras': {row: extras for row, extras in enumerate(self._extras[:used]) if extras},
+            'documents': list(self._documents),
+            'document_refs': list(self._document_refs),
+            'document_fields': sorted(self.document_fields),
+            'dead_bytes': self._dead_bytes,
+            'heap_size': heap_size,
+        }
+        return state, self._heap, heap_buffers
+    
+    @classmethod
+    def from_state(cls, state: Dict[str, Any], heap_buffer: Optional[Any]) -> 'ColumnarMetadataStore':
+        """Restore a captured state over the heap file contents in ``heap_buffer``"""
+        heap_size = state['heap_size']
+        if heap_size and (heap_buffer is None or len(heap_buffer) < heap_size):
+            raise ValueError("Text heap file is shorter than the metadata snapshot expects")
+        
+        store = cls(state['document_fields'], heap=StringHeap(heap_buffer, heap_size))
+        used = len(state['columns']['flags'])
+        store._grow(used)
+        for name, column in state['columns'].items():
+            store._columns[name][:used] = column
+        for row, extras in state['extras'].items():
+            store._extras[row] = extras
+        store._count = int(np.count_nonzero(store._columns['flags'] & cls.PRESENT))
+        store._dead_bytes = state['dead_bytes']
+        
+        store._documents = list(state['documents'])
+        store._document_refs = list(state['document_refs'])
+        for row, fields in enumerate(store._documents):
+            if fields is None:
+                store._free_documents.append(row)
+                continue
+            key = cls._document_key(fields)
+            if key is not None:
+                store._document_rows.setdefault(key, row)
+        return store
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'metadata_rows': self._count,
+            'metadata_documents': len(self._documents) - len(self._free_documents),
+            'metadata_heap_bytes': self._heap.size,
+            'metadata_heap_dead_bytes': self._dead_bytes,
+            'metadata_column_bytes': sum(column.nbytes for column in self._columns.values()),
+        }
@@ -10,6 +10,7 @@ import threading
 import tempfile
 import shutil
 import time
+import os
 from pathlib import Path
 from typing import List, Tuple, Dict, Any, Optional
 from datetime import datetime
@@ -37,6 +38,19 @@ except ImportError:
             Result, with_error_handling
         )
 
+try:
+    from .faiss_wal import WriteAheadLog
+    from .faiss_id_map import VectorIdMap
+    from .faiss_metadata_index import MetadataIndex
+    from .faiss_metadata_store import ColumnarMetadataStore, StringHeap
+    from .change_log import DocumentChangeLog
+except ImportError:
+    from faiss_wal import WriteAheadLog
+    from faiss_id_map import VectorIdMap
+    from faiss_metadata_index import MetadataIndex
+    from faiss_metadata_store import ColumnarMetadataStore, StringHeap
+    from change_log import DocumentChangeLog
+
 class IndexType(Enum):
     FLAT = "flat"  # Brute force
     IVF = "ivf"    # Inverted file index
@@ -55,10 +69,80 @@ class OptimizedFAISSIndex:
         self.is_trained = False
         self.training_data = []
         self.training_sample_size = 50000  # Max training samples
+        self.mmapped = False  # Index data is memory-mapped from disk (read-only)
         
         # Create initial index
         self._create_index()
     
+    @classmethod
+    def from_index(cls, index, state: Optional[Dict[str, Any]] = None,
+                   mmapped: bool = False) -> 'OptimizedFAISSIndex':
+        """Wrap an index read from disk as-is, without retraining or re-adding vectors"""
+        state = state or {}
+        instance = cls.__new__(cls)
+        instance.index = index
+        instance.dimension = instance.index.d
+        instance.index_type = (IndexType(state['index_type']) if state.get('index_type')
+                               else cls._detect_index_type(instance.index))
+        instance.size_estimate = state.get('size_estimate', max(instance.index.ntotal, 1000))
+        instance.is_trained = bool(instance.index.is_trained)
+        instance.training_sample_size = 50000
+        instance.mmapped = mmapped
+        
+        if isinstance(instance.index, faiss.IndexIVF) and instance.index.direct_map.type == faiss.DirectMap.NoMap:
+            # Older snapshots were saved without a direct map
+            instance.index.make_direct_map()
+        
+        # Vectors collected before training are not in the index yet
+        training_data = state.get('training_data')
+        if training_data is not None and not instance.is_trained:
+            instance.training_data = list(training_data)
+        else:
+            instance.training_data = []
+        return instance
+    
+    @staticmethod
+    def _detect_index_type(index) -> IndexType:
+        """Infer the index type of a snapshot saved without type information"""
+        if isinstance(index, faiss.IndexIVFPQ):
+            return IndexType.COMPOSITE
+        if isinstance(index, faiss.IndexIVF):
+            return IndexType.IVF
+        if isinstance(index, faiss.IndexHNSW):
+            return IndexType.HNSW
+        if isinstance(index, faiss.IndexLSH):
+            return IndexType.LSH
+        return IndexType.FLAT
+    
+    def get_state(self) -> Dict[str, Any]:
+        """Type and training state persisted alongside the index file"""
+        return {
+            'index_type': self.index_type.value,
+            'size_estimate': self.size_estimate,
+            'is_trained': self.is_trained,
+            'training_data': np.array(self.training_data, dtype=np.float32) if self.training_data else None
+        }
+    
+    def ensure_writable(self):
+        """Copy a memory-mapped index into RAM before its first mutation"""
+        if not self.mmapped:
+            return
+        if isinstance(self.index, faiss.IndexIVF):
+            # Memory-mapped inverted lists are read-only and cannot be cloned
+            ivf = faiss.extract_index_ivf(self.index)
+            source = ivf.invlists
+            in_memory = faiss.ArrayInvertedLists(ivf.nlist, ivf.code_size)
+            for list_no in range(ivf.nlist):
+                list_size = source.list_size(list_no)
+                if list_size:
+                    in_memory.add_entries(list_no, list_size, source.get_ids(list_no), source.get_codes(list_no))
+            ivf.replace_invlists(in_memory, True)
+            in_memory.this.disown()
+        else:
+            self.index = faiss.clone_index(self.index)
+        self.mmapped = False
+        logging.info(f"Copied memory-mapped {self.index_type.value} index into memory for writes")
+    
     def _create_index(self):
         """Create optimal index based on estimated size"""
         if self.size_estimate < 10000:
@@ -92,6 +176,7 @@ class OptimizedFAISSIndex:
         
         # Create IVF index
         self.index = faiss.IndexIVFFlat(quantizer, self.dimension, n_clusters)
+        self.index.set_direct_map_type(faiss.DirectMap.Array)  # Allow reconstruct by position
         
         # Set search parameters
         self.index.nprobe = min(n_clusters // 10, 64)  # Search 10% of clusters
@@ -132,6 +217,7 @@ class OptimizedFAISSIndex:
             quantizer, self.dimension, n_clusters,
             m, n_bits
         )
+        self.index.set_direct_map_type(faiss.DirectMap.Array)  # Allow reconstruct by position
         
         # Set search parameters
         self.index.nprobe = 64
@@ -140,30 +226,36 @@ class OptimizedFAISSIndex:
         self.is_trained = False
         logging.info(f"Created Composite IVF-PQ index with {n_clusters} clusters, m={m}")
     
+    @property
+    def total_vectors(self) -> int:
+        """Vectors in the index plus those buffered until training"""
+        return self.index.ntotal + len(self.training_data)
+    
     def add_vectors(self, vectors: np.ndarray):
         """Add vectors with automatic training if needed"""
+        self.ensure_writable()
+        
         if not self.is_trained and self.index_type in [IndexType.IVF, IndexType.COMPOSITE]:
-            # Collect training data
-            if len(self.training_data) < self.training_sample_size:
-                self.training_data.extend(vectors[:self.training_sample_size - len(self.training_data)])
+            # Buffer vectors until there is enough data to train on; buffered
+            # vectors keep their positions and are added right after training
+            self.training_data.extend(vectors)
             
             # Train when we have enough data
             if len(self.training_data) >= min(10000, self.size_estimate // 10):
                 self._train_index()
+            else:
+                logging.warning(f"Index not trained yet. Collected {len(self.training_data)} training samples")
+            return
         
-        # Add vectors
-        if self.is_trained:
-            self.index.add(vectors)
-        else:
-            # Store vectors temporarily until training
-            logging.warning(f"Index not trained yet. Collected {len(self.training_data)} training samples")
+        self.index.add(vectors)
     
     def _train_index(self):
         """Train the index with collected data"""
         if self.is_trained or not self.training_data:
             return
         
-        training_vectors = np.array(self.training_data, dtype=np.float32)
+        buffered_vectors = np.array(self.training_data, dtype=np.float32)
+        training_vectors = buffered_vectors[:self.training_sample_size]
         
         logging.info(f"Training {self.index_type.value} index with {len(training_vectors)} vectors")
         start_time = time.time()
@@ -171,8 +263,8 @@ class OptimizedFAISSIndex:
         self.index.train(training_vectors)
         self.is_trained = True
         
-        # Add training vectors to index
-        self.index.add(training_vectors)
+        # Add every buffered vector to the index, in arrival order
+        self.index.add(buffered_vectors)
         
         # Clear training data
         self.training_data = []
@@ -235,8 +327,20 @@ class OptimizedFAISSIndex:
         
         logging.info(f"Migration completed: {old_type.value} -> {new_type.value}")
     
-    def search(self, query_vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
-        """Search with automatic parameter tuning"""
+    def reconstruct_batch(self, positions: np.ndarray) -> np.ndarray:
+        """Gather stored vectors by FAISS position"""
+        if len(positions) == 0:
+            return np.empty((0, self.index.d), dtype=np.float32)
+        return self.index.reconstruct_batch(np.ascontiguousarray(positions, dtype=np.int64))
+    
+    def search(self, query_vectors: np.ndarray, k: int, selector=None,
+               selectivity: float = 1.0) -> Tuple[np.ndarray, np.ndarray]:
+        """Search with automatic parameter tuning.
+        
+        ``selector`` (a FAISS IDSelector over positions) restricts the search
+        to a subset inside the index; ``selectivity`` is the fraction of the
+        index it admits and widens nprobe / efSearch so enough hits survive.
+        """
         if not self.is_trained:
             # Force training if we have data
             if self.training_data:
@@ -255,7 +359,21 @@ class OptimizedFAISSIndex:
             # Dynamic efSearch
             self.index.hnsw.efSearch = max(k * 2, 64)
         
-        return self.index.search(query_vectors, k)
+        if selector is None:
+            return self.index.search(query_vectors, k)
+        
+        widen = 1.0 / max(selectivity, 1e-6)
+        if isinstance(self.index, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(
+                sel=selector, nprobe=min(int(np.ceil(self.index.nprobe * widen)), self.index.nlist)
+            )
+        elif isinstance(self.index, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(
+                sel=selector, efSearch=min(int(np.ceil(self.index.hnsw.efSearch * widen)), max(self.index.ntotal, 1))
+            )
+        else:
+            params = faiss.SearchParameters(sel=selector)
+        return self.index.search(query_vectors, k, params=params)
     
     def get_index_stats(self) -> Dict[str, Any]:
         """Get detailed index statistics"""
@@ -264,6 +382,7 @@ class OptimizedFAISSIndex:
             'dimension': self.dimension,
             'total_vectors': self.index.ntotal if self.index else 0,
             'is_trained': self.is_trained,
+            'memory_mapped': self.mmapped,
             'index_size_bytes': self._estimate_index_size()
         }
         
@@ -316,14 +435,22 @@ class OptimizedFAISSIndex:
 class FAISSStore:
     """Thread-safe FAISS-based vector store for similarity search with optimization"""
     
-    def __init__(self, index_path: str = "data/vectors/index.faiss", dimension: int = 1024):  # Updated to match Azure Cohere-embed-v3-english dimension
+    # Filtered searches with at most this many candidates are scored exactly
+    FILTER_BRUTE_FORCE_LIMIT = 4096
+    
+    def __init__(self, index_path: str = "data/vectors/index.faiss", dimension: int = 1024,  # Updated to match Azure Cohere-embed-v3-english dimension
+                 wal_enabled: bool = True, wal_compact_bytes: int = 64 * 1024 * 1024,
+                 wal_compact_interval: float = 300.0, mmap_index: bool = False):
         self.index_path = Path(index_path)
         self.dimension = dimension
+        self.mmap_index = mmap_index
         self.metadata_path = self.index_path.parent / "vector_metadata.pkl"
-        self.id_to_metadata = {}
-        self.index_to_id = {}  # Maps FAISS index position to our vector ID
+        self.id_to_metadata = ColumnarMetadataStore()  # Vector ID -> flat metadata, stored column-wise
+        self.index_to_id = VectorIdMap()  # Maps FAISS index position <-> our vector ID
         self.next_id = 0
         self.deleted_indices = set()  # Track deleted indices for cleanup
+        self.metadata_index = MetadataIndex()  # Field value -> live vector IDs
+        self.change_log = DocumentChangeLog()  # Store version and the documents each mutation touched
         
         # Thread safety components
         self._lock = threading.RLock()  # Reentrant lock for nested calls
@@ -337,9 +464,25 @@ class FAISSStore:
         # Create directory if it doesn't exist
         self.index_path.parent.mkdir(parents=True, exist_ok=True)
         
+        # Write-ahead log: mutations are appended here and periodically folded
+        # into the base snapshot (index + metadata pickle) by a checkpoint
+        self.wal_enabled = wal_enabled
+        self.wal_compact_bytes = wal_compact_bytes
+        self.wal_compact_interval = wal_compact_interval
+        self._wal = WriteAheadLog(self.index_path.parent, prefix=f"{self.index_path.stem}_wal")
+        self._checkpoint_seq = 0
+        self._snapshot_lock = threading.Lock()  # Serializes snapshot file writes
+        self._compact_event = threading.Event()
+        self._stop_compactor = threading.Event()
+        self._compactor_thread = None
+        self._rebuild_thread = None  # Background compaction of deleted vectors
+        
         # Initialize or load index
         self._initialize_index()
         
+        if self.wal_enabled:
+            self._start_compactor()
+        
         logging.info(f"Thread-safe optimized FAISS store initialized with dimension {dimension}")
     
     @contextmanager
@@ -367,40 +510,83 @@ class FAISSStore:
     
     def _initialize_index(self):
         """Initialize or load existing FAISS index"""
-        if self.index_path.exists():
+        self._checkpoint_seq = 0
+        self._index_file = self.index_path
+        # The metadata pickle names the index file of its snapshot, so it is read first
+        index_state = self._load_metadata()
+        if self._index_file.exists():
             try:
-                # Load existing index
-                index = faiss.read_index(str(self.index_path))
-                self._load_metadata()
-                
-                # Estimate current size
-                current_size = max(index.ntotal, len(self.id_to_metadata))
-                
-                # Create optimized index and migrate
-                self.optimized_index = OptimizedFAISSIndex(self.dimension, current_size)
+                # Load the saved index as-is: no retraining or graph rebuild
+                start_time = time.time()
+                io_flags = faiss.IO_FLAG_MMAP if self.mmap_index else 0
+                index = faiss.read_index(str(self._index_file), io_flags)
                 
-                # Migrate existing data if any
-                if index.ntotal > 0:
-                    vectors = index.reconstruct_n(0, index.ntotal)
-                    self.optimized_index.add_vectors(vectors)
+                self.optimized_index = OptimizedFAISSIndex.from_index(index, index_state, mmapped=self.mmap_index)
+                if index.d != self.dimension:
+                    logging.warning(f"Loaded index dimension {index.d} differs from configured dimension {self.dimension}")
                 
-                # Clean up any deleted vectors on startup
-                self._cleanup_deleted_vectors()
-                logging.info(f"Loaded existing FAISS index with {self.optimized_index.index.ntotal} vectors")
+                logging.info(f"Loaded existing {self.optimized_index.index_type.value} FAISS index with "
+                             f"{self.optimized_index.index.ntotal} vectors in {time.time() - start_time:.2f}s"
+                             f"{' (memory-mapped)' if self.mmap_index else ''}")
             except Exception as e:
                 logging.warning(f"Failed to load existing index: {e}. Creating new index.")
+                self._checkpoint_seq = 0
                 self._create_new_index()
         else:
+            # No snapshot to start from: rebuild from whatever the log still holds
+            self._checkpoint_seq = 0
             self._create_new_index()
+        
+        if self._checkpoint_seq >= self._wal.active_seq:
+            # Snapshot is newer than every segment on disk (e.g. restored from backup)
+            logging.warning("FAISS snapshot is newer than the write-ahead log; discarding stale segments")
+            self._wal.reset(next_seq=self._checkpoint_seq + 1)
+        
+        # Bring the snapshot up to date with mutations logged after it was taken
+        replayed = self._replay_wal()
+        
+        try:
+            # Clean up any deleted vectors on startup
+            self._cleanup_deleted_vectors()
+        except FAISSError:
+            pass
+        
+        if replayed and not self.wal_enabled:
+            # Logging is off, so fold the replayed records into the snapshot now
+            self._save_atomic()
+    
+    def _replay_wal(self) -> int:
+        """Re-apply logged mutations newer than the loaded snapshot"""
+        replayed = 0
+        try:
+            for record in self._wal.replay(after_seq=self._checkpoint_seq):
+                op = record.get('op')
+                if op == 'add':
+                    self._apply_add(record['vectors'], record['vector_ids'], record['metadata'])
+                elif op == 'update':
+                    self._apply_update(record['vector_id'], record['updates'])
+                elif op == 'update_batch':
+                    for vector_id, updates in record['updates']:
+                        self._apply_update(vector_id, updates)
+                elif op == 'delete':
+                    self._apply_delete(record['vector_ids'], record['deleted_at'])
+                else:
+                    logging.warning(f"Skipping unknown WAL record type: {op}")
+                    continue
+                replayed += 1
+        except Exception as e:
+            logging.error(f"Failed to replay FAISS write-ahead log: {e}")
+            raise FAISSError(f"Failed to replay write-ahead log: {e}")
+        
+        if replayed:
+            logging.info(f"Replayed {replayed} write-ahead log records on top of snapshot")
+        return replayed
     
     def _cleanup_deleted_vectors(self):
         """Efficiently clean up deleted vectors without full reconstruction"""
         try:
             # Get all vector IDs that are marked as deleted
-            deleted_ids = {
-                vector_id for vector_id, metadata in self.id_to_metadata.items()
-                if metadata and metadata.get('deleted', False)
-            }
+            deleted_ids = set(self.id_to_metadata.deleted_ids().tolist())
             
             if not deleted_ids:
                 return
@@ -411,6 +597,8 @@ class FAISSStore:
             
             if deletion_ratio > 0.2:  # 20% threshold
                 self._efficient_rebuild_index()
+                # Positions changed, so the rebuilt index becomes the new base snapshot
+                self._save_atomic()
                 logging.info(f"Efficiently cleaned up {len(deleted_ids)} deleted vectors")
             else:
                 # Just mark for later cleanup
@@ -421,127 +609,354 @@ class FAISSStore:
             logging.error(f"Failed to clean up deleted vectors: {e}")
             raise FAISSError(f"Failed to clean up deleted vectors: {e}")
     
-    def _efficient_rebuild_index(self):
-        """Efficiently rebuild index using optimized approach"""
+    def _efficient_rebuild_index(self, background: bool = False):
+        """Rebuild the index without deleted vectors via a single masked gather.
+        
+        With ``background=True`` live vectors are gathered under the read lock
+        and the new index is built with no lock held; only the final swap takes
+        the write lock, so searches keep running against the old index.
+        Otherwise the caller must hold the write lock (or be in init).
+        """
         try:
-            # Get active vectors and metadata
-            active_vectors = []
-            active_metadata = []
-            new_index_to_id = {}
-            new_id_to_metadata = {}
-            
-            current_idx = 0
-            for vector_id, metadata in self.id_to_metadata.items():
-                if metadata and not metadata.get('deleted', False):
-                    # Get vector from current index
-                    old_faiss_idx = None
-                    for idx, vid in self.index_to_id.items():
-                        if vid == vector_id:
-                            old_faiss_idx = idx
-                            break
-                    
-                    if old_faiss_idx is not None and old_faiss_idx < self.optimized_index.index.ntotal:
-                        try:
-                            vector = self.optimized_index.index.reconstruct(old_faiss_idx)
-                            active_vectors.append(vector)
-                            new_index_to_id[current_idx] = vector_id
-                            new_id_to_metadata[vector_id] = metadata
-                            current_idx += 1
-                        except Exception as e:
-                            logging.warning(f"Failed to reconstruct vector {vector_id}: {e}")
-                            continue
-            
-            if not active_vectors:
-                # No active vectors, create empty index
-                self._create_new_index()
+            if background:
+                with self._read_lock():
+                    captured = self._gather_live_vectors()
+            else:
+                captured = self._gather_live_vectors()
+            if captured is None:
                 return
             
-            # Create new optimized index
-            self.optimized_index = OptimizedFAISSIndex(self.dimension, len(active_vectors))
-            
-            # Add vectors in batches for efficiency
-            batch_size = 10000
-            vectors_array = np.array(active_vectors, dtype=np.float32)
+            source_index, live_ids, live_vectors, captured_ntotal = captured
+            start_time = time.time()
+            rebuilt_index = self._build_index_from_vectors(live_vectors)
             
-            for i in range(0, len(vectors_array), batch_size):
-                batch = vectors_array[i:i+batch_size]
-                self.optimized_index.add_vectors(batch)
-            
-            # Update mappings
-            self.index_to_id = new_index_to_id
-            self.id_to_metadata = new_id_to_metadata
-            self.deleted_indices.clear()
-            
-            # Optimize index type if needed
-            self.optimized_index.optimize_for_current_size()
+            if not background:
+                self._swap_rebuilt_index(source_index, rebuilt_index, live_ids, captured_ntotal)
+                return
             
-            logging.info(f"Efficiently rebuilt index with {len(active_vectors)} active vectors")
+            with self._write_lock_context():
+                if not self._swap_rebuilt_index(source_index, rebuilt_index, live_ids, captured_ntotal):
+                    return
+                snapshot = self._capture_snapshot()
+            self._write_snapshot(snapshot)
+            logging.info(f"Background index rebuild finished in {time.time() - start_time:.2f}s")
             
         except Exception as e:
             logging.error(f"Failed to efficiently rebuild index: {e}")
             raise FAISSError(f"Failed to efficiently rebuild index: {e}")
     
+    def _gather_live_vectors(self):
+        """Reconstruct every live vector in position order; caller holds at least the read lock"""
+        source_index = self.optimized_index
+        if not source_index.is_trained:
+            # Vectors are still buffered for training; nothing to compact yet
+            return None
+        
+        captured_ntotal = source_index.index.ntotal
+        live_ids = self.id_to_metadata.live_ids()
+        positions = self.index_to_id.positions_of(live_ids)
+        positions = np.sort(positions[(positions >= 0) & (positions < captured_ntotal)])
+        
+        live_vectors = source_index.reconstruct_batch(positions)
+        return source_index, self.index_to_id.position_ids[positions], live_vectors, captured_ntotal
+    
+    def _build_index_from_vectors(self, vectors: np.ndarray) -> 'OptimizedFAISSIndex':
+        """Create a fresh optimized index holding ``vectors`` at positions 0..n-1"""
+        rebuilt_index = OptimizedFAISSIndex(self.optimized_index.index.d, max(len(vectors), 1))
+        
+        # Add vectors in batches for efficiency
+        batch_size = 10000
+        for i in range(0, len(vectors), batch_size):
+            rebuilt_index.add_vectors(vectors[i:i + batch_size])
+        
+        # Optimize index type if needed
+        rebuilt_index.optimize_for_current_size()
+        return rebuilt_index
+    
+    def _swap_rebuilt_index(self, source_index: 'OptimizedFAISSIndex', rebuilt_index: 'OptimizedFAISSIndex',
+                            live_ids: np.ndarray, captured_ntotal: int) -> bool:
+        """Install a rebuilt index; caller holds the write lock. Returns False if it went stale"""
+        if self.optimized_index is not source_index:
+            # Index was replaced (cleared, restored, migrated) while rebuilding
+            logging.info("Discarding stale index rebuild")
+            return False
+        
+        # Carry over vectors added after the live set was captured
+        tail_positions = np.arange(captured_ntotal, source_index.index.ntotal, dtype=np.int64)
+        tail_ids = self.index_to_id.position_ids[captured_ntotal:source_index.index.ntotal]
+        if len(tail_positions):
+            rebuilt_index.add_vectors(source_index.reconstruct_batch(tail_positions))
+        
+        new_position_ids = np.concatenate([live_ids, tail_ids])
+        
+        self.optimized_index = rebuilt_index
+        self.index_to_id = VectorIdMap(new_position_ids)
+        removed_ids = np.setdiff1d(self.id_to_metadata.ids(), new_position_ids)
+        for vector_id in removed_ids.tolist():
+            self.metadata_index.remove(vector_id, self.id_to_metadata.get(vector_id))
+        # Drops the rows and compacts the text heap once it is mostly garbage
+        self.id_to_metadata.retain(new_position_ids)
+        removed = len(removed_ids)
+        self.deleted_indices = {vector_id for vector_id in self.deleted_indices if vector_id in self.id_to_metadata}
+        
+        logging.info(f"Efficiently rebuilt index with {len(new_position_ids)} active vectors "
+                     f"({removed} deleted vectors removed)")
+        return True
+    
+    def _schedule_rebuild(self):
+        """Compact deleted vectors in a background thread unless one is already running"""
+        if self._rebuild_thread and self._rebuild_thread.is_alive():
+            return
+        self._rebuild_thread = threading.Thread(
+            target=self._background_rebuild, name="faiss-index-rebuild", daemon=True
+        )
+        self._rebuild_thread.start()
+    
+    def _background_rebuild(self):
+        try:
+            self._efficient_rebuild_index(background=True)
+        except Exception as e:
+            logging.error(f"Background index rebuild failed: {e}")
+    
     def _create_new_index(self):
         """Create a new optimized FAISS index"""
         # Create optimized index with initial estimate
         self.optimized_index = OptimizedFAISSIndex(self.dimension, 1000)
-        self.id_to_metadata = {}
-        self.index_to_id = {}
+        self.id_to_metadata = ColumnarMetadataStore()
+        self.index_to_id = VectorIdMap()
         self.next_id = 0
         self.deleted_indices = set()
+        self.metadata_index.rebuild(self.id_to_metadata.select(self.metadata_index.fields + ('deleted',)))
         logging.info(f"Created new optimized FAISS index with dimension {self.dimension}")
     
-    def _load_metadata(self):
-        """Load vector metadata"""
+    def _load_metadata(self) -> Optional[Dict[str, Any]]:
+        """Load vector metadata; returns the persisted index state, if any"""
+        index_state = None
         if self.metadata_path.exists():
             try:
                 with open(self.metadata_path, 'rb') as f:
                     data = pickle.load(f)
-                    self.id_to_metadata = data.get('id_to_metadata', {})
-                    self.index_to_id = data.get('index_to_id', {})
+                    if 'metadata_columns' in data:
+                        heap_path = self.metadata_path.parent / data['text_heap']
+                        self.id_to_metadata = ColumnarMetadataStore.from_state(
+                            data['metadata_columns'], StringHeap.map_file(heap_path)
+                        )
+                    else:
+                        # Snapshots written before the columnar metadata store
+                        self.id_to_metadata = ColumnarMetadataStore.from_dict(data.get('id_to_metadata', {}))
+                    if 'position_ids' in data:
+                        self.index_to_id = VectorIdMap(np.asarray(data['position_ids'], dtype=np.int64))
+                    else:
+                        # Snapshots written before the array-backed mapping
+                        self.index_to_id = VectorIdMap.from_dict(data.get('index_to_id', {}))
                     self.next_id = data.get('next_id', 0)
                     self.deleted_indices = set(data.get('deleted_indices', []))
+                    self._checkpoint_seq = data.get('wal_checkpoint_seq', 0)
+                    if data.get('index_file'):
+                        # Snapshots written before seq-named index files use index_path itself
+                        self._index_file = self.metadata_path.parent / data['index_file']
+                    index_state = data.get('index_state')
             except Exception as e:
                 logging.warning(f"Failed to load metadata: {e}")
-                self.id_to_metadata = {}
-                self.index_to_id = {}
+                self.id_to_metadata = ColumnarMetadataStore()
+                self.index_to_id = VectorIdMap()
                 self.next_id = 0
                 self.deleted_indices = set()
+        self.metadata_index.rebuild(self.id_to_metadata.select(self.metadata_index.fields + ('deleted',)))
+        return index_state
     
     def _save_atomic(self):
-        """Atomically save index and metadata"""
-        try:
-            # Save to temporary files first
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.faiss') as tmp_index:
-                faiss.write_index(self.optimized_index.index, tmp_index.name)
-                tmp_index_path = tmp_index.name
-            
-            with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl') as tmp_meta:
-                data = {
-                    'id_to_metadata': self.id_to_metadata,
-                    'index_to_id': self.index_to_id,
-                    'next_id': self.next_id,
-                    'deleted_indices': list(self.deleted_indices),
-                    'index_stats': self.optimized_index.get_index_stats(),
-                    'saved_at': datetime.now().isoformat()
-                }
-                pickle.dump(data, tmp_meta)
-                tmp_meta_path = tmp_meta.name
-            
-            # Atomic move
-            shutil.move(tmp_index_path, str(self.index_path))
-            shutil.move(tmp_meta_path, str(self.metadata_path))
+        """Atomically save index and metadata as a new base snapshot.
+        
+        Caller must hold the write lock (or be in single-threaded init).
+        """
+        self._write_snapshot(self._capture_snapshot())
+    
+    def _capture_snapshot(self) -> Dict[str, Any]:
+        """Capture a consistent in-memory snapshot; caller holds the write lock.
+        
+        The WAL is rotated at the same instant, so every record in the sealed
+        segments is reflected in this snapshot and anything logged afterwards
+        lands in a newer segment. Metadata columns are copied and the text
+        heap is sealed, so both are safe to write out off-lock.
+        """
+        sealed_seq = self._wal.rotate()
+        # Memory-mapped inverted lists cannot be serialized
+        self.optimized_index.ensure_writable()
+        metadata_state, heap, heap_buffers = self.id_to_metadata.capture()
+        return {
+            'index_bytes': faiss.serialize_index(self.optimized_index.index),
+            'heap': heap,
+            'heap_buffers': heap_buffers,
+            'data': {
+                'metadata_columns': metadata_state,
+                'text_heap': f"{self.metadata_path.stem}.{sealed_seq}.heap",
+                'index_file': f"{self.index_path.stem}.{sealed_seq}{self.index_path.suffix}",
+                'position_ids': self.index_to_id.to_array(),
+                'next_id': self.next_id,
+                'deleted_indices': list(self.deleted_indices),
+                'index_stats': self.optimized_index.get_index_stats(),
+                'index_state': self.optimized_index.get_state(),
+                'wal_checkpoint_seq': sealed_seq,
+                'saved_at': datetime.now().isoformat()
+            }
+        }
+    
+    def _write_snapshot(self, snapshot: Dict[str, Any]):
+        """Write a captured snapshot to disk and drop the WAL segments it covers"""
+        sealed_seq = snapshot['data']['wal_checkpoint_seq']
+        with self._snapshot_lock:
+            if sealed_seq < self._checkpoint_seq:
+                # A newer snapshot was written while this one waited
+                return
+            try:
+                # Chunk text and the index go to seq-named files first; the pickle that
+                # references them is renamed last, so that rename is the checkpoint's commit point
+                heap_path = self.metadata_path.parent / snapshot['data']['text_heap']
+                index_file = self.metadata_path.parent / snapshot['data']['index_file']
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.heap', dir=self.index_path.parent) as tmp_heap:
+                    for buffer in snapshot['heap_buffers']:
+                        tmp_heap.write(buffer)
+                    tmp_heap.flush()
+                    os.fsync(tmp_heap.fileno())
+                    tmp_heap_path = tmp_heap.name
+                os.replace(tmp_heap_path, heap_path)
+                
+                # Save to temporary files next to the targets so the move is a rename
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.faiss', dir=self.index_path.parent) as tmp_index:
+                    tmp_index.write(snapshot['index_bytes'].tobytes())
+                    tmp_index.flush()
+                    os.fsync(tmp_index.fileno())
+                    tmp_index_path = tmp_index.name
+                os.replace(tmp_index_path, index_file)
+                
+                with tempfile.NamedTemporaryFile(delete=False, suffix='.pkl', dir=self.index_path.parent) as tmp_meta:
+                    pickle.dump(snapshot['data'], tmp_meta, protocol=pickle.HIGHEST_PROTOCOL)
+                    tmp_meta.flush()
+                    os.fsync(tmp_meta.fileno())
+                    tmp_meta_path = tmp_meta.name
+                
+                # Atomic commit: a crash before this leaves the previous snapshot and its WAL intact
+                os.replace(tmp_meta_path, self.metadata_path)
+                
+                self._checkpoint_seq = sealed_seq
+                self._index_file = index_file
+                self._wal.remove_segments(sealed_seq)
+                self._remove_stale_heaps(heap_path)
+                self._remove_stale_index_files(index_file)
+                
+                # Serve the sealed text from the page cache instead of the Python heap
+                heap_size = snapshot['data']['metadata_columns']['heap_size']
+                if heap_size:
+                    snapshot['heap'].attach(StringHeap.map_file(heap_path), heap_size)
             
+            except Exception as e:
+                # Clean up temp files on error
+                try:
+                    if 'tmp_heap_path' in locals():
+                        Path(tmp_heap_path).unlink(missing_ok=True)
+                    if 'tmp_index_path' in locals():
+                        Path(tmp_index_path).unlink(missing_ok=True)
+                    if 'tmp_meta_path' in locals():
+                        Path(tmp_meta_path).unlink(missing_ok=True)
+                except:
+                    pass
+                raise StorageError(f"Failed to save index atomically: {e}")
+    
+    def _remove_stale_heaps(self, current_heap: Path):
+        """Delete text heap files left behind by older snapshots"""
+        for heap_path in self.metadata_path.parent.glob(f"{self.metadata_path.stem}.*.heap"):
+            if heap_path != current_heap:
+                try:
+                    heap_path.unlink()
+                except OSError as e:
+                    # Still mapped on platforms that lock mapped files; retried next snapshot
+                    logging.debug(f"Could not remove stale text heap {heap_path}: {e}")
+    
+    def _remove_stale_index_files(self, current_index: Path):
+        """Delete index files left behind by older snapshots, including a pre-seq-naming index_path"""
+        stale = list(self.index_path.parent.glob(f"{self.index_path.stem}.*{self.index_path.suffix}"))
+        stale.append(self.index_path)
+        for index_file in stale:
+            if index_file != current_index and index_file.exists():
+                try:
+                    index_file.unlink()
+                except OSError as e:
+                    # Still mapped on platforms that lock mapped files; retried next snapshot
+                    logging.debug(f"Could not remove stale index file {index_file}: {e}")
+    
+    def _log_mutation(self, record: Dict[str, Any]):
+        """Persist a mutation: append to the WAL, or rewrite the snapshot when logging is off"""
+        self.change_log.record(self._changed_doc_paths(record))
+        if not self.wal_enabled:
+            self._save_atomic()
+            return
+        try:
+            self._wal.append(record)
         except Exception as e:
-            # Clean up temp files on error
+            raise StorageError(f"Failed to append to write-ahead log: {e}")
+        if self._wal.pending_bytes() >= self.wal_compact_bytes:
+            self._compact_event.set()
+    
+    def _changed_doc_paths(self, record: Dict[str, Any]) -> Optional[List[Optional[str]]]:
+        """doc_path of every vector a logged mutation touches"""
+        op = record.get('op')
+        if op == 'add':
+            return [metadata.get('doc_path') for metadata in record['metadata']]
+        if op == 'update':
+            vector_ids = [record['vector_id']]
+        elif op == 'update_batch':
+            vector_ids = [vector_id for vector_id, _ in record['updates']]
+        elif op == 'delete':
+            vector_ids = record['vector_ids']
+        else:
+            return None
+        return [(self.id_to_metadata.get(vector_id) or {}).get('doc_path') for vector_id in vector_ids]
+    
+    def _start_compactor(self):
+        """Start the background thread that folds the WAL into the base snapshot"""
+        self._compactor_thread = threading.Thread(
+            target=self._compactor_loop, name="faiss-wal-compactor", daemon=True
+        )
+        self._compactor_thread.start()
+    
+    def _compactor_loop(self):
+        while not self._stop_compactor.is_set():
+            triggered = self._compact_event.wait(self.wal_compact_interval)
+            self._compact_event.clear()
+            if self._stop_compactor.is_set():
+                break
+            if not triggered and self._wal.pending_bytes() == 0:
+                continue
             try:
-                if 'tmp_index_path' in locals():
-                    Path(tmp_index_path).unlink(missing_ok=True)
-                if 'tmp_meta_path' in locals():
-                    Path(tmp_meta_path).unlink(missing_ok=True)
-            except:
-                pass
-            raise StorageError(f"Failed to save index atomically: {e}")
+                self.compact()
+            except Exception as e:
+                logging.error(f"Background WAL compaction failed: {e}")
+    
+    def compact(self):
+        """Fold logged mutations into the base snapshot.
+        
+        Only the in-memory capture runs under the write lock; serializing and
+        writing the snapshot happens after the lock is released.
+        """
+        with self._write_lock_context():
+            if self._wal.pending_bytes() == 0:
+                return
+            snapshot = self._capture_snapshot()
+        start_time = time.time()
+        self._write_snapshot(snapshot)
+        logging.info(f"Compacted FAISS write-ahead log into snapshot in {time.time() - start_time:.2f}s")
+    
+    def close(self):
+        """Stop background work and write a final snapshot"""
+        if self._rebuild_thread and self._rebuild_thread.is_alive():
+            self._rebuild_thread.join()
+        self._stop_compactor.set()
+        self._compact_event.set()
+        if self._compactor_thread and self._compactor_thread.is_alive():
+            self._compactor_thread.join(timeout=30)
+        self.compact()
+        self._wal.close()
     
     def _normalize_vectors(self, vectors: np.ndarray) -> np.ndarray:
         """Normalize vectors for cosine similarity"""
@@ -596,11 +1011,7 @@ class FAISSStore:
             for vector_id, metadata in self.id_to_metadata.items():
                 if metadata and not metadata.get('deleted', False):
                     # Find the FAISS index for this vector
-                    faiss_idx = None
-                    for idx, vid in self.index_to_id.items():
-                        if vid == vector_id:
-                            faiss_idx = idx
-                            break
+                    faiss_idx = self.index_to_id.position_of(vector_id)
                     
                     if faiss_idx is not None and faiss_idx < self.optimized_index.index.ntotal:
                         try:
@@ -642,6 +1053,8 @@ class FAISSStore:
             # Create new index with new dimension
             self.dimension = new_dimension
             self._create_new_index()
+            # Checkpoint so old-dimension WAL records are never replayed
+            self._save_atomic()
             
             # Add re-embedded vectors
             vector_ids = self.add_vectors(new_vectors, active_metadata)
@@ -761,21 +1174,15 @@ class FAISSStore:
                 
                 normalized_vectors = self._normalize_vectors(vector_array)
                 
-                # Get current index size atomically
-                current_index_size = self.optimized_index.index.ntotal
-                
-                # Add to optimized index
-                self.optimized_index.add_vectors(normalized_vectors)
-                
-                # Update metadata atomically
-                vector_ids = []
-                for i, meta in enumerate(cleaned_metadata):
-                    vector_id = self.next_id
-                    faiss_index = current_index_size + i
-                    
+                # Assign IDs and build flat metadata up front so the WAL record
+                # replays to exactly the same state
+                vector_ids = list(range(self.next_id, self.next_id + len(cleaned_metadata)))
+                added_at = datetime.now().isoformat()
+                flat_metadata = []
+                for vector_id, meta in zip(vector_ids, cleaned_metadata):
                     # Ensure metadata is flat - no nested 'metadata' key
                     flat_meta = {
-                        'added_at': datetime.now().isoformat(),
+                        'added_at': added_at,
                         'vector_id': vector_id
                     }
                     
@@ -783,17 +1190,17 @@ class FAISSStore:
                     for key, value in meta.items():
                         if key != 'metadata':  # Skip any nested metadata key
                             flat_meta[key] = value
-                    
-                    self.id_to_metadata[vector_id] = flat_meta
-                    self.index_to_id[faiss_index] = vector_id
-                    vector_ids.append(vector_id)
-                    self.next_id += 1
+                    flat_metadata.append(flat_meta)
                 
-                # Optimize index if needed
-                self.optimized_index.optimize_for_current_size()
+                self._apply_add(normalized_vectors, vector_ids, flat_metadata)
                 
-                # Save atomically
-                self._save_atomic()
+                # Persist just this change
+                self._log_mutation({
+                    'op': 'add',
+                    'vector_ids': vector_ids,
+                    'vectors': normalized_vectors,
+                    'metadata': flat_metadata
+                })
                 
                 logging.info(f"Added {len(vectors)} vectors to optimized FAISS index")
                 return vector_ids
@@ -801,6 +1208,47 @@ class FAISSStore:
             except Exception as e:
                 raise FAISSError(f"Failed to add vectors: {e}")
     
+    def _apply_add(self, normalized_vectors: np.ndarray, vector_ids: List[int],
+                   flat_metadata: List[Dict[str, Any]]):
+        """Apply an add to the in-memory index and mappings (live or WAL replay)"""
+        # Get current index size atomically (including vectors buffered for training)
+        current_index_size = self.optimized_index.total_vectors
+        
+        # Add to optimized index
+        self.optimized_index.add_vectors(normalized_vectors)
+        
+        # Update metadata atomically
+        for vector_id, flat_meta in zip(vector_ids, flat_metadata):
+            self.metadata_index.update(vector_id, self.id_to_metadata.get(vector_id), flat_meta)
+            self.id_to_metadata[vector_id] = flat_meta
+        self.index_to_id.assign(current_index_size, vector_ids)
+        if vector_ids:
+            self.next_id = max(self.next_id, max(vector_ids) + 1)
+        
+        # Optimize index if needed
+        self.optimized_index.optimize_for_current_size()
+    
+    def _apply_update(self, vector_id: int, updates: Dict[str, Any]):
+        """Apply a metadata update; replaces the dict so captured snapshots stay stable"""
+        old_metadata = self.id_to_metadata.get(vector_id)
+        if old_metadata is not None:
+            new_metadata = {**old_metadata, **updates}
+            self.id_to_metadata[vector_id] = new_metadata
+            self.metadata_index.update(vector_id, old_metadata, new_metadata)
+    
+    def _apply_delete(self, vector_ids: List[int], deleted_at: str):
+        """Mark vectors deleted; replaces each dict so captured snapshots stay stable"""
+        for vector_id in vector_ids:
+            old_metadata = self.id_to_metadata.get(vector_id)
+            if old_metadata is not None:
+                self.metadata_index.remove(vector_id, old_metadata)
+                self.id_to_metadata[vector_id] = {
+                    **old_metadata,
+                    'deleted': True,
+                    'deleted_at': deleted_at
+                }
+                self.deleted_indices.add(vector_id)
+    
     def search(self, query_vector: List[float], k: int = 5, 
                filter_metadata: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """Thread-safe search for similar vectors with optimization"""
@@ -821,9 +1269,8 @@ class FAISSStore:
                 
                 normalized_query = self._normalize_vectors(query_array)
                 
-                # Search using optimized index
-                search_k = min(k * 2, self.optimized_index.index.ntotal)  # Get more results for filtering
-                scores, indices = self.optimized_index.search(normalized_query, search_k)
+                # Search using optimized index, pre-filtered when the filter is indexed
+                scores, indices = self._search_index(normalized_query, k, filter_metadata)
                 
                 results = []
                 for score, idx in zip(scores[0], indices[0]):
@@ -835,16 +1282,9 @@ class FAISSStore:
                     if vector_id is None:
                         continue
                     
-                    # Get metadata using vector ID with consistent snapshot
-                    if vector_id in self.id_to_metadata:
-                        metadata = self.id_to_metadata[vector_id]
-                        
-                        # Safely handle None metadata
-                        if metadata is None:
-                            metadata = {}
-                        else:
-                            metadata = metadata.copy()
-                        
+                    # Get metadata using vector ID (a fresh dict built from the columns)
+                    metadata = self.id_to_metadata.get(vector_id)
+                    if metadata is not None:
                         # Skip deleted vectors
                         if metadata.get('deleted', False):
                             continue
@@ -868,13 +1308,25 @@ class FAISSStore:
     
     def search_with_metadata(self, query_vector: List[float], k: int = 5) -> List[Dict[str, Any]]:
         """Thread-safe search with enhanced metadata format for query engine"""
+        return self.search_batch([query_vector], k)[0]
+    
+    def search_batch(self, query_vectors: List[List[float]], k: int = 5,
+                     filters: Dict[str, Any] = None, return_vectors: bool = False) -> List[List[Dict[str, Any]]]:
+        """Search several query vectors with a single q x d FAISS call under one read lock.
+        
+        Returns one result list per query vector, in input order, in the
+        same format as ``search_with_metadata``. With ``return_vectors`` each
+        hit also carries its stored (normalized) vector under ``_vector``.
+        """
+        if len(query_vectors) == 0:
+            return []
+        
         with self._read_lock():
             if self.optimized_index.index.ntotal == 0:
-                return []
+                return [[] for _ in query_vectors]
             
             try:
-                # Normalize query vector
-                query_array = np.array([query_vector], dtype=np.float32)
+                query_array = np.asarray(query_vectors, dtype=np.float32)
                 
                 # Check dimension compatibility
                 if not self.validate_dimension(query_array.shape[1]):
@@ -883,68 +1335,118 @@ class FAISSStore:
                         f"Use check_dimension_compatibility() to see migration options."
                     )
                 
-                normalized_query = self._normalize_vectors(query_array)
-                
-                # Search using optimized index
-                scores, indices = self.optimized_index.search(normalized_query, k)
+                normalized_queries = self._normalize_vectors(query_array)
+                scores, indices = self._search_index(normalized_queries, k, filters)
+                if len(indices) == 0:
+                    return [[] for _ in query_vectors]
                 
-                results = []
-                for score, idx in zip(scores[0], indices[0]):
-                    if idx == -1:
-                        continue
-                    
-                    vector_id = self.index_to_id.get(idx)
-                    if vector_id is None:
-                        # Handle orphaned vectors
-                        result = {
-                            'faiss_index': int(idx),
-                            'similarity_score': float(score),
-                            'score': float(score),
-                            'vector_id': f'orphan_{idx}',
-                            'doc_id': 'unknown',
-                            'text': 'Content not available (orphaned vector)',
-                            'chunk_id': f'chunk_{idx}',
-                        }
-                        results.append(result)
-                        continue
-                    
-                    if vector_id in self.id_to_metadata:
-                        metadata = self.id_to_metadata[vector_id]
-                        
-                        if metadata is None:
-                            metadata = {}
-                        
-                        if metadata.get('deleted', False):
+                batch_results = []
+                for row_scores, row_indices in zip(scores, indices):
+                    results = []
+                    positions = []
+                    for score, idx in zip(row_scores, row_indices):
+                        if idx == -1:
                             continue
                         
-                        # FIXED: Return all metadata fields at top level, not nested
-                        result = metadata.copy()  # Start with all existing metadata
-                        
-                        # Add/override with search-specific fields
-                        result.update({
-                            'faiss_index': int(idx),
-                            'similarity_score': float(score),
-                            'score': float(score),
-                            'vector_id': str(vector_id),
-                            # Ensure key fields exist even if not in metadata
-                            'doc_id': result.get('doc_id', 'unknown'),
-                            'text': result.get('text', result.get('content', '')),
-                            'content': result.get('content', result.get('text', '')),
-                            'chunk_id': result.get('chunk_id', f'chunk_{vector_id}'),
-                        })
-                        
-                        # Debug log to verify output structure
-                        if logging.getLogger().isEnabledFor(logging.DEBUG) and len(results) == 0:
-                            logging.debug(f"Search result keys: {list(result.keys())}")
-                            if 'metadata' in result:
-                                logging.warning("Found nested 'metadata' key in search result!")
+                        result = self._format_search_hit(idx, score)
+                        if result is None:
+                            continue
+                        if filters and not self._matches_filter(result, filters):
+                            continue
                         
                         results.append(result)
+                        positions.append(idx)
+                        if len(results) >= k:
+                            break
+                    if return_vectors and results:
+                        vectors = self.optimized_index.reconstruct_batch(np.asarray(positions, dtype=np.int64))
+                        for result, vector in zip(results, vectors):
+                            result['_vector'] = vector
+                    batch_results.append(results)
                 
-                return results
+                return batch_results
                 
+            except FAISSError:
+                raise
             except Exception as e:
-                raise FAISSError(f"Search with metadata failed: {e}")
+                raise FAISSError(f"Batch search failed: {e}")
+    
+    def _search_index(self, normalized_queries: np.ndarray, k: int,
+                      filters: Dict[str, Any] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """Vector search restricted to filter matches inside the index; caller holds the read lock.
+        
+        Filters on indexed metadata fields are resolved to a candidate set
+        first: small sets are scored exactly, larger ones are searched with a
+        FAISS IDSelector. Other filters fall back to over-fetching so the
+        caller's post-filter still has k*2 hits to choose from.
+        """
+        ntotal = self.optimized_index.index.ntotal
+        if not filters:
+            # Leave room for deleted vectors that are still awaiting compaction
+            return self.optimized_index.search(normalized_queries, k + min(k, len(self.deleted_indices)))
+        
+        candidate_ids = self.metadata_index.lookup(filters)
+        if candidate_ids is None:
+            return self.optimized_index.search(normalized_queries, min(k * 2, ntotal))
+        
+        positions = self.index_to_id.positions_of(
+            np.fromiter(candidate_ids, dtype=np.int64, count=len(candidate_ids))
+        )
+        positions = np.sort(positions[(positions >= 0) & (positions < ntotal)])
+        if len(positions) == 0:
+            empty = np.empty((len(normalized_queries), 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+        
+        if len(positions) <= self.FILTER_BRUTE_FORCE_LIMIT:
+            # Exact scoring over the candidates, using the index's own metric
+            candidate_vectors = self.optimized_index.reconstruct_batch(positions)
+            scores, rows = faiss.knn(normalized_queries, candidate_vectors, min(k, len(positions)),
+                                     metric=self.optimized_index.index.metric_type)
+            return scores, np.where(rows >= 0, positions[rows], -1)
+        
+        selector = faiss.IDSelectorBatch(positions)
+        return self.optimized_index.search(normalized_queries, min(k, len(positions)),
+                                           selector=selector, selectivity=len(positions) / ntotal)
+    
+    def _format_search_hit(self, idx: int, score: float) -> Optional[Dict[str, Any]]:
+        """Build a query-engine result for one FAISS hit; None for deleted or unknown vectors"""
+        vector_id = self.index_to_id.get(idx)
+        if vector_id is None:
+            # Handle orphaned vectors
+            return {
+                'faiss_index': int(idx),
+                'similarity_score': float(score),
+                'score': float(score),
+                'vector_id': f'orphan_{idx}',
+                'doc_id': 'unknown',
+                'text': 'Content not available (orphaned vector)',
+                'chunk_id': f'chunk_{idx}',
+            }
+        
+        # Rebuilt from the metadata columns, so the dict is already a private copy
+        result = self.id_to_metadata.get(vector_id)
+        if result is None or result.get('deleted', False):
+            return None
+        
+        # FIXED: Return all metadata fields at top level, not nested
+        
+        # Add/override with search-specific fields
+        result.update({
+            'faiss_index': int(idx),
+            'similarity_score': float(score),
+            'score': float(score),
+            'vector_id': str(vector_id),
+            # Ensure key fields exist even if not in metadata
+            'doc_id': result.get('doc_id', 'unknown'),
+            'text': result.get('text', result.get('content', '')),
+            'content': result.get('content', result.get('text', '')),
+            'chunk_id': result.get('chunk_id', f'chunk_{vector_id}'),
+        })
+        
+        if logging.getLogger().isEnabledFor(logging.DEBUG) and 'metadata' in result:
+            logging.warning("Found nested 'metadata' key in search result!")
+        
+        return result
     
     def _matches_filter(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
         """Check if metadata matches the given filters"""
@@ -964,29 +1466,37 @@ class FAISSStore:
         """Update metadata for a vector"""
         with self._write_lock_context():
             if vector_id in self.id_to_metadata:
-                self.id_to_metadata[vector_id].update(updates)
-                self._save_atomic()
+                self._apply_update(vector_id, updates)
+                self._log_mutation({'op': 'update', 'vector_id': vector_id, 'updates': updates})
+    
+    def update_metadata_batch(self, updates: Dict[int, Dict[str, Any]]):
+        """Update metadata for many vectors under one lock and one log record"""
+        with self._write_lock_context():
+            applied = [[vector_id, changes] for vector_id, changes in updates.items()
+                       if vector_id in self.id_to_metadata]
+            for vector_id, changes in applied:
+                self._apply_update(vector_id, changes)
+            if applied:
+                self._log_mutation({'op': 'update_batch', 'updates': applied})
     
     def delete_vectors(self, vector_ids: List[int]):
         """Thread-safe vector deletion with efficient cleanup"""
         with self._write_lock_context():
             try:
                 # Mark vectors as deleted
-                for vector_id in vector_ids:
-                    if vector_id in self.id_to_metadata:
-                        self.id_to_metadata[vector_id]['deleted'] = True
-                        self.id_to_metadata[vector_id]['deleted_at'] = datetime.now().isoformat()
-                        self.deleted_indices.add(vector_id)
+                deleted_at = datetime.now().isoformat()
+                self._apply_delete(vector_ids, deleted_at)
                 
                 # Save metadata
-                self._save_atomic()
+                self._log_mutation({'op': 'delete', 'vector_ids': list(vector_ids), 'deleted_at': deleted_at})
                 
                 # Schedule efficient cleanup if threshold reached
                 total_vectors = len(self.id_to_metadata)
                 deletion_ratio = len(self.deleted_indices) / max(total_vectors, 1)
                 
                 if deletion_ratio > 0.15:  # 15% threshold for efficient rebuild
-                    self._efficient_rebuild_index()
+                    # Compact off the request path; searches keep using the current index
+                    self._schedule_rebuild()
                 
                 logging.info(f"Deleted {len(vector_ids)} vectors")
                 
@@ -996,23 +1506,21 @@ class FAISSStore:
     
     def find_vectors_by_doc_path(self, doc_path: str) -> List[int]:
         """Find all vector IDs that match a given doc_path"""
+        return self.find_vectors_by_metadata({'doc_path': doc_path})
+    
+    def find_vectors_by_metadata(self, filters: Dict[str, Any]) -> List[int]:
+        """Find IDs of live vectors whose metadata equals every filter value"""
         with self._read_lock():
-            matching_vectors = []
+            matching_ids = self.metadata_index.lookup(filters)
+            if matching_ids is not None:
+                return sorted(matching_ids)
             
-            for vector_id, metadata in self.id_to_metadata.items():
-                # Safely handle None metadata
-                if metadata is None:
-                    metadata = {}
-                
-                if metadata.get('deleted', False):
-                    continue
-                    
-                # Check if doc_path matches
-                if metadata.get('doc_path') == doc_path:
-                    matching_vectors.append(vector_id)
-            
-            return matching_vectors
-
+            # Unindexed field: scan the metadata
+            return [
+                vector_id for vector_id, metadata in self.id_to_metadata.items()
+                if metadata and not metadata.get('deleted', False) and self._matches_filter(metadata, filters)
+            ]
+    
     def delete_vectors_by_doc_path(self, doc_path: str) -> int:
         """Delete all vectors associated with a doc_path"""
         vectors_to_delete = self.find_vectors_by_doc_path(doc_path)
@@ -1024,6 +1532,14 @@ class FAISSStore:
         
         return 0
     
+    def find_chunk_hashes(self, doc_path: str) -> Dict[int, Optional[str]]:
+        """Map each live vector of ``doc_path`` to its stored chunk text hash (None if never recorded)"""
+        with self._read_lock():
+            return {
+                vector_id: (self.id_to_metadata.get(vector_id) or {}).get('chunk_hash')
+                for vector_id in self.find_vectors_by_metadata({'doc_path': doc_path})
+            }
+    
     def save_index(self):
         """Save the FAISS index and metadata"""
         with self._write_lock_context():
@@ -1033,8 +1549,7 @@ class FAISSStore:
     def get_index_info(self) -> Dict[str, Any]:
         """Get information about the index"""
         with self._read_lock():
-            active_count = sum(1 for meta in self.id_to_metadata.values() 
-                              if meta is not None and not meta.get('deleted', False))
+            active_count = len(self.id_to_metadata.live_ids())
             
             base_info = {
                 'ntotal': self.optimized_index.index.ntotal if self.optimized_index.index else 0,
@@ -1042,7 +1557,12 @@ class FAISSStore:
                 'active_vectors': active_count,
                 'deleted_vectors': len(self.deleted_indices),
                 'index_path': str(self.index_path),
-                'metadata_path': str(self.metadata_path)
+                'index_file': str(self._index_file),
+                'metadata_path': str(self.metadata_path),
+                'wal_enabled': self.wal_enabled,
+                'wal_checkpoint_seq': self._checkpoint_seq,
+                **self._wal.get_stats(),
+                **self.id_to_metadata.get_stats()
             }
             
             # Add optimized index stats
@@ -1053,6 +1573,8 @@ class FAISSStore:
     
     def backup_index(self, backup_path: str):
         """Create a backup of the index"""
+        # Fold pending WAL records in so the metadata file matches the in-memory index
+        self.compact()
         with self._read_lock():
             backup_path = Path(backup_path)
             backup_path.mkdir(parents=True, exist_ok=True)
@@ -1060,7 +1582,7 @@ class FAISSStore:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             
             # Backup FAISS index
-            if self.index_path.exists():
+            if self._index_file.exists():
                 backup_index_path = backup_path / f"index_{timestamp}.faiss"
                 faiss.write_index(self.optimized_index.index, str(backup_index_path))
             
@@ -1069,6 +1591,12 @@ class FAISSStore:
                 backup_metadata_path = backup_path / f"metadata_{timestamp}.pkl"
                 with open(self.metadata_path, 'rb') as src, open(backup_metadata_path, 'wb') as dst:
                     dst.write(src.read())
+                
+                # Chunk text referenced by the metadata snapshot
+                with open(self.metadata_path, 'rb') as f:
+                    heap_name = pickle.load(f).get('text_heap')
+                if heap_name and (self.metadata_path.parent / heap_name).exists():
+                    shutil.copy2(self.metadata_path.parent / heap_name, backup_path / f"metadata_{timestamp}.heap")
             
             logging.info(f"Optimized index backed up to {backup_path}")
             return str(backup_path)
@@ -1088,12 +1616,22 @@ class FAISSStore:
             latest_index = max(index_backups, key=lambda x: x.stat().st_mtime)
             latest_metadata = max(metadata_backups, key=lambda x: x.stat().st_mtime)
             
-            # Restore files
-            shutil.copy2(latest_index, self.index_path)
+            # Restore files under the names the metadata snapshot references; the pickle goes last
+            with open(latest_metadata, 'rb') as f:
+                data = pickle.load(f)
+            shutil.copy2(latest_index, self.metadata_path.parent / data.get('index_file', self.index_path.name))
+            
+            latest_heap = latest_metadata.with_suffix('.heap')
+            if latest_heap.exists():
+                shutil.copy2(latest_heap, self.metadata_path.parent / data['text_heap'])
             shutil.copy2(latest_metadata, self.metadata_path)
             
+            # Logged mutations belong to the replaced snapshot
+            self._wal.reset()
+            
             # Reload
             self._initialize_index()
+            self.change_log.record(None)
             
             logging.info(f"Optimized index restored from {backup_path}")
     
@@ -1102,6 +1640,7 @@ class FAISSStore:
         with self._write_lock_context():
             self._create_new_index()
             self._save_atomic()
+            self.change_log.record(None)
             logging.info("Optimized index cleared")
     
     def get_stats(self) -> Dict[str, Any]:
@@ -1111,15 +1650,12 @@ class FAISSStore:
             
             # Add more detailed stats
             if self.id_to_metadata:
-                creation_times = [
-                    meta.get('added_at') for meta in self.id_to_metadata.values()
-                    if meta and not meta.get('deleted', False) and meta.get('added_at')
-                ]
+                creation_range = self.id_to_metadata.timestamp_range('added_at')
                 
-                if creation_times:
+                if creation_range:
                     stats.update({
-                        'oldest_vector': min(creation_times),
-                        'newest_vector': max(creation_times),
+                        'oldest_vector': creation_range[0],
+                        'newest_vector': creation_range[1],
                         'total_metadata_entries': len(self.id_to_metadata)
                     })
             
@@ -1129,7 +1665,7 @@ class FAISSStore:
         """Get all vector metadata (for API endpoints)"""
         with self._read_lock():
             # Return all metadata including deleted vectors for admin purposes
-            return dict(self.id_to_metadata)
+            return dict(self.id_to_metadata.items())
     
     def get_metadata(self, vector_id: str) -> Optional[Dict[str, Any]]:
         """Get metadata for a specific vector ID"""
@@ -0,0 +1,170 @@
+"""
+FAISS Write-Ahead Log
+Append-only, segmented mutation log used for incremental FAISSStore persistence
+"""
+import os
+import pickle
+import struct
+import zlib
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, Iterator, List, Optional
+
+
+class WriteAheadLog:
+    """Segmented append-only log of vector store mutations.
+    
+    Every record is a pickled dict framed as ``<length><crc32><payload>``.
+    Segments are named ``<prefix>.<seq>.log``; the highest sequence number
+    is the active segment, all lower ones are sealed and wait to be folded
+    into the base snapshot by a checkpoint.
+    """
+    
+    HEADER = struct.Struct('<II')  # payload length, crc32 of payload
+    
+    def __init__(self, directory: str, prefix: str = "vector_wal", fsync: bool = True):
+        self.directory = Path(directory)
+        self.prefix = prefix
+        self.fsync = fsync
+        self.directory.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.Lock()
+        self._file = None
+        self._pending_bytes = 0
+        self._pending_records = 0
+        
+        existing = self._list_segments()
+        self._active_seq = existing[-1] if existing else 1
+        for seq in existing:
+            self._pending_bytes += self._segment_path(seq).stat().st_size
+        self._open_active()
+    
+    def _segment_path(self, seq: int) -> Path:
+        return self.directory / f"{self.prefix}.{seq:06d}.log"
+    
+    def _list_segments(self) -> List[int]:
+        """Return sequence numbers of all segments on disk, oldest first"""
+        seqs = []
+        for path in self.directory.glob(f"{self.prefix}.*.log"):
+            try:
+                seqs.append(int(path.name[len(self.prefix) + 1:-len(".log")]))
+            except ValueError:
+                logging.warning(f"Ignoring unexpected WAL file: {path}")
+        return sorted(seqs)
+    
+    def _open_active(self):
+        self._file = open(self._segment_path(self._active_seq), 'ab')
+    
+    @property
+    def active_seq(self) -> int:
+        return self._active_seq
+    
+    def append(self, record: Dict[str, Any]) -> int:
+        """Durably append one record to the active segment; returns bytes written"""
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        frame = self.HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with self._lock:
+            self._file.write(frame)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending_bytes += len(frame)
+            self._pending_records += 1
+        return len(frame)
+    
+    def rotate(self) -> int:
+        """Seal the active segment and start a new one; returns the sealed sequence"""
+        with self._lock:
+            sealed = self._active_seq
+            self._file.close()
+            self._active_seq += 1
+            self._open_active()
+            return sealed
+    
+    def replay(self, after_seq: int = 0) -> Iterator[Dict[str, Any]]:
+        """Yield records from every segment newer than ``after_seq``, in order.
+        
+        A torn or corrupt tail (e.g. after a crash mid-append) ends replay of
+        that segment; the damaged bytes are truncated away so later appends
+        stay readable.
+        """
+        for seq in self._list_segments():
+            if seq <= after_seq:
+                continue
+            path = self._segment_path(seq)
+            valid_end = 0
+            with open(path, 'rb') as f:
+                while True:
+                    header = f.read(self.HEADER.size)
+                    if not header:
+                        break
+                    if len(header) < self.HEADER.size:
+                        logging.warning(f"Truncated WAL header in {path.name} at offset {valid_end}")
+                        break
+                    length, crc = self.HEADER.unpack(header)
+                    payload = f.read(length)
+                    if len(payload) < length or zlib.crc32(payload) != crc:
+                        logging.warning(f"Corrupt WAL record in {path.name} at offset {valid_end}")
+                        break
+                    valid_end = f.tell()
+                    yield pickle.loads(payload)
+            if valid_end < path.stat().st_size:
+                self._truncate(seq, valid_end)
+    
+    def _truncate(self, seq: int, size: int):
+        with self._lock:
+            if seq == self._active_seq:
+                self._file.close()
+            with open(self._segment_path(seq), 'r+b') as f:
+                f.truncate(size)
+            if seq == self._active_seq:
+                self._open_active()
+    
+    def remove_segments(self, up_to_seq: int):
+        """Delete sealed segments that a checkpoint has folded into the snapshot"""
+        with self._lock:
+            for seq in self._list_segments():
+                if seq > up_to_seq or seq == self._active_seq:
+                    continue
+                path = self._segment_path(seq)
+                try:
+                    self._pending_bytes -= path.stat().st_size
+                    path.unlink()
+                except FileNotFoundError:
+                    pass
+            self._pending_bytes = max(self._pending_bytes, 0)
+            if up_to_seq >= self._active_seq - 1:
+                self._pending_records = 0
+    
+    def reset(self, next_seq: Optional[int] = None):
+        """Discard every segment (used when the base snapshot is replaced wholesale)"""
+        with self._lock:
+            self._file.close()
+            for seq in self._list_segments():
+                self._segment_path(seq).unlink(missing_ok=True)
+            self._active_seq = max(self._active_seq + 1, next_seq or 0)
+            self._pending_bytes = 0
+            self._pending_records = 0
+            self._open_active()
+    
+    def pending_bytes(self) -> int:
+        """Bytes logged since the last checkpoint"""
+        return self._pending_bytes
+    
+    def pending_records(self) -> int:
+        """Records appended by this process since the last checkpoint"""
+        return self._pending_records
+    
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'wal_active_segment': self._active_seq,
+            'wal_segments': len(self._list_segments()),
+            'wal_pending_bytes': self._pending_bytes,
+            'wal_pending_records': self._pending_records,
+        }
+    
+    def close(self):
+        with self._lock:
+            if self._file and not self._file.closed:
+                self._file.close()
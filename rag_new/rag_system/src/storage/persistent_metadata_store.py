@@ -25,6 +25,7 @@ class PersistentJSONMetadataStore:
         self._files_cache = None
         self._chunks_cache = None
         self._vector_mappings_cache = None
+        self._hash_index: Dict[str, str] = {}  # doc_hash -> file_id of the latest file with that content
         
         # Load existing data
         self._load_all_data()
@@ -37,6 +38,14 @@ class PersistentJSONMetadataStore:
         self._files_cache = self._load_json(self.files_metadata_path, {})
         self._chunks_cache = self._load_json(self.chunks_metadata_path, {})
         self._vector_mappings_cache = self._load_json(self.vector_mappings_path, {})
+        self._rebuild_hash_index()
+    
+    def _rebuild_hash_index(self):
+        self._hash_index = {}
+        for file_id, file_metadata in self._files_cache.items():
+            doc_hash = file_metadata.get('doc_hash')
+            if doc_hash:
+                self._hash_index[doc_hash] = file_id
     
     def _load_json(self, file_path: Path, default: Any = None) -> Any:
         """Load JSON file with error handling"""
@@ -71,16 +80,21 @@ class PersistentJSONMetadataStore:
         
         # Add to cache and save
         self._files_cache[file_id] = file_metadata
+        if file_metadata.get('doc_hash'):
+            self._hash_index[file_metadata['doc_hash']] = file_id
         self._save_json(self.files_metadata_path, self._files_cache)
         
         return file_id
     
     def find_by_hash(self, doc_hash: str) -> Optional[Dict[str, Any]]:
         """Find file metadata by document hash for deduplication"""
-        for file_id, file_metadata in self._files_cache.items():
-            if file_metadata.get('doc_hash') == doc_hash:
-                return file_metadata
-        return None
+        file_id = self._hash_index.get(doc_hash)
+        return self._files_cache.get(file_id) if file_id else None
+    
+    def find_vector_ids_by_hash(self, doc_hash: str) -> List[Any]:
+        """Vector IDs recorded for the file with this document hash"""
+        file_metadata = self.find_by_hash(doc_hash)
+        return list(file_metadata.get('vector_ids') or []) if file_metadata else []
     
     def add_chunk_metadata(self, chunk_data: Dict[str, Any]) -> str:
         """Add chunk metadata with vector linking"""
@@ -165,6 +179,7 @@ class PersistentJSONMetadataStore:
         self._files_cache = {}
         self._chunks_cache = {}
         self._vector_mappings_cache = {}
+        self._hash_index = {}
         
         # Remove files
         for file_path in [self.files_metadata_path, self.chunks_metadata_path, self.vector_mappings_path]:
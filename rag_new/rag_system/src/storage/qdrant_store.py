@@ -15,7 +15,8 @@ from qdrant_client.models import (
     Distance, VectorParams, PointStruct, 
     Filter, FieldCondition, Range, MatchValue,
     SearchRequest, ScrollRequest, UpdateStatus,
-    HasIdCondition, MatchAny, MatchText
+    HasIdCondition, MatchAny, MatchText,
+    SetPayload, SetPayloadOperation, PayloadSchemaType
 )
 import numpy as np
 
@@ -40,14 +41,38 @@ except ImportError:
             Result, with_error_handling
         )
 
+try:
+    from .change_log import DocumentChangeLog
+except ImportError:
+    from change_log import DocumentChangeLog
+
 class QdrantVectorStore:
     """Qdrant-based vector store with advanced filtering and metadata support"""
     
+    # Payload fields filtered or counted by exact value; unindexed filters scan the collection
+    PAYLOAD_INDEX_FIELDS = {
+        'doc_type': PayloadSchemaType.KEYWORD,
+        'source_file': PayloadSchemaType.KEYWORD,
+        'doc_path': PayloadSchemaType.KEYWORD,
+        'doc_hash': PayloadSchemaType.KEYWORD,
+        'has_incident': PayloadSchemaType.BOOL,
+        'incident_ids': PayloadSchemaType.KEYWORD
+    }
+    AGGREGATE_DOC_TYPES = ('incident', 'change', 'problem', 'request', 'task')
+    # Scroll pages start small so short result sets return quickly, then grow
+    SCROLL_PAGE_MIN = 256
+    SCROLL_PAGE_MAX = 4096
+    
     def __init__(self, 
                  url: str = "localhost:6333",
                  collection_name: str = "rag_documents",
                  dimension: int = 1024,
-                 on_disk: bool = True):
+                 on_disk: bool = True,
+                 prefer_grpc: bool = False,
+                 grpc_port: int = 6334,
+                 path: Optional[str] = None,
+                 upload_batch_size: int = 256,
+                 upload_parallel: int = 1):
         """
         Initialize Qdrant vector store
         
@@ -56,15 +81,33 @@ class QdrantVectorStore:
             collection_name: Name of the collection
             dimension: Vector dimension
             on_disk: Store vectors on disk (for large datasets)
+            prefer_grpc: Talk to the server over gRPC instead of HTTP/JSON
+            grpc_port: Server gRPC port
+            path: Run Qdrant embedded in this process, persisted at ``path``
+                (single-node deployments and server-less tests); ``url`` is ignored
+            upload_batch_size: ``add_vectors`` calls with more points are sent
+                through ``upload_points`` in batches of this size
+            upload_parallel: Upload worker processes (forced to 1 in local mode)
         """
-        self.client = QdrantClient(url=url)
+        if path:
+            Path(path).mkdir(parents=True, exist_ok=True)
+            self.client = QdrantClient(path=path)
+            location = f"local:{path}"
+        else:
+            self.client = QdrantClient(url=url, prefer_grpc=prefer_grpc, grpc_port=grpc_port)
+            location = f"{url} ({'grpc' if prefer_grpc else 'http'})"
         self.collection_name = collection_name
         self.dimension = dimension
+        self.change_log = DocumentChangeLog()  # Mutations made through this instance
+        self.local_mode = bool(path)
+        self.upload_batch_size = max(1, upload_batch_size)
+        # The embedded client cannot be shared with upload worker processes
+        self.upload_parallel = 1 if self.local_mode else max(1, upload_parallel)
         
         # Create or verify collection
         self._init_collection(on_disk)
         
-        logging.info(f"Qdrant store initialized: {url}/{collection_name}")
+        logging.info(f"Qdrant store initialized: {location}/{collection_name}")
     
     def _init_collection(self, on_disk: bool):
         """Initialize Qdrant collection"""
@@ -82,6 +125,17 @@ class QdrantVectorStore:
             logging.info(f"Created collection: {self.collection_name}")
         else:
             logging.info(f"Using existing collection: {self.collection_name}")
+        
+        # Without a payload index every filtered lookup scans the collection
+        for field_name, field_schema in self.PAYLOAD_INDEX_FIELDS.items():
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
+                )
+            except Exception as e:
+                logging.debug(f"Payload index on {field_name} not created: {e}")
     
     def add_vectors(self, vectors: List[List[float]], metadata: List[Dict[str, Any]]) -> List[str]:
         """Add vectors with metadata to Qdrant"""
@@ -114,12 +168,22 @@ class QdrantVectorStore:
                 payload=payload
             ))
         
-        # Batch upload
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=points
-        )
+        if len(points) > self.upload_batch_size:
+            # Split into batches, optionally uploaded by parallel workers
+            self.client.upload_points(
+                collection_name=self.collection_name,
+                points=points,
+                batch_size=self.upload_batch_size,
+                parallel=self.upload_parallel,
+                wait=True
+            )
+        else:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=points
+            )
         
+        self.change_log.record(meta.get('doc_path') for meta in metadata)
         logging.info(f"Added {len(vectors)} vectors to Qdrant")
         return vector_ids
     
@@ -140,7 +204,39 @@ class QdrantVectorStore:
             with_vectors=False
         )
         
-        # Format results
+        return self._format_scored_points(results)
+    
+    def search_batch(self, query_vectors: List[List[float]], k: int = 5,
+                     filters: Optional[Dict[str, Any]] = None,
+                     return_vectors: bool = False) -> List[List[Dict[str, Any]]]:
+        """Search several query vectors in one round trip; one result list per query
+        
+        With ``return_vectors`` each hit also carries its stored vector under ``_vector``.
+        """
+        if len(query_vectors) == 0:
+            return []
+        
+        qdrant_filter = self._build_filter(filters) if filters else None
+        requests = [
+            SearchRequest(
+                vector=list(query_vector),
+                filter=qdrant_filter,
+                limit=k,
+                with_payload=True,
+                with_vector=return_vectors
+            )
+            for query_vector in query_vectors
+        ]
+        
+        batch_results = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=requests
+        )
+        
+        return [self._format_scored_points(results) for results in batch_results]
+    
+    def _format_scored_points(self, results) -> List[Dict[str, Any]]:
+        """Flatten Qdrant scored points into payload dicts with score and ID"""
         formatted_results = []
         for result in results:
             formatted_result = {
@@ -148,6 +244,8 @@ class QdrantVectorStore:
                 'similarity_score': result.score,
                 'vector_id': result.id
             }
+            if getattr(result, 'vector', None) is not None:
+                formatted_result['_vector'] = result.vector
             formatted_results.append(formatted_result)
         
         return formatted_results
@@ -189,29 +287,9 @@ class QdrantVectorStore:
             ]
         )
         
-        # Use scroll to get ALL matching documents
-        results = []
-        offset = None
-        
-        while True:
-            response = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=incident_filter,
-                limit=100,  # Batch size
-                offset=offset,
-                with_payload=True,
-                with_vectors=False
-            )
-            
-            results.extend(response[0])
-            offset = response[1]
-            
-            if offset is None:
-                break
-        
-        # Extract and deduplicate incidents
+        # Extract and deduplicate incidents, fetching only the fields used below
         all_incidents = {}
-        for result in results:
+        for result in self._scroll_all(incident_filter, with_payload=['incident_ids', 'text', 'source_file']):
             incident_ids = result.payload.get('incident_ids', [])
             text = result.payload.get('text', '')
             source = result.payload.get('source_file', 'unknown')
@@ -244,68 +322,60 @@ class QdrantVectorStore:
             ]
         )
         
-        results = []
+        return [r.payload for r in self._scroll_all(pattern_filter)]
+    
+    def _scroll_all(self, scroll_filter: Optional[Filter] = None, with_payload: Any = True):
+        """Yield every point matching ``scroll_filter``, doubling the page size as the scroll continues"""
         offset = None
-        
+        limit = self.SCROLL_PAGE_MIN
         while True:
-            response = self.client.scroll(
+            points, offset = self.client.scroll(
                 collection_name=self.collection_name,
-                scroll_filter=pattern_filter,
-                limit=100,
+                scroll_filter=scroll_filter,
+                limit=limit,
                 offset=offset,
-                with_payload=True
+                with_payload=with_payload,
+                with_vectors=False
             )
-            
-            results.extend(response[0])
-            offset = response[1]
-            
+            yield from points
             if offset is None:
                 break
-        
-        return [r.payload for r in results]
+            limit = min(limit * 2, self.SCROLL_PAGE_MAX)
+    
+    def count(self, filters: Optional[Dict[str, Any]] = None, exact: bool = True) -> int:
+        """Count points matching ``filters`` on the server without transferring them"""
+        response = self.client.count(
+            collection_name=self.collection_name,
+            count_filter=self._build_filter(filters) if filters else None,
+            exact=exact
+        )
+        return response.count
+    
+    def facet_counts(self, field: str, filters: Optional[Dict[str, Any]] = None,
+                     limit: int = 100) -> Optional[Dict[Any, int]]:
+        """Server-side value -> count for an indexed keyword field; None if the server has no facet API"""
+        if not hasattr(self.client, 'facet'):
+            return None
+        try:
+            response = self.client.facet(
+                collection_name=self.collection_name,
+                key=field,
+                facet_filter=self._build_filter(filters) if filters else None,
+                limit=limit,
+                exact=True
+            )
+        except Exception as e:
+            logging.debug(f"Facet on {field} unavailable, falling back to counts: {e}")
+            return None
+        return {hit.value: hit.count for hit in response.hits}
     
     def aggregate_by_type(self) -> Dict[str, int]:
         """Get counts by document type"""
-        
-        # Note: Qdrant doesn't have built-in aggregation like MongoDB
-        # We'll use scroll with filters for each type
-        
-        doc_types = ['incident', 'change', 'problem', 'request', 'task']
-        counts = {}
-        
-        for doc_type in doc_types:
-            type_filter = Filter(
-                must=[
-                    FieldCondition(
-                        key="doc_type",
-                        match=MatchValue(value=doc_type)
-                    )
-                ]
-            )
-            
-            # Count using scroll
-            count = 0
-            offset = None
-            
-            while True:
-                response = self.client.scroll(
-                    collection_name=self.collection_name,
-                    scroll_filter=type_filter,
-                    limit=100,
-                    offset=offset,
-                    with_payload=False,
-                    with_vectors=False
-                )
-                
-                count += len(response[0])
-                offset = response[1]
-                
-                if offset is None:
-                    break
-            
-            counts[doc_type] = count
-        
-        return counts
+        # One facet request over the doc_type index, or one indexed count per type
+        facets = self.facet_counts('doc_type')
+        if facets is not None:
+            return {doc_type: facets.get(doc_type, 0) for doc_type in self.AGGREGATE_DOC_TYPES}
+        return {doc_type: self.count({'doc_type': doc_type}) for doc_type in self.AGGREGATE_DOC_TYPES}
     
     def hybrid_search(self, 
                      query_vector: Optional[List[float]] = None,
@@ -440,6 +510,7 @@ class QdrantVectorStore:
             collection_name=self.collection_name,
             points_selector=qdrant_filter
         )
+        self.change_log.record(None)
         
         return result.status == UpdateStatus.COMPLETED
     
@@ -486,6 +557,7 @@ class QdrantVectorStore:
                 collection_name=self.collection_name,
                 points_selector=PointIdsList(points=vector_ids)
             )
+            self.change_log.record(None)  # Document paths are not known from IDs alone
             
             return result.status == UpdateStatus.COMPLETED
             
@@ -534,6 +606,7 @@ class QdrantVectorStore:
                 payload=updated_payload,
                 points=[vector_id]
             )
+            self.change_log.record([updated_payload.get('doc_path')])
             
             return True
             
@@ -541,6 +614,40 @@ class QdrantVectorStore:
             logging.error(f"Failed to update metadata: {e}")
             return False
     
+    def update_metadata_batch(self, updates: Dict[str, Dict[str, Any]]) -> bool:
+        """Merge new payload fields into many points with a single request"""
+        if not updates:
+            return True
+        try:
+            operations = [
+                SetPayloadOperation(set_payload=SetPayload(payload=payload, points=[vector_id]))
+                for vector_id, payload in updates.items()
+            ]
+            self.client.batch_update_points(
+                collection_name=self.collection_name,
+                update_operations=operations
+            )
+            self.change_log.record(payload.get('doc_path') for payload in updates.values())
+            return True
+        except Exception as e:
+            logging.error(f"Failed to update metadata batch: {e}")
+            return False
+    
+    def find_vectors_by_metadata(self, filters: Dict[str, Any]) -> List[str]:
+        """Find IDs of points whose payload matches every filter (FAISS compatibility)"""
+        return [str(point.id) for point in self._scroll_all(self._build_filter(filters), with_payload=['deleted'])
+                if not (point.payload or {}).get('deleted', False)]
+    
+    def find_chunk_hashes(self, doc_path: str) -> Dict[str, Optional[str]]:
+        """Map each point of ``doc_path`` to its stored chunk text hash (None if never recorded)"""
+        doc_filter = Filter(must=[FieldCondition(key="doc_path", match=MatchValue(value=doc_path))])
+        hashes = {}
+        for point in self._scroll_all(doc_filter, with_payload=['chunk_hash', 'deleted']):
+            payload = point.payload or {}
+            if not payload.get('deleted', False):
+                hashes[str(point.id)] = payload.get('chunk_hash')
+        return hashes
+    
     def find_vectors_by_doc_path(self, doc_path: str) -> List[str]:
         """Find vector IDs by document path"""
         doc_filter = Filter(
@@ -552,25 +659,8 @@ class QdrantVectorStore:
             ]
         )
         
-        results = []
-        offset = None
-        
-        while True:
-            response = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=doc_filter,
-                limit=100,
-                offset=offset,
-                with_payload=True
-            )
-            
-            results.extend([r.id for r in response[0]])
-            offset = response[1]
-            
-            if offset is None:
-                break
-        
-        return results
+        # IDs only; the payload is never read
+        return [r.id for r in self._scroll_all(doc_filter, with_payload=False)]
     
     def delete_vectors_by_doc_path(self, doc_path: str) -> int:
         """Delete all vectors associated with a document path"""
@@ -583,6 +673,7 @@ class QdrantVectorStore:
         """Clear all vectors from the collection"""
         self.client.delete_collection(self.collection_name)
         self._init_collection(on_disk=True)
+        self.change_log.record(None)
         logging.info("Cleared Qdrant collection")
     
     def backup_index(self, backup_path: str):
@@ -605,27 +696,7 @@ class QdrantVectorStore:
         """
         try:
             # Get all points using scroll
-            all_metadata = {}
-            offset = None
-            
-            while True:
-                response = self.client.scroll(
-                    collection_name=self.collection_name,
-                    limit=1000,  # Process in batches
-                    offset=offset,
-                    with_payload=True,
-                    with_vectors=False  # Don't need vectors for metadata
-                )
-                
-                # Add to mapping
-                for point in response[0]:
-                    all_metadata[str(point.id)] = point.payload
-                
-                offset = response[1]
-                if offset is None:
-                    break
-            
-            return all_metadata
+            return {str(point.id): point.payload for point in self._scroll_all()}
             
         except Exception as e:
             logging.error(f"Failed to retrieve id_to_metadata mapping: {e}")
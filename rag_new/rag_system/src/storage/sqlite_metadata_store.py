@@ -0,0 +1,347 @@
+"""
+SQLite Metadata Store
+Transactional, indexed replacement for PersistentJSONMetadataStore
+"""
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+JSON_FILES = ('files_metadata.json', 'chunks_metadata.json', 'vector_mappings.json')
+
+
+class SQLiteMetadataStore:
+    """Metadata store with the PersistentJSONMetadataStore API on top of SQLite.
+    
+    Every record is one row, so inserts cost the same whatever the corpus
+    size, and lookups by ``doc_id``, ``doc_hash``, ``vector_id`` and
+    ``filename`` go through secondary indexes. The full record is kept as
+    JSON next to the indexed columns, so callers get back exactly what they
+    stored. Legacy JSON files found in ``base_path`` are imported once.
+    """
+    
+    def __init__(self, base_path: str = "data/metadata", db_name: str = "metadata.sqlite"):
+        self.base_path = Path(base_path)
+        self.base_path.mkdir(parents=True, exist_ok=True)
+        self.db_path = self.base_path / db_name
+        
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+        
+        if self._get_meta('json_migrated_at') is None:
+            self.migrate_from_json(self.base_path)
+        
+        print(f"🔧 SQLiteMetadataStore initialized at {self.db_path}")
+        print(f"✅ SQLite metadata store ready")
+    
+    def _create_schema(self):
+        with self._lock, self._conn:
+            self._conn.executescript('''
+                CREATE TABLE IF NOT EXISTS files (
+                    seq INTEGER PRIMARY KEY,
+                    file_id TEXT NOT NULL UNIQUE,
+                    file_path TEXT,
+                    filename TEXT,
+                    doc_id TEXT,
+                    doc_hash TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_files_doc_hash ON files(doc_hash);
+                CREATE INDEX IF NOT EXISTS idx_files_doc_id ON files(doc_id);
+                CREATE INDEX IF NOT EXISTS idx_files_filename ON files(filename);
+                
+                CREATE TABLE IF NOT EXISTS chunks (
+                    seq INTEGER PRIMARY KEY,
+                    chunk_id TEXT NOT NULL UNIQUE,
+                    doc_id TEXT,
+                    vector_id TEXT,
+                    filename TEXT,
+                    data TEXT NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS idx_chunks_doc_id ON chunks(doc_id);
+                CREATE INDEX IF NOT EXISTS idx_chunks_vector_id ON chunks(vector_id);
+                CREATE INDEX IF NOT EXISTS idx_chunks_filename ON chunks(filename);
+                
+                CREATE TABLE IF NOT EXISTS vector_mappings (
+                    vector_id TEXT PRIMARY KEY,
+                    chunk_id TEXT,
+                    doc_id TEXT,
+                    filename TEXT,
+                    created_at TEXT
+                );
+                
+                CREATE TABLE IF NOT EXISTS store_meta (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+            ''')
+    
+    def _get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM store_meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+    
+    # ------------------------------------------------------------------
+    # Row helpers
+    # ------------------------------------------------------------------
+    
+    @staticmethod
+    def _text(value: Any) -> Optional[str]:
+        return None if value is None else str(value)
+    
+    def _file_row(self, file_metadata: Dict[str, Any]) -> Tuple:
+        return (
+            file_metadata['file_id'],
+            self._text(file_metadata.get('file_path')),
+            self._text(file_metadata.get('filename')),
+            self._text(file_metadata.get('doc_id')),
+            self._text(file_metadata.get('doc_hash')),
+            json.dumps(file_metadata, ensure_ascii=False, default=str)
+        )
+    
+    def _chunk_row(self, chunk_metadata: Dict[str, Any]) -> Tuple:
+        return (
+            chunk_metadata['chunk_id'],
+            self._text(chunk_metadata.get('doc_id')),
+            self._text(chunk_metadata.get('vector_id')),
+            self._text(chunk_metadata.get('filename')),
+            json.dumps(chunk_metadata, ensure_ascii=False, default=str)
+        )
+    
+    def _insert_files(self, file_rows: List[Tuple]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO files (file_id, file_path, filename, doc_id, doc_hash, data) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            file_rows
+        )
+    
+    def _insert_chunks(self, chunk_rows: List[Tuple], mapping_rows: List[Tuple]):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO chunks (chunk_id, doc_id, vector_id, filename, data) VALUES (?, ?, ?, ?, ?)",
+            chunk_rows
+        )
+        if mapping_rows:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO vector_mappings (vector_id, chunk_id, doc_id, filename, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                mapping_rows
+            )
+    
+    # ------------------------------------------------------------------
+    # Files
+    # ------------------------------------------------------------------
+    
+    def add_file_metadata(self, file_path: str, metadata: Dict[str, Any]) -> str:
+        """Add file metadata"""
+        return self.add_files_metadata([(file_path, metadata)])[0]
+    
+    def add_files_metadata(self, files: List[Tuple[str, Dict[str, Any]]]) -> List[str]:
+        """Add several file records in one transaction; returns their file IDs"""
+        file_ids = []
+        rows = []
+        for file_path, metadata in files:
+            file_id = str(uuid.uuid4())
+            file_ids.append(file_id)
+            rows.append(self._file_row({
+                'file_id': file_id,
+                'file_path': file_path,
+                'filename': os.path.basename(file_path),
+                'created_at': datetime.now().isoformat(),
+                'type': 'file',
+                **metadata
+            }))
+        with self._lock, self._conn:
+            self._insert_files(rows)
+        return file_ids
+    
+    def find_by_hash(self, doc_hash: str) -> Optional[Dict[str, Any]]:
+        """Find file metadata by document hash for deduplication"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT data FROM files WHERE doc_hash = ? ORDER BY seq DESC LIMIT 1", (doc_hash,)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def find_vector_ids_by_hash(self, doc_hash: str) -> List[Any]:
+        """Vector IDs recorded for the file with this document hash"""
+        file_metadata = self.find_by_hash(doc_hash)
+        return list(file_metadata.get('vector_ids') or []) if file_metadata else []
+    
+    def find_files_by_filename(self, filename: str) -> List[Dict[str, Any]]:
+        """File records with this base filename, oldest first"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM files WHERE filename = ? ORDER BY seq", (filename,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def get_file_metadata(self, file_id: str) -> Optional[Dict[str, Any]]:
+        """Get metadata for a specific file"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM files WHERE file_id = ?", (file_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_all_files(self) -> List[Dict[str, Any]]:
+        """Get all files with chunk count"""
+        with self._lock:
+            rows = self._conn.execute('''
+                SELECT f.data, COUNT(c.seq) FROM files f
+                LEFT JOIN chunks c ON c.doc_id = f.file_id
+                GROUP BY f.seq ORDER BY f.seq
+            ''').fetchall()
+        return [{**json.loads(data), 'chunk_count': chunk_count} for data, chunk_count in rows]
+    
+    # ------------------------------------------------------------------
+    # Chunks
+    # ------------------------------------------------------------------
+    
+    def add_chunk_metadata(self, chunk_data: Dict[str, Any]) -> str:
+        """Add chunk metadata with vector linking"""
+        return self.add_chunks_metadata([chunk_data])[0]
+    
+    def add_chunks_metadata(self, chunks: List[Dict[str, Any]]) -> List[str]:
+        """Add many chunks (and their vector mappings) in one transaction"""
+        chunk_ids = []
+        chunk_rows = []
+        mapping_rows = []
+        for chunk_data in chunks:
+            chunk_id = chunk_data.get('chunk_id') or str(uuid.uuid4())
+            created_at = datetime.now().isoformat()
+            chunk_ids.append(chunk_id)
+            chunk_rows.append(self._chunk_row({
+                'chunk_id': chunk_id,
+                'created_at': created_at,
+                'type': 'chunk',
+                **chunk_data
+            }))
+            vector_id = chunk_data.get('vector_id')
+            if vector_id:
+                mapping_rows.append((
+                    str(vector_id), chunk_id, chunk_data.get('doc_id', 'unknown'),
+                    chunk_data.get('filename', 'unknown'), created_at
+                ))
+        with self._lock, self._conn:
+            self._insert_chunks(chunk_rows, mapping_rows)
+        return chunk_ids
+    
+    def get_metadata_by_vector_id(self, vector_id: str) -> Optional[Dict[str, Any]]:
+        """Get metadata using vector ID"""
+        with self._lock:
+            row = self._conn.execute('''
+                SELECT c.data FROM vector_mappings m JOIN chunks c ON c.chunk_id = m.chunk_id
+                WHERE m.vector_id = ?
+            ''', (str(vector_id),)).fetchone()
+        return json.loads(row[0]) if row else None
+    
+    def get_all_chunks(self) -> List[Dict[str, Any]]:
+        """Get all chunks"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM chunks ORDER BY seq").fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    def get_file_chunks(self, file_id: str) -> List[Dict[str, Any]]:
+        """Get all chunks for a file"""
+        with self._lock:
+            rows = self._conn.execute("SELECT data FROM chunks WHERE doc_id = ? ORDER BY seq", (file_id,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+    
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Get metadata store statistics"""
+        with self._lock:
+            counts = {
+                table: self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+                for table in ('files', 'chunks', 'vector_mappings')
+            }
+        return {
+            'total_files': counts['files'],
+            'total_chunks': counts['chunks'],
+            'total_vector_mappings': counts['vector_mappings'],
+            'storage_path': str(self.base_path),
+            'backend': 'sqlite',
+            'database_size': self.db_path.stat().st_size if self.db_path.exists() else 0
+        }
+    
+    def clear_all_data(self):
+        """Clear all metadata (for testing)"""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            self._conn.execute("DELETE FROM chunks")
+            self._conn.execute("DELETE FROM vector_mappings")
+    
+    def backup_metadata(self, backup_path: str) -> str:
+        """Create a consistent online backup of the database"""
+        backup_dir = Path(backup_path)
+        backup_dir.mkdir(parents=True, exist_ok=True)
+        
+        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        backup_file = backup_dir / f"{self.db_path.stem}_{timestamp}.sqlite"
+        with self._lock:
+            target = sqlite3.connect(str(backup_file))
+            try:
+                self._conn.backup(target)
+            finally:
+                target.close()
+        
+        return str(backup_dir)
+    
+    def migrate_from_json(self, json_dir: str) -> Dict[str, int]:
+        """One-time import of PersistentJSONMetadataStore files from ``json_dir``
+        
+        The import runs in a single transaction and is recorded, so it never
+        runs twice; the JSON files are renamed to ``*.json.migrated``.
+        """
+        json_dir = Path(json_dir)
+        sources = [json_dir / name for name in JSON_FILES]
+        imported = {'files': 0, 'chunks': 0, 'vector_mappings': 0}
+        
+        def load(path: Path) -> Dict[str, Any]:
+            if not path.exists():
+                return {}
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f) or {}
+        
+        with self._lock:
+            try:
+                files, chunks, mappings = (load(path) for path in sources)
+            except Exception as e:
+                logging.error(f"Could not read JSON metadata for migration from {json_dir}: {e}")
+                return imported
+            
+            with self._conn:
+                self._insert_files([self._file_row({'file_id': file_id, **record})
+                                    for file_id, record in files.items()])
+                self._insert_chunks(
+                    [self._chunk_row({'chunk_id': chunk_id, **record}) for chunk_id, record in chunks.items()],
+                    [(str(vector_id), m.get('chunk_id'), m.get('doc_id'), m.get('filename'), m.get('created_at'))
+                     for vector_id, m in mappings.items()]
+                )
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO store_meta (key, value) VALUES ('json_migrated_at', ?)",
+                    (datetime.now().isoformat(),)
+                )
+            imported = {'files': len(files), 'chunks': len(chunks), 'vector_mappings': len(mappings)}
+        
+        for path in sources:
+            if path.exists():
+                try:
+                    path.rename(path.with_name(path.name + '.migrated'))
+                except OSError as e:
+                    logging.warning(f"Could not rename migrated {path}: {e}")
+        if any(imported.values()):
+            logging.info(f"Migrated JSON metadata from {json_dir}: {imported}")
+        return imported
+    
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Benchmark: memory held by FAISSStore chunk metadata, per-vector dicts vs the columnar store
+Measures Python heap usage with tracemalloc plus the on-disk snapshot size
+"""
+
+import argparse
+import gc
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.faiss_metadata_store import ColumnarMetadataStore, StringHeap
+
+
+def generate_metadata(n_chunks, chunks_per_doc, text_size):
+    """Chunk metadata shaped like what IngestionEngine hands to FAISSStore.add_vectors"""
+    added_at = datetime(2024, 5, 1, 9, 30)
+    filler = "lorem ipsum dolor sit amet " * (text_size // 27 + 1)
+    for vector_id in range(n_chunks):
+        doc = vector_id // chunks_per_doc
+        chunk_index = vector_id % chunks_per_doc
+        text = f"[{vector_id}] " + filler[:text_size]
+        path = f"/data/uploads/department_{doc % 17}/report_{doc}.pdf"
+        yield vector_id, {
+            'added_at': (added_at + timedelta(seconds=doc)).isoformat(),
+            'vector_id': vector_id,
+            'text': text,
+            'content': text,
+            'chunk_index': chunk_index,
+            'total_chunks': chunks_per_doc,
+            'chunk_size': len(text),
+            'doc_id': f"doc_{doc:08d}",
+            'doc_path': path,
+            'file_path': path,
+            'original_filename': path,
+            'filename': f"report_{doc}.pdf",
+            'file_size': 250000 + doc,
+            'file_type': '.pdf',
+            'source_type': 'file',
+            'upload_source': 'web_upload',
+            'content_type': 'application/pdf',
+            'upload_timestamp': (added_at + timedelta(seconds=doc)).isoformat(),
+            'ingested_at': (added_at + timedelta(seconds=doc, microseconds=1)).isoformat(),
+            'processor': 'ingestion_engine',
+            'is_update': False,
+            'replaced_vectors': 0,
+            'doc_hash': f"{doc:064x}",
+            'chunking_method': 'SemanticChunker',
+            'embedding_model': 'Cohere-embed-v3-english',
+        }
+
+
+def traced(build):
+    """Run ``build`` and return its result with the Python heap growth it caused"""
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = build()
+    elapsed = time.perf_counter() - start
+    gc.collect()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current, peak, elapsed
+
+
+def mb(size):
+    return f"{size / (1024 * 1024):8.1f} MB"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--chunks', type=int, default=200000)
+    parser.add_argument('--chunks-per-doc', type=int, default=40)
+    parser.add_argument('--text-size', type=int, default=800, help="characters of text per chunk")
+    args = parser.parse_args()
+    
+    print(f"{args.chunks:,} chunks, {args.chunks_per_doc} per document, "
+          f"{args.text_size} characters of text each", flush=True)
+    
+    tmp_dir = Path(tempfile.mkdtemp(prefix="faiss_metadata_bench_"))
+    try:
+        # Per-vector dicts, as loaded from a pre-columnar snapshot
+        legacy_bytes = pickle.dumps(
+            {'id_to_metadata': dict(generate_metadata(args.chunks, args.chunks_per_doc, args.text_size))},
+            protocol=pickle.HIGHEST_PROTOCOL
+        )
+        legacy, legacy_mem, legacy_peak, legacy_time = traced(lambda: pickle.loads(legacy_bytes))
+        del legacy
+        
+        # Columnar store filled row by row, text still in the in-memory heap tail
+        def build_columnar():
+            store = ColumnarMetadataStore()
+            for vector_id, metadata in generate_metadata(args.chunks, args.chunks_per_doc, args.text_size):
+                store[vector_id] = metadata
+            return store
+        store, built_mem, built_peak, built_time = traced(build_columnar)
+        
+        # Snapshot to disk the way FAISSStore does, then reload with the heap mmap'd
+        state, _, heap_buffers = store.capture()
+        heap_path = tmp_dir / "vector_metadata.1.heap"
+        with open(heap_path, 'wb') as f:
+            for buffer in heap_buffers:
+                f.write(buffer)
+        columnar_bytes = pickle.dumps(
+            {'metadata_columns': state, 'text_heap': heap_path.name}, protocol=pickle.HIGHEST_PROTOCOL
+        )
+        del store, state, heap_buffers
+        
+        def load_columnar():
+            data = pickle.loads(columnar_bytes)
+            return ColumnarMetadataStore.from_state(data['metadata_columns'], StringHeap.map_file(heap_path))
+        loaded, loaded_mem, loaded_peak, loaded_time = traced(load_columnar)
+        assert loaded[args.chunks - 1]['text'].startswith(f"[{args.chunks - 1}] ")
+        
+        print(f"\n{'':32}{'python heap':>11}  {'peak':>11}  {'time':>7}")
+        print(f"{'dict per vector (loaded)':32}{mb(legacy_mem)}  {mb(legacy_peak)}  {legacy_time:6.2f}s")
+        print(f"{'columnar (built in memory)':32}{mb(built_mem)}  {mb(built_peak)}  {built_time:6.2f}s")
+        print(f"{'columnar (loaded, heap mmapped)':32}{mb(loaded_mem)}  {mb(loaded_peak)}  {loaded_time:6.2f}s")
+        print(f"\nsaved vs dicts: {mb(legacy_mem - built_mem)} in memory, "
+              f"{mb(legacy_mem - loaded_mem)} after reload "
+              f"({legacy_mem / max(loaded_mem, 1):.1f}x smaller)")
+        print(f"snapshot on disk: dicts {mb(len(legacy_bytes))}, columnar {mb(len(columnar_bytes))} pickle "
+              f"+ {mb(heap_path.stat().st_size)} text heap")
+        print(f"columnar stats: {loaded.get_stats()}")
+        print("(times include tracemalloc overhead)")
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
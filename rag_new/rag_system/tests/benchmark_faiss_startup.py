@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+Benchmark: FAISSStore cold-start time per index type (FLAT, IVF, HNSW, IVF-PQ)
+Compares direct loading (optionally memory-mapped) against the old reconstruct-and-re-add path
+"""
+
+import argparse
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.faiss_store import FAISSStore, OptimizedFAISSIndex
+
+# Vector counts that make OptimizedFAISSIndex pick each index type
+DEFAULT_SIZES = {
+    'flat': 5000,
+    'ivf': 50000,
+    'hnsw': 200000,
+    'composite': 1000000,
+}
+
+
+def build_snapshot(directory, index_type, n_vectors, dimension, rng):
+    """Write an index + metadata snapshot of the given type to ``directory``"""
+    optimized = OptimizedFAISSIndex(dimension, n_vectors)
+    assert optimized.index_type.value == index_type, optimized.index_type
+    
+    vectors = rng.rand(n_vectors, dimension).astype('float32')
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    if not optimized.is_trained:
+        optimized.index.train(vectors[:optimized.training_sample_size])
+        optimized.is_trained = True
+    for offset in range(0, n_vectors, 50000):
+        optimized.add_vectors(vectors[offset:offset + 50000])
+    
+    index_path = Path(directory) / "index.faiss"
+    faiss.write_index(optimized.index, str(index_path))
+    with open(Path(directory) / "vector_metadata.pkl", 'wb') as f:
+        pickle.dump({
+            'id_to_metadata': {i: {'text': f"chunk {i}", 'doc_path': f"/bench/{i // 10}.txt"}
+                               for i in range(n_vectors)},
+            'position_ids': np.arange(n_vectors, dtype=np.int64),
+            'next_id': n_vectors,
+            'deleted_indices': [],
+            'index_state': optimized.get_state(),
+        }, f, protocol=pickle.HIGHEST_PROTOCOL)
+    return index_path
+
+
+def time_store_load(index_path, dimension, mmap_index):
+    start = time.perf_counter()
+    store = FAISSStore(str(index_path), dimension=dimension, wal_enabled=False, mmap_index=mmap_index)
+    elapsed = time.perf_counter() - start
+    assert store.optimized_index.index.ntotal > 0
+    return elapsed
+
+
+def time_legacy_load(index_path, dimension):
+    """The previous startup path: read, reconstruct every vector and re-add it"""
+    start = time.perf_counter()
+    index = faiss.read_index(str(index_path))
+    if isinstance(index, faiss.IndexIVF):
+        index.make_direct_map()
+    vectors = index.reconstruct_n(0, index.ntotal)
+    optimized = OptimizedFAISSIndex(dimension, index.ntotal)
+    optimized.add_vectors(vectors)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--types', nargs='+', default=list(DEFAULT_SIZES), choices=list(DEFAULT_SIZES))
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="multiply the default vector counts (types are clamped to their size band)")
+    parser.add_argument('--dimension', type=int, default=384)
+    parser.add_argument('--legacy', action='store_true',
+                        help="also time the old reconstruct-and-re-add startup (slow for HNSW / IVF-PQ)")
+    args = parser.parse_args()
+    
+    rng = np.random.RandomState(42)
+    bands = {'flat': (1, 9999), 'ivf': (10000, 99999), 'hnsw': (100000, 999999), 'composite': (1000000, None)}
+    for index_type in args.types:
+        low, high = bands[index_type]
+        n_vectors = max(int(DEFAULT_SIZES[index_type] * args.scale), low)
+        if high is not None:
+            n_vectors = min(n_vectors, high)
+        
+        tmp_dir = tempfile.mkdtemp(prefix="faiss_startup_bench_")
+        try:
+            build_start = time.time()
+            index_path = build_snapshot(tmp_dir, index_type, n_vectors, args.dimension, rng)
+            size_mb = index_path.stat().st_size / (1024 * 1024)
+            print(f"[{index_type}] {n_vectors:,} vectors, {size_mb:.1f} MB on disk "
+                  f"(built in {time.time() - build_start:.1f}s)", flush=True)
+            
+            print(f"  direct load:        {time_store_load(index_path, args.dimension, False):.2f}s", flush=True)
+            print(f"  memory-mapped load: {time_store_load(index_path, args.dimension, True):.2f}s", flush=True)
+            if args.legacy:
+                print(f"  reconstruct+re-add: {time_legacy_load(index_path, args.dimension):.2f}s", flush=True)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: incremental (write-ahead log) vs full-rewrite FAISSStore persistence
+Ingests many small files into a large pre-populated store and reports per-file latency
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.faiss_store import FAISSStore
+
+
+def _write_bytes():
+    """Bytes written by this process so far (None if psutil is unavailable)"""
+    try:
+        import psutil
+        return psutil.Process().io_counters().write_bytes
+    except Exception:
+        return None
+
+
+def _metadata(file_no, chunk_no):
+    return {
+        'text': f"chunk {chunk_no} of small file {file_no}",
+        'doc_path': f"/bench/file_{file_no}.txt",
+        'filename': f"file_{file_no}.txt",
+        'chunk_index': chunk_no,
+        'source_type': 'file'
+    }
+
+
+def run(wal_enabled, base_vectors, files, chunks_per_file, dimension):
+    tmp_dir = tempfile.mkdtemp(prefix="faiss_wal_bench_")
+    rng = np.random.RandomState(42)
+    try:
+        store = FAISSStore(str(Path(tmp_dir) / "index.faiss"), dimension=dimension,
+                           wal_enabled=wal_enabled, wal_compact_interval=3600)
+        
+        print(f"  seeding {base_vectors:,} vectors...", flush=True)
+        seed_start = time.time()
+        for offset in range(0, base_vectors, 50000):
+            n = min(50000, base_vectors - offset)
+            store.add_vectors(rng.rand(n, dimension).astype('float32').tolist(),
+                              [_metadata(-1, offset + i) for i in range(n)])
+        store.save_index()
+        print(f"  seeded in {time.time() - seed_start:.1f}s", flush=True)
+        
+        latencies = []
+        bytes_before = _write_bytes()
+        start = time.time()
+        for file_no in range(files):
+            vectors = rng.rand(chunks_per_file, dimension).astype('float32').tolist()
+            t0 = time.perf_counter()
+            store.add_vectors(vectors, [_metadata(file_no, c) for c in range(chunks_per_file)])
+            latencies.append(time.perf_counter() - t0)
+        elapsed = time.time() - start
+        bytes_after = _write_bytes()
+        
+        latencies_ms = np.array(latencies) * 1000
+        label = "wal" if wal_enabled else "full-rewrite"
+        print(f"  [{label}] {files} files in {elapsed:.2f}s "
+              f"({files / elapsed:.1f} files/s), "
+              f"p50={np.percentile(latencies_ms, 50):.1f}ms "
+              f"p95={np.percentile(latencies_ms, 95):.1f}ms")
+        if bytes_before is not None and bytes_after is not None:
+            print(f"  [{label}] bytes written: {(bytes_after - bytes_before) / (1024 * 1024):.1f} MB")
+        
+        if wal_enabled:
+            compact_start = time.time()
+            store.compact()
+            print(f"  [{label}] final compaction: {time.time() - compact_start:.2f}s")
+        store.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-vectors', type=int, default=200000)
+    parser.add_argument('--files', type=int, default=1000)
+    parser.add_argument('--legacy-files', type=int, default=20,
+                        help="files to ingest in full-rewrite mode (each one rewrites the whole store)")
+    parser.add_argument('--chunks-per-file', type=int, default=5)
+    parser.add_argument('--dimension', type=int, default=384)
+    args = parser.parse_args()
+    
+    print(f"Incremental persistence (write-ahead log):")
+    run(True, args.base_vectors, args.files, args.chunks_per_file, args.dimension)
+    
+    if args.legacy_files:
+        print(f"Full rewrite on every add (wal_enabled=False):")
+        run(False, args.base_vectors, args.legacy_files, args.chunks_per_file, args.dimension)
+
+
+if __name__ == '__main__':
+    main()
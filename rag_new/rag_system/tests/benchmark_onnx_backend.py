@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Benchmark: PyTorch vs ONNX Runtime (int8) backend for local sentence-transformer and cross-encoder models
+Each backend runs in a fresh process and reports peak RSS, p50/p95 latency and agreement with PyTorch
+"""
+
+import argparse
+import json
+import resource
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.onnx_backend import configure_model_backend, load_cross_encoder, load_sentence_transformer
+
+
+def _texts(n):
+    rng = np.random.RandomState(7)
+    vocabulary = ["network", "router", "outage", "password", "reset", "incident", "building", "floor",
+                  "access", "point", "firmware", "upgrade", "policy", "training", "escalation", "priority"]
+    return [" ".join(rng.choice(vocabulary, size=rng.randint(8, 120))) for _ in range(n)]
+
+
+def _peak_rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def worker(args):
+    configure_model_backend(backend=args.worker, cache_dir=args.cache_dir, quantize=not args.fp32,
+                            num_threads=args.threads)
+    rss_before = _peak_rss_mb()
+    texts = _texts(args.texts)
+    latencies = []
+    if args.kind == 'embedder':
+        model = load_sentence_transformer(args.model)
+        output = model.encode(texts, batch_size=args.batch_size, convert_to_numpy=True)
+        for start in range(0, len(texts), args.batch_size):
+            t0 = time.perf_counter()
+            model.encode(texts[start:start + args.batch_size], batch_size=args.batch_size)
+            latencies.append(time.perf_counter() - t0)
+    else:
+        model = load_cross_encoder(args.model)
+        pairs = [("how do I fix the router outage", text) for text in texts]
+        output = model.predict(pairs, batch_size=args.batch_size)
+        for start in range(0, len(pairs), args.batch_size):
+            t0 = time.perf_counter()
+            model.predict(pairs[start:start + args.batch_size], batch_size=args.batch_size)
+            latencies.append(time.perf_counter() - t0)
+    
+    np.save(args.output, np.asarray(output, dtype=np.float32))
+    latencies_ms = np.array(latencies) * 1000
+    print(json.dumps({
+        'model_class': type(model).__name__,
+        'p50_ms': float(np.percentile(latencies_ms, 50)),
+        'p95_ms': float(np.percentile(latencies_ms, 95)),
+        'rss_mb': _peak_rss_mb() - rss_before
+    }))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--kind', choices=['embedder', 'cross_encoder'], default='embedder')
+    parser.add_argument('--model', default=None)
+    parser.add_argument('--texts', type=int, default=512)
+    parser.add_argument('--batch-size', type=int, default=32)
+    parser.add_argument('--threads', type=int, default=0)
+    parser.add_argument('--fp32', action='store_true', help="export without int8 quantization")
+    parser.add_argument('--cache-dir', default="data/onnx_models")
+    parser.add_argument('--worker', choices=['torch', 'onnx'], help=argparse.SUPPRESS)
+    parser.add_argument('--output', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.model is None:
+        args.model = ("sentence-transformers/all-MiniLM-L6-v2" if args.kind == 'embedder'
+                      else "cross-encoder/ms-marco-MiniLM-L6-v2")
+    
+    if args.worker:
+        worker(args)
+        return
+    
+    # Export up front so the ONNX run measures inference, not the one-off export
+    configure_model_backend(backend='onnx', cache_dir=args.cache_dir, quantize=not args.fp32)
+    (load_sentence_transformer if args.kind == 'embedder' else load_cross_encoder)(args.model)
+    
+    outputs = {}
+    print(f"{args.kind} {args.model}, {args.texts} texts, batch {args.batch_size}:")
+    for backend in ('torch', 'onnx'):
+        output_path = Path(args.cache_dir) / f"bench_{backend}.npy"
+        command = [sys.executable, __file__, '--worker', backend, '--output', str(output_path),
+                   '--kind', args.kind, '--model', args.model, '--texts', str(args.texts),
+                   '--batch-size', str(args.batch_size), '--threads', str(args.threads),
+                   '--cache-dir', args.cache_dir] + (['--fp32'] if args.fp32 else [])
+        result = json.loads(subprocess.run(command, check=True, capture_output=True, text=True).stdout.splitlines()[-1])
+        outputs[backend] = np.load(output_path)
+        output_path.unlink()
+        print(f"  [{backend}] {result['model_class']}: p50={result['p50_ms']:.1f}ms p95={result['p95_ms']:.1f}ms "
+              f"per batch, +{result['rss_mb']:.0f}MB peak RSS")
+    
+    torch_out, onnx_out = outputs['torch'], outputs['onnx']
+    if args.kind == 'embedder':
+        cosines = np.sum(torch_out * onnx_out, axis=1) / (
+            np.linalg.norm(torch_out, axis=1) * np.linalg.norm(onnx_out, axis=1))
+        print(f"  agreement: min cosine {cosines.min():.4f}, mean {cosines.mean():.4f}")
+    else:
+        print(f"  agreement: score correlation {np.corrcoef(torch_out, onnx_out)[0, 1]:.4f}, "
+              f"max abs diff {np.abs(torch_out - onnx_out).max():.4f}")
+
+
+if __name__ == '__main__':
+    main()
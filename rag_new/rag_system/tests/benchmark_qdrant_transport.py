@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Benchmark: QdrantVectorStore over HTTP, gRPC and embedded local mode
+Reports upsert throughput (add_vectors) and single-query search throughput per transport
+"""
+
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.qdrant_store import QdrantVectorStore
+
+
+def _metadata(i):
+    return {
+        'text': f"benchmark chunk {i} mentioning INC{i % 1000000:06d}",
+        'doc_path': f"/bench/file_{i // 10}.txt",
+        'filename': f"file_{i // 10}.txt",
+        'chunk_index': i % 10
+    }
+
+
+def make_store(mode, url, dimension, upload_batch_size, upload_parallel, local_dir):
+    collection = f"bench_{mode}_{uuid.uuid4().hex[:8]}"
+    kwargs = dict(collection_name=collection, dimension=dimension, on_disk=False,
+                  upload_batch_size=upload_batch_size, upload_parallel=upload_parallel)
+    if mode == 'local':
+        return QdrantVectorStore(path=local_dir, **kwargs)
+    return QdrantVectorStore(url=url, prefer_grpc=(mode == 'grpc'), **kwargs)
+
+
+def run(mode, args):
+    local_dir = tempfile.mkdtemp(prefix="qdrant_local_bench_") if mode == 'local' else None
+    rng = np.random.RandomState(42)
+    try:
+        store = make_store(mode, args.url, args.dimension, args.upload_batch_size,
+                           args.upload_parallel, local_dir)
+        try:
+            start = time.time()
+            for offset in range(0, args.points, args.batch):
+                n = min(args.batch, args.points - offset)
+                store.add_vectors(rng.rand(n, args.dimension).astype('float32').tolist(),
+                                  [_metadata(offset + i) for i in range(n)])
+            upsert_elapsed = time.time() - start
+            
+            queries = rng.rand(args.queries, args.dimension).astype('float32').tolist()
+            latencies = []
+            for query in queries:
+                t0 = time.perf_counter()
+                store.search(query, k=args.k)
+                latencies.append(time.perf_counter() - t0)
+            latencies_ms = np.array(latencies) * 1000
+            
+            print(f"  [{mode}] upsert {args.points:,} points in {upsert_elapsed:.2f}s "
+                  f"({args.points / upsert_elapsed:,.0f} points/s)")
+            print(f"  [{mode}] search {args.queries} queries: "
+                  f"{args.queries / (latencies_ms.sum() / 1000):,.0f} qps, "
+                  f"p50={np.percentile(latencies_ms, 50):.2f}ms p95={np.percentile(latencies_ms, 95):.2f}ms")
+        finally:
+            try:
+                store.client.delete_collection(store.collection_name)
+            except Exception:
+                pass
+    except Exception as e:
+        print(f"  [{mode}] skipped: {e}")
+    finally:
+        if local_dir:
+            shutil.rmtree(local_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--url', default="localhost:6333", help="server for the http and grpc modes")
+    parser.add_argument('--modes', nargs='+', default=['http', 'grpc', 'local'],
+                        choices=['http', 'grpc', 'local'])
+    parser.add_argument('--points', type=int, default=50000)
+    parser.add_argument('--batch', type=int, default=5000, help="points per add_vectors call")
+    parser.add_argument('--dimension', type=int, default=1024)
+    parser.add_argument('--queries', type=int, default=500)
+    parser.add_argument('-k', type=int, default=10)
+    parser.add_argument('--upload-batch-size', type=int, default=256)
+    parser.add_argument('--upload-parallel', type=int, default=4)
+    args = parser.parse_args()
+    
+    for mode in args.modes:
+        print(f"Qdrant {mode}:")
+        run(mode, args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: Reranker latency with and without the score cache and cascade first pass
+Reports p50/p95 rerank latency at 20, 60 and 200 candidates
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from retrieval.reranker import Reranker
+
+
+def make_candidates(n, words):
+    rng = np.random.RandomState(n)
+    vocabulary = [f"term{i}" for i in range(2000)]
+    return [{
+        'chunk_id': f"chunk_{i}",
+        'text': " ".join(rng.choice(vocabulary, size=words)),
+        'similarity_score': float(rng.rand())
+    } for i in range(n)]
+
+
+def run(label, reranker, candidates, queries, top_k, warm):
+    latencies = []
+    for query in queries:
+        if warm:
+            reranker.rerank(query, candidates, top_k=top_k)
+        t0 = time.perf_counter()
+        reranker.rerank(query, candidates, top_k=top_k)
+        latencies.append(time.perf_counter() - t0)
+    latencies_ms = np.array(latencies) * 1000
+    print(f"  [{label}] {len(candidates)} candidates: "
+          f"p50={np.percentile(latencies_ms, 50):.1f}ms p95={np.percentile(latencies_ms, 95):.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--model', default="cross-encoder/ms-marco-MiniLM-L6-v2")
+    parser.add_argument('--cascade-model', default="cross-encoder/ms-marco-TinyBERT-L2-v2")
+    parser.add_argument('--cascade-keep', type=int, default=20)
+    parser.add_argument('--candidates', type=int, nargs='+', default=[20, 60, 200])
+    parser.add_argument('--queries', type=int, default=20)
+    parser.add_argument('--words', type=int, default=400, help="words per candidate chunk")
+    parser.add_argument('--max-tokens', type=int, default=0)
+    parser.add_argument('-k', type=int, default=5)
+    args = parser.parse_args()
+    
+    baseline = Reranker(args.model, cache_size=0, max_tokens=args.max_tokens)
+    cached = Reranker(args.model, max_tokens=args.max_tokens)
+    cascade = Reranker(args.model, cache_size=0, max_tokens=args.max_tokens,
+                       cascade_model_name=args.cascade_model, cascade_keep=args.cascade_keep)
+    if not baseline.is_enabled():
+        print("sentence-transformers CrossEncoder unavailable; nothing to benchmark")
+        return
+    
+    queries = [f"how do I resolve issue {i} with term{i * 7}" for i in range(args.queries)]
+    for n in args.candidates:
+        candidates = make_candidates(n, args.words)
+        print(f"Reranking {n} candidates:")
+        run("full", baseline, candidates, queries, args.k, warm=False)
+        run("cached (warm)", cached, candidates, queries, args.k, warm=True)
+        run(f"cascade keep={args.cascade_keep}", cascade, candidates, queries, args.k, warm=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Tests for the async embedding client against a local stub embedding server
+"""
+
+import json
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ingestion.async_embedding_client import AsyncEmbeddingClient, HTTPX_AVAILABLE
+
+
+class StubEmbeddingServer(ThreadingHTTPServer):
+    """Cohere-style /v1/embed that sleeps ``latency`` and answers 429 to every ``throttle_every``-th request"""
+    
+    daemon_threads = True
+    
+    def __init__(self, latency=0.05, throttle_every=0):
+        super().__init__(('127.0.0.1', 0), StubHandler)
+        self.latency = latency
+        self.throttle_every = throttle_every
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.connections = set()
+    
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/embed"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        with server.lock:
+            server.requests += 1
+            request_number = server.requests
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+            server.connections.add(self.client_address)
+        try:
+            time.sleep(server.latency)
+            if server.throttle_every and request_number % server.throttle_every == 0:
+                self._send(429, {'message': "rate limited"}, {'Retry-After': '0'})
+            else:
+                self._send(200, {'embeddings': [[float(len(text)), float(i)] for i, text in enumerate(body['texts'])]})
+        finally:
+            with server.lock:
+                server.in_flight -= 1
+    
+    def _send(self, status, payload, headers=None):
+        data = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+
+@unittest.skipUnless(HTTPX_AVAILABLE, "httpx required")
+class TestAsyncEmbeddingClient(unittest.TestCase):
+    
+    def start_server(self, **kwargs):
+        server = StubEmbeddingServer(**kwargs)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.shutdown)
+        return server
+    
+    def make_client(self, server, **kwargs):
+        client = AsyncEmbeddingClient.for_cohere("test-key", "embed-english-v3.0", url=server.url,
+                                                 backoff_base=0.01, **kwargs)
+        self.addCleanup(client.close)
+        return client
+    
+    def test_concurrent_batches_keep_order_and_reuse_connections(self):
+        server = self.start_server(latency=0.1)
+        client = self.make_client(server, batch_size=10, max_concurrency=4)
+        texts = [f"text {'x' * i}" for i in range(80)]
+        
+        start = time.time()
+        embeddings = client.embed(texts)
+        elapsed = time.time() - start
+        
+        self.assertEqual([e[0] for e in embeddings], [float(len(t)) for t in texts])
+        self.assertEqual(server.max_in_flight, 4)
+        self.assertLess(elapsed, 0.8 * 8 * 0.1)  # 8 batches, well under the serial time
+        
+        client.embed(texts[:40])
+        self.assertLessEqual(len(server.connections), 4)
+    
+    def test_retries_rate_limited_batches(self):
+        server = self.start_server(latency=0.01, throttle_every=3)
+        client = self.make_client(server, batch_size=5, max_concurrency=2)
+        texts = [f"t{i}" for i in range(50)]
+        
+        embeddings = client.embed(texts)
+        
+        self.assertEqual([e[0] for e in embeddings], [float(len(t)) for t in texts])
+        self.assertGreater(client.get_stats()['rate_limited'], 0)
+        self.assertEqual(client.get_stats()['batches'], 10)
+    
+    def test_token_bucket_caps_request_rate(self):
+        server = self.start_server(latency=0.0)
+        client = self.make_client(server, batch_size=1, max_concurrency=8, requests_per_second=20)
+        
+        start = time.time()
+        client.embed([f"t{i}" for i in range(30)])
+        
+        # 20-request burst, then 10 more at 20/s
+        self.assertGreaterEqual(time.time() - start, 0.45)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for the persistent embedding cache behind Embedder.embed_texts
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ingestion.embedder import Embedder, BaseEmbedder
+from ingestion.embedding_cache import EmbeddingCache
+
+
+class CountingEmbedder(BaseEmbedder):
+    """Deterministic provider that records which texts it was asked to embed"""
+    
+    def __init__(self, model_name="fake-model"):
+        self.model_name = model_name
+        self.calls = []
+    
+    def embed_texts(self, texts, batch_size=None):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 0.5, float(sum(map(ord, text)) % 97)] for text in texts]
+    
+    def get_dimension(self):
+        return 3
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Only cache misses reach the provider"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.db_path = str(Path(self.tmp_dir) / "embeddings.sqlite")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def make_embedder(self, cache, model_name="fake-model"):
+        with patch.object(Embedder, '_initialize_embedder'):
+            embedder = Embedder(provider="sentence-transformers", batch_size=8, cache=cache)
+        embedder.embedder = CountingEmbedder(model_name)
+        return embedder
+    
+    def test_unchanged_chunks_are_not_re_embedded(self):
+        embedder = self.make_embedder(EmbeddingCache(self.db_path))
+        first = embedder.embed_texts(["alpha", "beta", "alpha"])
+        self.assertEqual(embedder.embedder.calls, [["alpha", "beta"]])
+        self.assertEqual(first[0], first[2])
+        
+        # A fresh process reopening the same cache only embeds the edited chunk
+        reopened = self.make_embedder(EmbeddingCache(self.db_path))
+        second = reopened.embed_texts(["alpha", "beta (edited)", "beta"])
+        self.assertEqual(reopened.embedder.calls, [["beta (edited)"]])
+        self.assertEqual(second[0], first[0])
+        self.assertEqual(second[2], first[1])
+        self.assertEqual(reopened.get_cache_stats()['cache_hits'], 2)
+        self.assertEqual(reopened.get_cache_stats()['cache_misses'], 1)
+        
+        # Another model never sees these vectors
+        other = self.make_embedder(EmbeddingCache(self.db_path), model_name="other-model")
+        other.embed_texts(["alpha"])
+        self.assertEqual(other.embedder.calls, [["alpha"]])
+    
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = EmbeddingCache(self.db_path, max_entries=10)
+        keys = [EmbeddingCache.text_key(f"text {i}") for i in range(10)]
+        for i, key in enumerate(keys):
+            cache.put_many("m", {key: [float(i)]})
+        cache.get_many("m", keys[:2])  # Touch the two oldest entries
+        cache.put_many("m", {EmbeddingCache.text_key("text 10"): [10.0]})
+        
+        stats = cache.get_stats()
+        self.assertEqual(stats['cache_entries'], 9)
+        self.assertEqual(stats['cache_evictions'], 2)
+        self.assertEqual(set(cache.get_many("m", keys[:2])), set(keys[:2]))
+        self.assertEqual(cache.get_many("m", keys[2:4]), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
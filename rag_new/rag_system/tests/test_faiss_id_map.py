@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the array-backed FAISS position <-> vector ID map and index compaction
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import numpy as np
+
+from storage.faiss_id_map import VectorIdMap
+
+try:
+    import faiss  # noqa: F401
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+class TestVectorIdMap(unittest.TestCase):
+    """Lookups in both directions and dict-compatible reads"""
+    
+    def test_assign_and_lookup(self):
+        id_map = VectorIdMap()
+        id_map.assign(0, [10, 11, 12])
+        id_map.assign(3, [20])
+        
+        self.assertEqual(id_map.get(1), 11)
+        self.assertIsNone(id_map.get(99))
+        self.assertEqual(id_map.position_of(20), 3)
+        self.assertIsNone(id_map.position_of(5))
+        self.assertEqual(id_map.positions_of([12, 5, 10]).tolist(), [2, -1, 0])
+        self.assertEqual(dict(id_map.items()), {0: 10, 1: 11, 2: 12, 3: 20})
+    
+    def test_overwrite_clears_reverse_entry(self):
+        id_map = VectorIdMap(np.array([1, 2, 3]))
+        id_map[1] = 7
+        self.assertIsNone(id_map.position_of(2))
+        self.assertEqual(id_map.position_of(7), 1)
+    
+    def test_from_legacy_dict_with_gaps(self):
+        id_map = VectorIdMap.from_dict({0: 5, 2: 9})
+        self.assertEqual(len(id_map), 2)
+        self.assertNotIn(1, id_map)
+        self.assertEqual(id_map.to_array().tolist(), [5, -1, 9])
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss is required")
+class TestFAISSStoreRebuild(unittest.TestCase):
+    """Deleted vectors are compacted without breaking the ID mapping"""
+    
+    def setUp(self):
+        from storage.faiss_store import FAISSStore
+        self.FAISSStore = FAISSStore
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_path = str(Path(self.tmp_dir) / "index.faiss")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _populated_store(self, n=40, dim=8):
+        store = self.FAISSStore(self.index_path, dimension=dim, wal_compact_interval=3600)
+        vectors = np.random.RandomState(0).rand(n, dim).astype('float32')
+        ids = store.add_vectors(vectors.tolist(), [{'text': f"chunk {i}"} for i in range(n)])
+        return store, vectors, ids
+    
+    def test_background_rebuild_drops_deleted_vectors(self):
+        store, vectors, ids = self._populated_store()
+        store.delete_vectors(ids[:10])
+        store._rebuild_thread.join()
+        
+        self.assertEqual(store.optimized_index.index.ntotal, 30)
+        self.assertNotIn(ids[0], store.id_to_metadata)
+        top = store.search(vectors[25].tolist(), k=1)[0]
+        self.assertEqual(top['text'], "chunk 25")
+        
+        reopened = self.FAISSStore(self.index_path, dimension=8, wal_compact_interval=3600)
+        self.assertEqual(reopened.optimized_index.index.ntotal, 30)
+        self.assertEqual(reopened.index_to_id.position_of(ids[10]), 0)
+    
+    def test_vectors_added_during_rebuild_are_carried_over(self):
+        store, vectors, ids = self._populated_store()
+        for vector_id in ids[:10]:
+            store.id_to_metadata[vector_id] = {**store.id_to_metadata[vector_id], 'deleted': True}
+        
+        source_index, live_ids, live_vectors, captured_ntotal = store._gather_live_vectors()
+        rebuilt = store._build_index_from_vectors(live_vectors)
+        new_id = store.add_vectors([vectors[0].tolist()], [{'text': 'late arrival'}])[0]
+        
+        self.assertTrue(store._swap_rebuilt_index(source_index, rebuilt, live_ids, captured_ntotal))
+        self.assertEqual(store.optimized_index.index.ntotal, 31)
+        self.assertEqual(store.index_to_id.position_of(new_id), 30)
+        self.assertEqual(store.search(vectors[0].tolist(), k=1)[0]['text'], 'late arrival')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Tests for loading persisted FAISS indexes as-is (no retrain / re-add on startup)
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+try:
+    import faiss
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss and numpy are required")
+class TestFAISSIndexLoading(unittest.TestCase):
+    """Index type and training state survive a restart"""
+    
+    def setUp(self):
+        from storage.faiss_store import FAISSStore, OptimizedFAISSIndex, IndexType
+        from storage.faiss_id_map import VectorIdMap
+        from storage.faiss_metadata_store import ColumnarMetadataStore
+        self.VectorIdMap = VectorIdMap
+        self.ColumnarMetadataStore = ColumnarMetadataStore
+        self.FAISSStore = FAISSStore
+        self.OptimizedFAISSIndex = OptimizedFAISSIndex
+        self.IndexType = IndexType
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_path = str(Path(self.tmp_dir) / "index.faiss")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def _ivf_store(self, n=3000, dim=16):
+        """Build a store whose snapshot holds a trained IVF index"""
+        store = self.FAISSStore(self.index_path, dimension=dim, wal_enabled=False)
+        vectors = store._normalize_vectors(np.random.RandomState(0).rand(n, dim).astype('float32'))
+        store.optimized_index = self.OptimizedFAISSIndex(dim, 20000)
+        store.optimized_index.index.train(vectors)
+        store.optimized_index.is_trained = True
+        store.optimized_index.add_vectors(vectors)
+        store.index_to_id = self.VectorIdMap(np.arange(n))
+        store.id_to_metadata = self.ColumnarMetadataStore.from_dict({i: {'text': str(i)} for i in range(n)})
+        store.next_id = n
+        store.save_index()
+        return store, vectors
+    
+    def test_ivf_index_is_loaded_without_retraining(self):
+        store, vectors = self._ivf_store()
+        expected = store.search(vectors[0].tolist(), k=3)
+        
+        from unittest import mock
+        with mock.patch.object(faiss.IndexIVFFlat, 'train') as train:
+            reopened = self.FAISSStore(self.index_path, dimension=16, wal_enabled=False)
+            train.assert_not_called()
+        
+        self.assertEqual(reopened.optimized_index.index_type, self.IndexType.IVF)
+        self.assertTrue(reopened.optimized_index.is_trained)
+        self.assertEqual(reopened.optimized_index.index.ntotal, len(vectors))
+        self.assertEqual([r['text'] for r in reopened.search(vectors[0].tolist(), k=3)],
+                         [r['text'] for r in expected])
+    
+    def test_memory_mapped_index_becomes_writable_on_add(self):
+        self._ivf_store()
+        reopened = self.FAISSStore(self.index_path, dimension=16, wal_enabled=False, mmap_index=True)
+        self.assertTrue(reopened.optimized_index.mmapped)
+        
+        reopened.add_vectors(np.random.rand(2, 16).astype('float32').tolist(), [{'text': 'a'}, {'text': 'b'}])
+        self.assertFalse(reopened.optimized_index.mmapped)
+        self.assertEqual(reopened.optimized_index.index.ntotal, 3002)
+        
+        again = self.FAISSStore(self.index_path, dimension=16, wal_enabled=False)
+        self.assertEqual(again.optimized_index.index.ntotal, 3002)
+    
+    def test_legacy_snapshot_type_is_detected(self):
+        index = faiss.IndexHNSWFlat(16, 8)
+        wrapped = self.OptimizedFAISSIndex.from_index(index)
+        self.assertEqual(wrapped.index_type, self.IndexType.HNSW)
+        self.assertTrue(wrapped.is_trained)
+
+
+if __name__ == '__main__':
+    unittest.main()
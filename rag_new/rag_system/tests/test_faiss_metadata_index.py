@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the FAISS metadata inverted index and pre-filtered search
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.faiss_metadata_index import MetadataIndex
+
+try:
+    import faiss  # noqa: F401
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+class TestMetadataIndex(unittest.TestCase):
+    """Postings stay in sync with adds, updates and deletes"""
+    
+    def test_lookup_intersects_fields(self):
+        index = MetadataIndex()
+        index.add(1, {'doc_path': 'a', 'source_type': 'pdf'})
+        index.add(2, {'doc_path': 'a', 'source_type': 'txt'})
+        index.add(3, {'doc_path': 'b', 'source_type': 'pdf', 'deleted': True})
+        
+        self.assertEqual(index.lookup({'doc_path': 'a'}), {1, 2})
+        self.assertEqual(index.lookup({'doc_path': 'a', 'source_type': 'pdf'}), {1})
+        self.assertEqual(index.lookup({'doc_path': 'b'}), set())
+        self.assertIsNone(index.lookup({'title': 'x'}))
+        self.assertIsNone(index.lookup({'doc_path': ['a', 'b']}))
+    
+    def test_update_and_remove(self):
+        index = MetadataIndex()
+        index.add(1, {'doc_path': 'a'})
+        index.update(1, {'doc_path': 'a'}, {'doc_path': 'b'})
+        self.assertEqual(index.lookup({'doc_path': 'a'}), set())
+        self.assertEqual(index.lookup({'doc_path': 'b'}), {1})
+        
+        index.remove(1, {'doc_path': 'b'})
+        self.assertEqual(index.get_stats()['doc_path_values'], 0)
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss and numpy are required")
+class TestFAISSPrefilteredSearch(unittest.TestCase):
+    """Selective filters return k matches instead of whatever survives a post-filter"""
+    
+    def setUp(self):
+        from storage.faiss_store import FAISSStore
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = FAISSStore(str(Path(self.tmp_dir) / "index.faiss"), dimension=8, wal_compact_interval=3600)
+        self.vectors = np.random.RandomState(0).rand(500, 8).astype('float32')
+        # Only 5 of 500 chunks belong to the rare document
+        metadata = [{'text': f"chunk {i}", 'doc_path': 'rare.txt' if i % 100 == 0 else 'common.txt'}
+                    for i in range(500)]
+        self.ids = self.store.add_vectors(self.vectors.tolist(), metadata)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_selective_filter_returns_k_results(self):
+        results = self.store.search_batch(self.vectors[[7]].tolist(), k=5, filters={'doc_path': 'rare.txt'})[0]
+        self.assertEqual(len(results), 5)
+        self.assertTrue(all(r['doc_path'] == 'rare.txt' for r in results))
+        
+        legacy = self.store.search(self.vectors[7].tolist(), k=5, filter_metadata={'doc_path': 'rare.txt'})
+        self.assertEqual(len(legacy), 5)
+    
+    def test_selector_path_matches_brute_force(self):
+        query = self.vectors[[42]].tolist()
+        exact = self.store.search_batch(query, k=5, filters={'doc_path': 'common.txt'})[0]
+        
+        self.store.FILTER_BRUTE_FORCE_LIMIT = 0
+        selected = self.store.search_batch(query, k=5, filters={'doc_path': 'common.txt'})[0]
+        self.assertEqual([r['vector_id'] for r in selected], [r['vector_id'] for r in exact])
+    
+    def test_deleted_vectors_leave_the_index(self):
+        rare_ids = self.store.find_vectors_by_doc_path('rare.txt')
+        self.assertEqual(len(rare_ids), 5)
+        
+        self.assertEqual(self.store.delete_vectors_by_doc_path('rare.txt'), 5)
+        self.assertEqual(self.store.find_vectors_by_doc_path('rare.txt'), [])
+        self.assertEqual(self.store.search_batch(self.vectors[[0]].tolist(), k=5,
+                                                 filters={'doc_path': 'rare.txt'})[0], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
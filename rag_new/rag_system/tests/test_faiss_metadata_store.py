@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the columnar FAISS metadata store and its mmap'd text heap
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.faiss_metadata_store import ColumnarMetadataStore, StringHeap
+
+try:
+    import faiss  # noqa: F401
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+def chunk_metadata(vector_id, doc, chunk_index):
+    text = f"Chunk {chunk_index} of {doc} — naïve UTF-8 text"
+    return {
+        'added_at': '2024-05-01T10:11:12.123456',
+        'vector_id': vector_id,
+        'text': text,
+        'content': text,
+        'chunk_index': chunk_index,
+        'chunk_size': len(text),
+        'doc_path': f"/docs/{doc}.pdf",
+        'doc_hash': f"hash-{doc}",
+        'file_size': 1024,
+        'is_update': False,
+        'upload_source': 'web',
+        'page_numbers': [chunk_index, chunk_index + 1],
+    }
+
+
+class TestColumnarMetadataStore(unittest.TestCase):
+    """Rows read back exactly as written while sharing file-level fields"""
+    
+    def test_round_trip_and_document_sharing(self):
+        store = ColumnarMetadataStore()
+        expected = {i: chunk_metadata(i, 'a' if i < 3 else 'b', i) for i in range(5)}
+        expected[4]['content'] = "different content"
+        expected[4]['added_at'] = '2024-05-01T10:11:12+02:00'  # Not a naive timestamp, kept verbatim
+        for vector_id, metadata in expected.items():
+            store[vector_id] = metadata
+        
+        self.assertEqual(dict(store.items()), expected)
+        self.assertIsInstance(store[0]['is_update'], bool)
+        self.assertEqual(store.get_stats()['metadata_documents'], 2)
+        self.assertNotIn(7, store)
+        self.assertNotIn('7', store)
+    
+    def test_update_reuses_heap_and_tracks_deletes(self):
+        store = ColumnarMetadataStore()
+        store[0] = chunk_metadata(0, 'a', 0)
+        store[1] = chunk_metadata(1, 'a', 1)
+        heap_size = store.get_stats()['metadata_heap_bytes']
+        
+        store[0] = {**store[0], 'deleted': True, 'deleted_at': '2024-05-02T00:00:00'}
+        self.assertEqual(store.get_stats()['metadata_heap_bytes'], heap_size)
+        self.assertEqual(store.live_ids().tolist(), [1])
+        self.assertEqual(store.deleted_ids().tolist(), [0])
+        self.assertEqual(store[0]['deleted_at'], '2024-05-02T00:00:00')
+        
+        store.retain([1])
+        self.assertEqual(len(store), 1)
+        self.assertEqual(store.get_stats()['metadata_heap_dead_bytes'], heap_size // 2)
+        
+        store.compact_heap(force=True)
+        self.assertEqual(store.get_stats()['metadata_heap_bytes'], heap_size // 2)
+        self.assertEqual(store[1]['text'], chunk_metadata(1, 'a', 1)['text'])
+    
+    def test_capture_restores_from_mapped_heap(self):
+        store = ColumnarMetadataStore()
+        for i in range(4):
+            store[i] = chunk_metadata(i, 'a', i)
+        state, heap, buffers = store.capture()
+        store[4] = chunk_metadata(4, 'b', 4)  # Written after the capture
+        
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            heap_path = Path(tmp_dir) / "vector_metadata.1.heap"
+            heap_path.write_bytes(b''.join(bytes(buffer) for buffer in buffers))
+            heap.attach(StringHeap.map_file(heap_path), state['heap_size'])
+            self.assertEqual(store[0]['text'], chunk_metadata(0, 'a', 0)['text'])
+            self.assertEqual(store[4]['text'], chunk_metadata(4, 'b', 4)['text'])
+            
+            restored = ColumnarMetadataStore.from_state(state, StringHeap.map_file(heap_path))
+            self.assertEqual(len(restored), 4)
+            self.assertEqual(restored[3], chunk_metadata(3, 'a', 3))
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss and numpy are required")
+class TestFAISSStoreColumnarMetadata(unittest.TestCase):
+    """Snapshots persist the columns plus one text heap file"""
+    
+    def setUp(self):
+        from storage.faiss_store import FAISSStore
+        self.FAISSStore = FAISSStore
+        self.tmp_dir = tempfile.mkdtemp()
+        self.index_path = str(Path(self.tmp_dir) / "index.faiss")
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_snapshot_round_trip(self):
+        store = self.FAISSStore(self.index_path, dimension=8, wal_enabled=False)
+        vectors = np.random.RandomState(0).rand(6, 8).astype('float32')
+        store.add_vectors(vectors[:3].tolist(), [chunk_metadata(i, 'a', i) for i in range(3)])
+        store.add_vectors(vectors[3:].tolist(), [chunk_metadata(i, 'b', i) for i in range(3, 6)])
+        
+        heaps = list(Path(self.tmp_dir).glob("vector_metadata.*.heap"))
+        self.assertEqual(len(heaps), 1)
+        
+        reopened = self.FAISSStore(self.index_path, dimension=8, wal_enabled=False)
+        self.assertEqual(reopened.get_all_metadata(), store.get_all_metadata())
+        top = reopened.search_with_metadata(vectors[4].tolist(), k=1)[0]
+        self.assertEqual(top['text'], chunk_metadata(4, 'b', 4)['text'])
+        self.assertEqual(top['doc_path'], "/docs/b.pdf")
+        self.assertEqual(top['vector_id'], '4')
+        self.assertEqual(reopened.find_vectors_by_doc_path("/docs/a.pdf"), [0, 1, 2])
+    
+    def test_backup_and_restore_include_text_heap(self):
+        store = self.FAISSStore(self.index_path, dimension=8, wal_enabled=False)
+        vector = np.random.RandomState(1).rand(8).tolist()
+        store.add_vectors([vector], [chunk_metadata(0, 'a', 0)])
+        backup_dir = store.backup_index(str(Path(self.tmp_dir) / "backup"))
+        
+        store.clear_index()
+        store.restore_index(backup_dir)
+        self.assertEqual(store.get_metadata('0')['text'], chunk_metadata(0, 'a', 0)['text'])
+
+
+if __name__ == '__main__':
+    unittest.main()
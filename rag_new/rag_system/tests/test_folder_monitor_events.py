@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Tests for event-driven folder monitoring: debounced file events and scandir reconciliation
+"""
+
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.monitoring.file_watcher import FileEventWatcher, CHANGED, DELETED
+from src.monitoring.folder_monitor import FolderMonitor
+from src.ingestion.file_hashing import precomputed_file_hash
+
+
+class TestFileEventWatcher(unittest.TestCase):
+    """Bursts of events collapse into one report per path once it settles"""
+    
+    def setUp(self):
+        self.batches = []
+        self.watcher = FileEventWatcher(["/watched"], self.batches.append, debounce_seconds=0.05,
+                                        max_delay_seconds=0.2)
+    
+    def test_bursts_are_coalesced_after_quiet_period(self):
+        for _ in range(20):
+            self.watcher.record("/watched/report.pdf", CHANGED)
+        self.watcher.record("/watched/tmp.txt", CHANGED)
+        self.watcher.record("/watched/tmp.txt", DELETED)
+        
+        self.assertEqual(self.watcher.flush(), [])
+        time.sleep(0.06)
+        self.assertEqual(sorted(self.watcher.flush()),
+                         [(CHANGED, "/watched/report.pdf"), (DELETED, "/watched/tmp.txt")])
+        self.assertEqual(len(self.batches), 1)
+        self.assertEqual(self.watcher.get_stats()['raw_events'], 22)
+    
+    def test_continuously_written_file_is_reported_after_max_delay(self):
+        deadline = time.monotonic() + 0.5
+        while not self.batches and time.monotonic() < deadline:
+            self.watcher.record("/watched/growing.log.txt", CHANGED)
+            self.watcher.flush()
+            time.sleep(0.01)
+        self.assertEqual(self.batches, [[(CHANGED, "/watched/growing.log.txt")]])
+
+
+class TestFolderMonitorChanges(unittest.TestCase):
+    """Full scans and file events produce the same FileState changes"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.monitor = FolderMonitor()
+        self.monitor.auto_ingest = False
+        self.monitor.monitored_folders = [self.tmp_dir]
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def write(self, name, text, mtime=None):
+        path = os.path.join(self.tmp_dir, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as f:
+            f.write(text)
+        if mtime is not None:
+            os.utime(path, (mtime, mtime))
+        return path
+    
+    def test_scan_detects_new_modified_and_deleted_files(self):
+        notes = self.write("notes.md", "v1", mtime=1000)
+        nested = self.write("sub/data.csv", "a,b")
+        self.write("sub/ignored.bin", "binary")
+        self.assertEqual(sorted(self.monitor._scan_folders([self.tmp_dir])),
+                         sorted([('new', nested), ('new', notes)]))
+        
+        self.write("notes.md", "v1", mtime=2000)  # touched, same content
+        self.assertEqual(self.monitor._scan_folders([self.tmp_dir]), [])
+        self.assertEqual(self.monitor.file_states[notes].mtime, 2000)
+        
+        self.write("notes.md", "v2", mtime=3000)
+        os.remove(nested)
+        self.assertEqual(sorted(self.monitor._scan_folders([self.tmp_dir])),
+                         [('deleted', nested), ('modified', notes)])
+        self.assertEqual(self.monitor.file_states[notes].ingestion_status, "pending")
+        self.assertNotIn(nested, self.monitor.file_states)
+    
+    def test_file_events_touch_only_reported_paths(self):
+        notes = self.write("notes.md", "v1")
+        self.monitor._scan_folders([self.tmp_dir])
+        
+        first = self.write("incoming/a.txt", "a")
+        second = self.write("incoming/b.txt", "b")
+        self.monitor._handle_file_events([(CHANGED, os.path.join(self.tmp_dir, "incoming"))])
+        self.assertIn(first, self.monitor.file_states)
+        self.assertIn(second, self.monitor.file_states)
+        
+        shutil.rmtree(os.path.join(self.tmp_dir, "incoming"))
+        outside = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, outside, True)
+        moved = os.path.join(outside, "notes.md")
+        shutil.move(notes, moved)
+        self.monitor._handle_file_events([(DELETED, os.path.join(self.tmp_dir, "incoming")),
+                                          (DELETED, notes), (CHANGED, moved)])
+        self.assertEqual(self.monitor.file_states, {})
+        self.assertEqual(self.monitor.stats['file_events'], 4)
+
+
+
+class TestFileStateCatalog(unittest.TestCase):
+    """File states survive a restart, so only files changed while down are hashed again"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        self.folder = os.path.join(self.tmp_dir, "docs")
+        self.db_path = os.path.join(self.tmp_dir, "state", "file_states.sqlite")
+        os.makedirs(self.folder)
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def start_monitor(self):
+        monitor = FolderMonitor()
+        monitor.auto_ingest = False
+        monitor.monitored_folders = [self.folder]
+        monitor.state_db_path = self.db_path
+        monitor._load_file_states()
+        self.addCleanup(monitor.catalog.close)
+        return monitor
+    
+    def write(self, name, text):
+        path = os.path.join(self.folder, name)
+        with open(path, 'w') as f:
+            f.write(text)
+        return path
+    
+    def test_restart_hashes_only_changed_files(self):
+        paths = [self.write(f"doc{i}.txt", f"content {i}") for i in range(5)]
+        first = self.start_monitor()
+        first._scan_all_folders()
+        first.file_states[paths[0]].ingestion_status = "success"
+        first._mark_dirty(paths[0])
+        first._save_file_states()
+        self.assertEqual(first.stats['files_hashed'], 5)
+        
+        second = self.start_monitor()
+        self.assertEqual(second.get_file_states(), first.get_file_states())
+        self.assertEqual(second._scan_folders([self.folder]), [])
+        self.assertEqual(second.stats['files_hashed'], 0)
+        
+        self.write("doc1.txt", "edited while the monitor was down")
+        os.remove(paths[2])
+        self.assertEqual(sorted(second._scan_folders([self.folder])),
+                         [('deleted', paths[2]), ('modified', paths[1])])
+        self.assertEqual(second.stats['files_hashed'], 1)
+        second._save_file_states()
+        
+        third = self.start_monitor()
+        self.assertEqual(sorted(third.file_states), [paths[0], paths[1], paths[3], paths[4]])
+        self.assertEqual(third.file_states[paths[0]].ingestion_status, "success")
+    
+    def test_ingestion_reuses_monitor_hash_while_file_is_unchanged(self):
+        path = self.write("report.md", "v1")
+        monitor = self.start_monitor()
+        monitor._scan_folders([self.folder])
+        state = monitor.file_states[path]
+        metadata = {'file_hash': state.hash, 'hash_algorithm': 'sha256',
+                    'file_size': state.size, 'file_mtime': state.mtime}
+        self.assertEqual(precomputed_file_hash(path, metadata), state.hash)
+        
+        os.utime(path, (state.mtime + 10, state.mtime + 10))
+        self.assertIsNone(precomputed_file_hash(path, metadata))
+
+
+if __name__ == '__main__':
+    unittest.main()
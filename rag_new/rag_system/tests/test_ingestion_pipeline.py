@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the staged directory ingestion pipeline
+"""
+
+import unittest
+import sys
+import threading
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from ingestion.pipeline import IngestionPipeline, PipelineFile
+
+
+def extract_chunks(file_path, metadata):
+    """Module-level so worker processes can unpickle it"""
+    if 'broken' in file_path:
+        raise ValueError(f"cannot parse {file_path}")
+    count = int(Path(file_path).stem.split('_')[-1])
+    chunks = [{'text': f"{file_path} chunk {i}", 'metadata': {}} for i in range(count)]
+    info = {'extraction_time': 0.01}
+    if not chunks:
+        info['skip_reason'] = 'no_content'
+    return chunks, {**metadata, 'extracted': True}, info
+
+
+class FakeStores:
+    """Records every embedding call and store commit"""
+    
+    def __init__(self, fail_text=None):
+        self.fail_text = fail_text
+        self.embed_calls = []
+        self.store_calls = []
+        self.failures = []
+        self.lock = threading.Lock()
+    
+    def prepare(self, file_path):
+        if 'duplicate' in file_path:
+            return {'status': 'skipped', 'reason': 'duplicate', 'file_path': file_path}
+        return PipelineFile(file_path=file_path, metadata={'source': 'test'})
+    
+    def embed(self, texts):
+        with self.lock:
+            self.embed_calls.append(len(texts))
+        if self.fail_text and any(self.fail_text in text for text in texts):
+            raise RuntimeError("embedding service rejected the batch")
+        return [[float(len(text))] for text in texts]
+    
+    def store(self, files):
+        with self.lock:
+            self.store_calls.append([item.file_path for item in files])
+        return [{'status': 'success', 'file_path': item.file_path, 'vectors_stored': len(item.embeddings),
+                 'extracted': item.metadata.get('extracted', False)} for item in files]
+    
+    def on_failed(self, file_path, error):
+        self.failures.append(file_path)
+        return {'status': 'failed', 'file_path': file_path, 'error': str(error)}
+    
+    def pipeline(self, **kwargs):
+        return IngestionPipeline(self.prepare, extract_chunks, self.embed, self.store, self.on_failed,
+                                 flush_interval=0.5, **kwargs)
+
+
+class TestIngestionPipeline(unittest.TestCase):
+    """Files share embedding batches and store commits while failures stay per file"""
+    
+    def test_batches_across_files_and_keeps_order(self):
+        stores = FakeStores()
+        files = [f"/docs/report_{n}.txt" for n in (3, 4, 0, 5)] + ["/docs/duplicate_2.txt"]
+        results = stores.pipeline(embed_batch_size=4, store_batch_size=100).run(files)
+        
+        self.assertEqual([r['file_path'] for r in results], files)
+        self.assertEqual([r['status'] for r in results], ['success', 'success', 'skipped', 'success', 'skipped'])
+        self.assertEqual(results[2]['reason'], 'no_content')
+        self.assertEqual([r['vectors_stored'] for r in results if r['status'] == 'success'], [3, 4, 5])
+        self.assertTrue(all(r['extracted'] for r in results if r['status'] == 'success'))
+        # 12 chunks from three files pack into three full batches
+        self.assertEqual(sorted(stores.embed_calls), [4, 4, 4])
+        self.assertEqual(sum(len(call) for call in stores.store_calls), 3)
+    
+    def test_failures_are_isolated(self):
+        stores = FakeStores(fail_text="report_2")
+        files = ["/docs/report_1.txt", "/docs/broken_1.txt", "/docs/report_2.txt", "/docs/other_3.txt"]
+        pipeline = stores.pipeline(embed_batch_size=1, max_in_flight=2)
+        results = pipeline.run(files)
+        
+        self.assertEqual([r['status'] for r in results], ['success', 'failed', 'failed', 'success'])
+        self.assertIn("cannot parse", results[1]['error'])
+        self.assertEqual(sorted(stores.failures), ["/docs/broken_1.txt", "/docs/report_2.txt"])
+        self.assertEqual(pipeline.stats['stored_files'], 2)
+    
+    def test_process_pool_extraction(self):
+        stores = FakeStores()
+        files = [f"/docs/report_{n}.txt" for n in range(1, 7)]
+        results = stores.pipeline(workers=2, embed_batch_size=8).run(files)
+        
+        self.assertEqual([r['vectors_stored'] for r in results], list(range(1, 7)))
+        self.assertEqual(sum(stores.embed_calls), 21)
+
+
+if __name__ == '__main__':
+    unittest.main()
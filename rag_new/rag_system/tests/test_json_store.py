@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for the log-structured JSONStore backend
+"""
+
+import unittest
+import sys
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.json_store import LogStructuredJSONStore
+
+
+class TestLogStructuredJSONStore(unittest.TestCase):
+    """Writes append records; the collection survives reopening, compaction and restore"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def make_store(self, **kwargs):
+        return LogStructuredJSONStore(self.tmp_dir, index_fields={'jobs': ['status']}, fsync=False, **kwargs)
+    
+    def test_api_and_reopen(self):
+        store = self.make_store()
+        first = store.append('jobs', {'status': 'queued', 'name': 'a'})
+        store.append('jobs', {'id': 'b', 'status': 'queued', 'name': 'b'})
+        store.append('jobs', {'id': 'c', 'status': 'done', 'name': 'c'})
+        self.assertTrue(store.update('jobs', 'b', {'status': 'done'}))
+        self.assertTrue(store.delete('jobs', 'c'))
+        self.assertFalse(store.delete('jobs', 'missing'))
+        
+        self.assertEqual([r['_key'] for r in store.search('jobs', {'status': 'done'})], ['b'])
+        self.assertEqual([r['_key'] for r in store.search('jobs', {'status': 'queued', 'name': 'a'})], [first])
+        self.assertEqual(list(store.read('jobs')), [first, 'b'])
+        
+        # A torn trailing write is ignored on reopen
+        with open(Path(self.tmp_dir) / 'jobs.jsonl', 'ab') as f:
+            f.write(b'{"op": "put", "key": "x"')
+        reopened = self.make_store()
+        self.assertEqual(reopened.read('jobs', 'b')['status'], 'done')
+        self.assertIsNone(reopened.read('jobs', 'c'))
+        self.assertEqual(reopened.collection_stats('jobs')['count'], 2)
+        self.assertEqual(len(reopened.search('jobs', {'status': 'done'})), 1)
+    
+    def test_compaction_and_legacy_import(self):
+        with open(Path(self.tmp_dir) / 'jobs.json', 'w') as f:
+            json.dump({'old': {'status': 'done'}}, f)
+        store = self.make_store(compact_min_records=10)
+        self.assertEqual(store.read('jobs', 'old'), {'status': 'done'})
+        
+        for i in range(30):
+            store.write('jobs', {'status': 'queued', 'n': i}, 'hot')
+        stats = store.collection_stats('jobs')
+        self.assertLessEqual(stats['dead_records'], 10)
+        self.assertEqual(store.read('jobs', 'hot')['n'], 29)
+        self.assertEqual([r['_key'] for r in store.search('jobs', {'status': 'queued'})], ['hot'])
+    
+    def test_incremental_snapshots_restore(self):
+        store = self.make_store()
+        store.append('jobs', {'id': 'a', 'status': 'queued'})
+        first = store.backup_collection('jobs')
+        store.append('jobs', {'id': 'b', 'status': 'queued'})
+        second = store.backup_collection('jobs')
+        store.delete('jobs', 'a')
+        
+        # The second snapshot holds only the bytes written after the first
+        self.assertEqual(Path(second).read_bytes().count(b"\n"), 1)
+        
+        store.restore_collection('jobs', second)
+        self.assertEqual(sorted(store.read('jobs')), ['a', 'b'])
+        store.restore_collection('jobs', first)
+        self.assertEqual(sorted(store.read('jobs')), ['a'])
+    
+    def test_snapshots_after_restoring_older_generation(self):
+        store = self.make_store()
+        for key in ('a', 'b', 'c'):
+            store.append('jobs', {'id': key, 'status': 'queued'})
+        g0 = store.backup_collection('jobs')
+        store.compact('jobs')
+        store.append('jobs', {'id': 'd', 'status': 'queued'})
+        g1 = store.backup_collection('jobs')
+        
+        store.restore_collection('jobs', g0)
+        store.append('jobs', {'id': 'e', 'status': 'done'})
+        restored_chain = store.backup_collection('jobs')
+        self.assertNotIn(Path(restored_chain).name.split(".")[1], {Path(g0).name.split(".")[1],
+                                                                   Path(g1).name.split(".")[1]})
+        
+        store.restore_collection('jobs', g1)
+        self.assertEqual(sorted(store.read('jobs')), ['a', 'b', 'c', 'd'])
+        store.restore_collection('jobs', restored_chain)
+        self.assertEqual(sorted(store.read('jobs')), ['a', 'b', 'c', 'e'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide LLM rate limiter
+"""
+
+import asyncio
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.retrieval.llm_rate_limiter import (
+    LLMRateLimiter, PRIORITY_BACKGROUND, PRIORITY_INTERACTIVE, llm_priority
+)
+from src.core.error_handling import LLMError
+
+
+class TestLLMRateLimiter(unittest.TestCase):
+    
+    def test_concurrency_is_bounded_across_threads(self):
+        limiter = LLMRateLimiter(max_concurrency=2)
+        lock = threading.Lock()
+        state = {'in_flight': 0, 'peak': 0}
+        
+        def call():
+            with limiter.slot():
+                with lock:
+                    state['in_flight'] += 1
+                    state['peak'] = max(state['peak'], state['in_flight'])
+                time.sleep(0.05)
+                with lock:
+                    state['in_flight'] -= 1
+        
+        threads = [threading.Thread(target=call) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        
+        stats = limiter.get_stats()
+        self.assertEqual(state['peak'], 2)
+        self.assertEqual((stats['granted'], stats['in_flight'], stats['waiting']), (6, 0, 0))
+        self.assertGreater(stats['max_queue_time'], 0.05)
+    
+    def test_interactive_calls_jump_the_background_queue(self):
+        limiter = LLMRateLimiter(max_concurrency=1)
+        blocker = limiter.acquire()
+        order = []
+        
+        def call(name, priority=None):
+            with limiter.slot(priority=priority):
+                order.append(name)
+        
+        background = threading.Thread(target=call, args=('background', PRIORITY_BACKGROUND))
+        background.start()
+        time.sleep(0.05)
+        
+        def interactive():
+            with llm_priority(PRIORITY_INTERACTIVE):
+                call('interactive')
+        
+        foreground = threading.Thread(target=interactive)
+        foreground.start()
+        time.sleep(0.05)
+        blocker.release()
+        background.join()
+        foreground.join()
+        
+        self.assertEqual(order, ['interactive', 'background'])
+    
+    def test_token_budget_and_timeout(self):
+        limiter = LLMRateLimiter(tokens_per_minute=600, timeout=0.2)  # refills 10 tokens/s
+        with limiter.acquire(estimated_tokens=100) as permit:
+            permit.record_usage(600)  # the call used the whole minute's budget
+        
+        start = time.monotonic()
+        with self.assertRaises(LLMError):
+            limiter.acquire(estimated_tokens=50)
+        self.assertGreaterEqual(time.monotonic() - start, 0.2)
+        self.assertEqual(limiter.get_stats()['timeouts'], 1)
+        
+        permit = limiter.acquire(estimated_tokens=1, timeout=1.0)
+        permit.release()
+        self.assertGreater(permit.queue_time, 0)
+    
+    def test_async_acquire_does_not_block_the_loop(self):
+        limiter = LLMRateLimiter(max_concurrency=1)
+        
+        async def main():
+            ticks = 0
+            blocker = await limiter.acquire_async()
+            
+            async def ticker():
+                nonlocal ticks
+                for _ in range(5):
+                    await asyncio.sleep(0.01)
+                    ticks += 1
+            
+            async def release_later():
+                await asyncio.sleep(0.1)
+                blocker.release()
+            
+            waiter = asyncio.ensure_future(limiter.acquire_async())
+            await asyncio.gather(ticker(), release_later())
+            (await waiter).release()
+            return ticks
+        
+        self.assertEqual(asyncio.run(main()), 5)
+        self.assertEqual(limiter.get_stats()['granted'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
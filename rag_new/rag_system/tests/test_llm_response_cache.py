@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for the prompt-level LLM response cache
+"""
+
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import sys
+from pathlib import Path
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.retrieval.llm_response_cache import LLMResponseCache
+
+
+class SlowProvider:
+    """Provider client stand-in that takes ``latency`` seconds and counts upstream calls"""
+    
+    model_name = "fake-model"
+    
+    def __init__(self, latency=0.1, fail=False):
+        self.latency = latency
+        self.fail = fail
+        self.calls = 0
+        self.lock = threading.Lock()
+    
+    def generate(self, prompt, max_tokens=1000, temperature=0.1):
+        with self.lock:
+            self.calls += 1
+        time.sleep(self.latency)
+        if self.fail:
+            raise RuntimeError("upstream unavailable")
+        return f"answer to {prompt}"
+
+
+def make_llm_client(provider, cache):
+    from src.retrieval.llm_client import LLMClient
+    with mock.patch.object(LLMClient, '_initialize_client'):
+        client = LLMClient(provider="openai", api_key="test-key", response_cache=cache)
+    client.client = provider
+    return client
+
+
+class TestLLMResponseCache(unittest.TestCase):
+    
+    def run_concurrently(self, func, count=8):
+        results, errors = [], []
+        
+        def worker():
+            try:
+                results.append(func())
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=worker) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results, errors
+    
+    def test_concurrent_identical_prompts_share_one_call(self):
+        provider = SlowProvider()
+        client = make_llm_client(provider, LLMResponseCache())
+        
+        results, errors = self.run_concurrently(lambda: client.generate("List AP models"))
+        self.assertEqual((provider.calls, errors), (1, []))
+        self.assertEqual(set(results), {"answer to List AP models"})
+        
+        client.generate("List AP models")
+        client.generate("List AP models", max_tokens=50)  # different key
+        client.generate("List AP models", use_cache=False)
+        self.assertEqual(provider.calls, 3)
+        
+        stats = client.get_cache_stats()
+        self.assertEqual((stats['misses'], stats['coalesced'] + stats['hits']), (2, 8))
+    
+    def test_errors_reach_every_waiter_and_are_not_cached(self):
+        provider = SlowProvider(fail=True)
+        client = make_llm_client(provider, LLMResponseCache())
+        
+        results, errors = self.run_concurrently(lambda: client.generate("q"), count=4)
+        self.assertEqual((results, len(errors), provider.calls), ([], 4, 1))
+        
+        provider.fail = False
+        self.assertEqual(client.generate("q"), "answer to q")
+        self.assertEqual(provider.calls, 2)
+    
+    def test_ttl_and_disk_tier(self):
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            path = str(Path(tmp_dir) / "llm_cache.sqlite")
+            key = LLMResponseCache.make_key("openai", "fake-model", "prompt", 0.1, 100)
+            cache = LLMResponseCache(max_entries=1, disk_path=path)
+            cache.put(key, "cached answer")
+            cache.put("other", "evicts the first entry from memory")
+            self.assertEqual(cache.get(key), "cached answer")
+            cache.close()
+            
+            restarted = LLMResponseCache(disk_path=path)
+            self.assertEqual(restarted.get(key), "cached answer")
+            self.assertEqual(restarted.get_stats()['disk_hits'], 1)
+            restarted.close()
+            
+            short_lived = LLMResponseCache(ttl_seconds=0.05, disk_path=path)
+            time.sleep(0.1)
+            self.assertIsNone(short_lived.get(key))
+            short_lived.close()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    unittest.main()
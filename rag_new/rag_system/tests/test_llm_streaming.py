@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Tests for streamed LLM responses against a local fake OpenAI-compatible server
+"""
+
+import json
+import threading
+import time
+import unittest
+import sys
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import openai
+    OPENAI_AVAILABLE = True
+except ImportError:
+    OPENAI_AVAILABLE = False
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """/v1/chat/completions that streams ``tokens`` as SSE chunks, sleeping ``delay`` before each"""
+    
+    daemon_threads = True
+    
+    def __init__(self, tokens, delay=0.1):
+        super().__init__(('127.0.0.1', 0), FakeLLMHandler)
+        self.tokens = tokens
+        self.delay = delay
+    
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1"
+
+
+class FakeLLMHandler(BaseHTTPRequestHandler):
+    
+    def log_message(self, format, *args):
+        pass
+    
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.end_headers()
+        for token in self.server.tokens:
+            time.sleep(self.server.delay)
+            chunk = {
+                'id': "chatcmpl-test", 'object': "chat.completion.chunk", 'created': 0, 'model': body['model'],
+                'choices': [{'index': 0, 'delta': {'content': token}, 'finish_reason': None}]
+            }
+            self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+@unittest.skipUnless(OPENAI_AVAILABLE, "openai package required")
+class TestOpenAIStreaming(unittest.TestCase):
+    
+    def test_first_token_arrives_before_generation_finishes(self):
+        from src.retrieval.llm_client import OpenAIClient
+        tokens = ["Restart ", "the ", "service ", "and ", "check ", "logs."]
+        server = FakeLLMServer(tokens, delay=0.1)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            client = OpenAIClient("test-key", "fake-model", base_url=server.base_url)
+            start = time.time()
+            received = []
+            first_token_at = None
+            for token in client.generate_stream("How do I fix it?"):
+                if first_token_at is None:
+                    first_token_at = time.time() - start
+                received.append(token)
+            total = time.time() - start
+        finally:
+            server.shutdown()
+            server.server_close()
+        
+        self.assertEqual(received, tokens)
+        self.assertLess(first_token_at, total / 2)
+
+
+class TestQueryEngineStream(unittest.TestCase):
+    """process_query_stream sends sources before any token and ends with the full response"""
+    
+    def make_engine(self, llm_client):
+        from src.retrieval.query_engine import QueryEngine
+        retrieval = SimpleNamespace(top_k=2, similarity_threshold=0.1, enable_reranking=False,
+                                    rerank_top_k=5, enable_source_diversity=False)
+        config_manager = mock.Mock()
+        config_manager.get_config.return_value = SimpleNamespace(retrieval=retrieval)
+        embedder = mock.Mock()
+        embedder.embed_texts.side_effect = lambda texts: [[1.0, 0.5] for _ in texts]
+        vector_store = mock.Mock(spec=['search_batch'])
+        vector_store.search_batch.side_effect = lambda vectors, k, filters=None: [
+            [{'text': "Restart the service", 'doc_path': "runbook.md", 'similarity_score': 0.9}] for _ in vectors
+        ]
+        return QueryEngine(vector_store, embedder, llm_client, None, config_manager)
+    
+    def test_event_order(self):
+        llm_client = mock.Mock()
+        llm_client.generate_stream.return_value = iter(["Restart ", "it."])
+        events = list(self.make_engine(llm_client).process_query_stream("How do I restart the service?"))
+        
+        self.assertEqual([event['type'] for event in events], ['sources', 'token', 'token', 'done'])
+        self.assertEqual(events[0]['total_sources'], 1)
+        self.assertEqual(events[-1]['response'], "Restart it.")
+        self.assertEqual(events[-1]['sources'], events[0]['sources'])
+    
+    def test_failure_before_first_token_yields_fallback_message(self):
+        def failing_stream(prompt):
+            raise RuntimeError("connection reset")
+            yield  # pragma: no cover
+        
+        llm_client = mock.Mock()
+        llm_client.generate_stream.side_effect = failing_stream
+        events = list(self.make_engine(llm_client).process_query_stream("How do I restart the service?"))
+        
+        self.assertEqual([event['type'] for event in events], ['sources', 'token', 'done'])
+        self.assertEqual(events[1]['text'], events[-1]['response'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Tests for hash-indexed duplicate detection
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.persistent_metadata_store import PersistentJSONMetadataStore
+from storage.faiss_metadata_index import MetadataIndex
+
+
+class TestMetadataHashIndex(unittest.TestCase):
+    """find_by_hash is a dictionary lookup that survives restarts"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_hash_lookup_after_reload(self):
+        store = PersistentJSONMetadataStore(self.tmp_dir)
+        first = store.add_file_metadata("/docs/a.pdf", {'doc_hash': "aaa", 'vector_ids': [1, 2]})
+        store.add_file_metadata("/docs/b.pdf", {'doc_hash': "bbb", 'vector_ids': [3]})
+        self.assertEqual(store.find_by_hash("aaa")['file_id'], first)
+        self.assertIsNone(store.find_by_hash("ccc"))
+        
+        reloaded = PersistentJSONMetadataStore(self.tmp_dir)
+        self.assertEqual(reloaded.find_by_hash("bbb")['file_path'], "/docs/b.pdf")
+        self.assertEqual(reloaded.find_vector_ids_by_hash("aaa"), [1, 2])
+        
+        # Re-ingesting the same content points the index at the newest record
+        newer = reloaded.add_file_metadata("/docs/a-copy.pdf", {'doc_hash': "aaa", 'vector_ids': [4, 5]})
+        self.assertEqual(reloaded.find_by_hash("aaa")['file_id'], newer)
+        
+        reloaded.clear_all_data()
+        self.assertIsNone(reloaded.find_by_hash("aaa"))
+    
+    def test_vector_doc_hash_is_indexed(self):
+        index = MetadataIndex()
+        index.add(7, {'doc_hash': "aaa", 'doc_path': "/docs/a.pdf"})
+        index.add(8, {'doc_hash': "aaa", 'doc_path': "/docs/a.pdf", 'deleted': True})
+        self.assertEqual(index.lookup({'doc_hash': "aaa"}), {7})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the shared, reference-counted model registry in ModelMemoryManager
+"""
+
+import time
+import unittest
+import sys
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core.model_memory_manager import ModelMemoryManager, shared_model_id
+
+
+class FakeModel:
+    def __init__(self, name, size_mb):
+        self.name = name
+        self.size_mb = size_mb
+    
+    def encode(self, texts):
+        return [[float(len(text))] for text in texts]
+
+
+class TestModelRegistry(unittest.TestCase):
+    
+    def setUp(self):
+        self.manager = ModelMemoryManager(max_memory_mb=100, idle_timeout=3600)
+        self.manager._estimate_model_mb = lambda model, rss_delta_mb: model.size_mb
+        self.loads = []
+    
+    def tearDown(self):
+        self.manager.shutdown()
+    
+    def _loader(self, name, size_mb=10):
+        def load():
+            self.loads.append(name)
+            return FakeModel(name, size_mb)
+        return load
+    
+    def test_components_share_one_lazy_load(self):
+        model_id = shared_model_id('sentence_transformer', "all-MiniLM-L6-v2", backend='torch')
+        first = self.manager.acquire(model_id, self._loader("minilm"))
+        second = self.manager.acquire(model_id, self._loader("minilm"))
+        self.assertEqual(self.loads, [])
+        
+        self.assertEqual(first.encode(["abc"]), [[3.0]])
+        self.assertEqual(second.encode(["abcd"]), [[4.0]])
+        self.assertEqual(self.loads, ["minilm"])
+        self.assertEqual(self.manager.get_stats()['model_details'][model_id]['ref_count'], 2)
+        
+        first.release()
+        self.assertEqual(self.manager.get_stats()['active_models'], 1)
+        second.release()
+        self.assertEqual(self.manager.get_stats()['active_models'], 0)
+    
+    def test_lru_eviction_under_budget_reloads_on_next_use(self):
+        a = self.manager.acquire("a", self._loader("a", 60))
+        b = self.manager.acquire("b", self._loader("b", 30))
+        c = self.manager.acquire("c", self._loader("c", 30))
+        a.resolve()
+        b.resolve()
+        c.resolve()  # 120MB > 100MB: "a" is least recently used
+        
+        stats = self.manager.get_stats()
+        self.assertEqual(set(stats['model_details']), {"b", "c"})
+        self.assertEqual(stats['resident_mb'], 60)
+        
+        self.assertEqual(a.name, "a")
+        self.assertEqual(self.loads, ["a", "b", "c", "a"])
+        self.assertLessEqual(self.manager.get_stats()['resident_mb'], 100)
+
+    
+    def test_idle_sweep_keeps_referenced_models(self):
+        held = self.manager.acquire("held", self._loader("held"))
+        held.resolve()
+        self.manager.get_model("scratch", self._loader("scratch"))
+        
+        later = time.time() + self.manager.idle_timeout + 1
+        self.assertEqual(self.manager._unload_idle_models(later), ["scratch"])
+        self.assertEqual(set(self.manager.get_stats()['model_details']), {"held"})
+        self.assertEqual(held.name, "held")
+        self.assertEqual(self.loads, ["held", "scratch"])
+
+    
+    def test_chunker_holding_handle_pickles_for_worker_processes(self):
+        import pickle
+        from unittest import mock
+        import ingestion.semantic_chunker as semantic_chunker
+        from core.model_memory_manager import get_model_memory_manager
+        
+        with mock.patch.object(semantic_chunker, 'SENTENCE_TRANSFORMERS_AVAILABLE', True):
+            chunker = semantic_chunker.SemanticChunker(model_name="all-MiniLM-L6-v2")
+        self.assertEqual(type(chunker.model).__name__, 'SharedModelHandle')
+        model_id = chunker.model.model_id
+        registry = get_model_memory_manager()
+        
+        copy = pickle.loads(pickle.dumps(chunker))
+        self.assertEqual(copy.model.model_id, model_id)
+        self.assertEqual(registry._ref_counts[model_id], 2)  # The copy registered its own reference
+        copy.model.release()
+        chunker.model.release()
+        self.assertNotIn(model_id, registry._ref_counts)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Tests for the ONNX Runtime backend of local sentence-transformer and cross-encoder models
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from core import onnx_backend
+from core.onnx_backend import configure_model_backend, load_cross_encoder, load_sentence_transformer
+
+try:
+    import onnxruntime  # noqa: F401
+    import sentence_transformers  # noqa: F401
+    import torch  # noqa: F401
+    EXPORT_DEPENDENCIES = True
+except ImportError:
+    EXPORT_DEPENDENCIES = False
+
+
+@unittest.skipUnless(EXPORT_DEPENDENCIES, "onnxruntime, torch and sentence-transformers required")
+class TestONNXBackend(unittest.TestCase):
+    """Exports are cached on disk and stay close to the PyTorch models"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+        configure_model_backend(backend="onnx", cache_dir=self.tmp_dir, quantize=True)
+    
+    def tearDown(self):
+        configure_model_backend()
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_sentence_encoder_matches_pytorch(self):
+        from sentence_transformers import SentenceTransformer
+        texts = ["network outage in building B", "how do I reset my password", "INC0012345 router firmware"]
+        
+        encoder = load_sentence_transformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.assertIsInstance(encoder, onnx_backend.ONNXSentenceEncoder)
+        expected = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2", device="cpu").encode(texts)
+        actual = encoder.encode(texts)
+        
+        self.assertEqual(actual.shape, expected.shape)
+        cosines = np.sum(expected * actual, axis=1) / (
+            np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1))
+        self.assertGreaterEqual(cosines.min(), 0.99)
+        
+        # Second load reuses the cached export
+        exports = sorted(p.name for p in Path(self.tmp_dir).iterdir())
+        load_sentence_transformer("sentence-transformers/all-MiniLM-L6-v2")
+        self.assertEqual(sorted(p.name for p in Path(self.tmp_dir).iterdir()), exports)
+    
+    def test_cross_encoder_preserves_ranking(self):
+        from sentence_transformers import CrossEncoder
+        pairs = [("router outage", text) for text in
+                 ["the router in building B is down", "cafeteria menu for friday", "router firmware upgrade failed"]]
+        
+        reranker = load_cross_encoder("cross-encoder/ms-marco-MiniLM-L6-v2")
+        self.assertIsInstance(reranker, onnx_backend.ONNXCrossEncoder)
+        expected = CrossEncoder("cross-encoder/ms-marco-MiniLM-L6-v2", device="cpu").predict(pairs)
+        actual = reranker.predict(pairs)
+        
+        self.assertEqual(list(np.argsort(-actual)), list(np.argsort(-np.asarray(expected))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Tests for QdrantVectorStore read paths against a mocked QdrantClient
+"""
+
+import shutil
+import tempfile
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    from src.storage.qdrant_store import QdrantVectorStore
+    QDRANT_AVAILABLE = True
+except ImportError:
+    QDRANT_AVAILABLE = False
+
+
+def make_client(collections=()):
+    client = mock.MagicMock()
+    client.get_collections.return_value = SimpleNamespace(
+        collections=[SimpleNamespace(name=name) for name in collections])
+    return client
+
+
+def make_store(client, **kwargs):
+    with mock.patch('src.storage.qdrant_store.QdrantClient', return_value=client) as client_cls:
+        store = QdrantVectorStore(collection_name="docs", dimension=4, **kwargs)
+    return store, client_cls
+
+
+def point(point_id, **payload):
+    return SimpleNamespace(id=point_id, payload=payload)
+
+
+@unittest.skipUnless(QDRANT_AVAILABLE, "qdrant-client is required")
+class TestQdrantStoreReads(unittest.TestCase):
+    """Stats and aggregations use payload indexes, facets or counts instead of scrolling"""
+    
+    def test_payload_indexes_created_on_init(self):
+        client = make_client()
+        make_store(client)
+        client.create_collection.assert_called_once()
+        indexed = {call.kwargs['field_name']: call.kwargs['field_schema']
+                   for call in client.create_payload_index.call_args_list}
+        self.assertEqual(indexed, QdrantVectorStore.PAYLOAD_INDEX_FIELDS)
+        
+        existing = make_client(collections=["docs"])
+        make_store(existing)
+        existing.create_collection.assert_not_called()
+        self.assertEqual(existing.create_payload_index.call_count, len(QdrantVectorStore.PAYLOAD_INDEX_FIELDS))
+    
+    def test_aggregate_by_type_prefers_facets_and_counts_agree(self):
+        totals = {'incident': 7, 'change': 3, 'problem': 0, 'request': 1, 'task': 2}
+        client = make_client()
+        client.facet.return_value = SimpleNamespace(hits=[
+            SimpleNamespace(value=doc_type, count=count) for doc_type, count in totals.items() if count
+        ] + [SimpleNamespace(value='other', count=40)])
+        client.count.side_effect = lambda collection_name, count_filter, exact: SimpleNamespace(
+            count=totals[count_filter.must[0].match.value])
+        store, _ = make_store(client)
+        
+        self.assertEqual(store.aggregate_by_type(), totals)
+        self.assertEqual(client.facet.call_args.kwargs['key'], 'doc_type')
+        client.count.assert_not_called()
+        
+        client.facet.side_effect = RuntimeError("facet API not supported by this server")
+        self.assertEqual(store.aggregate_by_type(), totals)
+        self.assertEqual(client.count.call_count, len(totals))
+        
+        del client.facet  # Older clients have no facet method at all
+        self.assertIsNone(store.facet_counts('doc_type'))
+        self.assertEqual(store.aggregate_by_type(), totals)
+    
+    def test_scroll_grows_pages_until_last_offset(self):
+        client = make_client()
+        store, _ = make_store(client)
+        pages = [([point(1), point(2)], 'a'), ([point(3)], 'b'), ([point(4)], 'c'),
+                 ([point(5)], 'd'), ([point(6)], 'e'), ([point(7)], 'f'), ([point(8)], None)]
+        client.scroll.side_effect = pages
+        
+        ids = [p.id for p in store._scroll_all(with_payload=['doc_type'])]
+        self.assertEqual(ids, list(range(1, 9)))
+        
+        calls = client.scroll.call_args_list
+        self.assertEqual([call.kwargs['limit'] for call in calls], [256, 512, 1024, 2048, 4096, 4096, 4096])
+        self.assertEqual([call.kwargs['offset'] for call in calls], [None, 'a', 'b', 'c', 'd', 'e', 'f'])
+        self.assertTrue(all(call.kwargs['with_payload'] == ['doc_type'] for call in calls))
+        self.assertTrue(all(call.kwargs['with_vectors'] is False for call in calls))
+    
+    def test_list_all_incidents_projects_payload(self):
+        client = make_client()
+        store, _ = make_store(client)
+        client.scroll.side_effect = [([
+            point(1, incident_ids=['INC000001'], text="db outage", source_file="a.txt"),
+            point(2, incident_ids=['INC000001', 'INC000002'], text="follow-up", source_file="b.txt"),
+        ], None)]
+        
+        incidents = {item['id']: item for item in store.list_all_incidents()}
+        self.assertEqual(incidents['INC000001']['occurrence_count'], 2)
+        self.assertEqual(incidents['INC000001']['sources'], ['a.txt', 'b.txt'])
+        self.assertEqual(client.scroll.call_args.kwargs['with_payload'], ['incident_ids', 'text', 'source_file'])
+
+
+
+@unittest.skipUnless(QDRANT_AVAILABLE, "qdrant-client is required")
+class TestQdrantStoreTransport(unittest.TestCase):
+    """Client options come from config; large batches go through upload_points"""
+    
+    def create_from_config(self, **vector_store_options):
+        from src.core.config_manager import VectorStoreConfig
+        from src.core.dependency_container import create_vector_store
+        
+        vector_store = VectorStoreConfig(collection_name="docs", **vector_store_options)
+        config_manager = mock.MagicMock()
+        config_manager.get_config.side_effect = lambda section=None: (
+            SimpleNamespace(provider="sentence-transformers", model_name="all-MiniLM-L6-v2")
+            if section == 'embedding' else SimpleNamespace(vector_store=vector_store))
+        container = SimpleNamespace(get=lambda name: config_manager)
+        
+        client = make_client()
+        with mock.patch('src.storage.qdrant_store.QdrantClient', return_value=client) as client_cls:
+            store = create_vector_store(container)
+        return store, client_cls
+    
+    def test_client_built_from_config(self):
+        store, client_cls = self.create_from_config(url="qdrant:6333", qdrant_prefer_grpc=True,
+                                                    qdrant_grpc_port=7334, qdrant_upload_parallel=4)
+        client_cls.assert_called_once_with(url="qdrant:6333", prefer_grpc=True, grpc_port=7334)
+        self.assertEqual((store.local_mode, store.upload_parallel), (False, 4))
+        
+        local_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, local_dir, True)
+        store, client_cls = self.create_from_config(qdrant_local_path=local_dir, qdrant_upload_parallel=4)
+        client_cls.assert_called_once_with(path=local_dir)
+        self.assertEqual((store.local_mode, store.upload_parallel), (True, 1))
+    
+    def test_large_batches_use_upload_points(self):
+        client = make_client()
+        store, _ = make_store(client, upload_batch_size=3, upload_parallel=2)
+        vectors = [[0.1, 0.2, 0.3, 0.4]] * 5
+        metadata = [{'text': f"chunk {i}", 'doc_path': "/docs/a.txt"} for i in range(5)]
+        
+        ids = store.add_vectors(vectors, metadata)
+        self.assertEqual(len(ids), 5)
+        client.upsert.assert_not_called()
+        kwargs = client.upload_points.call_args.kwargs
+        self.assertEqual((kwargs['batch_size'], kwargs['parallel'], kwargs['wait']), (3, 2, True))
+        self.assertEqual([p.id for p in kwargs['points']], ids)
+        
+        store.add_vectors(vectors[:3], metadata[:3])
+        self.assertEqual(client.upload_points.call_count, 1)
+        self.assertEqual(len(client.upsert.call_args.kwargs['points']), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
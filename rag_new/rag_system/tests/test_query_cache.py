@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Tests for the two-tier query result cache
+"""
+
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from retrieval.query_cache import QueryResultCache
+from storage.change_log import DocumentChangeLog
+
+
+class TestQueryResultCache(unittest.TestCase):
+    """Exact and semantic hits, invalidated by changes to contributing documents"""
+    
+    def setUp(self):
+        self.change_log = DocumentChangeLog()
+        self.cache = QueryResultCache(max_entries=2, semantic_threshold=0.9)
+        self.scope = QueryResultCache.make_scope(None, 5)
+    
+    def test_exact_and_semantic_tiers(self):
+        self.cache.put("What AP models are in building A?", self.scope, {'response': "AP-1"},
+                       ["docs/aps.xlsx"], self.change_log.version, [1.0, 0.0, 0.1])
+        
+        hit = self.cache.get("  what AP models are in   building a", self.scope, self.change_log)
+        self.assertEqual((hit['response'], hit['cache_hit']), ("AP-1", 'exact'))
+        
+        hit = self.cache.get("which access points are in building A", self.scope, self.change_log, [0.99, 0.0, 0.12])
+        self.assertEqual(hit['cache_hit'], 'semantic')
+        self.assertIsNone(self.cache.get("something else", self.scope, self.change_log, [0.0, 1.0, 0.0]))
+        self.assertIsNone(self.cache.get("what AP models are in building A?", QueryResultCache.make_scope(None, 3),
+                                         self.change_log))
+    
+    def test_semantic_tier_requires_same_identifiers(self):
+        self.cache.put("status of INC0012345", self.scope, {'response': "open"}, ["inc.csv"],
+                       self.change_log.version, [1.0, 0.0])
+        self.assertIsNone(self.cache.get("status of INC0012346", self.scope, self.change_log, [1.0, 0.0]))
+        self.assertEqual(self.cache.get("state of INC0012345", self.scope, self.change_log, [1.0, 0.01])['response'],
+                         "open")
+    
+    def test_invalidation_and_eviction(self):
+        self.cache.put("q1", self.scope, {'response': "a"}, ["docs/a.pdf"], self.change_log.version)
+        self.cache.put("q2", self.scope, {'response': "b"}, ["docs/b.pdf"], self.change_log.version)
+        
+        self.change_log.record(["docs/b.pdf"])
+        self.assertIsNotNone(self.cache.get("q1", self.scope, self.change_log))
+        self.assertIsNone(self.cache.get("q2", self.scope, self.change_log))
+        
+        self.change_log.record(None)  # Unattributed change invalidates everything
+        self.assertIsNone(self.cache.get("q1", self.scope, self.change_log))
+        
+        for query in ("q3", "q4", "q5"):
+            self.cache.put(query, self.scope, {'response': query}, [], self.change_log.version)
+        stats = self.cache.get_stats()
+        self.assertEqual((stats['entries'], stats['evictions'], stats['invalidations']), (2, 1, 2))
+        self.assertEqual(stats['exact_hits'], 1)
+
+
+class TestFAISSChangeLog(unittest.TestCase):
+    """FAISSStore mutations are attributed to the documents they touch"""
+    
+    def test_add_and_delete_record_doc_paths(self):
+        import shutil
+        import tempfile
+        from storage.faiss_store import FAISSStore
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            store = FAISSStore(str(Path(tmp_dir) / "index.faiss"), dimension=2, wal_compact_interval=3600)
+            start = store.change_log.version
+            ids = store.add_vectors([[1.0, 0.0], [0.0, 1.0]], [{'doc_path': "a.md"}, {'doc_path': "b.md"}])
+            after_add = store.change_log.version
+            store.delete_vectors([ids[1]])
+            self.assertEqual(store.change_log.changes_since(start), {"a.md", "b.md"})
+            self.assertEqual(store.change_log.changes_since(after_add), {"b.md"})
+            store.close()
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+
+class TestQueryEngineCache(unittest.TestCase):
+    """A repeated question skips search and the LLM"""
+    
+    def test_repeated_query_is_served_from_cache(self):
+        from src.retrieval.query_engine import QueryEngine
+        retrieval = SimpleNamespace(top_k=2, similarity_threshold=0.1, enable_reranking=False,
+                                    rerank_top_k=5, enable_source_diversity=False)
+        config_manager = mock.Mock()
+        config_manager.get_config.return_value = SimpleNamespace(retrieval=retrieval)
+        embedder = mock.Mock()
+        embedder.embed_texts.side_effect = lambda texts: [[1.0, 0.5] for _ in texts]
+        vector_store = mock.Mock()
+        vector_store.change_log = DocumentChangeLog()
+        vector_store.search_batch.side_effect = lambda vectors, k, filters=None: [
+            [{'text': "Restart the service", 'doc_path': "runbook.md", 'similarity_score': 0.9}] for _ in vectors
+        ]
+        llm_client = mock.Mock()
+        llm_client.generate.return_value = "Restart it."
+        engine = QueryEngine(vector_store, embedder, llm_client, None, config_manager,
+                             query_cache=QueryResultCache())
+        
+        first = engine.process_query("How do I restart the service?")
+        # The embedding made for the semantic cache lookup is reused for retrieval
+        self.assertEqual(embedder.embed_texts.call_count, 1)
+        self.assertEqual(vector_store.search_batch.call_args.args[0], [[1.0, 0.5]])
+        second = engine.process_query("how do i restart the service")
+        self.assertEqual(second['cache_hit'], 'exact')
+        self.assertEqual(second['response'], first['response'])
+        self.assertEqual(vector_store.search_batch.call_count, 1)
+        # An exact hit is answered before the query is embedded
+        self.assertEqual(embedder.embed_texts.call_count, 1)
+        
+        vector_store.change_log.record(["runbook.md"])
+        engine.process_query("How do I restart the service?")
+        self.assertEqual(vector_store.search_batch.call_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Tests for the Reranker score cache, chunk truncation and cascade first pass
+"""
+
+import unittest
+import sys
+from pathlib import Path
+from unittest.mock import patch
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+import retrieval.reranker as reranker_module
+from retrieval.reranker import Reranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how often query words occur in the text"""
+    
+    instances = {}
+    
+    def __init__(self, model_name, device="cpu"):
+        self.model_name = model_name
+        self.max_length = 8
+        self.seen = []
+        FakeCrossEncoder.instances[model_name] = self
+    
+    def predict(self, pairs):
+        self.seen.extend(text for _, text in pairs)
+        return [float(sum(text.split().count(word) for word in query.split())) for query, text in pairs]
+
+
+class TestRerankerCache(unittest.TestCase):
+    
+    def setUp(self):
+        FakeCrossEncoder.instances = {}
+        patcher = patch.multiple(reranker_module, get_shared_cross_encoder=FakeCrossEncoder,
+                                 CROSS_ENCODER_AVAILABLE=True)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.docs = [{'chunk_id': f"c{i}", 'text': " ".join(["alpha"] * i + ["pad"] * 3),
+                      'similarity_score': 0.1 * i} for i in range(6)]
+    
+    def test_cached_pairs_skip_the_model(self):
+        reranker = Reranker("full")
+        model = FakeCrossEncoder.instances["full"]
+        first = reranker.rerank("alpha", self.docs, top_k=3)
+        self.assertEqual(len(model.seen), 6)
+        
+        second = reranker.rerank("alpha", self.docs, top_k=3)
+        self.assertEqual(len(model.seen), 6)
+        self.assertEqual([d['chunk_id'] for d in first], [d['chunk_id'] for d in second])
+        self.assertEqual(reranker.get_model_info()['score_cache']['cache_hits'], 6)
+        
+        reranker.rerank("beta", self.docs, top_k=3)
+        self.assertEqual(len(model.seen), 12)
+    
+    def test_text_truncated_to_model_max_length(self):
+        reranker = Reranker("full")
+        reranker.rerank("alpha", [{'chunk_id': 'long', 'text': "word " * 100}])
+        self.assertEqual(len(FakeCrossEncoder.instances["full"].seen[0].split()), 8)
+    
+    def test_cascade_only_sends_survivors_to_full_model(self):
+        reranker = Reranker("full", cascade_model_name="cheap", cascade_keep=2)
+        results = reranker.rerank("alpha", self.docs)
+        
+        self.assertEqual(len(FakeCrossEncoder.instances["cheap"].seen), 6)
+        self.assertEqual(len(FakeCrossEncoder.instances["full"].seen), 2)
+        self.assertEqual([d['chunk_id'] for d in results[:2]], ['c5', 'c4'])
+        self.assertFalse(any(d.get('rerank_pruned') for d in results[:2]))
+        
+        # Pruned candidates carry only their first-pass score, never an invented rerank_score
+        pruned = results[2:]
+        self.assertTrue(all(d.get('rerank_pruned') and 'rerank_score' not in d for d in pruned))
+        cascade_scores = [d['cascade_score'] for d in pruned]
+        self.assertEqual(cascade_scores, sorted(cascade_scores, reverse=True))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for batched multi-query search (FAISSStore.search_batch and QueryEngine wiring)
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+try:
+    import faiss  # noqa: F401
+    import numpy as np
+    FAISS_AVAILABLE = True
+except ImportError:
+    FAISS_AVAILABLE = False
+
+
+@unittest.skipUnless(FAISS_AVAILABLE, "faiss and numpy are required")
+class TestFAISSSearchBatch(unittest.TestCase):
+    """One q x d search returns the same hits as q single searches"""
+    
+    def setUp(self):
+        from storage.faiss_store import FAISSStore
+        self.tmp_dir = tempfile.mkdtemp()
+        self.store = FAISSStore(str(Path(self.tmp_dir) / "index.faiss"), dimension=8, wal_compact_interval=3600)
+        self.vectors = np.random.RandomState(0).rand(30, 8).astype('float32')
+        self.store.add_vectors(self.vectors.tolist(),
+                               [{'text': f"chunk {i}", 'doc_path': f"doc{i % 3}"} for i in range(30)])
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_batch_matches_single_searches(self):
+        queries = self.vectors[[3, 17, 25]].tolist()
+        batch = self.store.search_batch(queries, k=4)
+        
+        self.assertEqual(len(batch), 3)
+        for query, results in zip(queries, batch):
+            single = self.store.search_with_metadata(query, k=4)
+            self.assertEqual([r['vector_id'] for r in results], [r['vector_id'] for r in single])
+        self.assertEqual(batch[1][0]['text'], "chunk 17")
+    
+    def test_batch_filters(self):
+        batch = self.store.search_batch(self.vectors[[4]].tolist(), k=3, filters={'doc_path': 'doc1'})
+        self.assertTrue(batch[0])
+        self.assertTrue(all(r['doc_path'] == 'doc1' for r in batch[0]))
+    
+    def test_batch_returns_stored_vectors(self):
+        batch = self.store.search_batch(self.vectors[[5]].tolist(), k=2, return_vectors=True)
+        expected = self.vectors[5] / np.linalg.norm(self.vectors[5])
+        self.assertTrue(np.allclose(batch[0][0]['_vector'], expected, atol=1e-5))
+    
+    def test_empty_batch(self):
+        self.assertEqual(self.store.search_batch([], k=3), [])
+
+
+class TestQueryEngineBatching(unittest.TestCase):
+    """Query variants and decomposed sub-queries share one embed call and one search"""
+    
+    def setUp(self):
+        from src.retrieval.query_engine import QueryEngine
+        retrieval = SimpleNamespace(top_k=2, similarity_threshold=0.1, enable_reranking=False,
+                                    rerank_top_k=5, enable_source_diversity=False)
+        config_manager = mock.Mock()
+        config_manager.get_config.return_value = SimpleNamespace(retrieval=retrieval)
+        
+        self.embedder = mock.Mock()
+        self.embedder.embed_texts.side_effect = lambda texts: [[float(i)] for i in range(len(texts))]
+        self.vector_store = mock.Mock()
+        self.vector_store.search_batch.side_effect = lambda vectors, k, filters=None: [
+            [{'text': f"hit for query {i}", 'chunk_id': f"c{i}", 'similarity_score': 0.9}]
+            for i in range(len(vectors))
+        ]
+        self.engine = QueryEngine(self.vector_store, self.embedder, mock.Mock(), None, config_manager)
+    
+    def test_retrieve_sources_batch_single_round_trip(self):
+        sources = self.engine.retrieve_sources_batch(["first", "second", "third"])
+        
+        self.embedder.embed_texts.assert_called_once_with(["first", "second", "third"])
+        self.vector_store.search_batch.assert_called_once()
+        self.vector_store.search_with_metadata.assert_not_called()
+        self.assertEqual([s[0]['text'] for s in sources],
+                         ["hit for query 0", "hit for query 1", "hit for query 2"])
+    
+    def test_process_query_batches_variants(self):
+        enhancer = mock.Mock()
+        enhancer.get_all_query_variants.return_value = [("a", 1.0), ("b", 0.9), ("c", 0.8), ("d", 0.7)]
+        self.engine.query_enhancer = enhancer
+        self.engine._generate_llm_response = mock.Mock(return_value="answer")
+        
+        response = self.engine.process_query("a")
+        
+        self.embedder.embed_texts.assert_called_once_with(["a", "b", "c"])
+        self.vector_store.search_batch.assert_called_once()
+        self.assertEqual(response['response'], "answer")
+        self.assertEqual(response['total_sources'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Tests for vectorized source-diversity scoring in QueryEngine
+"""
+
+import unittest
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from src.retrieval.query_engine import QueryEngine
+
+
+def make_engine(diversity_similarity='jaccard'):
+    retrieval = SimpleNamespace(top_k=3, similarity_threshold=0.0, enable_reranking=False, rerank_top_k=5,
+                                enable_source_diversity=True, diversity_weight=0.3, max_chunks_per_doc=2,
+                                diversity_similarity=diversity_similarity)
+    config_manager = mock.Mock()
+    config_manager.get_config.return_value = SimpleNamespace(retrieval=retrieval)
+    return QueryEngine(mock.Mock(), mock.Mock(), mock.Mock(), None, config_manager)
+
+
+def jaccard(a, b):
+    words_a, words_b = set(a.lower().split()), set(b.lower().split())
+    if not words_a or not words_b:
+        return 0.0
+    return len(words_a & words_b) / len(words_a | words_b)
+
+
+class TestSourceDiversity(unittest.TestCase):
+    """The similarity matrix matches pairwise word-set Jaccard and drives selection"""
+    
+    def setUp(self):
+        self.results = [
+            {'text': "restart the database service", 'doc_id': "a", 'similarity_score': 0.9},
+            {'text': "restart the Database cluster", 'doc_id': "a", 'similarity_score': 0.85},
+            {'text': "network outage in building two", 'doc_id': "b", 'similarity_score': 0.8},
+            {'text': "", 'doc_id': "c", 'similarity_score': 0.7},
+            {'text': "restart the database service", 'doc_id': "a", 'similarity_score': 0.6},
+        ]
+    
+    def test_content_scores_match_pairwise_jaccard(self):
+        engine = make_engine()
+        scored = {r['similarity_score']: r for r in engine._calculate_diversity_scores(self.results)}
+        texts = [r['text'] for r in self.results]
+        for i, result in enumerate(self.results):
+            others = [jaccard(texts[i], texts[j]) for j in range(len(texts)) if j != i and texts[j]]
+            expected = 0.5 if not texts[i] else max(0.0, min(1.0, 1.0 - sum(others) / len(others)))
+            self.assertAlmostEqual(scored[result['similarity_score']]['content_diversity_score'], expected, places=6)
+    
+    def test_selection_respects_chunk_limit_without_duplicates(self):
+        engine = make_engine()
+        selected = engine._apply_source_diversity_scoring(self.results, top_k=4)
+        self.assertEqual(len(selected), 4)
+        self.assertEqual(len({r['similarity_score'] for r in selected}), 4)
+        self.assertLessEqual(sum(1 for r in selected if r['doc_id'] == "a"), 2)
+    
+    def test_embedding_mode_reuses_search_vectors(self):
+        engine = make_engine('embedding')
+        vectors = [[1.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.7, 0.7], [1.0, 0.0]]
+        results = [{**r, '_vector': v} for r, v in zip(self.results, vectors)]
+        selected = engine._apply_source_diversity_scoring(results, top_k=3)
+        
+        self.assertTrue(all('_vector' not in r for r in selected))
+        by_score = {r['similarity_score']: r for r in selected}
+        # The orthogonal vector is the least similar to the rest
+        self.assertGreater(by_score[0.8]['content_diversity_score'], by_score[0.9]['content_diversity_score'])
+
+    def test_cascade_pruned_results_only_fill_open_slots(self):
+        engine = make_engine()
+        reranked = [{'text': f"reranked answer {i}", 'doc_id': f"r{i}", 'similarity_score': 0.5,
+                     'rerank_score': 0.2} for i in range(2)]
+        pruned = [{'text': f"pruned candidate {i}", 'doc_id': f"p{i}", 'similarity_score': 0.95,
+                   'cascade_score': 0.9, 'rerank_pruned': True} for i in range(3)]
+
+        selected = engine._apply_source_diversity_scoring(pruned + reranked, top_k=3)
+        self.assertEqual([r.get('rerank_pruned', False) for r in selected], [False, False, True])
+
+        selected = engine._apply_source_diversity_scoring(pruned + reranked, top_k=2)
+        self.assertTrue(all('rerank_score' in r for r in selected))
+
+
+if __name__ == '__main__':
+    unittest.main()
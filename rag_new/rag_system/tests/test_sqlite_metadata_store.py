@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for the SQLite-backed metadata store
+"""
+
+import unittest
+import sys
+import shutil
+import tempfile
+from pathlib import Path
+
+# Add the src directory to the path
+sys.path.insert(0, str(Path(__file__).parent.parent / 'src'))
+
+from storage.persistent_metadata_store import PersistentJSONMetadataStore
+from storage.sqlite_metadata_store import SQLiteMetadataStore
+
+
+class TestSQLiteMetadataStore(unittest.TestCase):
+    """Same API as the JSON store, with indexed lookups and a one-time migration"""
+    
+    def setUp(self):
+        self.tmp_dir = tempfile.mkdtemp()
+    
+    def tearDown(self):
+        shutil.rmtree(self.tmp_dir, ignore_errors=True)
+    
+    def test_api_matches_json_store(self):
+        store = SQLiteMetadataStore(self.tmp_dir)
+        file_id = store.add_file_metadata("/docs/a.pdf", {'doc_hash': "aaa", 'vector_ids': [1, 2]})
+        store.add_chunks_metadata([
+            {'doc_id': file_id, 'vector_id': 1, 'filename': "a.pdf", 'text': "first"},
+            {'doc_id': file_id, 'vector_id': 2, 'filename': "a.pdf", 'text': "second"}
+        ])
+        
+        self.assertEqual(store.get_file_metadata(file_id)['filename'], "a.pdf")
+        self.assertEqual(store.find_by_hash("aaa")['file_id'], file_id)
+        self.assertEqual(store.find_vector_ids_by_hash("aaa"), [1, 2])
+        self.assertEqual(store.get_metadata_by_vector_id("2")['text'], "second")
+        self.assertEqual([c['text'] for c in store.get_file_chunks(file_id)], ["first", "second"])
+        self.assertEqual(store.get_all_files()[0]['chunk_count'], 2)
+        self.assertEqual(len(store.find_files_by_filename("a.pdf")), 1)
+        
+        newer = store.add_file_metadata("/docs/a-copy.pdf", {'doc_hash': "aaa"})
+        self.assertEqual(store.find_by_hash("aaa")['file_id'], newer)
+        
+        stats = store.get_stats()
+        self.assertEqual((stats['total_files'], stats['total_chunks'], stats['total_vector_mappings']), (2, 2, 2))
+        
+        store.clear_all_data()
+        self.assertIsNone(store.find_by_hash("aaa"))
+        self.assertEqual(store.get_all_chunks(), [])
+    
+    def test_json_files_are_migrated_once(self):
+        legacy = PersistentJSONMetadataStore(self.tmp_dir)
+        file_id = legacy.add_file_metadata("/docs/b.pdf", {'doc_hash': "bbb"})
+        legacy.add_chunk_metadata({'doc_id': file_id, 'vector_id': 7, 'text': "legacy chunk"})
+        
+        store = SQLiteMetadataStore(self.tmp_dir)
+        self.assertEqual(store.find_by_hash("bbb")['file_id'], file_id)
+        self.assertEqual(store.get_metadata_by_vector_id("7")['text'], "legacy chunk")
+        self.assertFalse((Path(self.tmp_dir) / "files_metadata.json").exists())
+        self.assertTrue((Path(self.tmp_dir) / "files_metadata.json.migrated").exists())
+        store.close()
+        
+        # Reopening does not import again
+        reopened = SQLiteMetadataStore(self.tmp_dir)
+        self.assertEqual(reopened.get_stats()['total_chunks'], 1)
+        
+        backup_dir = reopened.backup_metadata(str(Path(self.tmp_dir) / "backup"))
+        self.assertEqual(len(list(Path(backup_dir).glob("*.sqlite"))), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()